@@ -7,17 +7,59 @@ Maneja usuarios, login y registro
 import sqlite3
 import os
 import hashlib
+import secrets
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from .database import StatementCache, CACHED_STATEMENTS
+
+
+# Duración de una sesión (30 días) y resolución con la que se actualiza last_seen
+SESSION_TTL = 30 * 24 * 60 * 60
+LAST_SEEN_RESOLUTION = 60
+
+# Registro de las sentencias SQL de AuthDatabase (ver STATEMENTS en database)
+AUTH_STATEMENTS = {
+    "user.exists": "SELECT COUNT(*) FROM users WHERE email = ?",
+    "user.add": "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
+    "user.check": "SELECT id, name, email FROM users WHERE email = ? AND password = ?",
+    "user.by_email": "SELECT id, name, email FROM users WHERE email = ?",
+    "user.count": "SELECT COUNT(*) FROM users",
+    "session.create": (
+        "INSERT INTO sessions (token_hash, user_id, created_at, expires_at, last_seen) "
+        "VALUES (?, ?, ?, ?, ?)"
+    ),
+    "session.get": (
+        "SELECT u.id, u.name, u.email, s.expires_at, s.last_seen "
+        "FROM sessions s JOIN users u ON u.id = s.user_id "
+        "WHERE s.token_hash = ?"
+    ),
+    "session.touch": "UPDATE sessions SET last_seen = ? WHERE token_hash = ?",
+    "session.revoke": "DELETE FROM sessions WHERE token_hash = ?",
+    "session.prune": "DELETE FROM sessions WHERE expires_at <= ?",
+    "session.count": "SELECT COUNT(*) FROM sessions",
+}
 
 
 class AuthDatabase:
     """Clase para manejar la autenticación de usuarios"""
     
-    def __init__(self, db_path):
+    def __init__(self, db_path, persistent=False):
         """
         Inicializa la conexión a la base de datos de usuarios
         :param db_path: Ruta completa al archivo de base de datos
+        :param persistent: Mantener una conexión abierta (se libera con close)
+                           en vez de abrir una por operación
         """
         self.db_path = db_path
+        self.persistent = persistent
+        self._conn = None
+        self._prepared = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # Diagnóstico de la caché de sentencias (ver statement_cache_stats)
+        self.statements = StatementCache()
         self._ensure_db_exists()
     
     def _ensure_db_exists(self):
@@ -44,6 +86,22 @@ class AuthDatabase:
                 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)
             """)
             
+            # Crear tabla de sesiones (solo se guarda el hash del token)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    token_hash TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    created_at INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL,
+                    last_seen INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            
+            # Índice para podar las sesiones vencidas sin recorrer la tabla
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)
+            """)
+            
             conn.commit()
     
     def _hash_password(self, password):
@@ -56,7 +114,52 @@ class AuthDatabase:
     
     def get_connection(self):
         """Retorna una conexión a la base de datos"""
-        return sqlite3.connect(self.db_path)
+        return sqlite3.connect(self.db_path, cached_statements=CACHED_STATEMENTS)
+    
+    @contextmanager
+    def _connection(self):
+        """
+        Conexión para una operación: se confirma al salir sin errores (o se
+        deshace) y se cierra, salvo la persistente, que se reutiliza
+        """
+        with self._lock if self.persistent else nullcontext():
+            if not self.persistent:
+                conn, self._local.prepared = self.get_connection(), self.statements.new_connection()
+            else:
+                if self._conn is None:
+                    self._conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                                 cached_statements=CACHED_STATEMENTS)
+                    self._prepared = self.statements.new_connection()
+                conn, self._local.prepared = self._conn, self._prepared
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                if not self.persistent:
+                    conn.close()
+    
+    def _execute(self, cursor, name, params=()):
+        """Ejecuta una sentencia de AUTH_STATEMENTS"""
+        sql = AUTH_STATEMENTS[name]
+        self.statements.record(self._local.prepared, sql)
+        return cursor.execute(sql, params)
+    
+    def statement_cache_stats(self):
+        """
+        Diagnóstico de la caché de sentencias preparadas (ver Database.statement_cache_stats)
+        :return: Dict con hits, misses, executions, hit_rate, statements,
+                 cached_statements y persistent
+        """
+        stats = self.statements.stats()
+        stats.update({
+            "statements": len(AUTH_STATEMENTS),
+            "cached_statements": self.statements.capacity,
+            "persistent": self.persistent,
+        })
+        return stats
     
     # ========== REGISTRO ==========
     
@@ -66,9 +169,9 @@ class AuthDatabase:
         :param email: Email a verificar
         :return: True si existe, False si no
         """
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM users WHERE email = ?", (email.lower(),))
+            self._execute(cursor, "user.exists", (email.lower(),))
             count = cursor.fetchone()[0]
             return count > 0
     
@@ -90,13 +193,9 @@ class AuthDatabase:
         password_hash = self._hash_password(password)
         
         try:
-            with self.get_connection() as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
-                    (name, email, password_hash)
-                )
-                conn.commit()
+                self._execute(cursor, "user.add", (name, email, password_hash))
                 return True
         except sqlite3.IntegrityError:
             return False
@@ -113,12 +212,9 @@ class AuthDatabase:
         email = email.lower().strip()
         password_hash = self._hash_password(password)
         
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, name, email FROM users WHERE email = ? AND password = ?",
-                (email, password_hash)
-            )
+            self._execute(cursor, "user.check", (email, password_hash))
             row = cursor.fetchone()
             
             if row:
@@ -137,12 +233,9 @@ class AuthDatabase:
         """
         email = email.lower().strip()
         
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, name, email FROM users WHERE email = ?",
-                (email,)
-            )
+            self._execute(cursor, "user.by_email", (email,))
             row = cursor.fetchone()
             
             if row:
@@ -153,6 +246,98 @@ class AuthDatabase:
                 }
             return None
     
+    # ========== SESIONES ==========
+    
+    def _hash_token(self, token):
+        """
+        Hashea el token de sesión (en la base de datos nunca se guarda el token)
+        :param token: Token opaco de la sesión
+        :return: Hash SHA-256 del token
+        """
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def create_session(self, user_id, ttl=SESSION_TTL, now=None):
+        """
+        Crea una sesión nueva para el usuario
+        :param user_id: ID del usuario
+        :param ttl: Duración de la sesión en segundos
+        :param now: Timestamp actual (inyectable para pruebas)
+        :return: Token opaco que se guarda en el archivo de sesión
+        """
+        now = int(time.time() if now is None else now)
+        token = secrets.token_urlsafe(32)
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "session.create",
+                          (self._hash_token(token), user_id, now, now + ttl, now))
+        return token
+    
+    def validate_session(self, token, now=None):
+        """
+        Valida un token de sesión (búsqueda por clave primaria)
+        :param token: Token opaco de la sesión
+        :param now: Timestamp actual (inyectable para pruebas)
+        :return: Diccionario con datos del usuario o None si la sesión no es válida
+        """
+        if not token:
+            return None
+        now = int(time.time() if now is None else now)
+        token_hash = self._hash_token(token)
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "session.get", (token_hash,))
+            row = cursor.fetchone()
+            
+            if not row or row[3] <= now:
+                return None
+            
+            # last_seen se actualiza como mucho una vez por minuto (evita escribir en cada arranque)
+            if now - row[4] >= LAST_SEEN_RESOLUTION:
+                self._execute(cursor, "session.touch", (now, token_hash))
+            
+            return {
+                "id": row[0],
+                "name": row[1],
+                "email": row[2]
+            }
+    
+    def revoke_session(self, token):
+        """
+        Elimina una sesión (cierre de sesión)
+        :param token: Token opaco de la sesión
+        :return: True si la sesión existía, False si no
+        """
+        if not token:
+            return False
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "session.revoke", (self._hash_token(token),))
+            return cursor.rowcount > 0
+    
+    def prune_expired_sessions(self, now=None):
+        """
+        Elimina las sesiones vencidas
+        :param now: Timestamp actual (inyectable para pruebas)
+        :return: Número de sesiones eliminadas
+        """
+        now = int(time.time() if now is None else now)
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "session.prune", (now,))
+            return cursor.rowcount
+    
+    def get_session_count(self):
+        """
+        Obtiene el número de sesiones guardadas
+        :return: Número de sesiones
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "session.count")
+            return cursor.fetchone()[0]
+    
     # ========== UTILIDADES ==========
     
     def get_user_count(self):
@@ -160,15 +345,44 @@ class AuthDatabase:
         Obtiene el número total de usuarios registrados
         :return: Número de usuarios
         """
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM users")
+            self._execute(cursor, "user.count")
             return cursor.fetchone()[0]
     
+    # ========== COPIAS DE SEGURIDAD ==========
+    
+    def backup(self, dest_path, **options):
+        """
+        Copia consistente de la base de datos de usuarios (ver app.backup)
+        :param dest_path: Archivo de destino
+        :param options: pages_per_step, pause, progress (ver backup_database)
+        :return: Dict de backup_database (bytes, seconds, restarts, max_step, ...)
+        """
+        from .backup import backup_database
+        return backup_database(self.db_path, dest_path, **options)
+    
+    def restore(self, snapshot_path):
+        """
+        Reemplaza la base de datos de usuarios por una copia hecha con backup
+        :param snapshot_path: Archivo de la copia
+        """
+        from .backup import restore_database
+        with self._lock:
+            result = restore_database(snapshot_path, self.db_path)
+        self._ensure_db_exists()
+        return result
+    
     def close(self):
         """
-        Cierra la conexión (no necesario con context managers)
+        Cierra la conexión persistente (sin persistent=True no hay nada que cerrar)
         """
-        pass
+        if not self.persistent:
+            return
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._prepared = None
 
 
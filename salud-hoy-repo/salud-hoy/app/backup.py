@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+Copias de seguridad de las bases de datos de Salud Hoy
+Usa la API de backup de SQLite (sqlite3.Connection.backup) en vez de copiar el
+archivo: copiar un archivo en uso puede capturar una escritura a medias. La
+copia se hace de a `pages_per_step` páginas y el bloqueo de lectura se suelta
+entre pasos, así la app puede seguir escribiendo mientras tanto:
+- Si otra conexión escribe durante la copia, SQLite la reinicia para que el
+  resultado sea consistente; después de MAX_RESTARTS reinicios se copia lo que
+  falta en un solo paso (bloquea las escrituras hasta terminar)
+- La copia se escribe en <destino>.part y se renombra al final: una copia
+  interrumpida nunca reemplaza a una buena
+- Instantáneas con rotación en data/backups/ (<base>-AAAAMMDD-HHMMSS-mmm.db),
+  las más nuevas al final
+- La restauración verifica la copia (quick_check) y la escribe sobre la base
+  de datos en una sola transacción
+
+Uso:
+    python -m app.backup snapshot [--db data/salud_hoy.db ...] [--dir data/backups] [--keep 7]
+    python -m app.backup list [--dir data/backups]
+    python -m app.backup restore data/backups/salud_hoy-20250101-120000-000.db [--db data/salud_hoy.db]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from urllib.request import pathname2url
+
+
+# Páginas copiadas por paso (con páginas de 4 KB, 1 MB por paso)
+PAGES_PER_STEP = 256
+
+# Pausa entre pasos (segundos): cede la CPU al hilo de la interfaz
+STEP_PAUSE = 0.0
+
+# Reinicios por escrituras concurrentes antes de copiar lo que falta en un solo paso
+MAX_RESTARTS = 3
+
+# Instantáneas que se conservan por base de datos
+KEEP_SNAPSHOTS = 7
+
+# Segundos entre dos instantáneas programadas
+SNAPSHOT_INTERVAL = 24 * 3600
+
+
+class _TooManyRestarts(Exception):
+    """La copia se reinició demasiadas veces por escrituras concurrentes"""
+
+
+class _StepTracker:
+    """Callback de progreso de Connection.backup: mide cada paso y cuenta los reinicios"""
+
+    def __init__(self, pause, max_restarts, progress):
+        self.pause = pause
+        self.max_restarts = max_restarts
+        self.progress = progress
+        self.steps = 0
+        self.restarts = 0
+        self.max_step = 0.0
+        self._remaining = None
+        self._last = time.perf_counter()
+
+    def __call__(self, status, remaining, total):
+        now = time.perf_counter()
+        # status 5/6 (BUSY/LOCKED): el paso no copió nada, esperó a un escritor
+        if status not in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+            self.steps += 1
+            self.max_step = max(self.max_step, now - self._last)
+        if self._remaining is not None and remaining > self._remaining:
+            # Otra conexión escribió: SQLite volvió a empezar la copia
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise _TooManyRestarts()
+        self._remaining = remaining
+        if self.progress is not None:
+            self.progress(total - remaining, total)
+        if self.pause:
+            time.sleep(self.pause)
+        self._last = time.perf_counter()
+
+
+def _connect_readonly(path):
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+
+
+def backup_database(src_path, dest_path, pages_per_step=PAGES_PER_STEP, pause=STEP_PAUSE,
+                    max_restarts=MAX_RESTARTS, progress=None):
+    """
+    Copia una base de datos en uso a otro archivo
+    :param src_path: Base de datos de origen (debe existir)
+    :param dest_path: Archivo de destino (se reemplaza al terminar)
+    :param pages_per_step: Páginas por paso (-1 = todo en un paso)
+    :param pause: Segundos de pausa entre pasos
+    :param max_restarts: Reinicios tolerados antes de copiar en un solo paso
+    :param progress: Función progress(páginas_copiadas, páginas_totales) opcional
+    :return: Dict con path, pages, bytes, steps, restarts, fallback, max_step,
+             seconds y bytes_per_sec
+    """
+    if not os.path.exists(src_path):
+        raise FileNotFoundError(f"No existe la base de datos: {src_path}")
+
+    dest_dir = os.path.dirname(os.path.abspath(dest_path))
+    os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = dest_path + ".part"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    start = time.perf_counter()
+    tracker = _StepTracker(pause, max_restarts, progress)
+    fallback = False
+    src = sqlite3.connect(src_path)
+    try:
+        dst = sqlite3.connect(tmp_path)
+        try:
+            try:
+                src.backup(dst, pages=pages_per_step, progress=tracker)
+            except _TooManyRestarts:
+                fallback = True
+                src.backup(dst, pages=-1)
+            pages = dst.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            dst.close()
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        src.close()
+    os.replace(tmp_path, dest_path)
+
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(dest_path)
+    return {
+        "path": dest_path,
+        "pages": pages,
+        "bytes": size,
+        "steps": tracker.steps,
+        "restarts": tracker.restarts,
+        "fallback": fallback,
+        "max_step": tracker.max_step,
+        "seconds": seconds,
+        "bytes_per_sec": size / seconds if seconds > 0 else 0.0,
+    }
+
+
+def restore_database(snapshot_path, db_path):
+    """
+    Reemplaza el contenido de una base de datos por el de una copia
+    Se escribe en un solo paso: las demás conexiones ven la base anterior o la
+    restaurada, nunca una mezcla (esperan a que termine si quieren escribir).
+    :param snapshot_path: Copia hecha con backup_database
+    :param db_path: Base de datos a restaurar (se crea si no existe)
+    :return: Dict con pages y seconds
+    """
+    if not os.path.exists(snapshot_path):
+        raise FileNotFoundError(f"No existe la copia: {snapshot_path}")
+
+    start = time.perf_counter()
+    src = _connect_readonly(snapshot_path)
+    try:
+        rows = [row[0] for row in src.execute("PRAGMA quick_check(10)")]
+        if rows != ["ok"]:
+            raise ValueError(f"La copia {snapshot_path} está dañada: {rows}")
+        dst = sqlite3.connect(db_path, timeout=30.0)
+        try:
+            src.backup(dst)
+            pages = dst.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return {"pages": pages, "seconds": time.perf_counter() - start}
+
+
+# ========== INSTANTÁNEAS ==========
+
+def _stem(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def list_snapshots(directory, db_path=None):
+    """
+    Instantáneas de un directorio, de la más vieja a la más nueva
+    :param directory: Directorio de las instantáneas
+    :param db_path: Solo las de esta base de datos (None = todas)
+    :return: Lista de rutas
+    """
+    if not os.path.isdir(directory):
+        return []
+    prefix = f"{_stem(db_path)}-" if db_path else ""
+    names = [
+        name for name in os.listdir(directory)
+        if name.endswith(".db") and name.startswith(prefix)
+    ]
+    # El nombre termina en fecha-hora-milisegundos: el orden alfabético es el cronológico
+    # dentro de cada base de datos
+    names.sort(key=lambda name: (name.rsplit("-", 3)[0], name))
+    return [os.path.join(directory, name) for name in names]
+
+
+def prune_snapshots(directory, db_path, keep=KEEP_SNAPSHOTS):
+    """
+    Borra las instantáneas más viejas de una base de datos
+    :return: Lista de rutas borradas
+    """
+    old = list_snapshots(directory, db_path)[:-keep] if keep > 0 else []
+    for path in old:
+        os.remove(path)
+    return old
+
+
+def snapshot(db_path, directory, keep=KEEP_SNAPSHOTS, pages_per_step=PAGES_PER_STEP,
+             pause=STEP_PAUSE, now=None):
+    """
+    Guarda una instantánea de la base de datos y borra las que sobran
+    :param db_path: Base de datos
+    :param directory: Directorio de las instantáneas
+    :param keep: Instantáneas que se conservan (incluida la nueva; 0 = no borrar ninguna)
+    :param now: Fecha y hora de la instantánea (segundos epoch; por defecto ahora)
+    :return: Dict de backup_database más removed (instantáneas borradas)
+    """
+    now = time.time() if now is None else now
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    path = os.path.join(directory, f"{_stem(db_path)}-{stamp}-{int(now * 1000) % 1000:03d}.db")
+    result = backup_database(db_path, path, pages_per_step=pages_per_step, pause=pause)
+    result["removed"] = prune_snapshots(directory, db_path, keep)
+    return result
+
+
+class SnapshotScheduler:
+    """
+    Guarda instantáneas periódicas en un hilo
+    La app llama a tick() periódicamente (ej: con Clock.schedule_interval); el
+    intervalo se cuenta desde la instantánea más nueva del directorio, así no se
+    repite en cada arranque.
+    """
+
+    def __init__(self, db_paths, directory, keep=KEEP_SNAPSHOTS, interval=SNAPSHOT_INTERVAL,
+                 pages_per_step=PAGES_PER_STEP, pause=0.001, clock=time.time):
+        """
+        :param db_paths: Rutas de las bases de datos
+        :param directory: Directorio de las instantáneas
+        :param keep: Instantáneas que se conservan por base de datos
+        :param interval: Segundos entre instantáneas
+        :param pages_per_step: Páginas por paso de la copia
+        :param pause: Segundos de pausa entre pasos (cede la CPU a la interfaz)
+        :param clock: Reloj de pared (inyectable para pruebas)
+        """
+        self.db_paths = list(db_paths)
+        self.directory = directory
+        self.keep = keep
+        self.interval = interval
+        self.pages_per_step = pages_per_step
+        self.pause = pause
+        self._clock = clock
+        self._thread = None
+        self.results = []
+        existing = [
+            os.path.getmtime(path)
+            for db_path in self.db_paths for path in list_snapshots(directory, db_path)[-1:]
+        ]
+        # La más vieja de las últimas: si falta la de alguna base de datos, corresponde ya
+        self._last_run = min(existing) if len(existing) == len(self.db_paths) else None
+
+    def is_due(self):
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        return self._last_run is None or self._clock() - self._last_run >= self.interval
+
+    def tick(self, *_):
+        """
+        Inicia las instantáneas en segundo plano si corresponde
+        :return: True si se iniciaron
+        """
+        if not self.is_due():
+            return False
+        self._last_run = self._clock()
+        self._thread = threading.Thread(target=self._run, name="db-snapshot", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        for path in self.db_paths:
+            if not os.path.exists(path):
+                continue
+            try:
+                self.results.append(snapshot(path, self.directory, self.keep,
+                                             self.pages_per_step, self.pause, now=self._clock()))
+            except (OSError, sqlite3.Error) as e:
+                print(f"[ERROR] No se pudo guardar la instantánea de {path}: {e}")
+
+    def join(self, timeout=None):
+        """Espera a que terminen las instantáneas en curso (pruebas y cierre de la app)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# ========== CONSOLA ==========
+
+def _format_size(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def main(argv=None):
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+    default_dbs = [os.path.join(data_dir, "salud_hoy.db"), os.path.join(data_dir, "users.db")]
+    parser = argparse.ArgumentParser(description="Copias de seguridad de las bases de datos de Salud Hoy")
+    parser.add_argument("--dir", default=os.path.join(data_dir, "backups"),
+                        help="Directorio de las instantáneas")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = commands.add_parser("snapshot", help="Guardar una instantánea")
+    snapshot_parser.add_argument("--db", action="append",
+                                 help="Base de datos (se puede repetir; por defecto salud_hoy.db y users.db)")
+    snapshot_parser.add_argument("--keep", type=int, default=KEEP_SNAPSHOTS)
+    snapshot_parser.add_argument("--pages-per-step", type=int, default=PAGES_PER_STEP)
+
+    commands.add_parser("list", help="Listar las instantáneas")
+
+    restore_parser = commands.add_parser("restore", help="Restaurar una instantánea")
+    restore_parser.add_argument("snapshot")
+    restore_parser.add_argument("--db", help="Base de datos destino (por defecto según el nombre de la copia)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "snapshot":
+            for db_path in args.db or default_dbs:
+                result = snapshot(db_path, args.dir, args.keep, args.pages_per_step)
+                print(f"[OK] {result['path']} ({_format_size(result['bytes'])}, "
+                      f"{result['seconds']:.2f} s, {result['restarts']} reinicios)")
+                for path in result["removed"]:
+                    print(f"     borrada: {os.path.basename(path)}")
+        elif args.command == "list":
+            for path in list_snapshots(args.dir):
+                print(f"{os.path.basename(path):<40} {_format_size(os.path.getsize(path)):>10}")
+        else:
+            target = args.db or os.path.join(data_dir, os.path.basename(args.snapshot).rsplit("-", 3)[0] + ".db")
+            if os.path.exists(target):
+                # Instantánea de seguridad del estado actual antes de reemplazarlo
+                safety = snapshot(target, args.dir, keep=0)
+                print(f"[OK] Estado actual guardado en {safety['path']}")
+            result = restore_database(args.snapshot, target)
+            print(f"[OK] {target} restaurada desde {args.snapshot} ({result['seconds']:.2f} s)")
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
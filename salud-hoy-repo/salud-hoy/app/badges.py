@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de medallas para Salud Hoy
+Cada medalla se declara como datos (métrica + umbral). Las métricas se calculan
+una sola vez y solo se recalculan cuando cambia alguna de sus entradas.
+"""
+
+from datetime import date, timedelta
+
+
+# ========== ENTRADAS ==========
+# today:    hábitos del día de hoy
+# history:  hábitos de días anteriores (o reset de datos)
+# calendar: cambio de fecha (pasó la medianoche)
+# catalog:  catálogo de hábitos activos
+INPUTS = ("today", "history", "calendar", "catalog")
+
+
+# ========== MÉTRICAS ==========
+# Cada métrica recibe el motor (para leer db u otras métricas) y la fecha de hoy.
+# Las métricas largas se dividen en "antes de hoy" (solo cambian con el historial
+# o la fecha) + el aporte de hoy, así un toggle solo vuelve a consultar el día actual.
+
+FIRST_DAY = "0001-01-01"
+
+
+def _today_count(engine, today):
+    return engine.db.get_completed_count_for_day(today.isoformat())
+
+
+def _active_today(engine, today):
+    return 1 if engine.metric("today_count") >= 1 else 0
+
+
+def _streak_before_today(engine, today):
+    return engine.db.get_streak(threshold=1, today=today - timedelta(days=1))
+
+
+def _streak(engine, today):
+    # Si hoy no hay hábitos completados la racha actual es 0
+    if not engine.metric("active_today"):
+        return 0
+    return engine.metric("streak_before_today") + 1
+
+
+def _weekly_before_today(engine, today):
+    start = today - timedelta(days=6)
+    end = today - timedelta(days=1)
+    return engine.db.get_completed_count_for_range(start.isoformat(), end.isoformat())
+
+
+def _weekly_score(engine, today):
+    return engine.metric("weekly_before_today") + engine.metric("today_count")
+
+
+def _monthly_before_today(engine, today):
+    if today.day == 1:
+        return 0
+    start = today.replace(day=1)
+    end = today - timedelta(days=1)
+    return engine.db.get_active_days_count(start.isoformat(), end.isoformat())
+
+
+def _monthly_active_days(engine, today):
+    return engine.metric("monthly_before_today") + engine.metric("active_today")
+
+
+def _total_before_today(engine, today):
+    end = today - timedelta(days=1)
+    return engine.db.get_active_days_count(FIRST_DAY, end.isoformat())
+
+
+def _total_active_days(engine, today):
+    return engine.metric("total_before_today") + engine.metric("active_today")
+
+
+def _ever_active(engine, today):
+    return 1 if engine.metric("total_active_days") > 0 else 0
+
+
+def _habit_count(engine, today):
+    # Catálogo en memoria: al cambiar la tabla habito, get_habit_catalog(refresh=True)
+    # e invalidate("catalog")
+    return len(engine.db.get_habit_catalog())
+
+
+# nombre -> (entradas de las que depende, función(engine, today))
+# Las entradas de una métrica derivada incluyen las de las métricas que usa.
+METRICS = {
+    "today_count": (("today", "calendar"), _today_count),
+    "active_today": (("today", "calendar"), _active_today),
+    "streak_before_today": (("history", "calendar"), _streak_before_today),
+    "streak": (("today", "history", "calendar"), _streak),
+    "weekly_before_today": (("history", "calendar"), _weekly_before_today),
+    "weekly_score": (("today", "history", "calendar"), _weekly_score),
+    "monthly_before_today": (("history", "calendar"), _monthly_before_today),
+    "monthly_active_days": (("today", "history", "calendar"), _monthly_active_days),
+    "total_before_today": (("history", "calendar"), _total_before_today),
+    "total_active_days": (("today", "history", "calendar"), _total_active_days),
+    "ever_active": (("today", "history", "calendar"), _ever_active),
+    "habit_count": (("catalog",), _habit_count),
+}
+
+
+# ========== MEDALLAS ==========
+# metric: métrica que se compara
+# min: umbral fijo | min_per_habit: umbral multiplicado por el número de hábitos activos
+# title: puede usar {nombre_metrica} como plantilla
+# sticky: una vez registrado el desbloqueo la medalla queda ganada y su métrica ya no se calcula
+BADGE_RULES = [
+    {"key": "first_active", "icon": "check-decagram", "title": "Primer día\nactivo",
+     "metric": "ever_active", "min": 1, "sticky": True},
+    {"key": "streak_3", "icon": "run", "title": "3 días\nseguidos",
+     "metric": "streak", "min": 3},
+    {"key": "streak_7", "icon": "fire", "title": "7 días\nseguidos",
+     "metric": "streak", "min": 7},
+    {"key": "week_14", "icon": "target", "title": "Semana\n14+",
+     "metric": "weekly_score", "min": 14},
+    {"key": "week_perfect", "icon": "crown", "title": "Semana\nperfecta",
+     "metric": "weekly_score", "min_per_habit": 7},
+    {"key": "today_full", "icon": "medal", "title": "Hoy\n{habit_count}/{habit_count}",
+     "metric": "today_count", "min_per_habit": 1},
+    {"key": "month_15", "icon": "calendar-check", "title": "15+ días\ndel mes",
+     "metric": "monthly_active_days", "min": 15},
+    {"key": "streak_30", "icon": "trophy", "title": "30 días\nseguidos",
+     "metric": "streak", "min": 30},
+    {"key": "total_100", "icon": "star-circle", "title": "100 días\nactivos",
+     "metric": "total_active_days", "min": 100, "sticky": True},
+]
+
+
+class BadgeEngine:
+    """Evalúa las medallas recalculando solo las métricas invalidadas"""
+
+    def __init__(self, db, rules=None, metrics=None, today=None, track_unlocks=False):
+        """
+        Inicializa el motor
+        :param db: Instancia de Database
+        :param rules: Lista de reglas (por defecto BADGE_RULES)
+        :param metrics: Diccionario de métricas (por defecto METRICS)
+        :param today: Función que retorna la fecha de hoy (inyectable para pruebas)
+        :param track_unlocks: Registrar los desbloqueos en badge_unlock dentro de
+                              cada set_habit_status y emitir eventos
+        """
+        self.db = db
+        self.rules = list(BADGE_RULES if rules is None else rules)
+        self.metrics = dict(METRICS if metrics is None else metrics)
+        self._today_fn = today or date.today
+        self._today = None
+        self._values = {}
+        # Número de veces que se calculó cada métrica (diagnóstico y pruebas)
+        self.compute_counts = {name: 0 for name in self.metrics}
+        self._check_rules()
+
+        # Medallas con desbloqueo registrado y callbacks de eventos
+        self.unlocked_keys = set()
+        self._unlock_callbacks = []
+        self.track_unlocks = track_unlocks
+        if track_unlocks:
+            self._load_unlocks()
+            self.db.add_write_hook(self._on_write)
+        # Una copia restaurada reemplaza el historial entero
+        self.db.add_restore_hook(self.invalidate_all)
+
+    def _check_rules(self):
+        for rule in self.rules:
+            if rule["metric"] not in self.metrics:
+                raise ValueError(f"La medalla '{rule['key']}' usa una métrica desconocida: {rule['metric']}")
+            if "min_per_habit" in rule and "habit_count" not in self.metrics:
+                raise ValueError(f"La medalla '{rule['key']}' necesita la métrica 'habit_count'")
+
+    # ---------- INVALIDACIÓN ----------
+
+    def invalidate(self, *inputs):
+        """
+        Marca como obsoletas las métricas que dependen de las entradas dadas
+        :param inputs: Nombres de entradas (ver INPUTS)
+        """
+        for name, (depends_on, _) in self.metrics.items():
+            if any(i in depends_on for i in inputs):
+                self._values.pop(name, None)
+
+    def invalidate_all(self):
+        """Descarta todas las métricas en caché"""
+        self._values.clear()
+        if self.track_unlocks:
+            # Ej: después de reset_all_data el historial de desbloqueos también cambia
+            self._load_unlocks()
+
+    def on_habit_changed(self, day_date):
+        """
+        Notifica un cambio en los hábitos de un día
+        :param day_date: Fecha ISO del día modificado
+        """
+        if day_date == self._current_today().isoformat():
+            self.invalidate("today")
+        else:
+            self.invalidate("history")
+
+    def _current_today(self):
+        today = self._today_fn()
+        if today != self._today:
+            # Cambió la fecha: todo lo que depende del calendario o de "hoy" es obsoleto
+            if self._today is not None:
+                self.invalidate("calendar", "today")
+            self._today = today
+        return today
+
+    # ---------- EVALUACIÓN ----------
+
+    def metric(self, name):
+        """Retorna el valor de una métrica (calculándola solo si está obsoleta)"""
+        today = self._current_today()
+        if name not in self._values:
+            _, compute = self.metrics[name]
+            self._values[name] = compute(self, today)
+            self.compute_counts[name] += 1
+        return self._values[name]
+
+    def threshold(self, rule):
+        """Umbral de una regla (fijo o proporcional al número de hábitos activos)"""
+        if "min_per_habit" in rule:
+            return rule["min_per_habit"] * self.metric("habit_count")
+        return rule.get("min", 1)
+
+    def is_unlocked(self, rule):
+        """Indica si la regla se cumple con las métricas actuales"""
+        if rule.get("sticky") and rule["key"] in self.unlocked_keys:
+            return True
+        threshold = self.threshold(rule)
+        return threshold > 0 and self.metric(rule["metric"]) >= threshold
+
+    def _badge(self, rule, unlocked):
+        title = rule["title"]
+        if "{" in title:
+            title = title.format_map(_MetricLookup(self))
+        return {"key": rule["key"], "icon": rule["icon"], "title": title, "unlocked": unlocked}
+
+    def evaluate(self):
+        """
+        Evalúa todas las medallas
+        :return: Lista de dicts con key, icon, title y unlocked
+        """
+        return [self._badge(rule, self.is_unlocked(rule)) for rule in self.rules]
+
+    # ---------- HISTORIAL DE DESBLOQUEOS ----------
+
+    def bind_unlock(self, callback):
+        """
+        Registra callback(badges) que recibe la lista de medallas recién desbloqueadas
+        (se llama después de confirmar la transacción que las desbloqueó)
+        """
+        self._unlock_callbacks.append(callback)
+
+    def unlock_history(self):
+        """Historial de desbloqueos con el título de cada medalla"""
+        titles = {rule["key"]: rule["title"] for rule in self.rules}
+        history = []
+        for unlock in self.db.get_badge_unlocks():
+            entry = unlock.to_dict()
+            entry["title"] = titles.get(unlock.badge_key, unlock.badge_key)
+            history.append(entry)
+        return history
+
+    def detach(self):
+        """Deja de registrar desbloqueos en la base de datos"""
+        self.db.remove_write_hook(self._on_write)
+        self.db.remove_restore_hook(self.invalidate_all)
+        self.track_unlocks = False
+
+    def _load_unlocks(self):
+        self.unlocked_keys = {u.badge_key for u in self.db.get_badge_unlocks()}
+
+    def _on_write(self, day_date):
+        """Hook de set_habit_status: corre dentro de la misma transacción"""
+        self.on_habit_changed(day_date)
+
+        # Solo se evalúan las medallas que aún no tienen desbloqueo registrado
+        new_badges = []
+        for rule in self.rules:
+            if rule["key"] in self.unlocked_keys or not self.is_unlocked(rule):
+                continue
+            if self.db.record_badge_unlock(rule["key"], day_date):
+                new_badges.append(self._badge(rule, True))
+
+        if new_badges:
+            self.db.call_after_commit(lambda: self._emit_unlocks(new_badges))
+
+    def _emit_unlocks(self, badges):
+        self.unlocked_keys.update(b["key"] for b in badges)
+        for callback in list(self._unlock_callbacks):
+            callback(badges)
+
+
+class _MetricLookup(dict):
+    """Permite usar {nombre_metrica} en los títulos de las medallas"""
+
+    def __init__(self, engine):
+        super().__init__()
+        self._engine = engine
+
+    def __missing__(self, key):
+        return self._engine.metric(key)
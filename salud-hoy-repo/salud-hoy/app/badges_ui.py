@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Grilla de medallas para Salud Hoy
+Crea los chips y las tarjetas de medallas una sola vez y luego solo actualiza
+(color del ícono y textos) los widgets cuyo estado cambió
+"""
+
+from kivy.metrics import dp
+
+from .lazy_imports import kivymd_widgets as widgets
+
+
+GREEN = (0, 0.6, 0.3, 1)
+GREY = (0.68, 0.68, 0.68, 1)
+CHIP_BG = (0, 0.6, 0.3, 0.12)
+CHIP_TEXT = (0, 0.45, 0.25, 1)
+
+
+class KivyMDBadgeFactory:
+    """Crea y modifica los widgets KivyMD de la grilla de medallas"""
+
+    def __init__(self):
+        # Número de widgets creados (para el benchmark de asignaciones)
+        self.created = 0
+
+    def make_chip(self, text):
+        chip = widgets.MDChip(text=text)
+        chip.md_bg_color = CHIP_BG
+        chip.text_color = CHIP_TEXT
+        self.created += 1
+        return chip
+
+    def set_chip_text(self, chip, text):
+        chip.text = text
+
+    def make_tile(self, badge):
+        """
+        Crea la tarjeta de una medalla
+        :return: Tupla (tile, icon, title)
+        """
+        tile = widgets.MDBoxLayout(
+            orientation="vertical",
+            spacing="4dp",
+            padding=[0, dp(4), 0, dp(4)],
+            size_hint=(1, None),
+            height=dp(90),
+        )
+        icon = widgets.MDIcon(
+            icon=badge["icon"],
+            theme_text_color="Custom",
+            text_color=GREEN if badge["unlocked"] else GREY,
+            font_size="28sp",
+            halign="center",
+        )
+        title = widgets.MDLabel(
+            text=badge["title"],
+            halign="center",
+            theme_text_color="Custom",
+            text_color=(0, 0, 0, 1),
+            size_hint_y=None,
+            text_size=(0, None),
+        )
+        title.bind(
+            width=lambda inst, w: setattr(inst, "text_size", (w, None)),
+            texture_size=lambda inst, ts: setattr(inst, "height", ts[1]),
+        )
+        tile.add_widget(icon)
+        tile.add_widget(title)
+        self.created += 3
+        return tile, icon, title
+
+    def set_unlocked(self, icon, unlocked):
+        icon.text_color = GREEN if unlocked else GREY
+
+    def set_title(self, title, text):
+        title.text = text
+
+
+class BadgeGrid:
+    """Mantiene la grilla de medallas y aplica solo las diferencias de estado"""
+
+    def __init__(self, grid, chips_box=None, factory=None):
+        """
+        Inicializa la grilla
+        :param grid: Contenedor de las tarjetas (ids.badges_grid)
+        :param chips_box: Contenedor de los chips de resumen (ids.badge_chips) o None
+        :param factory: Fábrica de widgets (por defecto KivyMD)
+        """
+        self.grid = grid
+        self.chips_box = chips_box
+        self.factory = factory or KivyMDBadgeFactory()
+        self._tiles = {}        # key -> (tile, icon, title)
+        self._state = {}        # key -> (unlocked, title)
+        self._keys = ()
+        self._chips = []
+        self._chip_texts = ()
+        # Widgets modificados en la última actualización
+        self.last_touched = 0
+
+    def update(self, badges, chip_texts=()):
+        """
+        Aplica el nuevo estado de medallas y chips
+        :param badges: Lista de dicts con key, icon, title y unlocked
+        :param chip_texts: Textos de los chips de resumen
+        :return: Número de widgets creados o modificados
+        """
+        touched = self._update_chips(tuple(chip_texts))
+
+        keys = tuple(b["key"] for b in badges)
+        if keys != self._keys:
+            # Primera vez o cambió el catálogo de medallas: crear las tarjetas
+            touched += self._rebuild_tiles(badges)
+        else:
+            for badge in badges:
+                unlocked, title_text = self._state[badge["key"]]
+                _, icon, title = self._tiles[badge["key"]]
+                if unlocked != badge["unlocked"]:
+                    self.factory.set_unlocked(icon, badge["unlocked"])
+                    touched += 1
+                if title_text != badge["title"]:
+                    self.factory.set_title(title, badge["title"])
+                    touched += 1
+                self._state[badge["key"]] = (badge["unlocked"], badge["title"])
+
+        self.last_touched = touched
+        return touched
+
+    def rebuild(self, badges, chip_texts=()):
+        """Descarta todos los widgets y vuelve a crearlos (comportamiento anterior)"""
+        self._keys = ()
+        self._chip_texts = None
+        return self.update(badges, chip_texts)
+
+    def _update_chips(self, chip_texts):
+        if self.chips_box is None or chip_texts == self._chip_texts:
+            return 0
+
+        touched = 0
+        if self._chip_texts is None or len(chip_texts) != len(self._chips):
+            self.chips_box.clear_widgets()
+            self._chips = []
+            for text in chip_texts:
+                chip = self.factory.make_chip(text)
+                self.chips_box.add_widget(chip)
+                self._chips.append(chip)
+                touched += 1
+        else:
+            for chip, old, new in zip(self._chips, self._chip_texts, chip_texts):
+                if old != new:
+                    self.factory.set_chip_text(chip, new)
+                    touched += 1
+
+        self._chip_texts = chip_texts
+        return touched
+
+    def _rebuild_tiles(self, badges):
+        self.grid.clear_widgets()
+        self._tiles = {}
+        self._state = {}
+        for badge in badges:
+            tile, icon, title = self.factory.make_tile(badge)
+            self.grid.add_widget(tile)
+            self._tiles[badge["key"]] = (tile, icon, title)
+            self._state[badge["key"]] = (badge["unlocked"], badge["title"])
+        self._keys = tuple(b["key"] for b in badges)
+        return len(badges) * 3
@@ -1,49 +1,611 @@
 # -*- coding: utf-8 -*-
 import sqlite3
 import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager, nullcontext
 from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
+from types import MappingProxyType
+
+
+# Versión del esquema (PRAGMA user_version)
+# 1: un solo historial compartido | 2: datos particionados por usuario (user_id)
+# 3: updated_at y seq por fila para la sincronización por deltas
+# 4: bandeja de salida de la sincronización (sync_outbox)
+SCHEMA_VERSION = 4
+
+# Cambios de esquema a partir de la versión 2 (versión destino -> SQL)
+MIGRATIONS = {
+    3: """
+    ALTER TABLE habitos_dia ADD COLUMN updated_at INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE habitos_dia ADD COLUMN seq INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE usuario_perfil ADD COLUMN updated_at INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE usuario_perfil ADD COLUMN seq INTEGER NOT NULL DEFAULT 0;
+    """,
+    # La tabla nueva la crea el esquema (CREATE TABLE IF NOT EXISTS)
+    4: "",
+}
+
+# Filas por lectura en los métodos que recorren resultados (iter_*, changes_since)
+FETCH_SIZE = 500
+
+# Días por página del historial (get_history_page)
+HISTORY_PAGE_SIZE = 60
+
+# Usuario por defecto; los datos de una base de datos de la versión 1 se le asignan a él
+DEFAULT_USER_ID = 1
+
+# Tablas cuyo contenido pasa a ser por usuario en la versión 2
+LEGACY_TABLES = ("usuario_perfil", "dia", "habitos_dia", "badge_unlock")
+
+# Tablas con datos de cada usuario (las que borra reset_all_data)
+USER_TABLES = ("habitos_dia", "dia", "badge_unlock", "usuario_perfil", "sync_outbox")
+
+# Tamaño de la caché de sentencias preparadas de cada conexión (sqlite3 usa 128):
+# alcanza para todo STATEMENTS, así una conexión persistente prepara cada
+# consulta una sola vez
+CACHED_STATEMENTS = 256
+
+# Registro de las sentencias SQL de Database (nombre -> SQL)
+# sqlite3 reutiliza una sentencia preparada solo si el texto es idéntico: cada
+# consulta se escribe una vez acá y los métodos la ejecutan por nombre
+# (_execute). Las variantes (ej: con y sin filtro) son entradas distintas. Quedan
+# afuera el esquema y las migraciones (executescript no usa la caché).
+STATEMENTS = {
+    # Perfil
+    "profile.get": "SELECT name, goal FROM usuario_perfil WHERE user_id = ?",
+    "profile.upsert": """
+        INSERT INTO usuario_perfil(user_id, name, goal, updated_at, seq)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+          name = excluded.name, goal = excluded.goal,
+          updated_at = excluded.updated_at, seq = excluded.seq
+    """,
+    # Catálogo de hábitos
+    "habits.active": "SELECT key, title FROM habito WHERE is_active = 1",
+    "habits.all": "SELECT key, title FROM habito",
+    # Días y hábitos diarios
+    "day.ensure": "INSERT OR IGNORE INTO dia(user_id, day_date) VALUES (?, ?)",
+    "day.habits": """
+        SELECT h.key, COALESCE(dh.done, 0) as done
+        FROM habito h
+        LEFT JOIN habitos_dia dh
+          ON h.key = dh.habit_key AND dh.user_id = ? AND dh.day_date = ?
+        WHERE h.is_active = 1
+    """,
+    "habit.set": """
+        INSERT INTO habitos_dia(user_id, day_date, habit_key, done, updated_at, seq)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day_date, habit_key)
+        DO UPDATE SET done = excluded.done, updated_at = excluded.updated_at, seq = excluded.seq
+    """,
+    # Lectura por streaming
+    "range.done": """
+        SELECT day_date, habit_key, done
+        FROM habitos_dia
+        WHERE user_id = ? AND day_date BETWEEN ? AND ? AND done = 1
+        ORDER BY day_date, habit_key
+    """,
+    "range.all": """
+        SELECT day_date, habit_key, done
+        FROM habitos_dia
+        WHERE user_id = ? AND day_date BETWEEN ? AND ?
+        ORDER BY day_date, habit_key
+    """,
+    # CROSS JOIN fija habitos_dia como tabla externa: se recorre en el orden
+    # de su clave primaria y no hace falta ordenar
+    "history.user": """
+        SELECT hd.user_id, hd.day_date, hd.habit_key, h.title, hd.done
+        FROM habitos_dia hd
+        CROSS JOIN habito h ON h.key = hd.habit_key
+        WHERE hd.user_id = ? AND hd.day_date BETWEEN ? AND ?
+        ORDER BY hd.user_id, hd.day_date, hd.habit_key
+    """,
+    "history.all_users": """
+        SELECT hd.user_id, hd.day_date, hd.habit_key, h.title, hd.done
+        FROM habitos_dia hd
+        CROSS JOIN habito h ON h.key = hd.habit_key
+        WHERE hd.day_date BETWEEN ? AND ?
+        ORDER BY hd.user_id, hd.day_date, hd.habit_key
+    """,
+    "days.with_habits": """
+        SELECT DISTINCT d.day_date
+        FROM dia d
+        INNER JOIN habitos_dia dh ON d.user_id = dh.user_id AND d.day_date = dh.day_date
+        WHERE d.user_id = ?
+        ORDER BY d.day_date
+    """,
+    # Historial por día, paginado por clave (day_date): recorre la clave primaria
+    # desde la fecha de corte y se detiene al llegar a LIMIT, sin OFFSET
+    "history.days_before": """
+        SELECT day_date, SUM(done), GROUP_CONCAT(CASE WHEN done = 1 THEN habit_key END)
+        FROM habitos_dia
+        WHERE user_id = ? AND day_date < ?
+        GROUP BY day_date
+        ORDER BY day_date DESC
+        LIMIT ?
+    """,
+    "history.days_after": """
+        SELECT day_date, SUM(done), GROUP_CONCAT(CASE WHEN done = 1 THEN habit_key END)
+        FROM habitos_dia
+        WHERE user_id = ? AND day_date > ?
+        GROUP BY day_date
+        ORDER BY day_date
+        LIMIT ?
+    """,
+    # Estadísticas
+    "stats.completed_day": """
+        SELECT COUNT(*) FROM habitos_dia
+        WHERE user_id = ? AND day_date = ? AND done = 1
+    """,
+    "stats.streak_days": """
+        SELECT day_date FROM habitos_dia
+        WHERE user_id = ? AND day_date <= ? AND done = 1
+        GROUP BY day_date
+        HAVING COUNT(*) >= ?
+        ORDER BY day_date DESC
+    """,
+    "stats.completed_range": """
+        SELECT COUNT(*) FROM habitos_dia
+        WHERE user_id = ? AND day_date BETWEEN ? AND ? AND done = 1
+    """,
+    "stats.active_days": """
+        SELECT COUNT(DISTINCT day_date) FROM habitos_dia
+        WHERE user_id = ? AND day_date BETWEEN ? AND ? AND done = 1
+    """,
+    # Mapa de calor: hábitos completados por día, agrupados recorriendo la clave primaria
+    "stats.daily_counts": """
+        SELECT day_date, SUM(done) FROM habitos_dia
+        WHERE user_id = ? AND day_date BETWEEN ? AND ?
+        GROUP BY day_date
+    """,
+    # Medallas
+    "badge.unlock": "INSERT OR IGNORE INTO badge_unlock(user_id, badge_key, day_date) VALUES (?, ?, ?)",
+    "badge.unlocks": """
+        SELECT badge_key, day_date, unlocked_at
+        FROM badge_unlock
+        WHERE user_id = ?
+        ORDER BY unlocked_at, rowid
+    """,
+    # Sincronización
+    "seq.next": "UPDATE change_seq SET value = value + 1 WHERE id = 1 RETURNING value",
+    "seq.current": "SELECT value FROM change_seq WHERE id = 1",
+    # Lee el próximo número sin consumirlo, pero como escritura: toma el cerrojo de
+    # escritura, así otra conexión no puede confirmar el mismo número antes de seq.set
+    "seq.peek": "UPDATE change_seq SET value = value WHERE id = 1 RETURNING value + 1",
+    "seq.set": "UPDATE change_seq SET value = ? WHERE id = 1",
+    "sync.changes_since": """
+        SELECT seq, 'h', day_date, habit_key, done, updated_at
+        FROM habitos_dia WHERE user_id = ? AND seq > ?
+        UNION ALL
+        SELECT seq, 'p', name, goal, NULL, updated_at
+        FROM usuario_perfil WHERE user_id = ? AND seq > ?
+        ORDER BY 1
+    """,
+    "sync.apply_habit": """
+        INSERT INTO habitos_dia(user_id, day_date, habit_key, done, updated_at, seq)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day_date, habit_key) DO UPDATE SET
+          done = excluded.done, updated_at = excluded.updated_at, seq = excluded.seq
+        WHERE (excluded.updated_at, excluded.done)
+              > (habitos_dia.updated_at, habitos_dia.done)
+    """,
+    "sync.apply_profile": """
+        INSERT INTO usuario_perfil(user_id, name, goal, updated_at, seq)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+          name = excluded.name, goal = excluded.goal,
+          updated_at = excluded.updated_at, seq = excluded.seq
+        WHERE (excluded.updated_at, excluded.name, excluded.goal)
+              > (usuario_perfil.updated_at, usuario_perfil.name, usuario_perfil.goal)
+    """,
+    # Importación
+    "import.replace": """
+        INSERT INTO habitos_dia(user_id, day_date, habit_key, done, updated_at, seq)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day_date, habit_key) DO UPDATE SET
+          done = excluded.done, updated_at = excluded.updated_at, seq = excluded.seq
+        WHERE habitos_dia.done != excluded.done
+    """,
+    "import.keep": """
+        INSERT INTO habitos_dia(user_id, day_date, habit_key, done, updated_at, seq)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day_date, habit_key) DO NOTHING
+    """,
+    # Bandeja de salida
+    "outbox.queue": """
+        INSERT INTO sync_outbox(user_id, day_date, habit_key, done, updated_at, queued_at)
+        SELECT user_id, day_date, habit_key, done, updated_at, ?
+        FROM habitos_dia
+        WHERE user_id = ? AND day_date = ? AND habit_key = ?
+        ON CONFLICT(user_id, day_date, habit_key) DO UPDATE SET
+          done = excluded.done, updated_at = excluded.updated_at
+    """,
+    "outbox.get": """
+        SELECT day_date, habit_key, done, updated_at
+        FROM sync_outbox
+        WHERE user_id = ?
+        ORDER BY queued_at, rowid
+        LIMIT ?
+    """,
+    "outbox.remove": """
+        DELETE FROM sync_outbox
+        WHERE user_id = ? AND day_date = ? AND habit_key = ? AND updated_at = ?
+    """,
+    "outbox.stats": "SELECT COUNT(*), MIN(queued_at) FROM sync_outbox WHERE user_id = ?",
+}
+
+# Reset: una sentencia de cada tipo por tabla (los nombres de tabla no son parámetros)
+for _table in USER_TABLES:
+    STATEMENTS[f"reset.{_table}.others"] = (
+        f"SELECT EXISTS(SELECT 1 FROM {_table} WHERE user_id < ?) "
+        f"OR EXISTS(SELECT 1 FROM {_table} WHERE user_id > ?)"
+    )
+    STATEMENTS[f"reset.{_table}.truncate"] = f"DELETE FROM {_table}"
+    STATEMENTS[f"reset.{_table}.user"] = f"DELETE FROM {_table} WHERE user_id = ?"
+
+
+class StatementCache:
+    """
+    Lleva la cuenta de la caché de sentencias preparadas de sqlite3 (LRU por
+    conexión, con la clave en el texto de la consulta) para diagnosticar cuántas
+    ejecuciones vuelven a preparar su consulta. sqlite3 no expone la caché: se
+    replica su política con el registro de cada conexión.
+    """
+    
+    def __init__(self, capacity=CACHED_STATEMENTS):
+        """
+        :param capacity: cached_statements de las conexiones
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+    
+    def new_connection(self):
+        """Registro vacío para una conexión recién abierta"""
+        return OrderedDict()
+    
+    def record(self, prepared, sql):
+        """
+        Registra una ejecución
+        :param prepared: Registro de la conexión (ver new_connection)
+        :param sql: Texto de la consulta
+        """
+        if sql in prepared:
+            prepared.move_to_end(sql)
+            self.hits += 1
+        else:
+            self.misses += 1
+            prepared[sql] = None
+            if len(prepared) > self.capacity:
+                prepared.popitem(last=False)
+    
+    def stats(self):
+        """
+        :return: Dict con hits, misses, executions y hit_rate (0 a 1)
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "executions": total,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# ========== REGISTROS ==========
+# Filas livianas (sin __dict__ por instancia) en lugar de un dict por fila. Los
+# registros con nombre de campo se leen como atributo (habit.key) y también
+# como dict (habit["key"], habit.get("key")) para el código que los usaba así.
+
+class Record:
+    """Base de los registros: __slots__ con acceso estilo dict"""
+    
+    __slots__ = ()
+    
+    def __getitem__(self, field):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+    
+    def __setitem__(self, field, value):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        setattr(self, field, value)
+    
+    def __contains__(self, field):
+        return field in self.__slots__
+    
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in self.__slots__ else default
+    
+    def keys(self):
+        return self.__slots__
+    
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.__slots__]
+    
+    def to_dict(self):
+        return dict(self.items())
+    
+    def __eq__(self, other):
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        if type(other) is type(self):
+            return self.items() == other.items()
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        fields = ", ".join(f"{field}={value!r}" for field, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+class Habit(Record):
+    """Hábito del catálogo (get_habits)"""
+    
+    __slots__ = ("key", "title")
+    
+    def __init__(self, key, title):
+        self.key = key
+        self.title = title
+
+
+class Profile(Record):
+    """Perfil del usuario (get_profile)"""
+    
+    __slots__ = ("name", "goal")
+    
+    def __init__(self, name, goal):
+        self.name = name
+        self.goal = goal
+
+
+class BadgeUnlock(Record):
+    """Medalla desbloqueada (get_badge_unlocks)"""
+    
+    __slots__ = ("badge_key", "day_date", "unlocked_at")
+    
+    def __init__(self, badge_key, day_date, unlocked_at):
+        self.badge_key = badge_key
+        self.day_date = day_date
+        self.unlocked_at = unlocked_at
+
+
+class HistoryDay(Record):
+    """Día del historial (get_history_page)"""
+    
+    __slots__ = ("day_date", "done", "habit_keys")
+    
+    def __init__(self, day_date, done, habit_keys):
+        self.day_date = day_date
+        self.done = done
+        self.habit_keys = habit_keys
+
+
+class HabitCatalog:
+    """
+    Catálogo de hábitos activos (inmutable), en el orden de get_habits
+    Se carga una vez por archivo (get_habit_catalog, común a las vistas de
+    for_user) y lo comparten la interfaz y las medallas: ni las filas de hábitos ni los umbrales consultan habito.
+    """
+    
+    __slots__ = ("keys", "titles")
+    
+    def __init__(self, habits):
+        """
+        :param habits: Lista de Habit (ver get_habits)
+        """
+        object.__setattr__(self, "keys", tuple(h.key for h in habits))
+        object.__setattr__(self, "titles", MappingProxyType({h.key: h.title for h in habits}))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("HabitCatalog es inmutable")
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def __iter__(self):
+        return iter(self.keys)
+    
+    def __contains__(self, key):
+        return key in self.titles
+    
+    def __eq__(self, other):
+        if not isinstance(other, HabitCatalog):
+            return NotImplemented
+        return self.keys == other.keys and dict(self.titles) == dict(other.titles)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"HabitCatalog({list(self.keys)!r})"
+
+
+# Las lecturas por streaming siguen siendo tuplas (se desempaquetan por
+# posición); DayHabit les agrega nombres de campo sin memoria extra por fila.
+# iter_habit_history retorna las tuplas de sqlite3 tal cual: es el camino del
+# exportador y un row_factory cuesta una llamada por fila.
+DayHabit = namedtuple("DayHabit", ("day_date", "habit_key", "done"))
+
+
+def _day_habit_row(cursor, row):
+    """row_factory de iter_habits_for_date_range"""
+    return DayHabit(row[0], row[1], bool(row[2]))
+
+
+class _FileState:
+    """Estado en memoria de un archivo, común a una instancia y sus vistas de for_user"""
+    
+    __slots__ = ("catalog", "restore_hooks")
+    
+    def __init__(self):
+        # Catálogo de hábitos activos (ver get_habit_catalog)
+        self.catalog = None
+        # Funciones llamadas después de restore (cachés que dependen del archivo entero)
+        self.restore_hooks = []
 
 
 class Database:
     """Clase para manejar todas las operaciones de la base de datos SQLite"""
     
-    def __init__(self, db_path):
+    def __init__(self, db_path, user_id=DEFAULT_USER_ID, persistent=False, ensure_schema=True):
         """
         Inicializa la conexión a la base de datos
         :param db_path: Ruta completa al archivo de base de datos
+        :param user_id: ID del usuario (de users.db) al que se limitan todas las operaciones
+        :param persistent: Mantener una conexión abierta (se libera con close)
+                           en vez de abrir una por operación
+        :param ensure_schema: Crear/migrar el esquema al inicializar (False si el
+                              archivo ya se preparó en este proceso)
         """
         self.db_path = db_path
-        self._ensure_db_exists()
+        self._init_state(user_id, persistent)
+        if ensure_schema:
+            self._ensure_db_exists()
+    
+    def _init_state(self, user_id, persistent=False):
+        self.user_id = user_id
+        # Conexión de la transacción en curso (por hilo), reutilizada por llamadas anidadas
+        self._local = threading.local()
+        # Funciones llamadas dentro de la transacción de set_habit_status(day_date)
+        self._write_hooks = []
+        # Reloj de updated_at (inyectable para pruebas de last-writer-wins)
+        self.clock = time.time
+        # Conexión persistente (compartida entre hilos, una transacción a la vez);
+        # la abre y la guarda la instancia dueña (las vistas de for_user la comparten)
+        self.persistent = persistent
+        self._owner = self
+        self._conn = None
+        self._prepared = None
+        self._lock = threading.RLock()
+        # Diagnóstico de la caché de sentencias (ver statement_cache_stats)
+        self.statements = StatementCache()
+        # Catálogo y hooks de restore (los comparten las vistas de for_user)
+        self._file = _FileState()
+    
+    def for_user(self, user_id):
+        """
+        Retorna una vista de la misma base de datos limitada a otro usuario
+        (no vuelve a crear ni migrar el esquema; con persistent=True usa la misma conexión)
+        :param user_id: ID del usuario (de users.db)
+        :return: Instancia de Database
+        """
+        view = self.__class__.__new__(self.__class__)
+        view.db_path = self.db_path
+        view._init_state(user_id, self.persistent)
+        # El catálogo de hábitos es común a todos los usuarios del archivo, y
+        # restaurar una copia reemplaza los datos de todos
+        view._file = self._file
+        if self.persistent:
+            # Una sola conexión por archivo: la vista usa la de esta instancia, con
+            # su cerrojo y su transacción en curso (cerrar cualquiera la libera)
+            view._owner = self._owner
+            view._lock = self._lock
+            view._local = self._local
+            view.statements = self.statements
+        return view
     
     def _ensure_db_exists(self):
-        """Crea la base de datos y las tablas si no existen"""
+        """Crea la base de datos y las tablas si no existen (y migra las versiones anteriores)"""
         db_dir = os.path.dirname(self.db_path)
         os.makedirs(db_dir, exist_ok=True)
         
         # Leer el schema SQL desde data/schema.sql
         # La DB ya está en data/, así que el schema está en el mismo directorio
         schema_path = os.path.join(os.path.dirname(self.db_path), "schema.sql")
+        if os.path.exists(schema_path):
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                schema = f.read()
+        else:
+            # Schema de respaldo por si no existe el archivo
+            schema = self._default_schema()
         
         with sqlite3.connect(self.db_path) as conn:
-            if os.path.exists(schema_path):
-                with open(schema_path, 'r', encoding='utf-8') as f:
-                    schema = f.read()
-                conn.executescript(schema)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION and self._is_legacy(conn):
+                self._migrate_to_v2(conn, schema)
             else:
-                # Schema de respaldo por si no existe el archivo
-                self._create_default_schema(conn)
+                if 2 <= version < SCHEMA_VERSION:
+                    self._migrate(conn, version)
+                # Solo tiene efecto en un archivo nuevo (antes de crear las tablas): permite
+                # liberar el espacio de las filas borradas de a poco (ver maintenance.py)
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.executescript(schema)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             conn.commit()
     
-    def _create_default_schema(self, conn):
-        """Crea el schema por defecto si no existe schema.sql"""
-        schema = """
+    def _is_legacy(self, conn):
+        """Indica si la base de datos tiene el esquema de un solo usuario (versión 1)"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(habitos_dia)")]
+        return bool(columns) and "user_id" not in columns
+    
+    def _migrate(self, conn, version):
+        """Aplica en una transacción los cambios de MIGRATIONS posteriores a version"""
+        steps = "\n".join(MIGRATIONS[v] for v in range(version + 1, SCHEMA_VERSION + 1))
+        try:
+            conn.executescript(f"BEGIN;\n{steps}\nPRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;")
+        except Exception as e:
+            conn.rollback()
+            print(f"[ERROR] Error al migrar la base de datos: {e}")
+            raise
+    
+    def _migrate_to_v2(self, conn, schema):
+        """
+        Migra una base de datos de un solo usuario a datos por usuario (con el esquema
+        actual) en una sola transacción: renombra las tablas viejas, crea las nuevas
+        y copia los datos asignándolos a DEFAULT_USER_ID
+        """
+        uid = int(DEFAULT_USER_ID)
+        renames = "\n".join(f"ALTER TABLE {t} RENAME TO {t}_v1;" for t in LEGACY_TABLES)
+        drops = "\n".join(f"DROP TABLE {t}_v1;" for t in reversed(LEGACY_TABLES))
+        script = f"""
+        BEGIN;
+        CREATE TABLE IF NOT EXISTS badge_unlock(
+          badge_key TEXT PRIMARY KEY,
+          day_date TEXT NOT NULL,
+          unlocked_at DATETIME NOT NULL DEFAULT (datetime('now'))
+        );
+        {renames}
+        -- Los índices conservan su nombre al renombrar la tabla
+        DROP INDEX IF EXISTS idx_habitos_dia_done;
+        DROP INDEX IF EXISTS idx_habitos_dia_done_day;
+        DROP INDEX IF EXISTS idx_habitos_dia_habit;
+        {schema}
+        INSERT OR REPLACE INTO usuario_perfil(user_id, name, goal, created_at)
+          SELECT {uid}, name, goal, created_at FROM usuario_perfil_v1;
+        INSERT INTO dia(user_id, day_date) SELECT {uid}, day_date FROM dia_v1;
+        INSERT INTO habitos_dia(user_id, day_date, habit_key, done)
+          SELECT {uid}, day_date, habit_key, done FROM habitos_dia_v1;
+        INSERT INTO badge_unlock(user_id, badge_key, day_date, unlocked_at)
+          SELECT {uid}, badge_key, day_date, unlocked_at FROM badge_unlock_v1;
+        {drops}
+        PRAGMA user_version = {SCHEMA_VERSION};
+        COMMIT;
+        """
+        try:
+            conn.executescript(script)
+        except Exception as e:
+            conn.rollback()
+            print(f"[ERROR] Error al migrar la base de datos: {e}")
+            raise
+    
+    def _default_schema(self):
+        """Schema por defecto si no existe schema.sql (mismo contenido que data/schema.sql)"""
+        return """
         PRAGMA foreign_keys = ON;
 
         CREATE TABLE IF NOT EXISTS usuario_perfil(
-          id INTEGER PRIMARY KEY CHECK (id = 1),
+          user_id INTEGER PRIMARY KEY,
           name TEXT NOT NULL DEFAULT '',
           goal TEXT NOT NULL DEFAULT 'Moverme más',
-          created_at DATETIME NOT NULL DEFAULT (datetime('now'))
+          created_at DATETIME NOT NULL DEFAULT (datetime('now')),
+          updated_at INTEGER NOT NULL DEFAULT 0,
+          seq INTEGER NOT NULL DEFAULT 0
         );
 
         CREATE TABLE IF NOT EXISTS habito(
@@ -53,22 +615,51 @@ class Database:
         );
 
         CREATE TABLE IF NOT EXISTS dia(
-          day_date TEXT PRIMARY KEY
+          user_id INTEGER NOT NULL,
+          day_date TEXT NOT NULL,
+          PRIMARY KEY (user_id, day_date)
         );
 
         CREATE TABLE IF NOT EXISTS habitos_dia(
+          user_id INTEGER NOT NULL,
           day_date TEXT NOT NULL,
           habit_key TEXT NOT NULL,
           done INTEGER NOT NULL DEFAULT 0 CHECK (done IN (0,1)),
-          PRIMARY KEY (day_date, habit_key),
-          FOREIGN KEY (day_date)  REFERENCES dia(day_date)   ON DELETE CASCADE,
+          updated_at INTEGER NOT NULL DEFAULT 0,
+          seq INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (user_id, day_date, habit_key),
+          FOREIGN KEY (user_id, day_date) REFERENCES dia(user_id, day_date) ON DELETE CASCADE,
           FOREIGN KEY (habit_key) REFERENCES habito(key)      ON DELETE CASCADE
         );
 
-        CREATE INDEX IF NOT EXISTS idx_habitos_dia_done   ON habitos_dia(done);
+        CREATE TABLE IF NOT EXISTS badge_unlock(
+          user_id INTEGER NOT NULL,
+          badge_key TEXT NOT NULL,
+          day_date TEXT NOT NULL,
+          unlocked_at DATETIME NOT NULL DEFAULT (datetime('now')),
+          PRIMARY KEY (user_id, badge_key)
+        );
+
+        CREATE TABLE IF NOT EXISTS change_seq(
+          id INTEGER PRIMARY KEY CHECK (id = 1),
+          value INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS sync_outbox(
+          user_id INTEGER NOT NULL,
+          day_date TEXT NOT NULL,
+          habit_key TEXT NOT NULL,
+          done INTEGER NOT NULL,
+          updated_at INTEGER NOT NULL,
+          queued_at INTEGER NOT NULL,
+          PRIMARY KEY (user_id, day_date, habit_key)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_habitos_dia_user_done_day ON habitos_dia(user_id, done, day_date);
         CREATE INDEX IF NOT EXISTS idx_habitos_dia_habit  ON habitos_dia(habit_key);
+        CREATE INDEX IF NOT EXISTS idx_habitos_dia_user_seq ON habitos_dia(user_id, seq);
 
-        INSERT OR IGNORE INTO usuario_perfil(id, name, goal) VALUES (1, '', 'Moverme más');
+        INSERT OR IGNORE INTO change_seq(id, value) VALUES (1, 0);
 
         INSERT OR IGNORE INTO habito(key, title, is_active) VALUES
         ('camina_10','Camina 10 minutos',1),
@@ -76,35 +667,145 @@ class Database:
         ('respira_1','Respira 1 minuto',1),
         ('postura_1','Postura recta 1 minuto',1);
         """
-        conn.executescript(schema)
     
     def get_connection(self):
         """Retorna una conexión a la base de datos"""
-        return sqlite3.connect(self.db_path)
+        return sqlite3.connect(self.db_path, cached_statements=CACHED_STATEMENTS)
+    
+    def _open_connection(self):
+        """
+        Conexión para la próxima transacción (la persistente se abre la primera vez)
+        :return: Tupla (conexión, registro de sus sentencias preparadas)
+        """
+        if not self.persistent:
+            return self.get_connection(), self.statements.new_connection()
+        owner = self._owner
+        if owner._conn is None:
+            owner._conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                          cached_statements=CACHED_STATEMENTS)
+            owner._prepared = self.statements.new_connection()
+        return owner._conn, owner._prepared
+    
+    @contextmanager
+    def _connection(self):
+        """
+        Conexión para una operación. Si ya hay una transacción abierta en este hilo
+        se reutiliza (las operaciones anidadas forman parte de la misma transacción);
+        si no, se abre una nueva que se confirma al salir sin errores.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        
+        with self._lock if self.persistent else nullcontext():
+            conn, self._local.prepared = self._open_connection()
+            self._local.conn = conn
+            self._local.after_commit = []
+            self._local.seq = None
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                self._local.after_commit = []
+                raise
+            finally:
+                self._local.conn = None
+                if not self.persistent:
+                    conn.close()
+        
+        callbacks, self._local.after_commit = self._local.after_commit, []
+        for callback in callbacks:
+            callback()
+    
+    def transaction(self):
+        """
+        Agrupa varias operaciones en una sola transacción
+        Uso: with db.transaction(): db.set_habit_status(...); db.set_habit_status(...)
+        """
+        return self._connection()
+    
+    def call_after_commit(self, callback):
+        """
+        Ejecuta callback cuando se confirme la transacción en curso
+        (o de inmediato si no hay transacción abierta)
+        """
+        if getattr(self._local, "conn", None) is None:
+            callback()
+        else:
+            self._local.after_commit.append(callback)
+    
+    def _execute(self, cursor, name, params=()):
+        """Ejecuta una sentencia de STATEMENTS en la transacción en curso"""
+        sql = STATEMENTS[name]
+        self.statements.record(self._local.prepared, sql)
+        return cursor.execute(sql, params)
+    
+    def _executemany(self, cursor, name, rows):
+        sql = STATEMENTS[name]
+        self.statements.record(self._local.prepared, sql)
+        return cursor.executemany(sql, rows)
+    
+    def statement_cache_stats(self):
+        """
+        Diagnóstico de la caché de sentencias preparadas
+        Con persistent=True cada consulta se prepara una sola vez; sin ella, cada
+        operación abre una conexión y vuelve a prepararlas.
+        :return: Dict con hits, misses, executions, hit_rate, statements
+                 (tamaño del registro), cached_statements y persistent
+        """
+        stats = self.statements.stats()
+        stats.update({
+            "statements": len(STATEMENTS),
+            "cached_statements": self.statements.capacity,
+            "persistent": self.persistent,
+        })
+        return stats
+    
+    def add_write_hook(self, hook):
+        """
+        Registra una función hook(day_date) que se ejecuta dentro de la misma
+        transacción que cada set_habit_status
+        """
+        self._write_hooks.append(hook)
+    
+    def remove_write_hook(self, hook):
+        """Quita una función registrada con add_write_hook"""
+        if hook in self._write_hooks:
+            self._write_hooks.remove(hook)
+    
+    def add_restore_hook(self, hook):
+        """
+        Registra una función hook() que se ejecuta después de cada restore (de
+        esta instancia o de cualquier vista de for_user del mismo archivo)
+        """
+        self._file.restore_hooks.append(hook)
+    
+    def remove_restore_hook(self, hook):
+        """Quita una función registrada con add_restore_hook"""
+        if hook in self._file.restore_hooks:
+            self._file.restore_hooks.remove(hook)
     
     # ========== PERFIL ==========
     
     def get_profile(self):
         """Obtiene el perfil del usuario"""
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT name, goal FROM usuario_perfil WHERE id = 1")
+            self._execute(cursor, "profile.get", (self.user_id,))
             row = cursor.fetchone()
             if row:
-                return {"name": row[0], "goal": row[1]}
-            return {"name": "", "goal": "Moverme más"}
+                return Profile(row[0], row[1])
+            return Profile("", "Moverme más")
     
     def update_profile(self, name, goal):
         """Actualiza el perfil del usuario"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE usuario_perfil SET name = ?, goal = ? WHERE id = 1",
-                (name, goal)
-            )
-            conn.commit()
-            conn.close()
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, "profile.upsert",
+                              (self.user_id, name, goal, self._now_ms(), self._next_seq(cursor)))
         except Exception as e:
             print(f"[ERROR] Error al actualizar perfil: {e}")
             raise
@@ -113,35 +814,36 @@ class Database:
     
     def get_habits(self, active_only=True):
         """Obtiene la lista de hábitos"""
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            if active_only:
-                cursor.execute("SELECT key, title FROM habito WHERE is_active = 1")
-            else:
-                cursor.execute("SELECT key, title FROM habito")
-            return [{"key": row[0], "title": row[1]} for row in cursor.fetchall()]
+            self._execute(cursor, "habits.active" if active_only else "habits.all")
+            return [Habit(key, title) for key, title in cursor.fetchall()]
+    
+    def get_habit_catalog(self, refresh=False):
+        """
+        Catálogo de hábitos activos, consultado una sola vez y luego en memoria
+        :param refresh: Volver a leerlo (ej: después de cambiar la tabla habito)
+        :return: HabitCatalog
+        """
+        if self._file.catalog is None or refresh:
+            self._file.catalog = HabitCatalog(self.get_habits())
+        return self._file.catalog
     
     # ========== DÍAS Y HÁBITOS DIARIOS ==========
     
     def ensure_day_exists(self, day_date):
         """Asegura que existe un registro para el día especificado"""
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("INSERT OR IGNORE INTO dia(day_date) VALUES (?)", (day_date,))
-            conn.commit()
+            self._execute(cursor, "day.ensure", (self.user_id, day_date))
     
     def get_day_habits(self, day_date):
         """Obtiene el estado de todos los hábitos para un día específico"""
         self.ensure_day_exists(day_date)
         
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT h.key, COALESCE(dh.done, 0) as done
-                FROM habito h
-                LEFT JOIN habitos_dia dh ON h.key = dh.habit_key AND dh.day_date = ?
-                WHERE h.is_active = 1
-            """, (day_date,))
+            self._execute(cursor, "day.habits", (self.user_id, day_date))
             
             result = {}
             for row in cursor.fetchall():
@@ -150,90 +852,168 @@ class Database:
     
     def set_habit_status(self, day_date, habit_key, done):
         """Establece el estado de un hábito para un día específico"""
-        self.ensure_day_exists(day_date)
-        
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO habitos_dia(day_date, habit_key, done)
-                VALUES (?, ?, ?)
-                ON CONFLICT(day_date, habit_key) 
-                DO UPDATE SET done = ?
-            """, (day_date, habit_key, int(done), int(done)))
-            conn.commit()
+            self._execute(cursor, "day.ensure", (self.user_id, day_date))
+            self._execute(cursor, "habit.set", (self.user_id, day_date, habit_key, int(done),
+                                                self._now_ms(), self._next_seq(cursor)))
+            # Los hooks (ej: medallas) escriben en la misma transacción
+            for hook in list(self._write_hooks):
+                hook(day_date)
     
     def get_habits_for_date_range(self, start_date, end_date):
         """Obtiene todos los hábitos completados en un rango de fechas"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT day_date, habit_key, done
-                FROM habitos_dia
-                WHERE day_date BETWEEN ? AND ? AND done = 1
-                ORDER BY day_date
-            """, (start_date, end_date))
-            
-            result = {}
-            for row in cursor.fetchall():
-                day = row[0]
-                if day not in result:
-                    result[day] = {}
-                result[day][row[1]] = bool(row[2])
-            return result
+        return dict(self.iter_days_for_date_range(start_date, end_date))
     
     def get_all_days_with_habits(self):
         """Obtiene todos los días que tienen al menos un hábito registrado"""
-        with self.get_connection() as conn:
+        return list(self.iter_all_days_with_habits())
+    
+    # ========== LECTURA POR STREAMING ==========
+    # Para rangos largos (exportaciones, análisis de años de historial): las filas
+    # se leen de a FETCH_SIZE con una conexión propia, así la memoria no depende
+    # del tamaño del rango. La conexión se cierra al terminar de recorrer el
+    # generador (o al descartarlo). No ven los cambios sin confirmar de una
+    # transacción abierta en el mismo hilo, y mientras se recorren las escrituras
+    # de otras conexiones esperan (journal por defecto): consumirlos sin pausas.
+    
+    def _iter_rows(self, name, params=(), fetch_size=FETCH_SIZE, row_factory=None):
+        """
+        Recorre el resultado de una sentencia de STATEMENTS de a fetch_size filas
+        :param row_factory: Arma cada fila (ver _day_habit_row); None = tuplas
+        """
+        sql = STATEMENTS[name]
+        conn = self.get_connection()
+        self.statements.record(self.statements.new_connection(), sql)
+        try:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT d.day_date
-                FROM dia d
-                INNER JOIN habitos_dia dh ON d.day_date = dh.day_date
-                ORDER BY d.day_date
-            """)
-            return [row[0] for row in cursor.fetchall()]
+            cursor.row_factory = row_factory
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+    
+    def iter_habits_for_date_range(self, start_date, end_date, only_done=True, fetch_size=FETCH_SIZE):
+        """
+        Recorre los hábitos de un rango de fechas ordenados por día
+        :param start_date: Fecha inicial (ISO, incluida)
+        :param end_date: Fecha final (ISO, incluida)
+        :param only_done: Solo los hábitos completados (False incluye los desmarcados)
+        :param fetch_size: Filas por lectura
+        :return: Generador de DayHabit (day_date, habit_key, done)
+        """
+        return self._iter_rows("range.done" if only_done else "range.all",
+                               (self.user_id, start_date, end_date), fetch_size, _day_habit_row)
+    
+    def iter_days_for_date_range(self, start_date, end_date, only_done=True, fetch_size=FETCH_SIZE):
+        """
+        Recorre un rango de fechas agrupado por día (solo los días con registros)
+        :return: Generador de tuplas (day_date, {habit_key: done})
+        """
+        rows = self.iter_habits_for_date_range(start_date, end_date, only_done, fetch_size)
+        for day_date, day_rows in groupby(rows, key=itemgetter(0)):
+            yield day_date, {habit_key: done for _, habit_key, done in day_rows}
+    
+    def iter_habit_history(self, start_date=None, end_date=None, all_users=False, fetch_size=FETCH_SIZE):
+        """
+        Recorre el historial de hábitos con el título de cada hábito (exportaciones)
+        :param start_date: Fecha inicial (ISO, incluida; None = sin límite)
+        :param end_date: Fecha final (ISO, incluida; None = sin límite)
+        :param all_users: Incluir a todos los usuarios del archivo, no solo a user_id
+        :param fetch_size: Filas por lectura
+        :return: Generador de tuplas (user_id, day_date, habit_key, title, done)
+                 ordenadas por usuario, día y hábito
+        """
+        name, params = ("history.all_users", ()) if all_users else ("history.user", (self.user_id,))
+        return self._iter_rows(name, params + (start_date or "0000-01-01", end_date or "9999-12-31"),
+                               fetch_size)
+    
+    def iter_all_days_with_habits(self, fetch_size=FETCH_SIZE):
+        """
+        Recorre los días que tienen al menos un hábito registrado
+        :return: Generador de fechas ISO en orden
+        """
+        rows = self._iter_rows("days.with_habits", (self.user_id,), fetch_size)
+        for (day_date,) in rows:
+            yield day_date
+    
+    # ========== HISTORIAL ==========
+    
+    def get_history_page(self, before=None, after=None, limit=HISTORY_PAGE_SIZE):
+        """
+        Página del historial, un elemento por día con registros
+        Paginación por clave: la página siguiente empieza después del último
+        day_date recibido, así el costo no depende de cuántos días se saltean.
+        :param before: Días anteriores a esta fecha ISO (None = desde el más reciente)
+        :param after: Días posteriores a esta fecha ISO (tiene prioridad sobre before)
+        :param limit: Días por página
+        :return: Lista de HistoryDay (day_date, done, habit_keys completados en
+                 orden alfabético) del día más reciente al más antiguo
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            if after is not None:
+                self._execute(cursor, "history.days_after", (self.user_id, after, limit))
+            else:
+                self._execute(cursor, "history.days_before", (self.user_id, before or "9999-12-31", limit))
+            rows = cursor.fetchall()
+        if after is not None:
+            rows.reverse()
+        return [HistoryDay(day_date, done, tuple(sorted(keys.split(","))) if keys else ())
+                for day_date, done, keys in rows]
     
     # ========== ESTADÍSTICAS ==========
     
     def get_completed_count_for_day(self, day_date):
         """Cuenta cuántos hábitos se completaron en un día específico"""
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT COUNT(*) FROM habitos_dia
-                WHERE day_date = ? AND done = 1
-            """, (day_date,))
+            self._execute(cursor, "stats.completed_day", (self.user_id, day_date))
             row = cursor.fetchone()
             return row[0] if row else 0
     
-    def get_streak(self, threshold=1):
+    def get_streak(self, threshold=1, today=None):
         """
         Calcula la racha actual de días consecutivos
         :param threshold: Número mínimo de hábitos completados para contar el día
+        :param today: Fecha de referencia (por defecto hoy)
         """
-        today = date.today()
+        current_day = today or date.today()
         streak = 0
-        current_day = today
         
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            while True:
-                day_str = current_day.isoformat()
-                cursor.execute("""
-                    SELECT COUNT(*) FROM habitos_dia
-                    WHERE day_date = ? AND done = 1
-                """, (day_str,))
-                row = cursor.fetchone()
-                count = row[0] if row else 0
-                
-                if count >= threshold:
-                    streak += 1
-                    current_day -= timedelta(days=1)
-                else:
+            # Una sola consulta: días que cumplen el umbral, del más reciente al más antiguo.
+            # Se recorre el cursor solo hasta encontrar el primer hueco.
+            self._execute(cursor, "stats.streak_days", (self.user_id, current_day.isoformat(), threshold))
+            for (day_str,) in cursor:
+                if day_str != current_day.isoformat():
                     break
+                streak += 1
+                current_day -= timedelta(days=1)
         
         return streak
     
+    def get_completed_count_for_range(self, start_date, end_date):
+        """Cuenta los hábitos completados entre dos fechas (inclusive)"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "stats.completed_range", (self.user_id, start_date, end_date))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+    
+    def get_active_days_count(self, start_date, end_date):
+        """Cuenta los días con al menos un hábito completado entre dos fechas (inclusive)"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "stats.active_days", (self.user_id, start_date, end_date))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+    
     def get_monthly_active_days(self, year, month):
         """Obtiene el número de días activos en un mes específico"""
         first_day = date(year, month, 1)
@@ -242,34 +1022,289 @@ class Database:
         else:
             last_day = date(year, month + 1, 1) - timedelta(days=1)
         
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT COUNT(DISTINCT day_date)
-                FROM habitos_dia
-                WHERE day_date BETWEEN ? AND ? AND done = 1
-            """, (first_day.isoformat(), last_day.isoformat()))
+            # Misma sentencia que get_active_days_count
+            self._execute(cursor, "stats.active_days",
+                          (self.user_id, first_day.isoformat(), last_day.isoformat()))
             row = cursor.fetchone()
             return row[0] if row else 0
     
+    def get_daily_counts(self, start_date, end_date):
+        """
+        Hábitos completados por día entre dos fechas (inclusive), en una sola consulta
+        :return: Dict {day_date: completados} (solo los días con registros)
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "stats.daily_counts", (self.user_id, start_date, end_date))
+            return dict(cursor.fetchall())
+    
+    # ========== MEDALLAS ==========
+    
+    def record_badge_unlock(self, badge_key, day_date):
+        """
+        Registra el desbloqueo de una medalla (solo la primera vez)
+        :return: True si es un desbloqueo nuevo
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "badge.unlock", (self.user_id, badge_key, day_date))
+            return cursor.rowcount > 0
+    
+    def get_badge_unlocks(self):
+        """Obtiene el historial de medallas desbloqueadas (de la más antigua a la más reciente)"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "badge.unlocks", (self.user_id,))
+            return [BadgeUnlock(*row) for row in cursor.fetchall()]
+    
+    # ========== SINCRONIZACIÓN ==========
+    
+    def _now_ms(self):
+        return int(self.clock() * 1000)
+    
+    def _next_seq(self, cursor):
+        """Número de cambio de la transacción en curso (el mismo para todas sus filas)"""
+        seq = getattr(self._local, "seq", None)
+        if seq is None:
+            self._execute(cursor, "seq.next")
+            seq = cursor.fetchone()[0]
+            self._local.seq = seq
+        return seq
+    
+    def current_seq(self):
+        """Último número de cambio de la base de datos (punto de partida para changes_since)"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "seq.current")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+    
+    def changes_since(self, since=None):
+        """
+        Recorre los cambios del usuario posteriores a un número de cambio
+        Cada fila aparece una sola vez con su último estado (las escrituras
+        reemplazadas no se envían). Los deltas se leen de a FETCH_SIZE.
+        :param since: Último número de cambio ya recibido (None = todo)
+        :return: Generador de listas compactas
+                 ["h", seq, day_date, habit_key, done, updated_at] o
+                 ["p", seq, name, goal, updated_at]
+        """
+        since = -1 if since is None else since
+        rows = self._iter_rows("sync.changes_since", (self.user_id, since, self.user_id, since))
+        for seq, kind, a, b, done, updated_at in rows:
+            if kind == "h":
+                yield ["h", seq, a, b, done, updated_at]
+            else:
+                yield ["p", seq, a, b, updated_at]
+    
+    def apply_changes(self, changes):
+        """
+        Aplica deltas de otro dispositivo en una sola transacción con
+        last-writer-wins por (day_date, habit_key): gana el updated_at mayor
+        (en empate, el valor mayor, para que todas las copias elijan lo mismo).
+        Los cambios aplicados toman un número de cambio local para reenviarse
+        a otros dispositivos.
+        :param changes: Iterable de deltas con el formato de changes_since
+        :return: Número de cambios aplicados
+        """
+        applied = 0
+        days = []
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # El número de cambio solo se consume si algo se aplica: reaplicar
+            # deltas ya recibidos no genera cambios nuevos (no hay eco entre copias).
+            # seq.peek abre la escritura: hasta confirmar, nadie más lee ni toma ese número
+            seq = getattr(self._local, "seq", None)
+            reserved = seq is not None
+            if not reserved:
+                self._execute(cursor, "seq.peek")
+                seq = cursor.fetchone()[0]
+            for change in changes:
+                if change[0] == "h":
+                    _, _, day_date, habit_key, done, updated_at = change
+                    self._execute(cursor, "day.ensure", (self.user_id, day_date))
+                    self._execute(cursor, "sync.apply_habit",
+                                  (self.user_id, day_date, habit_key, int(done), updated_at, seq))
+                    if cursor.rowcount > 0:
+                        applied += 1
+                        if day_date not in days:
+                            days.append(day_date)
+                elif change[0] == "p":
+                    _, _, name, goal, updated_at = change
+                    self._execute(cursor, "sync.apply_profile", (self.user_id, name, goal, updated_at, seq))
+                    applied += cursor.rowcount
+            if applied and not reserved:
+                self._execute(cursor, "seq.set", (seq,))
+                self._local.seq = seq
+            # Los hooks (ej: medallas) ven los días modificados por otro dispositivo
+            for day_date in days:
+                for hook in list(self._write_hooks):
+                    hook(day_date)
+        return applied
+    
+    # ========== IMPORTACIÓN ==========
+    
+    def import_habit_rows(self, rows, replace=True):
+        """
+        Escribe un lote de hábitos importados en una sola transacción
+        Las filas importadas toman un número de cambio (se sincronizan como
+        cualquier escritura). No llama a los write hooks: después de importar,
+        recalcular las medallas con BadgeEngine.invalidate_all().
+        :param rows: Lista de tuplas (user_id, day_date, habit_key, done) ya validadas
+        :param replace: True reemplaza el estado existente; False conserva las filas existentes
+        :return: Número de filas insertadas o modificadas
+        """
+        if not rows:
+            return 0
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._executemany(cursor, "day.ensure",
+                              sorted({(user_id, day_date) for user_id, day_date, _, _ in rows}))
+            now, seq = self._now_ms(), self._next_seq(cursor)
+            self._executemany(cursor, "import.replace" if replace else "import.keep",
+                              [(user_id, day_date, habit_key, int(done), now, seq)
+                               for user_id, day_date, habit_key, done in rows])
+            return cursor.rowcount
+    
+    # ========== BANDEJA DE SALIDA ==========
+    
+    def queue_habit_change(self, day_date, habit_key):
+        """
+        Encola el estado actual de un hábito para enviarlo al servidor
+        Llamar en la misma transacción que set_habit_status para que el cambio
+        y su registro en la bandeja se confirmen juntos. Si ya había un cambio
+        pendiente del mismo hábito y día se reemplaza (solo se envía el último).
+        :param day_date: Fecha en formato ISO
+        :param habit_key: Clave del hábito
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "outbox.queue", (self._now_ms(), self.user_id, day_date, habit_key))
+    
+    def get_outbox(self, limit=100):
+        """
+        Cambios pendientes, del más antiguo al más nuevo
+        :param limit: Máximo de cambios a retornar
+        :return: Lista de dicts con date, habit_key, done y updated_at
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "outbox.get", (self.user_id, limit))
+            return [
+                {"date": day_date, "habit_key": habit_key, "done": bool(done), "updated_at": updated_at}
+                for day_date, habit_key, done, updated_at in cursor.fetchall()
+            ]
+    
+    def remove_from_outbox(self, changes):
+        """
+        Quita de la bandeja los cambios ya confirmados por el servidor
+        Un cambio que fue reemplazado mientras se enviaba (otro updated_at) se conserva.
+        :param changes: Lista de dicts como los de get_outbox
+        :return: Número de cambios quitados
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._executemany(cursor, "outbox.remove",
+                              [(self.user_id, c["date"], c["habit_key"], c["updated_at"]) for c in changes])
+            return cursor.rowcount
+    
+    def get_outbox_stats(self):
+        """
+        Métricas de la bandeja de salida
+        :return: Dict con depth (cambios pendientes) y oldest_age (segundos desde
+                 el cambio pendiente más antiguo, 0 si no hay)
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "outbox.stats", (self.user_id,))
+            depth, oldest = cursor.fetchone()
+            age = max(0.0, (self._now_ms() - oldest) / 1000.0) if oldest is not None else 0.0
+            return {"depth": depth, "oldest_age": age}
+    
     # ========== UTILIDADES ==========
     
-    def reset_all_data(self):
-        """Resetea todos los datos (útil para testing o reiniciar la app)"""
-        with self.get_connection() as conn:
+    def reset_all_data(self, all_users=False):
+        """
+        Resetea todos los datos del usuario (útil para testing o reiniciar la app)
+        Todo en una transacción. Si nadie más tiene datos en una tabla (el caso
+        de un solo usuario por archivo) se vacía con DELETE sin WHERE: SQLite
+        la trunca soltando sus páginas de una vez, sin borrar fila por fila ni
+        actualizar cada índice. El catálogo y el contador de cambios no se tocan.
+        :param all_users: Borrar los datos de todos los usuarios del archivo
+        :return: Tupla con las tablas que se truncaron
+        """
+        truncated = []
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM habitos_dia")
-            cursor.execute("DELETE FROM dia")
-            cursor.execute("UPDATE usuario_perfil SET name = '', goal = 'Moverme más' WHERE id = 1")
-            conn.commit()
+            for table in USER_TABLES:
+                if all_users or not self._has_other_users(cursor, table):
+                    self._execute(cursor, f"reset.{table}.truncate")
+                    truncated.append(table)
+                else:
+                    self._execute(cursor, f"reset.{table}.user", (self.user_id,))
+        return tuple(truncated)
+    
+    def _has_other_users(self, cursor, table):
+        """Indica si la tabla tiene filas de otros usuarios (dos búsquedas en la clave primaria)"""
+        self._execute(cursor, f"reset.{table}.others", (self.user_id, self.user_id))
+        return bool(cursor.fetchone()[0])
+    
+    def backup(self, dest_path, **options):
+        """
+        Copia consistente de la base de datos (de todos los usuarios) con la API de
+        backup de SQLite, de a pages_per_step páginas para no frenar a la app (ver app.backup)
+        :param dest_path: Archivo de destino
+        :param options: pages_per_step, pause, progress (ver backup_database)
+        :return: Dict de backup_database (bytes, seconds, restarts, max_step, ...)
+        """
+        # Import local: los scripts de app/ importan este módulo sin el paquete
+        from .backup import backup_database
+        return backup_database(self.db_path, dest_path, **options)
+    
+    def restore(self, snapshot_path):
+        """
+        Reemplaza la base de datos (de todos los usuarios) por una copia hecha con
+        backup y la migra si es de una versión anterior del esquema
+        Después se llaman los hooks de add_restore_hook (ej: el motor de medallas
+        descarta sus métricas); la UI debe recargarse (ver SaludHoyApp.restore_snapshot).
+        :param snapshot_path: Archivo de la copia
+        """
+        if getattr(self._local, "conn", None) is not None:
+            # La transacción en curso ya reservó un número de cambio de la base anterior
+            raise RuntimeError("No se puede restaurar dentro de una transacción")
+        from .backup import restore_database
+        with self._lock:
+            result = restore_database(snapshot_path, self.db_path)
+        self._ensure_db_exists()
+        # La copia puede tener otro catálogo de hábitos
+        self._file.catalog = None
+        for hook in list(self._file.restore_hooks):
+            hook()
+        return result
     
-    def close(self):
+    def close(self, keep_persistent=True):
         """
         Cierra todas las conexiones activas.
-        Nota: Esta clase usa context managers para manejar conexiones,
-        por lo que no hay conexiones persistentes que cerrar.
-        Este método existe para compatibilidad con la API.
+        Nota: Sin persistent=True esta clase abre una conexión por operación,
+        por lo que no hay conexiones persistentes que cerrar. Con persistent=True
+        espera a que termine la transacción en curso y libera la conexión (se
+        vuelve a abrir si la instancia se usa de nuevo). Las vistas de for_user
+        comparten esa conexión: cerrar una vista la cierra para todas.
+        :param keep_persistent: False = si la instancia se usa de nuevo abre una
+                                conexión por operación en vez de mantener otra
+                                abierta (ej: desalojada por DatabaseRouter)
         """
-        pass
+        if not self.persistent:
+            return
+        owner = self._owner
+        with self._lock:
+            if owner._conn is not None:
+                owner._conn.close()
+                owner._conn = None
+                owner._prepared = None
+            if not keep_persistent:
+                self.persistent = False
 
 
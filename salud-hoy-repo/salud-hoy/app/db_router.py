@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Router de bases de datos por usuario para Salud Hoy
+Cada usuario tiene su propio archivo SQLite bajo data/users/. El router
+mantiene abiertas las bases de datos usadas más recientemente (LRU) para no
+abrir un archivo en cada petición, y crea o migra cada archivo la primera vez
+que se accede a él.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from .database import Database
+
+
+# Número de subdirectorios en los que se reparten los archivos
+# (evita directorios con cientos de miles de archivos)
+DEFAULT_SHARDS = 256
+
+# Bases de datos abiertas a la vez por defecto
+DEFAULT_MAX_OPEN = 64
+
+
+class DatabaseRouter:
+    """Asigna a cada usuario su archivo de base de datos con una caché LRU de conexiones"""
+
+    def __init__(self, base_dir, max_open=DEFAULT_MAX_OPEN, shards=DEFAULT_SHARDS):
+        """
+        Inicializa el router
+        :param base_dir: Directorio donde se guardan los archivos por usuario
+        :param max_open: Máximo de bases de datos abiertas a la vez
+        :param shards: Número de subdirectorios
+        """
+        if max_open < 1:
+            raise ValueError("max_open debe ser al menos 1")
+        self.base_dir = base_dir
+        self.max_open = max_open
+        self.shards = shards
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        # Archivos ya creados/migrados en este proceso (al reabrirlos no se repite el esquema)
+        self._ready = set()
+        # Contadores (diagnóstico y benchmarks)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, user_id):
+        """
+        Ruta del archivo de base de datos de un usuario
+        :param user_id: ID del usuario (de users.db)
+        :return: Ej: data/users/2a/user_42.db
+        """
+        user_id = int(user_id)
+        shard = f"{user_id % self.shards:02x}"
+        return os.path.join(self.base_dir, shard, f"user_{user_id}.db")
+
+    def get(self, user_id):
+        """
+        Retorna la base de datos del usuario (abriéndola, y creándola si no existe)
+        Si la instancia se desaloja mientras alguien la sigue usando, sigue
+        funcionando pero sin conexión persistente (abre una por operación): las
+        conexiones abiertas nunca superan max_open.
+        :param user_id: ID del usuario (de users.db)
+        :return: Instancia de Database con conexión persistente
+        """
+        user_id = int(user_id)
+        with self._lock:
+            db = self._open.get(user_id)
+            if db is not None:
+                self._open.move_to_end(user_id)
+                self.hits += 1
+                return db
+            self.misses += 1
+
+        # Crear o migrar el archivo puede tardar: se hace fuera del lock del
+        # router para no frenar los accesos de los demás usuarios
+        path = self.path_for(user_id)
+        created = Database(path, user_id=user_id, persistent=True,
+                           ensure_schema=path not in self._ready)
+
+        evicted = None
+        with self._lock:
+            self._ready.add(path)
+            db = self._open.get(user_id)
+            if db is not None:
+                # Otro hilo abrió el mismo usuario mientras tanto: gana el primero
+                self._open.move_to_end(user_id)
+            else:
+                db = self._open[user_id] = created
+                if len(self._open) > self.max_open:
+                    _, evicted = self._open.popitem(last=False)
+                    self.evictions += 1
+
+        if db is not created:
+            created.close()
+        # Se cierra fuera del lock del router: close() espera a que termine
+        # la transacción en curso de esa base de datos
+        if evicted is not None:
+            evicted.close(keep_persistent=False)
+        return db
+
+    def evict(self, user_id):
+        """
+        Cierra la base de datos de un usuario si está abierta
+        :return: True si estaba abierta
+        """
+        with self._lock:
+            db = self._open.pop(int(user_id), None)
+        if db is None:
+            return False
+        db.close(keep_persistent=False)
+        return True
+
+    def open_count(self):
+        """Número de bases de datos abiertas"""
+        return len(self._open)
+
+    def hit_rate(self):
+        """Proporción de accesos que encontraron la base de datos ya abierta"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close_all(self):
+        """Cierra todas las bases de datos abiertas"""
+        with self._lock:
+            dbs = list(self._open.values())
+            self._open.clear()
+        for db in dbs:
+            db.close(keep_persistent=False)
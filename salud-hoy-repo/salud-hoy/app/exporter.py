@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación del historial de hábitos para Salud Hoy
+Recorre habitos_dia (con el título de cada hábito) por streaming y lo escribe
+de a bloques, así la memoria no depende del número de filas. Formatos:
+- csv:      una fila por hábito y día, con encabezado
+- jsonl:    un objeto JSON por línea
+- columnar: binario por columnas (estilo Parquet, sin dependencias): cada
+            bloque guarda cada columna comprimida con zlib; las fechas van como
+            diferencias entre días y los textos como diccionario + índices
+
+Uso:
+    python -m app.exporter salida.csv [--format csv|jsonl|columnar]
+                           [--start 2025-01-01] [--end 2025-12-31]
+                           [--user 1 | --all-users] [--partition]
+"""
+
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import date
+from itertools import groupby, islice
+from operator import itemgetter
+
+from .database import Database, DEFAULT_USER_ID
+
+
+# Columnas exportadas (en el orden de iter_habit_history)
+COLUMNS = ("user_id", "day_date", "habit_key", "title", "done")
+
+FORMATS = ("csv", "jsonl", "columnar")
+
+# Extensión de cada formato (al partir la exportación en un archivo por usuario)
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "columnar": ".shc"}
+
+# Filas por bloque (lectura de la base de datos y escritura)
+CHUNK_SIZE = 50000
+
+# Formato columnar
+COLUMNAR_MAGIC = b"SHCOL\x01"
+COLUMNAR_TYPES = {
+    "user_id": "int64",
+    "day_date": "date_delta",
+    "habit_key": "dict",
+    "title": "dict",
+    "done": "bool",
+}
+
+
+# ========== ESCRITORES ==========
+
+class _CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(COLUMNS)
+
+    def write_chunk(self, rows):
+        self._csv.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8", newline="\n")
+        # Las claves y títulos salen de un catálogo chico: se codifican una sola vez
+        self._encoded = {}
+
+    def _json(self, value):
+        encoded = self._encoded.get(value)
+        if encoded is None:
+            encoded = self._encoded[value] = json.dumps(value, ensure_ascii=False)
+        return encoded
+
+    def write_chunk(self, rows):
+        # Equivale a json.dumps de cada fila (las fechas ISO no necesitan escaparse)
+        self._file.write("".join(
+            f'{{"user_id": {user_id}, "day_date": "{day_date}", '
+            f'"habit_key": {self._json(habit_key)}, "title": {self._json(title)}, '
+            f'"done": {"true" if done else "false"}}}\n'
+            for user_id, day_date, habit_key, title, done in rows
+        ))
+
+    def close(self):
+        self._file.close()
+
+
+class _ColumnarWriter:
+    """
+    Archivo: MAGIC | u16 largo + encabezado JSON | bloques | u32 0
+    Bloque:  u32 filas | por columna: u32 largo + datos comprimidos con zlib
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        header = json.dumps({"columns": list(COLUMNS), "types": COLUMNAR_TYPES}).encode("utf-8")
+        self._file.write(COLUMNAR_MAGIC + struct.pack("<H", len(header)) + header)
+
+    def write_chunk(self, rows):
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        parts = [struct.pack("<I", len(rows))]
+        for name, values in zip(COLUMNS, columns):
+            block = zlib.compress(_encode_column(COLUMNAR_TYPES[name], values), 6)
+            parts.append(struct.pack("<I", len(block)))
+            parts.append(block)
+        self._file.write(b"".join(parts))
+
+    def close(self):
+        self._file.write(struct.pack("<I", 0))
+        self._file.close()
+
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "columnar": _ColumnarWriter}
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_column(kind, values):
+    if kind == "int64":
+        return _little_endian(array("q", values))
+    if kind == "date_delta":
+        # Diferencia con la fecha anterior (el primer valor es el ordinal completo):
+        # dentro de un usuario casi todas son 0 o 1 y se comprimen muy bien
+        ordinals = {}
+        deltas = array("i", (
+            ordinals.get(d) or ordinals.setdefault(d, date.fromisoformat(d).toordinal())
+            for d in values
+        ))
+        for i in range(len(deltas) - 1, 0, -1):
+            deltas[i] -= deltas[i - 1]
+        return _little_endian(deltas)
+    if kind == "dict":
+        index = {}
+        codes = array("H", (index.setdefault(v, len(index)) for v in values))
+        names = json.dumps(list(index), ensure_ascii=False).encode("utf-8")
+        return struct.pack("<I", len(names)) + names + _little_endian(codes)
+    if kind == "bool":
+        return bytes(values)
+    raise ValueError(f"Tipo de columna desconocido: {kind}")
+
+
+def _decode_column(kind, data):
+    if kind == "int64":
+        values = array("q")
+    elif kind == "date_delta":
+        values = array("i")
+    elif kind == "dict":
+        size = struct.unpack_from("<I", data)[0]
+        names = json.loads(data[4:4 + size].decode("utf-8"))
+        codes = array("H")
+        codes.frombytes(data[4 + size:])
+        if sys.byteorder == "big":
+            codes.byteswap()
+        return [names[c] for c in codes]
+    elif kind == "bool":
+        return [b == 1 for b in data]
+    else:
+        raise ValueError(f"Tipo de columna desconocido: {kind}")
+
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    if kind == "date_delta":
+        ordinal = 0
+        days = []
+        for delta in values:
+            ordinal += delta
+            days.append(date.fromordinal(ordinal).isoformat())
+        return days
+    return list(values)
+
+
+def read_columnar(path):
+    """
+    Lee un archivo del formato columnar bloque por bloque
+    :param path: Ruta del archivo .shc
+    :return: Generador de tuplas con las columnas de COLUMNS
+    """
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"No es un archivo columnar de Salud Hoy: {path}")
+        size = struct.unpack("<H", f.read(2))[0]
+        header = json.loads(f.read(size).decode("utf-8"))
+        columns = header["columns"]
+        while True:
+            count = struct.unpack("<I", f.read(4))[0]
+            if count == 0:
+                break
+            decoded = []
+            for name in columns:
+                length = struct.unpack("<I", f.read(4))[0]
+                data = zlib.decompress(f.read(length))
+                decoded.append(_decode_column(header["types"][name], data))
+            yield from zip(*decoded)
+
+
+# ========== EXPORTACIÓN ==========
+
+def _chunks(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_history(db, out_path, fmt="csv", start_date=None, end_date=None,
+                   all_users=False, partition_by_user=False, chunk_size=CHUNK_SIZE):
+    """
+    Exporta el historial de hábitos
+    :param db: Instancia de Database (su user_id se usa si all_users es False)
+    :param out_path: Archivo de salida, o directorio si partition_by_user es True
+    :param fmt: Formato (ver FORMATS)
+    :param start_date: Fecha inicial (ISO, incluida; None = sin límite)
+    :param end_date: Fecha final (ISO, incluida; None = sin límite)
+    :param all_users: Exportar a todos los usuarios del archivo
+    :param partition_by_user: Escribir un archivo por usuario (user_<id>.<ext>)
+    :param chunk_size: Filas por bloque
+    :return: Dict con rows, bytes, seconds, rows_per_sec y files
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato desconocido: {fmt} (usa {', '.join(FORMATS)})")
+
+    start = time.perf_counter()
+    rows = db.iter_habit_history(start_date, end_date, all_users=all_users, fetch_size=chunk_size)
+    files = []
+    total = 0
+
+    if partition_by_user:
+        os.makedirs(out_path, exist_ok=True)
+        writer = None
+        current_user = None
+        try:
+            for chunk in _chunks(rows, chunk_size):
+                # Las filas vienen ordenadas por usuario: se cambia de archivo al cambiar de usuario
+                for user_id, user_rows in groupby(chunk, key=itemgetter(0)):
+                    if user_id != current_user:
+                        if writer is not None:
+                            writer.close()
+                        path = os.path.join(out_path, f"user_{user_id}{EXTENSIONS[fmt]}")
+                        writer = WRITERS[fmt](path)
+                        files.append(path)
+                        current_user = user_id
+                    user_rows = list(user_rows)
+                    writer.write_chunk(user_rows)
+                    total += len(user_rows)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        out_dir = os.path.dirname(os.path.abspath(out_path))
+        os.makedirs(out_dir, exist_ok=True)
+        writer = WRITERS[fmt](out_path)
+        files.append(out_path)
+        try:
+            for chunk in _chunks(rows, chunk_size):
+                writer.write_chunk(chunk)
+                total += len(chunk)
+        finally:
+            writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": total,
+        "bytes": sum(os.path.getsize(p) for p in files),
+        "seconds": seconds,
+        "rows_per_sec": total / seconds if seconds > 0 else 0.0,
+        "files": files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar el historial de hábitos de Salud Hoy")
+    parser.add_argument("out", help="Archivo de salida (o directorio con --partition)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--db", default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "salud_hoy.db"))
+    parser.add_argument("--start", help="Fecha inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Fecha final (YYYY-MM-DD)")
+    parser.add_argument("--user", type=int, default=DEFAULT_USER_ID)
+    parser.add_argument("--all-users", action="store_true")
+    parser.add_argument("--partition", action="store_true", help="Un archivo por usuario")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"[ERROR] No existe la base de datos: {args.db}")
+        sys.exit(1)
+
+    db = Database(args.db, user_id=args.user)
+    result = export_history(db, args.out, args.format, args.start, args.end,
+                            all_users=args.all_users, partition_by_user=args.partition,
+                            chunk_size=args.chunk_size)
+    print(f"[OK] {result['rows']} filas exportadas a {len(result['files'])} archivo(s) "
+          f"({result['bytes']} bytes) en {result['seconds']:.2f} s "
+          f"({result['rows_per_sec']:.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Lista de hábitos del día para Salud Hoy
+Las filas salen del catálogo de hábitos (Database.get_habit_catalog) y se
+muestran en un RecycleView: solo existen los widgets de las filas visibles,
+así una lista de decenas de hábitos no crea un checkbox por hábito.
+"""
+
+
+class HabitList:
+    """Mantiene el data del RecycleView de hábitos y el estado de cada fila"""
+
+    def __init__(self, view):
+        """
+        Inicializa la lista
+        :param view: RecycleView de las filas (ids.habits_list, viewclass HabitRow)
+        """
+        self.view = view
+        self.catalog = None
+        self._rows = {}         # key -> dict de la fila en view.data
+        # Filas creadas o modificadas en la última actualización
+        self.last_touched = 0
+
+    def update(self, catalog, habits_today):
+        """
+        Aplica el catálogo y el estado de hoy
+        :param catalog: HabitCatalog
+        :param habits_today: Dict {habit_key: done} (ver get_day_habits)
+        :return: Número de filas creadas o modificadas
+        """
+        if catalog != self.catalog:
+            # Primera vez o cambió el catálogo: armar las filas
+            self.catalog = catalog
+            data = [
+                {"key": key, "title": catalog.titles[key], "active": bool(habits_today.get(key, False))}
+                for key in catalog
+            ]
+            self._rows = {row["key"]: row for row in data}
+            self.view.data = data
+            touched = len(data)
+        else:
+            touched = 0
+            for key, row in self._rows.items():
+                done = bool(habits_today.get(key, False))
+                if row["active"] != done:
+                    row["active"] = done
+                    touched += 1
+            if touched:
+                self.view.refresh_from_data()
+
+        self.last_touched = touched
+        return touched
+
+    def set_done(self, key, done):
+        """
+        Registra el toggle de una fila
+        Al reciclar una fila el RecycleView vuelve a asignar su estado y dispara
+        on_active con el valor que ya tenía: esos eventos no son toggles.
+        :return: True si el estado cambió (hay que guardarlo)
+        """
+        row = self._rows.get(key)
+        if row is None or row["active"] == bool(done):
+            return False
+        # El widget ya muestra el estado nuevo; el data se corrige para cuando se recicle
+        row["active"] = bool(done)
+        return True
+
+    def done_count(self):
+        """Hábitos del catálogo completados hoy (sin consultar la base de datos)"""
+        return sum(1 for row in self._rows.values() if row["active"])
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Mapa de calor del historial para Salud Hoy
+Un cuadro por día (columnas = semanas, filas = lunes a domingo) con el color
+según los hábitos completados. Los conteos salen de una sola consulta
+agregada (Database.get_daily_counts) y los cuadros se dibujan con
+instrucciones de canvas en un Fbo: la pantalla muestra su textura (un solo
+Rectangle en lugar de un widget por día). Cuando cambia el conteo de hoy solo
+se vuelve a subir ese cuadro a la textura.
+"""
+
+from datetime import date, timedelta
+
+from kivy.graphics import Fbo, Color, Rectangle, ClearColor, ClearBuffers
+
+
+# Tamaño de cada cuadro y separación, en píxeles de la textura
+CELL = 10
+GAP = 2
+PITCH = CELL + GAP
+
+BACKGROUND = (1, 1, 1, 1)
+
+# Colores por nivel: 0 = ningún hábito ... 4 = todos los hábitos
+LEVEL_COLORS = (
+    (0.92, 0.93, 0.94, 1),
+    (0.78, 0.91, 0.84, 1),
+    (0.49, 0.80, 0.64, 1),
+    (0.20, 0.70, 0.55, 1),
+    (0.08, 0.45, 0.33, 1),
+)
+
+
+def heatmap_level(count, total):
+    """
+    Nivel de color de un día
+    :param count: Hábitos completados
+    :param total: Hábitos activos
+    :return: 0 (ninguno) a 4 (todos)
+    """
+    if count <= 0 or total <= 0:
+        return 0
+    return min(len(LEVEL_COLORS) - 1, -(-count * (len(LEVEL_COLORS) - 1) // total))
+
+
+class HeatmapGrid:
+    """Posición de cada día en la grilla de semanas"""
+
+    def __init__(self, end_day, years=1):
+        """
+        :param end_day: Último día (hoy), en la última columna
+        :param years: Años hacia atrás; la primera columna empieza en lunes
+        """
+        first = end_day - timedelta(days=365 * years - 1)
+        self.start_day = first - timedelta(days=first.weekday())
+        self.end_day = end_day
+        self.weeks = (end_day - self.start_day).days // 7 + 1
+        self.size = (self.weeks * PITCH - GAP, 7 * PITCH - GAP)
+
+    def days(self):
+        """Días de la grilla, del primero a end_day"""
+        for offset in range((self.end_day - self.start_day).days + 1):
+            yield self.start_day + timedelta(days=offset)
+
+    def cell_pos(self, day):
+        """Esquina inferior izquierda del cuadro de un día (el lunes va arriba)"""
+        column, row = divmod((day - self.start_day).days, 7)
+        return column * PITCH, (6 - row) * PITCH
+
+
+class FboHeatmapRenderer:
+    """Dibuja la grilla en la textura de un Fbo y repinta cuadros sueltos"""
+
+    def __init__(self):
+        self.fbo = None
+        self._grid = None
+        self._colors = {}       # day_date -> instrucción Color de su cuadro
+        # Renders completos y cuadros repintados (para el benchmark)
+        self.renders = 0
+        self.painted = 0
+
+    def render(self, grid, levels):
+        """
+        Dibuja todos los cuadros
+        :param grid: HeatmapGrid
+        :param levels: Dict {day_date: nivel}
+        :return: Textura
+        """
+        self._grid = grid
+        self._colors = {}
+        self.fbo = Fbo(size=grid.size)
+        with self.fbo:
+            ClearColor(*BACKGROUND)
+            ClearBuffers()
+            for day in grid.days():
+                key = day.isoformat()
+                self._colors[key] = Color(*LEVEL_COLORS[levels.get(key, 0)])
+                Rectangle(pos=grid.cell_pos(day), size=(CELL, CELL))
+        self.fbo.draw()
+        self.fbo.texture.mag_filter = "nearest"
+        self.renders += 1
+        return self.fbo.texture
+
+    def paint(self, day_date, level):
+        """Sube a la textura solo el cuadro de un día (sin volver a dibujar el Fbo)"""
+        rgba = LEVEL_COLORS[level]
+        # Si el contexto GL se recrea, el Fbo se vuelve a dibujar con el color nuevo
+        self._colors[day_date].rgba = rgba
+        pixel = bytes(round(c * 255) for c in rgba)
+        self.fbo.texture.blit_buffer(pixel * (CELL * CELL), size=(CELL, CELL),
+                                     pos=self._grid.cell_pos(date.fromisoformat(day_date)),
+                                     colorfmt="rgba", bufferfmt="ubyte")
+        self.painted += 1
+
+
+class HeatmapView:
+    """Mantiene la textura del mapa de calor de un widget Image (ids.heatmap)"""
+
+    def __init__(self, image, years=1, renderer=None):
+        """
+        Inicializa el mapa de calor
+        :param image: Widget que muestra la textura
+        :param years: Años que abarca la grilla
+        :param renderer: Dibujante de la textura (por defecto FboHeatmapRenderer)
+        """
+        self.image = image
+        self.years = years
+        self.renderer = renderer or FboHeatmapRenderer()
+        self._db = None
+        self._key = None
+        self._levels = {}
+
+    def show(self, db, today=None, reload=False):
+        """
+        Arma la textura si cambió el usuario, el día o el catálogo de hábitos
+        :param db: Database del usuario
+        :param today: Fecha de hoy (por defecto date.today())
+        :param reload: Volver a consultar y dibujar aunque no haya cambiado nada
+        :return: True si se dibujó de nuevo
+        """
+        today = today or date.today()
+        total = len(db.get_habit_catalog())
+        key = (db.db_path, db.user_id, today, total)
+        if key == self._key and not reload:
+            return False
+
+        grid = HeatmapGrid(today, self.years)
+        counts = db.get_daily_counts(grid.start_day.isoformat(), today.isoformat())
+        self._levels = {day: heatmap_level(count, total) for day, count in counts.items()}
+        self.image.texture = self.renderer.render(grid, self._levels)
+        self._db = db
+        self._key = key
+        return True
+
+    def update_today(self, count, today=None):
+        """
+        Aplica el conteo de hoy (después de un toggle)
+        :return: True si cambió la textura
+        """
+        if self._key is None:
+            return False
+        today = today or date.today()
+        if today != self._key[2]:
+            # Cambió el día: la grilla se corre una posición
+            return self.show(self._db, today)
+        day_date = today.isoformat()
+        level = heatmap_level(count, self._key[3])
+        if self._levels.get(day_date, 0) == level:
+            return False
+        self._levels[day_date] = level
+        self.renderer.paint(day_date, level)
+        # La textura cambió sin cambiar el canvas del widget: pedir un frame
+        self.image.canvas.ask_update()
+        return True
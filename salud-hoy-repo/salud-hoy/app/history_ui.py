@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Historial de días para Salud Hoy
+El RecycleView (ids.history_list) solo crea los widgets de las filas visibles;
+HistoryFeed le entrega el data de a páginas (Database.get_history_page) y
+mantiene una ventana de a lo sumo max_pages páginas: al bajar se descarta la
+página de arriba y al volver a subir se pide de nuevo. Así recorrer años de
+historial no acumula filas en memoria.
+"""
+
+from datetime import date
+
+from .database import HISTORY_PAGE_SIZE
+
+
+WEEKDAYS = ("Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom")
+MONTHS = ("ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic")
+
+# Páginas que se mantienen en el data del RecycleView
+MAX_PAGES = 4
+
+# Fracción del desplazamiento a la que se pide la página siguiente (o anterior)
+SCROLL_EDGE = 0.1
+
+
+class HistoryFeed:
+    """Ventana de páginas del historial (data del RecycleView, del día más reciente al más antiguo)"""
+
+    def __init__(self, db, page_size=HISTORY_PAGE_SIZE, max_pages=MAX_PAGES):
+        """
+        Inicializa el historial
+        :param db: Database del usuario
+        :param page_size: Días por página
+        :param max_pages: Páginas que se mantienen a la vez
+        """
+        self.db = db
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.rows = []
+        self._titles = {}
+        # Hay días más antiguos / más recientes fuera de la ventana
+        self.has_older = False
+        self.has_newer = False
+
+    def reset(self, db=None):
+        """
+        Vuelve a la primera página (los días más recientes)
+        :param db: Database del usuario (None = la actual)
+        :return: Número de filas
+        """
+        if db is not None:
+            self.db = db
+        self._titles = self.db.get_habit_catalog().titles
+        page = self.db.get_history_page(limit=self.page_size)
+        self.rows = [self._row(day) for day in page]
+        self.has_older = len(page) == self.page_size
+        self.has_newer = False
+        return len(self.rows)
+
+    def load_older(self):
+        """
+        Agrega la página siguiente al final y descarta filas del principio
+        :return: Tupla (filas agregadas al final, filas quitadas del principio)
+        """
+        if not self.rows or not self.has_older:
+            return 0, 0
+        page = self.db.get_history_page(before=self.rows[-1]["day_date"], limit=self.page_size)
+        self.has_older = len(page) == self.page_size
+        self.rows.extend(self._row(day) for day in page)
+        removed = max(0, len(self.rows) - self.max_rows)
+        if removed:
+            del self.rows[:removed]
+            self.has_newer = True
+        return len(page), removed
+
+    def load_newer(self):
+        """
+        Agrega la página anterior al principio y descarta filas del final
+        :return: Tupla (filas agregadas al principio, filas quitadas del final)
+        """
+        if not self.rows or not self.has_newer:
+            return 0, 0
+        page = self.db.get_history_page(after=self.rows[0]["day_date"], limit=self.page_size)
+        self.has_newer = len(page) == self.page_size
+        self.rows[:0] = [self._row(day) for day in page]
+        removed = max(0, len(self.rows) - self.max_rows)
+        if removed:
+            del self.rows[-removed:]
+            self.has_older = True
+        return len(page), removed
+
+    def _row(self, day):
+        """Fila del RecycleView (propiedades de HistoryRow) para un HistoryDay"""
+        d = date.fromisoformat(day.day_date)
+        total = len(self._titles)
+        return {
+            "day_date": day.day_date,
+            "date_text": f"{WEEKDAYS[d.weekday()]} {d.day} {MONTHS[d.month - 1]} {d.year}",
+            "score": f"{day.done}/{total}",
+            # Títulos en el orden del catálogo
+            "summary": ", ".join(title for key, title in self._titles.items() if key in day.habit_keys)
+                       or "Sin hábitos completados",
+            "complete": bool(total) and day.done >= total,
+        }
+
+
+class HistoryList:
+    """Conecta HistoryFeed con el RecycleView: pide páginas al acercarse a un extremo"""
+
+    def __init__(self, view, feed, row_height):
+        """
+        :param view: RecycleView del historial (ids.history_list)
+        :param feed: HistoryFeed
+        :param row_height: Alto de cada fila en píxeles (default_size del layout)
+        """
+        self.view = view
+        self.feed = feed
+        self.row_height = row_height
+        self._loading = False
+        view.bind(scroll_y=self._on_scroll)
+
+    def open(self, db=None):
+        """Muestra los días más recientes (al entrar a la pestaña o cambiar de usuario)"""
+        self.feed.reset(db)
+        self.view.data = self.feed.rows
+        self.view.scroll_y = 1
+
+    def _on_scroll(self, view, scroll_y):
+        if self._loading:
+            return
+        if scroll_y <= SCROLL_EDGE and self.feed.has_older:
+            rows_before = len(self.feed.rows)
+            _, removed = self.feed.load_older()
+            self._apply(rows_before, -removed)
+        elif scroll_y >= 1 - SCROLL_EDGE and self.feed.has_newer:
+            rows_before = len(self.feed.rows)
+            added, _ = self.feed.load_newer()
+            self._apply(rows_before, added)
+
+    def _apply(self, rows_before, shift):
+        """
+        Publica la ventana nueva sin mover lo que se ve en pantalla
+        :param rows_before: Filas antes de la carga
+        :param shift: Filas agregadas (+) o quitadas (-) arriba de la vista
+        """
+        self._loading = True
+        try:
+            view, row = self.view, self.row_height
+            offset = (1 - view.scroll_y) * max(rows_before * row - view.height, 0) + shift * row
+            scrollable = len(self.feed.rows) * row - view.height
+            view.data = self.feed.rows
+            view.scroll_y = min(1, max(0, 1 - offset / scrollable)) if scrollable > 0 else 1
+        finally:
+            self._loading = False
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Importación de historial de hábitos para Salud Hoy
+Lee CSV o JSON Lines por streaming (por ejemplo, lo generado por otras apps o
+por app.exporter), valida cada fila y la escribe en lotes grandes a través de
+Database, una transacción por lote:
+- Fechas ISO (YYYY-MM-DD) y hábitos del catálogo (habito, cargado una sola vez)
+- done: 1/0, true/false, sí/no
+- Filas repetidas del mismo (usuario, día, hábito): gana la última
+- Las filas inválidas se escriben en un archivo de rechazos con el motivo
+
+Columnas: day_date (o date), habit_key, done y, con --user-ids, user_id.
+
+Uso:
+    python -m app.importer historial.csv [--format csv|jsonl] [--rejects rechazos.csv]
+                           [--user 1 | --user-ids] [--keep-existing] [--batch-size 50000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date
+
+from .database import Database, DEFAULT_USER_ID
+
+
+FORMATS = ("csv", "jsonl")
+
+# Filas por transacción
+BATCH_SIZE = 50000
+
+# Valores aceptados para done
+TRUE_VALUES = {"1", "true", "t", "yes", "y", "si", "sí", "x"}
+FALSE_VALUES = {"0", "false", "f", "no", "n"}
+
+
+class _Reject(Exception):
+    """Fila inválida (el mensaje es el motivo que va al archivo de rechazos)"""
+
+
+def _read_csv(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for line, record in enumerate(csv.DictReader(f), start=2):
+            yield line, record, None
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line, text in enumerate(f, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError:
+                record = None
+            # record = None: la línea no es un objeto JSON
+            yield line, record if isinstance(record, dict) else None, text.rstrip("\n")
+
+
+READERS = {"csv": _read_csv, "jsonl": _read_jsonl}
+
+
+class HistoryImporter:
+    """Valida filas de historial y las escribe en lotes"""
+
+    def __init__(self, db, user_ids=False, replace=True, batch_size=BATCH_SIZE):
+        """
+        Inicializa el importador
+        :param db: Instancia de Database (las filas se asignan a su user_id)
+        :param user_ids: Tomar el usuario de la columna user_id de cada fila
+        :param replace: Reemplazar el estado de las filas que ya existen
+        :param batch_size: Filas por transacción
+        """
+        self.db = db
+        self.user_ids = user_ids
+        self.replace = replace
+        self.batch_size = batch_size
+        # Catálogo en memoria: validar un hábito no consulta la base de datos
+        self.habit_keys = {h.key for h in db.get_habits(active_only=False)}
+        self._dates = {}
+
+    def parse(self, record):
+        """
+        Valida y normaliza una fila
+        :param record: Dict leído del archivo
+        :return: Tupla (user_id, day_date, habit_key, done)
+        """
+        # En JSON Lines los valores pueden ser listas u objetos: se validan los
+        # tipos antes de buscarlos en el caché de fechas y en el catálogo
+        day_date = record.get("day_date", record.get("date"))
+        if not isinstance(day_date, str) or len(day_date) != 10:
+            raise _Reject(f"Fecha inválida: {day_date}")
+        parsed = self._dates.get(day_date)
+        if parsed is None:
+            try:
+                parsed = date.fromisoformat(day_date).isoformat()
+            except ValueError:
+                raise _Reject(f"Fecha inválida: {day_date}")
+            if len(self._dates) < 100000:
+                self._dates[day_date] = parsed
+
+        habit_key = record.get("habit_key")
+        if not isinstance(habit_key, str) or habit_key not in self.habit_keys:
+            raise _Reject(f"Hábito desconocido: {habit_key}")
+
+        done = record.get("done")
+        if isinstance(done, bool):
+            pass
+        elif isinstance(done, int) and done in (0, 1):
+            done = bool(done)
+        elif not isinstance(done, str):
+            raise _Reject(f"Valor de done inválido: {done}")
+        else:
+            text = str(done).strip().lower()
+            if text in TRUE_VALUES:
+                done = True
+            elif text in FALSE_VALUES:
+                done = False
+            else:
+                raise _Reject(f"Valor de done inválido: {done}")
+
+        if self.user_ids:
+            # Entero de JSON (no bool ni float: 2.7 o true no son un usuario) o dígitos del CSV
+            user_id = record.get("user_id")
+            if isinstance(user_id, str) and user_id.strip().isascii() and user_id.strip().isdigit():
+                user_id = int(user_id)
+            elif isinstance(user_id, bool) or not isinstance(user_id, int):
+                raise _Reject(f"user_id inválido: {user_id}")
+        else:
+            user_id = self.db.user_id
+        return user_id, parsed, habit_key, done
+
+    def run(self, path, fmt=None, rejects_path=None):
+        """
+        Importa un archivo
+        :param path: Archivo CSV o JSON Lines
+        :param fmt: Formato (por defecto según la extensión)
+        :param rejects_path: Archivo CSV de rechazos (line, reason, record); None = no se guardan
+        :return: Dict con read, imported, unchanged, duplicates, rejected, seconds y rows_per_sec
+        """
+        fmt = fmt or ("jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv")
+        if fmt not in READERS:
+            raise ValueError(f"Formato desconocido: {fmt} (usa {', '.join(FORMATS)})")
+
+        stats = {"read": 0, "imported": 0, "unchanged": 0, "duplicates": 0, "rejected": 0}
+        start = time.perf_counter()
+        rejects_file = rejects = None
+        if rejects_path:
+            rejects_file = open(rejects_path, "w", encoding="utf-8", newline="")
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(("line", "reason", "record"))
+
+        # Lote actual: (usuario, día, hábito) -> done (una fila repetida reemplaza a la anterior)
+        batch = {}
+        try:
+            for line, record, raw in READERS[fmt](path):
+                stats["read"] += 1
+                try:
+                    if record is None:
+                        raise _Reject("Se esperaba un objeto JSON")
+                    user_id, day_date, habit_key, done = self.parse(record)
+                except _Reject as e:
+                    stats["rejected"] += 1
+                    if rejects is not None:
+                        if raw is None:
+                            raw = json.dumps(record, ensure_ascii=False)
+                        rejects.writerow((line, str(e), raw))
+                    continue
+
+                key = (user_id, day_date, habit_key)
+                if key in batch:
+                    stats["duplicates"] += 1
+                batch[key] = done
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, stats)
+            self._flush(batch, stats)
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["rows_per_sec"] = stats["read"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        return stats
+
+    def _flush(self, batch, stats):
+        if not batch:
+            return
+        rows = [key + (done,) for key, done in batch.items()]
+        changed = self.db.import_habit_rows(rows, replace=self.replace)
+        stats["imported"] += changed
+        stats["unchanged"] += len(rows) - changed
+        batch.clear()
+
+
+def import_history(db, path, fmt=None, rejects_path=None, user_ids=False, replace=True,
+                   batch_size=BATCH_SIZE):
+    """
+    Importa un archivo de historial (ver HistoryImporter)
+    :return: Dict con las estadísticas de HistoryImporter.run
+    """
+    importer = HistoryImporter(db, user_ids=user_ids, replace=replace, batch_size=batch_size)
+    return importer.run(path, fmt, rejects_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importar historial de hábitos a Salud Hoy")
+    parser.add_argument("input", help="Archivo CSV o JSON Lines")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--db", default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "salud_hoy.db"))
+    parser.add_argument("--rejects", help="Archivo CSV para las filas rechazadas")
+    parser.add_argument("--user", type=int, default=DEFAULT_USER_ID)
+    parser.add_argument("--user-ids", action="store_true", help="Usar la columna user_id de cada fila")
+    parser.add_argument("--keep-existing", action="store_true", help="No reemplazar filas existentes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"[ERROR] No existe el archivo: {args.input}")
+        sys.exit(1)
+
+    db = Database(args.db, user_id=args.user)
+    stats = import_history(db, args.input, args.format, args.rejects, user_ids=args.user_ids,
+                           replace=not args.keep_existing, batch_size=args.batch_size)
+    print(f"[OK] {stats['read']} filas leídas: {stats['imported']} importadas, "
+          f"{stats['unchanged']} sin cambios, {stats['duplicates']} repetidas, "
+          f"{stats['rejected']} rechazadas ({stats['rows_per_sec']:.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
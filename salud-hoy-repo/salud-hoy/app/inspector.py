@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Inspector de bases de datos para Salud Hoy
+Pensado para revisar bases de datos grandes sin cargarlas enteras:
+- Abre el archivo en modo solo lectura
+- Cantidad aproximada de filas desde sqlite_stat1 (sin COUNT(*), que recorre
+  toda la tabla); se actualiza con --analyze
+- Tamaño de cada tabla e índice desde dbstat (si SQLite lo incluye)
+- Páginas de cualquier tabla con paginación por clave (keyset): cada página
+  continúa después de la última clave vista, sin OFFSET
+- Filtros por rango de fechas (day_date) y por usuario (user_id)
+
+Uso:
+    python -m app.inspector [--db data/salud_hoy.db] summary [--analyze]
+    python -m app.inspector [--db ...] browse habitos_dia [--limit 50] [--user 1]
+                            [--start 2025-01-01] [--end 2025-01-31] [--after '[1, "2025-01-10", "camina_10"]']
+                            [--interactive]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from urllib.request import pathname2url
+
+
+# Filas por página por defecto
+PAGE_SIZE = 50
+
+
+def connect(db_path, readonly=True):
+    """
+    Abre una base de datos existente
+    :param db_path: Ruta del archivo
+    :param readonly: Abrir en modo solo lectura (no crea el archivo ni bloquea escrituras largas)
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No existe la base de datos: {db_path}")
+    mode = "ro" if readonly else "rw"
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode={mode}", uri=True)
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def list_tables(conn):
+    """Nombres de las tablas de usuario (sin las internas de SQLite)"""
+    return [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+
+
+def table_columns(conn, table):
+    """Columnas de una tabla: lista de (nombre, tipo, posición en la clave primaria)"""
+    return [(row[1], row[2], row[5]) for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+
+def approx_row_counts(conn):
+    """
+    Cantidad aproximada de filas por tabla según sqlite_stat1 (la última vez que
+    se ejecutó ANALYZE)
+    :return: Dict tabla -> filas, o None si la base de datos nunca se analizó
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    if not exists:
+        return None
+    counts = {}
+    for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+        # El primer número de stat es la cantidad de filas (de la tabla o del índice)
+        rows = int(stat.split()[0]) if stat else 0
+        counts[table] = max(rows, counts.get(table, 0))
+    return counts
+
+
+def object_sizes(conn):
+    """
+    Bytes y páginas de cada tabla e índice según dbstat
+    :return: Dict nombre -> (bytes, páginas), o None si SQLite no incluye dbstat
+    """
+    try:
+        rows = conn.execute("SELECT name, pgsize, 1 FROM dbstat WHERE aggregate = TRUE").fetchall()
+    except sqlite3.OperationalError:
+        try:
+            # SQLite anterior a 3.31: sin aggregate, se suman las páginas
+            rows = conn.execute("SELECT name, SUM(pgsize), COUNT(*) FROM dbstat GROUP BY name").fetchall()
+        except sqlite3.OperationalError:
+            return None
+    return {name: (size, pages) for name, size, pages in rows}
+
+
+def summary(conn):
+    """
+    Resumen de la base de datos
+    :return: Lista de dicts con name, type (table/index), table, rows (aprox.) y bytes
+    """
+    counts = approx_row_counts(conn) or {}
+    sizes = object_sizes(conn) or {}
+    result = []
+    for name, kind, table in conn.execute(
+        "SELECT name, type, tbl_name FROM sqlite_master "
+        "WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_stat%' ORDER BY tbl_name, type DESC, name"
+    ):
+        result.append({
+            "name": name,
+            "type": kind,
+            "table": table,
+            "rows": counts.get(name) if kind == "table" else None,
+            "bytes": sizes.get(name, (None, None))[0],
+        })
+    return result
+
+
+class TablePager:
+    """Recorre una tabla por páginas ordenadas por su clave primaria (o rowid)"""
+
+    def __init__(self, conn, table, limit=PAGE_SIZE, user_id=None, start_date=None, end_date=None):
+        """
+        Inicializa el paginador
+        :param conn: Conexión abierta (ver connect)
+        :param table: Nombre de la tabla (debe existir)
+        :param limit: Filas por página
+        :param user_id: Solo filas de este usuario (tablas con user_id)
+        :param start_date: Fecha inicial (tablas con day_date, incluida)
+        :param end_date: Fecha final (tablas con day_date, incluida)
+        """
+        if table not in list_tables(conn):
+            raise ValueError(f"Tabla desconocida: {table}")
+        self.conn = conn
+        self.table = table
+        self.limit = limit
+        columns = table_columns(conn, table)
+        self.columns = [name for name, _, _ in columns]
+
+        pk = [name for name, _, position in sorted(columns, key=lambda c: c[2]) if position > 0]
+        # Sin clave primaria se pagina por rowid (que no forma parte de las columnas mostradas)
+        self.key = pk or ["rowid"]
+        self._key_sql = ", ".join(_quote(k) if k != "rowid" else "rowid" for k in self.key)
+        self._key_index = None if not pk else [self.columns.index(k) for k in pk]
+
+        self._filters = []
+        self._params = []
+        if user_id is not None:
+            if "user_id" not in self.columns:
+                raise ValueError(f"La tabla {table} no tiene user_id")
+            self._filters.append('"user_id" = ?')
+            self._params.append(user_id)
+        if start_date or end_date:
+            if "day_date" not in self.columns:
+                raise ValueError(f"La tabla {table} no tiene day_date")
+            self._filters.append('"day_date" BETWEEN ? AND ?')
+            self._params.extend([start_date or "0000-01-01", end_date or "9999-12-31"])
+
+    def page(self, after=None):
+        """
+        Lee una página
+        :param after: Clave de la última fila de la página anterior (None = desde el principio)
+        :return: Tupla (filas, clave de la última fila o None si no hay más)
+        """
+        filters = list(self._filters)
+        params = list(self._params)
+        if after is not None:
+            after = list(after)
+            if len(after) != len(self.key):
+                raise ValueError(f"La clave de {self.table} tiene {len(self.key)} columnas: {self.key}")
+            placeholders = ", ".join("?" for _ in after)
+            filters.append(f"({self._key_sql}) > ({placeholders})")
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+        select = "*" if self._key_index is not None else "rowid, *"
+        rows = self.conn.execute(
+            f"SELECT {select} FROM {_quote(self.table)} {where} ORDER BY {self._key_sql} LIMIT ?",
+            params + [self.limit],
+        ).fetchall()
+        if not rows:
+            return [], None
+
+        if self._key_index is None:
+            last = [rows[-1][0]]
+            rows = [row[1:] for row in rows]
+        else:
+            last = [rows[-1][i] for i in self._key_index]
+        return rows, (last if len(rows) == self.limit else None)
+
+    def pages(self, after=None):
+        """Generador de páginas (filas, clave) hasta el final de la tabla"""
+        while True:
+            rows, after = self.page(after)
+            if rows:
+                yield rows, after
+            if after is None:
+                return
+
+
+# ========== SALIDA EN CONSOLA ==========
+
+def _format_bytes(size):
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+
+def print_summary(conn):
+    objects = summary(conn)
+    if approx_row_counts(conn) is None:
+        print("[!] Sin estadísticas: ejecuta 'summary --analyze' para ver las filas aproximadas")
+    if object_sizes(conn) is None:
+        print("[!] Esta versión de SQLite no incluye dbstat: no se muestran tamaños")
+    print(f"\n{'objeto':<34} {'tipo':<6} {'filas (aprox.)':>15} {'tamaño':>10}")
+    for obj in objects:
+        name = obj["name"] if obj["type"] == "table" else f"  {obj['name']}"
+        rows = "" if obj["rows"] is None else str(obj["rows"])
+        print(f"{name:<34} {obj['type']:<6} {rows:>15} {_format_bytes(obj['bytes']):>10}")
+
+
+def print_page(pager, rows, after):
+    print(f"\n{pager.table}  (clave: {', '.join(pager.key)})")
+    print("  " + " | ".join(pager.columns))
+    for row in rows:
+        print("  " + " | ".join("NULL" if v is None else str(v) for v in row))
+    if after is not None:
+        print(f"\nSiguiente página: --after '{json.dumps(after, ensure_ascii=False)}'")
+    else:
+        print("\n(fin de la tabla)")
+
+
+def browse(conn, table, limit=PAGE_SIZE, after=None, interactive=False, **filters):
+    pager = TablePager(conn, table, limit=limit, **filters)
+    while True:
+        rows, after = pager.page(after)
+        print_page(pager, rows, after)
+        if not interactive or after is None:
+            return
+        if input("Enter: siguiente página | q: salir > ").strip().lower() == "q":
+            return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspector de bases de datos de Salud Hoy")
+    parser.add_argument("--db", default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "salud_hoy.db"))
+    commands = parser.add_subparsers(dest="command")
+
+    summary_parser = commands.add_parser("summary", help="Tablas, índices, filas aproximadas y tamaños")
+    summary_parser.add_argument("--analyze", action="store_true",
+                                help="Actualizar sqlite_stat1 (abre la base de datos para escritura)")
+
+    browse_parser = commands.add_parser("browse", help="Ver una tabla por páginas")
+    browse_parser.add_argument("table")
+    browse_parser.add_argument("--limit", type=int, default=PAGE_SIZE)
+    browse_parser.add_argument("--after", help="Clave de la última fila vista (JSON)")
+    browse_parser.add_argument("--user", type=int)
+    browse_parser.add_argument("--start", help="Fecha inicial (YYYY-MM-DD)")
+    browse_parser.add_argument("--end", help="Fecha final (YYYY-MM-DD)")
+    browse_parser.add_argument("--interactive", "-i", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "summary" and args.analyze:
+            conn = connect(args.db, readonly=False)
+            conn.execute("ANALYZE")
+            conn.commit()
+            conn.close()
+        conn = connect(args.db)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    try:
+        if args.command == "browse":
+            after = json.loads(args.after) if args.after else None
+            browse(conn, args.table, args.limit, after, args.interactive,
+                   user_id=args.user, start_date=args.start, end_date=args.end)
+        else:
+            print_summary(conn)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
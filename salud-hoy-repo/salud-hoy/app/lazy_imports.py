@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de imports diferidos para Salud Hoy
+Los módulos pesados de KivyMD se importan una sola vez, en el primer uso
+(o durante el pre-calentamiento después del primer frame)
+"""
+
+import importlib
+import time
+
+
+class LazyImports:
+    """Registro nombre -> (módulo, atributo) que importa bajo demanda y cachea"""
+
+    def __init__(self, registry):
+        """
+        Inicializa el registro
+        :param registry: Diccionario {nombre: (ruta_modulo, atributo)}
+        """
+        self._registry = dict(registry)
+        self._cache = {}
+        # Milisegundos que tomó cargar cada nombre (para diagnóstico)
+        self.load_times = {}
+
+    def get(self, name):
+        """
+        Retorna el objeto registrado, importándolo en el primer acceso
+        :param name: Nombre registrado (ej: "MDChip")
+        """
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+
+        module_path, attr = self._registry[name]
+        start = time.perf_counter()
+        module = importlib.import_module(module_path)
+        obj = getattr(module, attr)
+        self.load_times[name] = (time.perf_counter() - start) * 1000.0
+        self._cache[name] = obj
+        return obj
+
+    def __getattr__(self, name):
+        # Solo se llama para atributos que no existen en la instancia
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self.get(name)
+        except KeyError:
+            raise AttributeError(f"'{name}' no está registrado en LazyImports") from None
+
+    def is_loaded(self, name):
+        """Indica si el nombre ya fue importado"""
+        return name in self._cache
+
+    def pending(self):
+        """Nombres registrados que aún no se importaron"""
+        return [name for name in self._registry if name not in self._cache]
+
+    def prewarm_next(self):
+        """
+        Importa el siguiente nombre pendiente (un import por llamada para no bloquear un frame)
+        :return: Número de nombres que siguen pendientes
+        """
+        pending = self.pending()
+        if pending:
+            self.get(pending[0])
+        return max(len(pending) - 1, 0)
+
+    def prewarm(self, names=None):
+        """Importa todos los nombres indicados (o todos los registrados)"""
+        for name in names or list(self._registry):
+            self.get(name)
+
+
+# Widgets de KivyMD que solo se usan después del primer frame
+kivymd_widgets = LazyImports({
+    "toast": ("kivymd.toast", "toast"),
+    "MDChip": ("kivymd.uix.chip", "MDChip"),
+    "MDBoxLayout": ("kivymd.uix.boxlayout", "MDBoxLayout"),
+    "MDLabel": ("kivymd.uix.label", "MDLabel"),
+    "MDIcon": ("kivymd.uix.label", "MDIcon"),
+    "MDDialog": ("kivymd.uix.dialog", "MDDialog"),
+    "MDTextField": ("kivymd.uix.textfield", "MDTextField"),
+    "MDFlatButton": ("kivymd.uix.button", "MDFlatButton"),
+    "MDRaisedButton": ("kivymd.uix.button", "MDRaisedButton"),
+    "MDSeparator": ("kivymd.uix.card", "MDSeparator"),
+    "Widget": ("kivy.uix.widget", "Widget"),
+})
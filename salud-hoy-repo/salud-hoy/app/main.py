@@ -12,9 +12,9 @@ from kivy.lang import Builder
 from kivy.clock import Clock
 from kivy.properties import DictProperty, StringProperty, BooleanProperty
 from kivymd.app import MDApp
-from kivymd.toast import toast
 from datetime import date, timedelta
 import os
+import threading
 
 from kivy.utils import platform
 # (ya no necesitamos tocar Window directamente)
@@ -24,6 +24,22 @@ from kivy.metrics import dp
 from .database import Database
 from .auth_database import AuthDatabase
 from .session_manager import SessionManager
+from .startup_trace import StartupTrace
+from .lazy_imports import kivymd_widgets as widgets
+from .badges import BadgeEngine
+from .badges_ui import BadgeGrid
+from .habits_ui import HabitList
+from .history_ui import HistoryFeed, HistoryList
+from .heatmap import HeatmapView
+from .ui_refresh import RefreshScheduler
+from .sync_client import SyncClient
+from .maintenance import IdleMaintenance
+from .backup import SnapshotScheduler
+
+
+def toast(text, *args, **kwargs):
+    """Muestra un toast (kivymd.toast se importa en el primer uso)"""
+    return widgets.toast(text, *args, **kwargs)
 
 
 def today_key():
@@ -51,12 +67,40 @@ class SaludHoyApp(MDApp):
     # Contador para rotar consejos
     current_tip_index = 0
 
-    HABITS = [
-        {"key": "camina_10", "title": "Camina 10 minutos"},
-        {"key": "estirate_2", "title": "Estírate 2 minutos"},
-        {"key": "respira_1", "title": "Respira 1 minuto"},
-        {"key": "postura_1", "title": "Postura recta 1 minuto"},
-    ]
+    # Traza de arranque (se imprime con SALUD_HOY_DEBUG_STARTUP=1)
+    startup_trace = None
+
+    # Motor de medallas (métricas en caché, recalculadas solo al invalidarse)
+    badge_engine = None
+
+    # Grilla de medallas (widgets creados una vez y actualizados en el lugar)
+    _badge_grid = None
+
+    # Filas de hábitos del día (RecycleView armado desde el catálogo de hábitos)
+    _habit_list = None
+
+    # Historial por día (RecycleView con páginas de Database.get_history_page)
+    _history_list = None
+
+    # Mapa de calor del último año (textura en caché; un toggle solo repinta hoy)
+    _heatmap = None
+
+    # Partes de la UI sucias, refrescadas una vez por frame (ver _invalidate)
+    _ui_refresh = None
+
+    # Cliente de sincronización (solo si SALUD_HOY_SYNC_URL está definida)
+    sync_client = None
+    _sync_event = None
+
+    # Segundos entre intentos de enviar la bandeja de salida
+    SYNC_INTERVAL = 30
+
+    # Mantenimiento de las bases de datos cuando la app está inactiva
+    maintenance = None
+    MAINTENANCE_CHECK_INTERVAL = 30
+
+    # Instantáneas diarias con rotación en data/backups/ (ver app.backup)
+    snapshots = None
 
     TIP_LIST = [
         "Levántate y camina 2 minutos cada hora.",
@@ -72,6 +116,7 @@ class SaludHoyApp(MDApp):
     ]
 
     def build(self):
+        self.startup_trace = StartupTrace()
         self.title = "Salud Hoy"
 
         # Tema: verde oscuro + texto negro
@@ -79,42 +124,162 @@ class SaludHoyApp(MDApp):
         self.theme_cls.primary_palette = "Green"
         self.theme_cls.primary_hue = "700"
 
-        return Builder.load_file(os.path.join(os.path.dirname(__file__), "salud_hoy.kv"))
+        with self.startup_trace.stage("build_kv"):
+            return Builder.load_file(os.path.join(os.path.dirname(__file__), "salud_hoy.kv"))
 
-    def on_start(self):
-        # Inicializar base de datos SQLite en el proyecto (data/salud_hoy.db)
+    def _database_paths(self):
+        """Rutas de las bases de datos del proyecto (data/salud_hoy.db y data/users.db)"""
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        db_path = os.path.join(project_root, "data", "salud_hoy.db")
-        self.db = Database(db_path)
-        
-        # Inicializar base de datos de autenticación
-        auth_db_path = os.path.join(project_root, "data", "users.db")
-        self.auth_db = AuthDatabase(auth_db_path)
-        
-        # Inicializar gestor de sesiones
-        self.session_manager = SessionManager()
-        
-        # Verificar si hay una sesión activa
-        saved_session = self.session_manager.load_session()
-        if saved_session:
-            # Verificar que el usuario aún existe en la BD
-            user = self.auth_db.get_user_by_email(saved_session.get("email", ""))
-            if user:
-                self.current_user = user
-                # Ir directamente a la pantalla principal
+        return (
+            os.path.join(project_root, "data", "salud_hoy.db"),
+            os.path.join(project_root, "data", "users.db"),
+        )
+
+    def _session_path(self):
+        """Ruta del archivo de sesión (solo guarda el token, junto a users.db)"""
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(project_root, "data", "session.json")
+
+    def on_start(self):
+        if self.startup_trace is None:
+            self.startup_trace = StartupTrace()
+        trace = self.startup_trace
+
+        # Etapa 1: leer el token en caché (solo un archivo JSON, sin abrir bases de datos)
+        with trace.stage("session_cache"):
+            self.session_manager = SessionManager(self._session_path())
+            token = self.session_manager.load_token()
+
+        # Etapa 2: primer frame optimista con la pantalla que indica el token en caché
+        with trace.stage("first_frame"):
+            # Hasta hidratar la UI se ignoran los toggles de los checkboxes
+            self.is_loading = True
+            if token:
+                self._set_consejo_del_dia()
                 self.root.ids.screen_manager.current = "main"
+            else:
+                self.root.ids.screen_manager.current = "login"
+
+        # Etapa 3: abrir y validar las bases de datos en segundo plano
+        self._start_opening(token)
+
+    def _start_opening(self, token):
+        """Abre las bases de datos en un hilo (al arrancar o al reintentar tras un error)"""
+        self.is_loading = True
+        threading.Thread(
+            target=self._open_databases_async,
+            args=(token,),
+            name="startup-db",
+            daemon=True,
+        ).start()
+
+    def _open_databases(self, token):
+        """
+        Abre las bases de datos y valida el token en caché (sin tocar la UI)
+        :param token: Token de la sesión guardada o None
+        :return: Tupla (db, auth_db, user) donde user es None si la sesión no es válida
+        """
+        trace = self.startup_trace or StartupTrace(enabled=False)
+        db_path, auth_db_path = self._database_paths()
+
+        # Conexiones persistentes: cada consulta se prepara una sola vez por sesión
+        with trace.stage("open_database"):
+            db = Database(db_path, persistent=True)
+        auth_db = None
+        try:
+            with trace.stage("open_auth_database"):
+                auth_db = AuthDatabase(auth_db_path, persistent=True)
+
+            user = None
+            if token:
+                with trace.stage("validate_session"):
+                    # Búsqueda por clave primaria: token vigente de un usuario que aún existe
+                    user = auth_db.validate_session(token)
+            with trace.stage("prune_sessions"):
+                auth_db.prune_expired_sessions()
+        except Exception:
+            # No dejar conexiones abiertas: el reintento abre todo de nuevo
+            db.close()
+            if auth_db is not None:
+                auth_db.close()
+            raise
+        return db, auth_db, user
+
+    def _open_databases_async(self, token):
+        """Abre las bases de datos en un hilo y agenda la hidratación en el hilo principal"""
+        try:
+            db, auth_db, user = self._open_databases(token)
+        except Exception as e:
+            print(f"[ERROR] Error al abrir las bases de datos: {e}")
+            Clock.schedule_once(lambda *_: self._opening_failed(), 0)
+            return
+        Clock.schedule_once(lambda *_: self._hydrate(db, auth_db, token, user), 0)
+
+    def _opening_failed(self):
+        """Habilita la UI tras un error al abrir las bases de datos (hilo principal)"""
+        self.is_loading = False
+        self.current_user = None
+        # Sin datos no se puede mostrar la pantalla principal; el próximo intento
+        # de login (o cualquier acción con datos) vuelve a abrir las bases de datos
+        self.root.ids.screen_manager.current = "login"
+        toast("No se pudieron abrir los datos. Intenta de nuevo")
+
+    def _hydrate(self, db, auth_db, token, user):
+        """Conecta las bases de datos abiertas y completa la UI (hilo principal)"""
+        trace = self.startup_trace or StartupTrace(enabled=False)
+        self.db = db
+        self.auth_db = auth_db
+
+        with trace.stage("hydrate_ui"):
+            if token and user:
+                self.current_user = user
+                # Los datos de hábitos se limitan al usuario de la sesión (la vista
+                # usa la conexión de db: on_stop la cierra con self.db.close())
+                self.db = db.for_user(user["id"])
+                self._start_sync(token)
                 self._load_data()
                 self._ensure_today_structure()
-                self._set_consejo_del_dia()
-                Clock.schedule_once(lambda *_: self.refresh_ui(), 0.1)
+                self.refresh_ui()
                 toast(f"¡Bienvenido de nuevo, {user['name']}!")
-            else:
-                # Sesión inválida, limpiar y mostrar login
+            elif token:
+                # Token vencido o revocado, limpiar y mostrar login
                 self.session_manager.clear_session()
+                self.current_user = None
                 self.root.ids.screen_manager.current = "login"
-        else:
-            # No hay sesión, mostrar login
-            self.root.ids.screen_manager.current = "login"
+            self.is_loading = False
+
+        trace.mark("ready")
+        trace.report()
+
+        # Optimize/vacuum e instantáneas en segundo plano tras un rato sin interacción
+        db_paths = self._database_paths()
+        self.maintenance = IdleMaintenance(db_paths)
+        self.snapshots = SnapshotScheduler(db_paths, os.path.join(os.path.dirname(db_paths[0]), "backups"))
+        Clock.schedule_interval(self._idle_tick, self.MAINTENANCE_CHECK_INTERVAL)
+
+        # Pre-calentar los widgets de KivyMD cuando la app ya está en reposo
+        Clock.schedule_once(self._prewarm_widgets, 0.5)
+
+    def _idle_tick(self, *_):
+        self.maintenance.tick()
+        # Las escrituras durante una copia la reinician: se espera a que la app esté inactiva
+        if self.maintenance.is_idle():
+            self.snapshots.tick()
+
+    def _prewarm_widgets(self, *_):
+        """Importa un módulo pesado de KivyMD por frame hasta completar el registro"""
+        if widgets.prewarm_next():
+            Clock.schedule_once(self._prewarm_widgets, 0)
+
+    def _databases_ready(self):
+        """Indica si las bases de datos ya se abrieron (el arranque es asíncrono)"""
+        if self.db is None or self.auth_db is None:
+            if not self.is_loading:
+                # La apertura anterior falló: reintentar con la sesión guardada
+                self._start_opening(self.session_manager.load_token())
+            toast("Cargando datos, intenta de nuevo en un momento")
+            return False
+        return True
 
     # ---------- DATA ----------
     def _load_data(self):
@@ -146,8 +311,7 @@ class SaludHoyApp(MDApp):
         self.current_tip_index = (self.current_tip_index + 1) % len(self.TIP_LIST)
         self.consejo_del_dia = self.TIP_LIST[self.current_tip_index]
         
-        # Forzar actualización de la UI
-        Clock.schedule_once(lambda *_: self._update_tip_ui(), 0)
+        self._invalidate("tip")
 
     def _update_tip_ui(self):
         """Actualiza la UI del consejo del día"""
@@ -157,160 +321,167 @@ class SaludHoyApp(MDApp):
         except Exception as e:
             print(f"Error actualizando UI del consejo: {e}")
 
+    # ---------- REFRESCOS ----------
+    def _invalidate(self, *parts):
+        """
+        Marca partes de la UI para refrescar en el próximo frame (cada una una sola vez)
+        :param parts: "heatmap", "counter", "badges", "tip" y/o "profile"
+        """
+        if self._ui_refresh is None:
+            # En orden: el contador repinta el día de hoy sobre el mapa de calor ya dibujado
+            self._ui_refresh = RefreshScheduler([
+                ("heatmap", self._refresh_heatmap),
+                ("counter", self._update_today_counter),
+                ("badges", self._build_badges_ui),
+                ("tip", self._update_tip_ui),
+                ("profile", self.refresh_profile_labels),
+            ])
+        self._ui_refresh.invalidate(*parts)
+
     # ---------- HÁBITOS ----------
     def refresh_ui(self):
+        """Recarga completa: las filas de hábitos ahora, el resto en el próximo frame"""
+        if self.db is None:
+            return
         self.is_loading = True
         dkey = today_key()
         habits_today = self.db.get_day_habits(dkey)
         ids = self.root.ids
 
-        mapping = [("ck_camina","camina_10"),("ck_estira","estirate_2"),
-                   ("ck_respira","respira_1"),("ck_postura","postura_1")]
-        for _id, key in mapping:
-            if _id in ids:
-                ids[_id].active = habits_today.get(key, False)
+        # Las filas salen del catálogo de hábitos (en memoria, se lee una vez)
+        if self._habit_list is None and "habits_list" in ids:
+            self._habit_list = HabitList(ids.habits_list)
+        if self._habit_list is not None:
+            self._habit_list.update(self.db.get_habit_catalog(), habits_today)
 
-        # Actualizar el consejo del día en la UI
-        self._update_tip_ui()
-        
-        self._update_today_counter()
-        self._build_badges_ui()
+        if self._heatmap is None and "heatmap" in ids:
+            self._heatmap = HeatmapView(ids.heatmap)
+
+        # Recarga completa: las métricas de medallas se recalculan desde cero
+        self._get_badge_engine().invalidate_all()
+        self._invalidate("tip", "heatmap", "counter", "badges")
         self.is_loading = False
 
+    def _refresh_heatmap(self):
+        """El mapa de calor vuelve a consultar y dibujar su textura"""
+        if self._heatmap is not None:
+            self._heatmap.show(self.db, reload=True)
+
     def on_toggle_habit(self, key, active):
-        if self.is_loading:
+        if self.is_loading or self.db is None:
+            return
+        # Al reciclar filas el RecycleView reasigna su estado: no es un toggle
+        if self._habit_list is not None and not self._habit_list.set_done(key, active):
             return
+        if self.maintenance is not None:
+            self.maintenance.touch()
         dkey = today_key()
-        self.db.set_habit_status(dkey, key, bool(active))
-        self._update_today_counter()
-        self._build_badges_ui()
+        # El motor de medallas escucha set_habit_status: invalida sus métricas y
+        # registra los desbloqueos nuevos en la misma transacción
+        self._get_badge_engine()
+        if self.sync_client is not None:
+            # Se guarda y se encola localmente; el envío no bloquea la UI
+            self.sync_client.record_toggle(dkey, key, bool(active))
+            self.sync_client.flush_async()
+        else:
+            self.db.set_habit_status(dkey, key, bool(active))
+        # Varios toggles en el mismo frame cuestan un solo refresco
+        self._invalidate("counter", "badges")
+
+    # ---------- SINCRONIZACIÓN ----------
+    def _start_sync(self, token):
+        """Crea el cliente de sincronización del usuario y reintenta los envíos pendientes"""
+        self._stop_sync()
+        url = os.environ.get("SALUD_HOY_SYNC_URL")
+        if not url:
+            return
+        self.sync_client = SyncClient(self.db, url, token)
+        self.sync_client.flush_async()
+        self._sync_event = Clock.schedule_interval(self._sync_tick, self.SYNC_INTERVAL)
+
+    def _sync_tick(self, *_):
+        if self.sync_client is not None:
+            self.sync_client.flush_async()
+
+    def _stop_sync(self):
+        # Los cambios pendientes quedan en la bandeja y se envían en la próxima sesión
+        if self._sync_event is not None:
+            self._sync_event.cancel()
+            self._sync_event = None
+        self.sync_client = None
 
     def _update_today_counter(self):
-        dkey = today_key()
-        done = self.db.get_completed_count_for_day(dkey)
-        total = len(self.HABITS)
+        total = len(self.db.get_habit_catalog())
+        if self._habit_list is not None:
+            # Estado de las filas: un toggle no vuelve a consultar la base de datos
+            done = self._habit_list.done_count()
+        else:
+            done = self.db.get_completed_count_for_day(today_key())
         if "lbl_today_progress" in self.root.ids:
             self.root.ids.lbl_today_progress.text = f"Completados hoy: {done}/{total}"
+        if self._heatmap is not None:
+            self._heatmap.update_today(done)
 
     # === Métricas para medallas ===
-    def _day_score(self, day_date):
-        """Calcula el score de un día específico basado en hábitos completados"""
-        return self.db.get_completed_count_for_day(day_date)
-
-    def _current_streak(self, threshold=1):
-        """Calcula la racha actual desde la base de datos"""
-        return self.db.get_streak(threshold)
-
-    def _weekly_score(self):
-        """Calcula el score de la última semana"""
-        total = 0
-        for day_str in last_n_days(7):
-            total += self.db.get_completed_count_for_day(day_str)
-        return total
-
-    def _active_days_this_month(self):
-        """Calcula los días activos del mes actual"""
-        today = date.today()
-        return self.db.get_monthly_active_days(today.year, today.month)
+    def _get_badge_engine(self):
+        """Motor de medallas de la base de datos actual (las métricas quedan en caché)"""
+        if self.badge_engine is None or self.badge_engine.db is not self.db:
+            if self.badge_engine is not None:
+                self.badge_engine.detach()
+            self.badge_engine = BadgeEngine(self.db, track_unlocks=True)
+            self.badge_engine.bind_unlock(self._celebrate_unlocks)
+        return self.badge_engine
+
+    def _celebrate_unlocks(self, badges):
+        """Celebra las medallas recién desbloqueadas (evento del motor de medallas)"""
+        titles = ", ".join(b["title"].replace("\n", " ") for b in badges)
+        toast(f"¡Nueva medalla! {titles}")
 
     def _compute_badges(self):
-        streak = self._current_streak(threshold=1)
-        weekly = self._weekly_score()
-        active_month = self._active_days_this_month()
-
-        today_score = self._day_score(today_key())
-        today_full = today_score == len(self.HABITS)
-        
-        # Verificar si alguna vez ha estado activo
-        all_days = self.db.get_all_days_with_habits()
-        ever_active = len(all_days) > 0
-
-        BADGES = [
-            {"key": "first_active", "icon": "check-decagram", "title": "Primer día\nactivo",
-             "unlocked": ever_active},
-            {"key": "streak_3", "icon": "run", "title": "3 días\nseguidos",
-             "unlocked": streak >= 3},
-            {"key": "streak_7", "icon": "fire", "title": "7 días\nseguidos",
-             "unlocked": streak >= 7},
-            {"key": "week_14", "icon": "target", "title": "Semana\n14+",
-             "unlocked": weekly >= 14},
-            {"key": "week_perfect", "icon": "crown", "title": "Semana\nperfecta",
-             "unlocked": weekly == 28},
-            {"key": "today_full", "icon": "medal", "title": "Hoy\n4/4",
-             "unlocked": today_full},
-            {"key": "month_15", "icon": "calendar-check", "title": "15+ días\ndel mes",
-             "unlocked": active_month >= 15},
-        ]
-
-        return BADGES, streak, weekly, active_month
+        engine = self._get_badge_engine()
+        badges = engine.evaluate()
+        return (
+            badges,
+            engine.metric("streak"),
+            engine.metric("weekly_score"),
+            engine.metric("monthly_active_days"),
+            # Máximo semanal: todos los hábitos activos los 7 días
+            7 * engine.metric("habit_count"),
+        )
 
     def _build_badges_ui(self):
         ids = self.root.ids
         if "badges_grid" not in ids:
             return
 
-        from kivymd.uix.chip import MDChip
-        badges, streak, weekly, active_month = self._compute_badges()
-
-        if "badge_chips" in ids:
-            chips_box = ids.badge_chips
-            chips_box.clear_widgets()
-            for text in (f"Racha: {streak} día(s)", f"Semana: {weekly}/28", f"Activos mes: {active_month}"):
-                chip = MDChip(text=text)
-                chip.md_bg_color = (0, 0.6, 0.3, 0.12)
-                chip.text_color = (0, 0.45, 0.25, 1)
-                chips_box.add_widget(chip)
-
-        from kivymd.uix.boxlayout import MDBoxLayout
-        from kivymd.uix.label import MDLabel
-        from kivymd.uix.label import MDIcon
-
-        grid = ids.badges_grid
-        grid.clear_widgets()
-
-        GREEN = (0, 0.6, 0.3, 1)
-        GREY = (0.68, 0.68, 0.68, 1)
-
-        for b in badges:
-            tile = MDBoxLayout(
-                orientation="vertical",
-                spacing="4dp",
-                padding=[0, dp(4), 0, dp(4)],
-                size_hint=(1, None),
-                height=dp(90),
-            )
-            icon = MDIcon(
-                icon=b["icon"],
-                theme_text_color="Custom",
-                text_color=GREEN if b["unlocked"] else GREY,
-                font_size="28sp",
-                halign="center",
-            )
-            title = MDLabel(
-                text=b["title"],
-                halign="center",
-                theme_text_color="Custom",
-                text_color=(0, 0, 0, 1),
-                size_hint_y=None,
-                text_size=(0, None),
-            )
-            title.bind(
-                width=lambda inst, w: setattr(inst, "text_size", (w, None)),
-                texture_size=lambda inst, ts: setattr(inst, "height", ts[1]),
-            )
-            tile.add_widget(icon)
-            tile.add_widget(title)
-            grid.add_widget(tile)
+        badges, streak, weekly, active_month, weekly_max = self._compute_badges()
+        chip_texts = (f"Racha: {streak} día(s)", f"Semana: {weekly}/{weekly_max}", f"Activos mes: {active_month}")
+
+        # Los widgets se crean una vez; luego solo se actualizan los que cambiaron
+        if self._badge_grid is None:
+            chips_box = ids.badge_chips if "badge_chips" in ids else None
+            self._badge_grid = BadgeGrid(ids.badges_grid, chips_box)
+        self._badge_grid.update(badges, chip_texts)
+
+    # ---------- HISTORIAL ----------
+    def open_history(self):
+        """Carga la primera página del historial al entrar a la pestaña"""
+        if self.db is None or "history_list" not in self.root.ids:
+            return
+        if self._history_list is None:
+            self._history_list = HistoryList(self.root.ids.history_list, HistoryFeed(self.db), dp(64))
+        # Siempre desde los días más recientes, del usuario actual
+        self._history_list.open(self.db)
 
     # ---------- PERFIL ----------
     def open_edit_profile(self):
-        from kivymd.uix.dialog import MDDialog
-        from kivymd.uix.boxlayout import MDBoxLayout
-        from kivymd.uix.textfield import MDTextField
-        from kivymd.uix.button import MDFlatButton, MDRaisedButton
-        from kivymd.uix.label import MDLabel, MDIcon
-        from kivymd.uix.card import MDSeparator
-        from kivy.uix.widget import Widget
+        MDDialog = widgets.MDDialog
+        MDBoxLayout = widgets.MDBoxLayout
+        MDTextField = widgets.MDTextField
+        MDFlatButton, MDRaisedButton = widgets.MDFlatButton, widgets.MDRaisedButton
+        MDLabel, MDIcon = widgets.MDLabel, widgets.MDIcon
+        MDSeparator = widgets.MDSeparator
+        Widget = widgets.Widget
 
         # Contenedor principal con diseño mejorado
         content = MDBoxLayout(
@@ -407,7 +578,7 @@ class SaludHoyApp(MDApp):
                 self.user_data["profile"]["name"] = name
                 self.user_data["profile"]["goal"] = goal
                 
-                self.refresh_profile_labels()
+                self._invalidate("profile")
                 dialog.dismiss()
                 toast("✓ Perfil actualizado")
             except Exception as e:
@@ -456,16 +627,46 @@ class SaludHoyApp(MDApp):
 
     def reset_data(self):
         """Resetea todos los datos de la aplicación"""
+        if not self._databases_ready():
+            return
         self.db.reset_all_data()
+        if self.maintenance is not None:
+            # Devolver al sistema las páginas que quedaron libres
+            self.maintenance.request()
         self._load_data()
         self._ensure_today_structure()
         self.refresh_ui()
         toast("Datos restaurados")
 
+    def restore_snapshot(self, snapshot_path):
+        """
+        Restaura una instantánea de data/backups/ (ver app.backup) y recarga la UI
+        :param snapshot_path: Archivo de la instantánea
+        :return: True si se restauró
+        """
+        if not self._databases_ready():
+            return False
+        try:
+            # Los hooks de restore descartan las métricas del motor de medallas
+            self.db.restore(snapshot_path)
+        except Exception as e:
+            print(f"[ERROR] Error al restaurar la copia: {e}")
+            toast("No se pudo restaurar la copia")
+            return False
+        # Catálogo, filas, mapa de calor y medallas se vuelven a leer de la copia
+        self._load_data()
+        self._ensure_today_structure()
+        self.refresh_ui()
+        self._invalidate("profile")
+        toast("Copia restaurada")
+        return True
+
     def switch_tab(self, name):
         self.root.ids.bottom_nav.switch_tab(name)
         if name == "profile":
-            Clock.schedule_once(lambda *_: self.refresh_profile_labels(), 0.05)
+            self._invalidate("profile")
+        elif name == "history":
+            self.open_history()
 
     # ---------- AUTENTICACIÓN ----------
     def do_login(self):
@@ -478,13 +679,19 @@ class SaludHoyApp(MDApp):
             toast("Por favor, completa todos los campos")
             return
         
+        if not self._databases_ready():
+            return
+        
         # Verificar credenciales
         user = self.auth_db.check_user(email, password)
         
         if user:
             # Login exitoso
             self.current_user = user
-            self.session_manager.save_session(user)
+            self.db = self.db.for_user(user["id"])
+            token = self.auth_db.create_session(user["id"])
+            self.session_manager.save_token(token)
+            self._start_sync(token)
             
             # Limpiar campos
             self.root.ids.login_email.text = ""
@@ -495,7 +702,7 @@ class SaludHoyApp(MDApp):
             self._ensure_today_structure()
             self._set_consejo_del_dia()
             self.root.ids.screen_manager.current = "main"
-            Clock.schedule_once(lambda *_: self.refresh_ui(), 0.1)
+            self.refresh_ui()
             toast(f"✓ Bienvenido, {user['name']}!")
         else:
             # Credenciales incorrectas
@@ -522,6 +729,9 @@ class SaludHoyApp(MDApp):
             toast("La contraseña debe tener al menos 6 caracteres")
             return
         
+        if not self._databases_ready():
+            return
+        
         # Intentar registrar
         success = self.auth_db.add_user(name, email, password)
         
@@ -541,6 +751,9 @@ class SaludHoyApp(MDApp):
     
     def logout(self):
         """Cierra la sesión actual"""
+        if self.auth_db is not None:
+            self.auth_db.revoke_session(self.session_manager.load_token())
+        self._stop_sync()
         self.session_manager.clear_session()
         self.current_user = None
         
@@ -562,8 +775,15 @@ class SaludHoyApp(MDApp):
 
     def on_stop(self):
         """Cierra la conexión a la base de datos al cerrar la app"""
+        if self.maintenance is not None:
+            self.maintenance.join(self.maintenance.budget * 2)
         if self.db:
             self.db.close()
+        if self.auth_db:
+            self.auth_db.close()
+        # Con SALUD_HOY_DEBUG_STARTUP=1 también se imprimen los refrescos evitados
+        if self._ui_refresh is not None and self.startup_trace is not None and self.startup_trace.enabled:
+            print(self._ui_refresh.format_report())
         return True
 
 
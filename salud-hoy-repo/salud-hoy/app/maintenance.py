@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Mantenimiento de las bases de datos de Salud Hoy
+Cada tarea corre con un presupuesto de tiempo: un progress handler de SQLite
+interrumpe la consulta si se pasa, así se puede ejecutar desde la app cuando
+está inactiva sin trabar la interfaz. Tareas:
+- quick_check: verificación rápida de integridad
+- optimize:    PRAGMA optimize (actualiza las estadísticas del planificador si hace falta)
+- vacuum:      PRAGMA incremental_vacuum (devuelve al sistema las páginas libres que
+               dejan los DELETE, ej: reset_all_data); requiere auto_vacuum=INCREMENTAL,
+               que las bases de datos nuevas ya tienen. Las anteriores se convierten
+               con --convert (VACUUM completo, sin presupuesto: solo desde la consola)
+
+Uso:
+    python -m app.maintenance [--db data/salud_hoy.db ...] [--budget 2.0] [--convert]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+
+# Presupuesto por defecto de una pasada completa (segundos)
+DEFAULT_BUDGET = 2.0
+
+# Páginas liberadas por cada PRAGMA incremental_vacuum
+VACUUM_STEP_PAGES = 256
+
+# Instrucciones de la VM entre cada revisión del presupuesto
+PROGRESS_STEPS = 1000
+
+# Valores de PRAGMA auto_vacuum
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+class _Budget:
+    """Corta las consultas de una conexión cuando se acaba el tiempo"""
+
+    def __init__(self, conn, seconds, clock=time.perf_counter):
+        self.conn = conn
+        self.deadline = clock() + seconds
+        self.clock = clock
+        conn.set_progress_handler(self._check, PROGRESS_STEPS)
+
+    def _check(self):
+        # Un valor distinto de 0 interrumpe la consulta (sqlite3.OperationalError: interrupted)
+        return 1 if self.clock() >= self.deadline else 0
+
+    def remaining(self):
+        return max(0.0, self.deadline - self.clock())
+
+    def close(self):
+        self.conn.set_progress_handler(None, 0)
+
+
+def _interrupted(error):
+    return "interrupt" in str(error).lower()
+
+
+def _step(report, name, fn):
+    """Ejecuta una tarea y guarda su resultado y tiempo en el reporte"""
+    start = time.perf_counter()
+    entry = {"ok": True, "interrupted": False}
+    try:
+        entry.update(fn() or {})
+    except sqlite3.OperationalError as e:
+        entry["ok"] = False
+        if _interrupted(e):
+            entry["interrupted"] = True
+        else:
+            entry["error"] = str(e)
+            print(f"[ERROR] Error en el mantenimiento ({name}): {e}")
+    entry["elapsed"] = time.perf_counter() - start
+    report["steps"][name] = entry
+    return entry
+
+
+def quick_check(conn, max_errors=10):
+    """
+    Verificación rápida de integridad (PRAGMA quick_check)
+    :return: Dict con integrity ("ok" o lista de errores)
+    """
+    rows = [row[0] for row in conn.execute(f"PRAGMA quick_check({int(max_errors)})")]
+    return {"integrity": "ok" if rows == ["ok"] else rows}
+
+
+def optimize(conn):
+    """PRAGMA optimize con un límite de filas por índice analizado"""
+    conn.execute("PRAGMA analysis_limit = 400")
+    conn.execute("PRAGMA optimize")
+    return {}
+
+
+def incremental_vacuum(conn, budget, step_pages=VACUUM_STEP_PAGES):
+    """
+    Libera páginas de a step_pages hasta vaciar la lista libre o agotar el presupuesto
+    :return: Dict con freed_pages y freelist (páginas libres que quedan)
+    """
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if mode != 2:
+        return {"freed_pages": 0, "freelist": before, "auto_vacuum": AUTO_VACUUM_MODES.get(mode, mode)}
+
+    freelist = before
+    interrupted = False
+    while freelist > 0 and budget.remaining() > 0:
+        try:
+            # incremental_vacuum devuelve una fila por página: hay que recorrer el cursor
+            conn.execute(f"PRAGMA incremental_vacuum({int(step_pages)})").fetchall()
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            if not _interrupted(e):
+                raise
+            # Se conserva lo liberado en los pasos anteriores
+            conn.rollback()
+            interrupted = True
+            break
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"freed_pages": before - freelist, "freelist": freelist, "auto_vacuum": "incremental",
+            "interrupted": interrupted or freelist > 0}
+
+
+def convert_to_incremental(conn):
+    """
+    Activa auto_vacuum=INCREMENTAL en una base de datos existente (VACUUM completo:
+    reescribe todo el archivo, no tiene presupuesto)
+    """
+    before = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    after = conn.execute("PRAGMA page_count").fetchone()[0]
+    return {"freed_pages": before - after}
+
+
+def run_maintenance(db_path, budget=DEFAULT_BUDGET, check=True, convert=False):
+    """
+    Ejecuta el mantenimiento de una base de datos dentro de un presupuesto de tiempo
+    :param db_path: Ruta de la base de datos (debe existir)
+    :param budget: Segundos para todas las tareas (la que se pasa se interrumpe)
+    :param check: Ejecutar quick_check
+    :param convert: Convertir a auto_vacuum=INCREMENTAL si hace falta (VACUUM completo)
+    :return: Dict con db, steps (ok, interrupted, elapsed y datos de cada tarea),
+             freed_pages, freed_bytes y elapsed
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No existe la base de datos: {db_path}")
+
+    start = time.perf_counter()
+    report = {"db": db_path, "steps": {}}
+    conn = sqlite3.connect(db_path, timeout=1.0)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        if convert and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            _step(report, "convert", lambda: convert_to_incremental(conn))
+
+        limit = _Budget(conn, budget)
+        try:
+            if check:
+                _step(report, "quick_check", lambda: quick_check(conn))
+            _step(report, "optimize", lambda: optimize(conn))
+            _step(report, "vacuum", lambda: incremental_vacuum(conn, limit))
+        finally:
+            limit.close()
+    finally:
+        conn.close()
+
+    freed = sum(step.get("freed_pages", 0) for step in report["steps"].values())
+    report["freed_pages"] = freed
+    report["freed_bytes"] = freed * page_size
+    report["elapsed"] = time.perf_counter() - start
+    return report
+
+
+class IdleMaintenance:
+    """
+    Ejecuta el mantenimiento en un hilo cuando la app lleva un rato sin uso
+    La app llama a touch() en cada interacción y a tick() periódicamente
+    (ej: con Clock.schedule_interval); como máximo una pasada cada `interval`.
+    """
+
+    def __init__(self, db_paths, idle_seconds=120, interval=24 * 3600, budget=0.5,
+                 clock=time.monotonic):
+        """
+        :param db_paths: Rutas de las bases de datos
+        :param idle_seconds: Segundos sin interacción antes de ejecutar
+        :param interval: Segundos mínimos entre dos pasadas
+        :param budget: Presupuesto de cada base de datos (segundos)
+        :param clock: Reloj monotónico (inyectable para pruebas)
+        """
+        self.db_paths = list(db_paths)
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self.budget = budget
+        self._clock = clock
+        self._last_activity = clock()
+        self._last_run = None
+        self._thread = None
+        self.reports = []
+
+    def touch(self):
+        """Registra una interacción del usuario"""
+        self._last_activity = self._clock()
+
+    def request(self):
+        """Pide una pasada en cuanto la app quede inactiva (ej: después de borrar datos)"""
+        self._last_run = None
+
+    def is_idle(self):
+        """True si pasaron idle_seconds desde la última interacción"""
+        return self._clock() - self._last_activity >= self.idle_seconds
+
+    def is_due(self):
+        now = self._clock()
+        if not self.is_idle():
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        return self._last_run is None or now - self._last_run >= self.interval
+
+    def tick(self, *_):
+        """
+        Inicia una pasada en segundo plano si corresponde
+        :return: True si se inició
+        """
+        if not self.is_due():
+            return False
+        self._last_run = self._clock()
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        for path in self.db_paths:
+            try:
+                self.reports.append(run_maintenance(path, budget=self.budget))
+            except (OSError, sqlite3.Error) as e:
+                print(f"[ERROR] No se pudo hacer el mantenimiento de {path}: {e}")
+
+    def join(self, timeout=None):
+        """Espera a que termine la pasada en curso (pruebas y cierre de la app)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def print_report(report):
+    print(f"\n{report['db']}")
+    for name, step in report["steps"].items():
+        status = "ERROR" if not step["ok"] and not step["interrupted"] else (
+            "INTERRUMPIDO" if step["interrupted"] else "OK")
+        extra = []
+        if "integrity" in step:
+            extra.append(f"integridad: {step['integrity']}")
+        if "freed_pages" in step:
+            extra.append(f"páginas liberadas: {step['freed_pages']}")
+        if "freelist" in step:
+            extra.append(f"páginas libres: {step['freelist']}")
+        if step.get("auto_vacuum") not in (None, "incremental"):
+            extra.append(f"auto_vacuum={step['auto_vacuum']} (usar --convert)")
+        print(f"  {name:<12} {status:<13} {step['elapsed'] * 1000:8.1f} ms  {'  '.join(extra)}")
+    print(f"  total: {report['freed_pages']} páginas ({report['freed_bytes']} bytes) "
+          f"liberadas en {report['elapsed'] * 1000:.1f} ms")
+
+
+def main(argv=None):
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+    parser = argparse.ArgumentParser(description="Mantenimiento de las bases de datos de Salud Hoy")
+    parser.add_argument("--db", action="append",
+                        help="Base de datos (se puede repetir; por defecto salud_hoy.db y users.db)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="Segundos por base de datos")
+    parser.add_argument("--no-check", action="store_true", help="No ejecutar quick_check")
+    parser.add_argument("--convert", action="store_true",
+                        help="Activar auto_vacuum=INCREMENTAL (VACUUM completo)")
+    args = parser.parse_args(argv)
+
+    paths = args.db or [os.path.join(data_dir, "salud_hoy.db"), os.path.join(data_dir, "users.db")]
+    status = 0
+    for path in paths:
+        try:
+            report = run_maintenance(path, args.budget, check=not args.no_check, convert=args.convert)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[ERROR] {e}")
+            status = 1
+            continue
+        print_report(report)
+        steps = report["steps"].values()
+        if any(not step["ok"] and not step["interrupted"] for step in steps):
+            status = 1
+        if any(step.get("integrity", "ok") != "ok" for step in steps):
+            print("[ERROR] La verificación de integridad encontró problemas")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
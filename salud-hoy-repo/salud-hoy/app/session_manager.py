@@ -6,6 +6,11 @@ Maneja la persistencia de sesión entre ejecuciones
 
 import json
 import os
+import tempfile
+
+
+# Marca de "todavía no se leyó el archivo" (None significa "no hay sesión")
+_NOT_LOADED = object()
 
 
 class SessionManager:
@@ -14,58 +19,124 @@ class SessionManager:
     def __init__(self, session_file="session.json"):
         """
         Inicializa el gestor de sesiones
-        :param session_file: Nombre del archivo de sesión
+        :param session_file: Nombre del archivo de sesión (o ruta absoluta)
         """
         # Ruta al archivo de sesión en el directorio de la app
         app_dir = os.path.dirname(os.path.abspath(__file__))
         self.session_path = os.path.join(app_dir, session_file)
+        # La sesión se lee del disco una sola vez; después se sirve desde memoria
+        self._cache = _NOT_LOADED
     
     def save_session(self, user_data):
         """
-        Guarda la sesión del usuario en un archivo JSON
+        Guarda la sesión del usuario en un archivo JSON compacto
+        Se escribe en un archivo temporal y se reemplaza con os.replace, así
+        un corte a mitad de la escritura nunca deja el archivo de sesión a medias
         :param user_data: Diccionario con datos del usuario (email, name, id)
         """
+        directory = os.path.dirname(self.session_path)
+        tmp_path = None
         try:
-            with open(self.session_path, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, ensure_ascii=False, indent=2)
+            fd, tmp_path = tempfile.mkstemp(prefix=".session-", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(user_data, f, ensure_ascii=False, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.session_path)
+            tmp_path = None
+            self._fsync_dir(directory)
+            self._cache = dict(user_data)
             return True
         except Exception as e:
             print(f"[ERROR] Error al guardar sesión: {e}")
             return False
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def load_session(self):
         """
-        Carga la sesión guardada del archivo JSON
+        Carga la sesión guardada (del disco solo la primera vez)
         :return: Diccionario con datos del usuario o None si no hay sesión
         """
-        if not os.path.exists(self.session_path):
-            return None
-        
+        if self._cache is _NOT_LOADED:
+            self._cache = self._read_session()
+        return dict(self._cache) if self._cache is not None else None
+    
+    def reload(self):
+        """
+        Descarta la sesión en memoria y la vuelve a leer del disco
+        :return: Diccionario con datos del usuario o None si no hay sesión
+        """
+        self._cache = _NOT_LOADED
+        return self.load_session()
+    
+    def _read_session(self):
         try:
             with open(self.session_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
         except Exception as e:
             print(f"[ERROR] Error al cargar sesión: {e}")
             return None
+        if not isinstance(data, dict):
+            print("[ERROR] Error al cargar sesión: formato inválido")
+            return None
+        return data
+    
+    def _fsync_dir(self, directory):
+        # Persistir también la entrada del directorio (no disponible en Windows)
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
     
     def clear_session(self):
         """
         Elimina la sesión guardada (cierre de sesión)
         """
-        if os.path.exists(self.session_path):
-            try:
-                os.remove(self.session_path)
-                return True
-            except Exception as e:
-                print(f"[ERROR] Error al eliminar sesión: {e}")
-                return False
+        try:
+            os.remove(self.session_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Error al eliminar sesión: {e}")
+            return False
+        self._cache = None
         return True
     
+    def save_token(self, token):
+        """
+        Guarda solo el token opaco de la sesión (los datos del usuario viven en users.db)
+        :param token: Token retornado por AuthDatabase.create_session
+        """
+        return self.save_session({"token": token})
+    
+    def load_token(self):
+        """
+        Carga el token de la sesión guardada
+        :return: Token o None si no hay sesión (o si el archivo es del formato anterior)
+        """
+        session = self.load_session()
+        if not session:
+            return None
+        token = session.get("token")
+        return token if isinstance(token, str) and token else None
+    
     def has_active_session(self):
         """
         Verifica si hay una sesión activa
         :return: True si hay sesión activa, False si no
         """
-        return os.path.exists(self.session_path) and self.load_session() is not None
-
-
+        if self._cache is _NOT_LOADED:
+            self._cache = self._read_session()
+        return self._cache is not None
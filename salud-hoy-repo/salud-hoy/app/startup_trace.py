@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Traza de arranque para Salud Hoy
+Mide cuántos milisegundos toma cada etapa del inicio de la app
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Variable de entorno que activa la impresión de la traza
+DEBUG_ENV_VAR = "SALUD_HOY_DEBUG_STARTUP"
+
+
+def startup_debug_enabled():
+    """Indica si la traza de arranque debe imprimirse"""
+    return os.environ.get(DEBUG_ENV_VAR, "").strip().lower() not in ("", "0", "false", "no")
+
+
+class StartupTrace:
+    """Línea de tiempo del arranque (etapas con inicio y duración en ms)"""
+
+    def __init__(self, enabled=None, clock=time.perf_counter):
+        """
+        Inicializa la traza
+        :param enabled: Si es None se lee la variable SALUD_HOY_DEBUG_STARTUP
+        :param clock: Función de reloj (inyectable para pruebas)
+        """
+        self.enabled = startup_debug_enabled() if enabled is None else enabled
+        self._clock = clock
+        self._origin = clock()
+        self._lock = threading.Lock()
+        # Lista de (etapa, inicio_ms, duracion_ms, hilo)
+        self.stages = []
+
+    def _elapsed_ms(self, instant):
+        return (instant - self._origin) * 1000.0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mide una etapa del arranque
+        :param name: Nombre de la etapa
+        """
+        start = self._clock()
+        try:
+            yield
+        finally:
+            end = self._clock()
+            self._record(name, self._elapsed_ms(start), (end - start) * 1000.0)
+
+    def mark(self, name):
+        """Registra un instante (etapa de duración cero)"""
+        self._record(name, self._elapsed_ms(self._clock()), 0.0)
+
+    def _record(self, name, start_ms, duration_ms):
+        with self._lock:
+            self.stages.append((name, start_ms, duration_ms, threading.current_thread().name))
+
+    def total_ms(self):
+        """Tiempo desde el origen hasta el final de la última etapa"""
+        with self._lock:
+            if not self.stages:
+                return 0.0
+            return max(start + duration for _, start, duration, _ in self.stages)
+
+    def format_report(self):
+        """Retorna la línea de tiempo como texto"""
+        with self._lock:
+            stages = sorted(self.stages, key=lambda s: s[1])
+        lines = ["[STARTUP] Línea de tiempo de arranque"]
+        for name, start_ms, duration_ms, thread_name in stages:
+            lines.append(
+                f"[STARTUP]   +{start_ms:8.1f} ms  {name:<22} {duration_ms:8.1f} ms  ({thread_name})"
+            )
+        lines.append(f"[STARTUP] Total: {self.total_ms():.1f} ms")
+        return "\n".join(lines)
+
+    def report(self):
+        """Imprime la línea de tiempo si el modo debug está activo"""
+        if self.enabled:
+            print(self.format_report())
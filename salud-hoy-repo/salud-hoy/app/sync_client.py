@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente de sincronización para Salud Hoy
+Los toggles se guardan primero en la base de datos local junto con su registro
+en la bandeja de salida (sync_outbox), así se ven al instante y no se pierden
+si el servidor no responde. La bandeja se envía por lotes a POST /changes
+cuando hay conexión; si falla, se reintenta con espera exponencial.
+
+Un lote que el servidor aplicó pero cuya respuesta se perdió se reenvía: el
+servidor lo ignora porque ya tiene ese updated_at (last-writer-wins). Un lote
+rechazado (400) se parte en mitades para descartar solo los cambios inválidos.
+"""
+
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Cambios por petición
+DEFAULT_BATCH_SIZE = 100
+
+# Espera entre reintentos (segundos): se duplica con cada fallo hasta el máximo
+RETRY_MIN = 1.0
+RETRY_MAX = 60.0
+
+
+class SyncClient:
+    """Envía al servidor los cambios de la bandeja de salida de un usuario"""
+
+    def __init__(self, db, base_url, token, batch_size=DEFAULT_BATCH_SIZE, timeout=5.0,
+                 clock=time.monotonic):
+        """
+        Inicializa el cliente
+        :param db: Instancia de Database del usuario (ver Database.for_user)
+        :param base_url: URL del servidor de sincronización (ej: http://127.0.0.1:8765)
+        :param token: Token de sesión del servidor
+        :param batch_size: Máximo de cambios por petición
+        :param timeout: Segundos de espera de cada petición
+        :param clock: Reloj monotónico para la espera entre reintentos (inyectable para pruebas)
+        """
+        url = urlsplit(base_url)
+        self.db = db
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 80
+        self.token = token
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._clock = clock
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._retry_at = 0.0
+        self._failures_in_row = 0
+        # Contadores (diagnóstico y pruebas)
+        self.queued = 0
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+
+    # ---------- ESCRITURA ----------
+
+    def record_toggle(self, day_date, habit_key, done):
+        """
+        Guarda un toggle y lo encola en la misma transacción (no usa la red)
+        :param day_date: Fecha en formato ISO
+        :param habit_key: Clave del hábito
+        :param done: True si está completado
+        """
+        with self.db.transaction():
+            self.db.set_habit_status(day_date, habit_key, done)
+            self.db.queue_habit_change(day_date, habit_key)
+        self.queued += 1
+
+    # ---------- ENVÍO ----------
+
+    def is_due(self):
+        """Indica si ya pasó la espera desde el último fallo"""
+        return self._clock() >= self._retry_at
+
+    def flush(self):
+        """
+        Envía la bandeja por lotes hasta vaciarla o hasta el primer fallo
+        :return: True si la bandeja quedó vacía
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            # Ya hay un envío en curso (ej: en el hilo de flush_async)
+            return False
+        try:
+            while True:
+                batch = self.db.get_outbox(self.batch_size)
+                if not batch:
+                    return True
+                if not self._send(batch):
+                    return False
+        finally:
+            self._flush_lock.release()
+
+    def _send(self, batch):
+        """
+        Envía un lote y lo quita de la bandeja si el servidor lo confirma
+        El servidor rechaza (400) el lote entero si un solo cambio es inválido (ej:
+        hábito desconocido): el lote se parte en mitades que se reenvían, hasta
+        quedarse solo con los cambios rechazados, que se descartan.
+        :param batch: Lista de dicts como los de get_outbox
+        :return: False si falló la conexión o el servidor (se reintenta más tarde)
+        """
+        try:
+            status, payload = self._post_changes(batch)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self._failed(f"Sin conexión con el servidor: {e}")
+            return False
+
+        if status == 200:
+            self.db.remove_from_outbox(batch)
+            self.sent += len(batch)
+            self.batches += 1
+            self._failures_in_row = 0
+            self._retry_at = 0.0
+            return True
+        if status == 400:
+            if len(batch) > 1:
+                half = len(batch) // 2
+                return self._send(batch[:half]) and self._send(batch[half:])
+            # El servidor nunca aceptará este cambio
+            print(f"[ERROR] El servidor rechazó el cambio {batch[0]['date']} "
+                  f"{batch[0]['habit_key']}: {payload.get('error')}")
+            self.db.remove_from_outbox(batch)
+            self.rejected += 1
+            return True
+        # 401 (sesión vencida) o error del servidor: se reintenta más tarde
+        self._failed(f"HTTP {status}: {payload.get('error')}")
+        return False
+
+    def flush_async(self):
+        """Envía la bandeja en un hilo (si no hay otro envío en curso y ya pasó la espera)"""
+        if not self.is_due() or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self.flush, name="sync-flush", daemon=True)
+        self._thread.start()
+
+    def _failed(self, error):
+        self.failures += 1
+        self._failures_in_row += 1
+        self.last_error = error
+        delay = min(RETRY_MAX, RETRY_MIN * 2 ** (self._failures_in_row - 1))
+        self._retry_at = self._clock() + delay
+
+    def _post_changes(self, batch):
+        body = json.dumps({"changes": batch}, separators=(",", ":"))
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request("POST", "/changes", body, {
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            })
+            response = conn.getresponse()
+            data = response.read()
+            return response.status, json.loads(data) if data else {}
+        finally:
+            conn.close()
+
+    # ---------- MÉTRICAS ----------
+
+    def stats(self):
+        """
+        Métricas de la cola de sincronización
+        :return: Dict con depth y oldest_age (de la bandeja) más los contadores:
+                 queued, sent, collapsed (cambios reemplazados antes de enviarse),
+                 rejected, batches, failures y last_error
+        """
+        stats = self.db.get_outbox_stats()
+        stats.update({
+            "queued": self.queued,
+            "sent": self.sent,
+            "collapsed": max(0, self.queued - self.sent - self.rejected - stats["depth"]),
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        })
+        return stats
@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor HTTP de sincronización para Salud Hoy
+Expone las operaciones de Database y AuthDatabase para que un mismo usuario
+use la app en varios dispositivos. Solo usa la biblioteca estándar (asyncio):
+- Autenticación con los tokens de sesión de users.db (Authorization: Bearer <token>)
+- Un archivo de base de datos por usuario, con las conexiones abiertas en un
+  DatabaseRouter (caché LRU)
+- SQLite se usa desde un pool de hilos para no bloquear el event loop
+- Las escrituras se agrupan: los cambios que llegan en la misma ventana se
+  aplican en una transacción por usuario
+
+Uso:
+    python -m app.sync_server [--host 127.0.0.1] [--port 8765] [--data-dir data]
+
+Rutas (JSON):
+    POST /login                          {email, password} -> {token, user}
+    DELETE /session                      Cierra la sesión del token
+    GET  /habits                         Catálogo de hábitos activos
+    GET  /profile | PUT /profile         {name, goal}
+    GET  /days/<fecha>                   Estado de los hábitos del día
+    PUT  /days/<fecha>/habits/<hábito>   {done}
+    POST /changes                        {changes: [{date, habit_key, done, updated_at?}, ...]}
+    GET  /changes?since=<seq>            Deltas posteriores a seq -> {seq, changes}
+    GET  /range?start=<fecha>&end=<fecha>
+    GET  /stats?date=<fecha>             Completados, racha, semana y mes
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit, parse_qs
+
+from .auth_database import AuthDatabase
+from .database import Record
+from .db_router import DatabaseRouter, DEFAULT_MAX_OPEN
+
+
+# Tamaño máximo del cuerpo de una petición (bytes)
+MAX_BODY = 1024 * 1024
+
+# Segundos que un token validado se mantiene en memoria antes de volver a consultarlo
+TOKEN_CACHE_TTL = 30
+
+# Máximo de tokens en memoria (al llenarse se descartan los más antiguos)
+TOKEN_CACHE_MAX = 4096
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+def _json_default(value):
+    """Los registros de Database (Habit, Profile) se envían como objetos JSON"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class HttpError(Exception):
+    """Error que se responde al cliente con un código HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise HttpError(400, f"Fecha inválida: {value}")
+
+
+def _parse_seq(value):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HttpError(400, f"Número de cambio inválido: {value}")
+
+
+def _parse_changes(value, received):
+    """
+    Valida el cuerpo de POST /changes
+    :param value: Lista de objetos {date, habit_key, done, updated_at?}
+    :param received: updated_at (ms) de los cambios que no lo traen
+    :return: Lista de tuplas (day_date, habit_key, done, updated_at)
+    """
+    if not isinstance(value, list):
+        raise HttpError(400, "changes debe ser una lista")
+    changes = []
+    for change in value:
+        if not isinstance(change, dict):
+            raise HttpError(400, f"Cambio inválido: {change}")
+        habit_key = change.get("habit_key", "")
+        if not isinstance(habit_key, str):
+            raise HttpError(400, f"Hábito inválido: {habit_key}")
+        # 0 es una hora válida: solo se usa la de llegada si el cambio no la trae
+        updated_at = received if change.get("updated_at") is None else change["updated_at"]
+        if isinstance(updated_at, bool) or not isinstance(updated_at, int):
+            raise HttpError(400, f"updated_at inválido: {updated_at}")
+        changes.append((_parse_date(change.get("date")), habit_key, bool(change.get("done")), updated_at))
+    return changes
+
+
+_clock_lock = threading.Lock()
+_last_ms = 0
+
+
+def _now_ms():
+    """Hora en ms, estrictamente creciente: dos cambios seguidos del mismo hábito
+    nunca empatan en updated_at (en un empate no gana el último)"""
+    global _last_ms
+    with _clock_lock:
+        _last_ms = max(int(time.time() * 1000), _last_ms + 1)
+        return _last_ms
+
+
+class WriteBatcher:
+    """Agrupa los cambios de hábitos que llegan en la misma ventana de tiempo"""
+
+    def __init__(self, apply, max_batch=512, window=0.002):
+        """
+        :param apply: Función bloqueante apply(user_id, changes) que escribe un grupo
+        :param max_batch: Máximo de cambios por lote
+        :param window: Segundos que se espera a que lleguen más cambios
+        """
+        self.apply = apply
+        self.max_batch = max_batch
+        self.window = window
+        self.batches = 0
+        self.writes = 0
+        self._executor = None
+        self._queue = None
+        self._task = None
+
+    def start(self, executor):
+        self._executor = executor
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, user_id, changes):
+        """
+        Encola cambios de un usuario y espera a que se confirmen
+        :param changes: Lista de tuplas (day_date, habit_key, done, updated_at)
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((user_id, changes, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][1])
+            deadline = loop.time() + self.window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[1])
+
+            # Una transacción por usuario con todos sus cambios del lote
+            by_user = {}
+            for user_id, changes, future in batch:
+                entry = by_user.setdefault(user_id, ([], []))
+                entry[0].extend(changes)
+                entry[1].append(future)
+
+            # Cada usuario tiene su propio archivo: sus transacciones van en paralelo
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self._executor, self.apply, user_id, changes)
+                for user_id, (changes, _) in by_user.items()
+            ), return_exceptions=True)
+            for (_, futures), error in zip(by_user.values(), results):
+                for future in futures:
+                    if future.done():
+                        continue
+                    if isinstance(error, Exception):
+                        future.set_exception(error)
+                    else:
+                        future.set_result(True)
+            self.batches += 1
+            self.writes += size
+
+
+class SyncServer:
+    """Servidor HTTP asyncio sobre Database y AuthDatabase"""
+
+    def __init__(self, data_dir, host="127.0.0.1", port=8765, max_open=DEFAULT_MAX_OPEN,
+                 workers=4, batch_window=0.002):
+        """
+        Inicializa el servidor
+        :param data_dir: Directorio con users.db y los archivos por usuario (data_dir/users/)
+        :param host: Dirección en la que escuchar
+        :param port: Puerto (0 elige uno libre)
+        :param max_open: Máximo de bases de datos de usuarios abiertas a la vez
+        :param workers: Hilos para las operaciones SQLite
+        :param batch_window: Segundos que se agrupan las escrituras
+        """
+        self.host = host
+        self.port = port
+        self.auth_db = AuthDatabase(os.path.join(data_dir, "users.db"))
+        self.router = DatabaseRouter(os.path.join(data_dir, "users"), max_open=max_open)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-db")
+        self.batcher = WriteBatcher(self._apply_changes, window=batch_window)
+        self.requests = 0
+        self._tokens = {}
+        self._habit_keys = None
+        # Conexiones abiertas: tarea -> writer
+        self._clients = {}
+        self._server = None
+        self._thread = None
+        self._loop = None
+
+    # ---------- CICLO DE VIDA ----------
+
+    async def start(self):
+        """Empieza a escuchar (con port=0 actualiza self.port con el puerto elegido)"""
+        self.batcher.start(self.executor)
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Deja de escuchar, corta las conexiones abiertas y cierra las bases de datos"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Las conexiones keep-alive siguen vivas después de cerrar el servidor:
+        # al cerrar su transporte la lectura pendiente termina con EOF
+        clients = list(self._clients.items())
+        for _, writer in clients:
+            writer.close()
+        await asyncio.gather(*(task for task, _ in clients), return_exceptions=True)
+        await self.batcher.stop()
+        self.executor.shutdown(wait=True)
+        self.router.close_all()
+
+    def start_in_thread(self):
+        """Ejecuta el servidor en un hilo propio (pruebas y benchmarks)"""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="sync-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop_thread(self):
+        """Detiene el servidor iniciado con start_in_thread"""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    # ---------- HTTP ----------
+
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "Cuerpo demasiado grande"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = (version == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+                status, payload = await self._dispatch(method, target, headers, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"),
+                          default=_json_default).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def _dispatch(self, method, target, headers, body):
+        self.requests += 1
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {"error": "JSON inválido"}
+        if not isinstance(payload, dict):
+            return 400, {"error": "Se esperaba un objeto JSON"}
+
+        try:
+            if parts == ["health"]:
+                return 200, {"ok": True}
+            if parts == ["login"] and method == "POST":
+                return 200, await self._login(payload)
+
+            token = self._bearer_token(headers)
+            user = await self._authenticate(token)
+            # Abrir (o crear) el archivo del usuario puede tocar el disco: va al pool
+            db = await self._run(self.router.get, user["id"])
+            return 200, await self._route(method, parts, query, payload, token, user, db)
+        except HttpError as e:
+            return e.status, {"error": e.message}
+        except Exception as e:
+            print(f"[ERROR] Error en {method} {url.path}: {e}")
+            return 500, {"error": "Error interno"}
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # ---------- AUTENTICACIÓN ----------
+
+    async def _login(self, payload):
+        user = await self._run(self.auth_db.check_user,
+                               payload.get("email", ""), payload.get("password", ""))
+        if not user:
+            raise HttpError(401, "Email o contraseña incorrectos")
+        token = await self._run(self.auth_db.create_session, user["id"])
+        return {"token": token, "user": user}
+
+    def _bearer_token(self, headers):
+        auth = headers.get("authorization", "")
+        if not auth.startswith("Bearer "):
+            raise HttpError(401, "Falta el token de sesión")
+        return auth[len("Bearer "):].strip()
+
+    async def _authenticate(self, token):
+        cached = self._tokens.get(token)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        user = await self._run(self.auth_db.validate_session, token)
+        if user is None:
+            self._tokens.pop(token, None)
+            raise HttpError(401, "Sesión inválida o vencida")
+        self._cache_token(token, user)
+        return user
+
+    def _cache_token(self, token, user):
+        now = time.monotonic()
+        self._tokens.pop(token, None)
+        # Todos duran TOKEN_CACHE_TTL: el orden de inserción es el de vencimiento,
+        # así que los vencidos (y los que sobran) están al principio
+        while self._tokens:
+            oldest = next(iter(self._tokens))
+            if self._tokens[oldest][1] > now and len(self._tokens) < TOKEN_CACHE_MAX:
+                break
+            del self._tokens[oldest]
+        self._tokens[token] = (user, now + TOKEN_CACHE_TTL)
+
+    # ---------- RUTAS ----------
+
+    async def _route(self, method, parts, query, payload, token, user, db):
+        if parts == ["session"] and method == "DELETE":
+            self._tokens.pop(token, None)
+            await self._run(self.auth_db.revoke_session, token)
+            return {"ok": True}
+
+        if parts == ["habits"] and method == "GET":
+            return {"habits": await self._run(db.get_habits)}
+
+        if parts == ["profile"]:
+            if method == "GET":
+                return await self._run(db.get_profile)
+            if method == "PUT":
+                await self._run(db.update_profile, payload.get("name", ""),
+                                payload.get("goal", "Moverme más"))
+                return await self._run(db.get_profile)
+
+        if len(parts) == 2 and parts[0] == "days" and method == "GET":
+            day = _parse_date(parts[1])
+            habits = await self._run(db.get_day_habits, day)
+            return {"date": day, "habits": habits, "completed": sum(habits.values())}
+
+        if len(parts) == 4 and parts[0] == "days" and parts[2] == "habits" and method == "PUT":
+            change = (_parse_date(parts[1]), parts[3], bool(payload.get("done")), _now_ms())
+            await self._check_habits(db, [change])
+            await self.batcher.submit(user["id"], [change])
+            return {"date": change[0], "habit_key": change[1], "done": change[2]}
+
+        if parts == ["changes"] and method == "GET":
+            return await self._run(self._changes_since, db, _parse_seq(query.get("since")))
+
+        if parts == ["changes"] and method == "POST":
+            # updated_at (ms) es la hora del dispositivo que hizo el cambio; sin él
+            # se usa la hora de llegada (last-writer-wins)
+            changes = _parse_changes(payload.get("changes", []), _now_ms())
+            if changes:
+                await self._check_habits(db, changes)
+                await self.batcher.submit(user["id"], changes)
+            return {"applied": len(changes)}
+
+        if parts == ["range"] and method == "GET":
+            start = _parse_date(query.get("start"))
+            end = _parse_date(query.get("end"))
+            return {"days": await self._run(db.get_habits_for_date_range, start, end)}
+
+        if parts == ["stats"] and method == "GET":
+            day = date.fromisoformat(_parse_date(query.get("date", date.today().isoformat())))
+            return await self._run(self._stats, db, day)
+
+        raise HttpError(404, "Ruta no encontrada")
+
+    async def _check_habits(self, db, changes):
+        # El catálogo es el mismo en todos los archivos: se lee una sola vez
+        if self._habit_keys is None:
+            habits = await self._run(db.get_habits, False)
+            self._habit_keys = {h["key"] for h in habits}
+        for change in changes:
+            habit_key = change[1]
+            if habit_key not in self._habit_keys:
+                raise HttpError(400, f"Hábito desconocido: {habit_key}")
+
+    def _stats(self, db, day):
+        return {
+            "date": day.isoformat(),
+            "completed": db.get_completed_count_for_day(day.isoformat()),
+            "streak": db.get_streak(today=day),
+            "weekly": db.get_completed_count_for_range((day - timedelta(days=6)).isoformat(),
+                                                       day.isoformat()),
+            "monthly_active_days": db.get_monthly_active_days(day.year, day.month),
+        }
+
+    def _changes_since(self, db, since):
+        # El número se lee antes que los deltas: un cambio concurrente se reenvía
+        # en la siguiente consulta en vez de perderse
+        seq = db.current_seq()
+        return {"seq": seq, "changes": list(db.changes_since(since))}
+
+    def _apply_changes(self, user_id, changes):
+        """Escribe los cambios de un usuario en una sola transacción (hilo del pool)"""
+        db = self.router.get(user_id)
+        db.apply_changes(
+            ["h", 0, day_date, habit_key, int(done), updated_at]
+            for day_date, habit_key, done, updated_at in changes
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de sincronización de Salud Hoy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+    parser.add_argument("--max-open", type=int, default=DEFAULT_MAX_OPEN)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    server = SyncServer(args.data_dir, args.host, args.port, args.max_open, args.workers)
+
+    async def serve():
+        await server.start()
+        print(f"[INFO] Servidor de sincronización en http://{server.host}:{server.port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
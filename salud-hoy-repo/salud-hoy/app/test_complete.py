@@ -202,8 +202,8 @@ def test_kivy_file():
     
     # Verificar IDs importantes
     required_ids = [
-        "lbl_tip", "ck_camina", "ck_estira", "ck_respira", "ck_postura",
-        "lbl_today_progress", "lbl_name", "lbl_goal", "badges_grid"
+        "lbl_tip", "habits_list",
+        "lbl_today_progress", "lbl_name", "lbl_goal", "badges_grid", "history_list"
     ]
     
     missing_ids = []
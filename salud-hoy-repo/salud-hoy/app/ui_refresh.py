@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Refrescos de la UI de Salud Hoy
+Las partes de la pantalla (contador de hoy, medallas, consejo, perfil, mapa de
+calor) se marcan como sucias con invalidate() y se actualizan juntas en el
+próximo frame: varias invalidaciones de la misma parte en un frame (ej: varios
+toggles seguidos, o un login que recarga todo) cuestan un solo refresco.
+"""
+
+from kivy.clock import Clock
+
+
+class RefreshScheduler:
+    """Marca partes de la UI como sucias y refresca cada una a lo sumo una vez por frame"""
+
+    def __init__(self, handlers, create_trigger=Clock.create_trigger):
+        """
+        Inicializa el planificador
+        :param handlers: Lista de (nombre, función) en el orden en que se refrescan
+        :param create_trigger: Crea el disparador del próximo frame (inyectable para pruebas)
+        """
+        self._handlers = list(handlers)
+        self._dirty = set()
+        self._trigger = create_trigger(self.flush)
+        # Invalidaciones pedidas y refrescos hechos, por parte
+        self.requested = {name: 0 for name, _ in self._handlers}
+        self.flushed = {name: 0 for name, _ in self._handlers}
+        self.errors = {name: 0 for name, _ in self._handlers}
+
+    def invalidate(self, *names):
+        """Marca partes como sucias (se refrescan en el próximo frame)"""
+        for name in names:
+            if name not in self.requested:
+                raise KeyError(f"Parte de la UI desconocida: {name}")
+            self.requested[name] += 1
+            self._dirty.add(name)
+        self._trigger()
+
+    def flush(self, *_):
+        """Refresca las partes sucias (lo llama el disparador una vez por frame)"""
+        dirty, self._dirty = self._dirty, set()
+        for name, handler in self._handlers:
+            if name in dirty:
+                self.flushed[name] += 1
+                try:
+                    handler()
+                except Exception as e:
+                    # Un error en una parte no deja sin refrescar a las siguientes;
+                    # no se reintenta en cada frame (la próxima invalidación la refresca)
+                    self.errors[name] += 1
+                    print(f"[ERROR] Error refrescando '{name}': {e}")
+
+    def stats(self):
+        """
+        Contadores por parte
+        :return: Dict {nombre: {"requested", "flushed", "avoided"}}; avoided son
+                 los refrescos redundantes que no se hicieron
+        """
+        return {
+            name: {
+                "requested": self.requested[name],
+                "flushed": self.flushed[name],
+                "avoided": self.requested[name] - self.flushed[name] - (name in self._dirty),
+            }
+            for name, _ in self._handlers
+        }
+
+    def format_report(self):
+        """Retorna los contadores como texto"""
+        lines = ["[REFRESH] Refrescos de la UI (pedidos / hechos / evitados)"]
+        for name, counts in self.stats().items():
+            lines.append(f"[REFRESH]   {name:<10} {counts['requested']:6d} {counts['flushed']:6d}"
+                         f" {counts['avoided']:6d}")
+        return "\n".join(lines)
@@ -1,82 +1,65 @@
 # -*- coding: utf-8 -*-
 """
 Script para ver el contenido de la base de datos
+Muestra el resumen (filas aproximadas y tamaños) y la primera página de cada
+tabla usando el inspector (python -m app.inspector para paginar y filtrar)
 """
 
-import sqlite3
 import os
+import sys
 
-# Ubicación de la base de datos LOCAL del proyecto
-script_dir = os.path.dirname(os.path.abspath(__file__))
-project_dir = os.path.dirname(script_dir)
-db_path = os.path.join(project_dir, 'data', 'salud_hoy.db')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-print("=" * 70)
-print("  VISUALIZADOR DE BASE DE DATOS - SALUD HOY")
-print("=" * 70)
-print(f"\nUbicacion: {db_path}")
+from app.inspector import connect, list_tables, print_summary, browse
 
-# Verificar si existe
-if not os.path.exists(db_path):
-    print("\n[!] La base de datos NO existe todavia.")
-    print("    Ejecuta la aplicacion primero: python main.py")
-    print("    Esto creara el archivo salud_hoy.db automaticamente.")
-    exit()
 
-print("[OK] Base de datos encontrada!")
-print(f"Tamano: {os.path.getsize(db_path)} bytes")
+# Filas de la primera página de cada tabla
+FILAS_POR_TABLA = 10
 
-# Conectar a la base de datos
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
 
-print("\n" + "=" * 70)
-print("  TABLAS")
-print("=" * 70)
+def main():
+    # Ubicación de la base de datos LOCAL del proyecto
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_dir = os.path.dirname(script_dir)
+    db_path = os.path.join(project_dir, 'data', 'salud_hoy.db')
 
-# Obtener lista de tablas
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-tablas = cursor.fetchall()
-
-print(f"\nTablas encontradas: {len(tablas)}")
-for tabla in tablas:
-    print(f"  - {tabla[0]}")
+    print("=" * 70)
+    print("  VISUALIZADOR DE BASE DE DATOS - SALUD HOY")
+    print("=" * 70)
+    print(f"\nUbicacion: {db_path}")
+
+    # Verificar si existe
+    if not os.path.exists(db_path):
+        print("\n[!] La base de datos NO existe todavia.")
+        print("    Ejecuta la aplicacion primero: python main.py")
+        print("    Esto creara el archivo salud_hoy.db automaticamente.")
+        return 1
+
+    print("[OK] Base de datos encontrada!")
+    print(f"Tamano: {os.path.getsize(db_path)} bytes")
+
+    conn = connect(db_path)
+    try:
+        print("\n" + "=" * 70)
+        print("  TABLAS")
+        print("=" * 70)
+        print_summary(conn)
+
+        # Primera página de cada tabla (paginada por clave, sin COUNT(*))
+        for tabla in list_tables(conn):
+            print("\n" + "=" * 70)
+            print(f"  TABLA: {tabla}")
+            print("=" * 70)
+            browse(conn, tabla, limit=FILAS_POR_TABLA)
+    finally:
+        conn.close()
 
-# Ver contenido de cada tabla
-for tabla in tablas:
-    nombre_tabla = tabla[0]
     print("\n" + "=" * 70)
-    print(f"  TABLA: {nombre_tabla}")
+    print("  FIN DEL REPORTE")
+    print("  Para ver más filas: python -m app.inspector browse <tabla> --after <clave>")
     print("=" * 70)
-    
-    # Obtener estructura
-    cursor.execute(f"PRAGMA table_info({nombre_tabla});")
-    columnas = cursor.fetchall()
-    
-    print("\nColumnas:")
-    for col in columnas:
-        print(f"  - {col[1]} ({col[2]})")
-    
-    # Contar registros
-    cursor.execute(f"SELECT COUNT(*) FROM {nombre_tabla};")
-    count = cursor.fetchone()[0]
-    print(f"\nRegistros: {count}")
-    
-    # Mostrar datos
-    if count > 0:
-        cursor.execute(f"SELECT * FROM {nombre_tabla} LIMIT 10;")
-        registros = cursor.fetchall()
-        
-        print("\nDatos:")
-        for i, registro in enumerate(registros, 1):
-            print(f"  {i}. {registro}")
-
-conn.close()
-
-print("\n" + "=" * 70)
-print("  FIN DEL REPORTE")
-print("=" * 70)
-
-
+    return 0
 
 
+if __name__ == "__main__":
+    sys.exit(main())
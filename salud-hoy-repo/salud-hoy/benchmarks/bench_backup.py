@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de copias de seguridad
+Arma una base de datos de --size-mb MB (historial de hábitos más una tabla de
+relleno; usar --size-mb 1024 para 1 GB) y la copia con distintos tamaños de
+paso mientras un hilo simula la interfaz: una lectura por frame (16 ms) y un
+toggle cada --write-every segundos. Mide:
+- MB/s de la copia, pasos, reinicios y el paso más largo
+- Latencia de los frames y de los toggles durante la copia (el bloqueo que ve
+  la interfaz): p99 y máximo
+pages_per_step = -1 es la copia en un solo paso (equivale a copiar sin pasos).
+
+Uso:
+    python benchmarks/bench_backup.py [--size-mb 256] [--steps 64,256,1024,-1] [--write-every 1.0]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+from app.backup import backup_database
+from bench_multiusuario import populate
+
+
+FRAME = 1 / 60.0
+
+
+def build(db_path, size_mb):
+    """Historial de 50 usuarios x 1 año y relleno hasta size_mb"""
+    db = Database(db_path)
+    populate(db, 1, 51, 365, 0.6)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS relleno (id INTEGER PRIMARY KEY, data BLOB)")
+    missing = size_mb * 1024 * 1024 - os.path.getsize(db_path)
+    if missing > 0:
+        conn.execute(
+            "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < ?) "
+            "INSERT INTO relleno(data) SELECT randomblob(3900) FROM c",
+            (missing // 4096,),
+        )
+        conn.commit()
+    conn.close()
+    return db
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run(db, dest, pages_per_step, write_every):
+    """Copia con un hilo de 'interfaz' leyendo y escribiendo en paralelo"""
+    ui = Database(db.db_path, user_id=1, ensure_schema=False)
+    today = date.today().isoformat()
+    frames, writes = [], []
+    done = threading.Event()
+    result = {}
+
+    def do_backup():
+        try:
+            result.update(backup_database(db.db_path, dest, pages_per_step=pages_per_step))
+        finally:
+            done.set()
+
+    thread = threading.Thread(target=do_backup)
+    thread.start()
+    next_write = time.perf_counter() + write_every if write_every > 0 else None
+    active = False
+    while not done.is_set():
+        start = time.perf_counter()
+        ui.get_completed_count_for_day(today)
+        frames.append(time.perf_counter() - start)
+        if next_write is not None and start >= next_write:
+            start = time.perf_counter()
+            active = not active
+            ui.set_habit_status(today, "camina_10", active)
+            writes.append(time.perf_counter() - start)
+            next_write = start + write_every
+        time.sleep(FRAME)
+    thread.join()
+    return result, frames, writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de copias de seguridad")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--steps", default="64,256,1024,-1", help="pages_per_step separados por coma")
+    parser.add_argument("--write-every", type=float, default=1.0,
+                        help="Segundos entre toggles durante la copia (0 = solo lecturas)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_backup_")
+    try:
+        db_path = os.path.join(tmp, "salud_hoy.db")
+        start = time.perf_counter()
+        db = build(db_path, args.size_mb)
+        size = os.path.getsize(db_path)
+        print("=" * 78)
+        print(f"Base de datos: {size / 1048576:.0f} MB (armada en {time.perf_counter() - start:.1f} s)")
+        print(f"Interfaz: lectura cada {FRAME * 1000:.0f} ms, toggle cada {args.write_every} s")
+        print("=" * 78)
+        print(f"{'paso':>6} {'MB/s':>8} {'seg':>7} {'pasos':>6} {'reinic.':>7} {'paso máx':>9} "
+              f"{'frame p99':>10} {'frame máx':>10} {'toggle máx':>11}")
+        for pages in (int(p) for p in args.steps.split(",")):
+            dest = os.path.join(tmp, f"copia_{pages}.db")
+            result, frames, writes = run(db, dest, pages, args.write_every)
+            label = "todo" if pages < 0 else str(pages)
+            if result.get("fallback"):
+                label += "*"
+            print(f"{label:>6} {result['bytes_per_sec'] / 1048576:8.1f} {result['seconds']:7.2f} "
+                  f"{result['steps']:6d} {result['restarts']:7d} {result['max_step'] * 1000:7.1f}ms "
+                  f"{percentile(frames, 0.99) * 1000:8.2f}ms {max(frames) * 1000:8.2f}ms "
+                  f"{(max(writes) * 1000 if writes else 0.0):9.2f}ms")
+            os.remove(dest)
+        print("\n* demasiados reinicios por escrituras concurrentes: el resto se copió en un solo paso")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
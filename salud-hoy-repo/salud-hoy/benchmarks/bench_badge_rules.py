@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del motor de medallas sobre un historial sintético grande
+Compara la evaluación anterior (consultas separadas en cada refresco, racha día
+por día) contra BadgeEngine en frío y después de un toggle de hoy (incremental).
+
+Uso:
+    python benchmarks/bench_badge_rules.py [--days 3650] [--density 0.9] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+from app.badges import BadgeEngine
+
+
+HABITS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+def populate(db, days, density, seed=7):
+    """Genera `days` días de historial hasta hoy (cada hábito completado con prob. `density`)"""
+    rng = random.Random(seed)
+    today = date.today()
+    day_rows, habit_rows = [], []
+    for i in range(days):
+        day = (today - timedelta(days=i)).isoformat()
+        day_rows.append((db.user_id, day))
+        for key in HABITS:
+            # Los últimos 40 días siempre activos para tener una racha larga
+            done = 1 if i < 40 or rng.random() < density else 0
+            habit_rows.append((db.user_id, day, key, done))
+    with db.get_connection() as conn:
+        conn.executemany("INSERT OR IGNORE INTO dia(user_id, day_date) VALUES (?, ?)", day_rows)
+        conn.executemany(
+            "INSERT OR REPLACE INTO habitos_dia(user_id, day_date, habit_key, done) VALUES (?, ?, ?, ?)",
+            habit_rows,
+        )
+        conn.commit()
+    return len(habit_rows)
+
+
+def legacy_streak(db, threshold=1):
+    """Racha calculada como antes: una consulta por día hacia atrás"""
+    current_day = date.today()
+    streak = 0
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                "SELECT COUNT(*) FROM habitos_dia WHERE user_id = ? AND day_date = ? AND done = 1",
+                (db.user_id, current_day.isoformat()),
+            )
+            if cursor.fetchone()[0] >= threshold:
+                streak += 1
+                current_day -= timedelta(days=1)
+            else:
+                return streak
+
+
+def legacy_evaluate(db):
+    """Evaluación anterior de SaludHoyApp._compute_badges"""
+    today = date.today()
+    streak = legacy_streak(db)
+    weekly = sum(
+        db.get_completed_count_for_day((today - timedelta(days=i)).isoformat()) for i in range(7)
+    )
+    active_month = db.get_monthly_active_days(today.year, today.month)
+    today_full = db.get_completed_count_for_day(today.isoformat()) == len(HABITS)
+    ever_active = len(db.get_all_days_with_habits()) > 0
+    return [ever_active, streak >= 3, streak >= 7, weekly >= 14, weekly == 28,
+            today_full, active_month >= 15]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de medallas")
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--density", type=float, default=0.9)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        rows = populate(db, args.days, args.density)
+        today = date.today().isoformat()
+
+        def engine_cold():
+            BadgeEngine(db).evaluate()
+
+        engine = BadgeEngine(db)
+        engine.evaluate()
+
+        def engine_toggle():
+            db.set_habit_status(today, "camina_10", True)
+            engine.on_habit_changed(today)
+            engine.evaluate()
+
+        def legacy_toggle():
+            db.set_habit_status(today, "camina_10", True)
+            legacy_evaluate(db)
+
+        print("=" * 70)
+        print(f"  BENCHMARK MOTOR DE MEDALLAS ({args.days} días, {rows} filas)")
+        print("=" * 70)
+        print(f"Racha actual: {db.get_streak()} días")
+        print(f"{'evaluación anterior (por refresco)':<40} {timed(lambda: legacy_evaluate(db), args.repeat):10.2f} ms")
+        print(f"{'BadgeEngine en frío':<40} {timed(engine_cold, args.repeat):10.2f} ms")
+        print(f"{'toggle + evaluación anterior':<40} {timed(legacy_toggle, args.repeat):10.2f} ms")
+        print(f"{'toggle + BadgeEngine incremental':<40} {timed(engine_toggle, args.repeat):10.2f} ms")
+        print(f"Métricas calculadas: {engine.compute_counts}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark headless de la grilla de medallas
+Compara, por cada toggle de hábito, el rebuild completo (clear_widgets + crear
+todo de nuevo) contra la actualización incremental de BadgeGrid: widgets creados,
+widgets modificados y tiempo por toggle.
+
+Uso:
+    python benchmarks/bench_badges_ui.py [--toggles 200] [--kivymd]
+
+Con --kivymd se crean widgets KivyMD reales (requiere poder abrir una ventana,
+por ejemplo con un display virtual); sin el flag se usa una fábrica en memoria.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Kivy no debe interpretar los argumentos del benchmark
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Raíz del repositorio: los widgets en memoria son los de las pruebas (tests/fake_widgets.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.badges_ui import BadgeGrid
+from tests.fake_widgets import FakeWidget, FakeBadgeFactory
+
+
+BADGES = [
+    ("first_active", "check-decagram", "Primer día\nactivo"),
+    ("streak_3", "run", "3 días\nseguidos"),
+    ("streak_7", "fire", "7 días\nseguidos"),
+    ("week_14", "target", "Semana\n14+"),
+    ("week_perfect", "crown", "Semana\nperfecta"),
+    ("today_full", "medal", "Hoy\n4/4"),
+    ("month_15", "calendar-check", "15+ días\ndel mes"),
+]
+
+
+def toggle_states(toggles):
+    """Genera el estado de medallas y chips después de cada toggle"""
+    done_today = 0
+    for i in range(toggles):
+        done_today = (done_today + 1) % 5
+        badges = [
+            {"key": key, "icon": icon, "title": title,
+             "unlocked": key == "first_active" or (key == "today_full" and done_today == 4)}
+            for key, icon, title in BADGES
+        ]
+        chips = (f"Racha: {i // 10} día(s)", f"Semana: {done_today + 10}/28", "Activos mes: 12")
+        yield badges, chips
+
+
+def run(strategy, toggles, factory, container):
+    grid = BadgeGrid(container(), container(), factory=factory)
+    states = list(toggle_states(toggles + 1))
+    # Primer render (igual para ambas estrategias)
+    grid.update(*states[0])
+    created_before = factory.created
+
+    touched = 0
+    start = time.perf_counter()
+    for badges, chips in states[1:]:
+        if strategy == "rebuild":
+            touched += grid.rebuild(badges, chips)
+        else:
+            touched += grid.update(badges, chips)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "created_per_toggle": (factory.created - created_before) / toggles,
+        "touched_per_toggle": touched / toggles,
+        "ms_per_toggle": elapsed * 1000.0 / toggles,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la grilla de medallas")
+    parser.add_argument("--toggles", type=int, default=200)
+    parser.add_argument("--kivymd", action="store_true", help="Usar widgets KivyMD reales")
+    args = parser.parse_args()
+
+    if args.kivymd:
+        from kivy.app import App
+        from kivymd.app import MDApp
+        from app.badges_ui import KivyMDBadgeFactory
+        from app.lazy_imports import kivymd_widgets
+
+        # Los widgets KivyMD necesitan una app "en ejecución" para leer theme_cls
+        App._running_app = MDApp()
+        make_factory = KivyMDBadgeFactory
+        container = lambda: kivymd_widgets.MDBoxLayout()
+    else:
+        make_factory = FakeBadgeFactory
+        container = FakeWidget
+
+    print("=" * 70)
+    print(f"  BENCHMARK GRILLA DE MEDALLAS ({'KivyMD' if args.kivymd else 'en memoria'})")
+    print("=" * 70)
+    print(f"{'estrategia':<12} {'creados/toggle':>15} {'modificados/toggle':>19} {'ms/toggle':>10}")
+    for strategy in ("rebuild", "incremental"):
+        result = run(strategy, args.toggles, make_factory(), container)
+        print(f"{strategy:<12} {result['created_per_toggle']:15.1f} "
+              f"{result['touched_per_toggle']:19.1f} {result['ms_per_toggle']:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de sincronización por deltas
+Compara los bytes que se transfieren para sincronizar dos copias de la base de
+datos de un usuario con N días de historial:
+- copia completa: el archivo .db entero (lo que se haría sin registro de cambios)
+- volcado completo: todos los deltas (changes_since(None)) en JSON
+- delta: solo los cambios desde la última sincronización, en JSON
+
+Escenarios por sincronización: un toggle, un día completo (4 hábitos) y una
+semana sin sincronizar.
+
+Uso:
+    python benchmarks/bench_delta_sync.py [--days 30 365 1825]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+
+
+HABITS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+def fill(db, days, today):
+    """Historial de `days` días con todos los hábitos completados"""
+    with db.transaction():
+        for i in range(1, days + 1):
+            day = (today - timedelta(days=i)).isoformat()
+            for key in HABITS:
+                db.set_habit_status(day, key, True)
+
+
+def payload_bytes(changes):
+    return len(json.dumps(list(changes), separators=(",", ":")).encode("utf-8"))
+
+
+def measure(path, days, scenario):
+    today = date.today()
+    db = Database(path)
+    fill(db, days, today)
+    since = db.current_seq()
+
+    if scenario == "toggle":
+        db.set_habit_status(today.isoformat(), "camina_10", True)
+    elif scenario == "día":
+        for key in HABITS:
+            db.set_habit_status(today.isoformat(), key, True)
+    else:
+        for i in range(7):
+            for key in HABITS:
+                db.set_habit_status((today + timedelta(days=i)).isoformat(), key, True)
+
+    full_file = os.path.getsize(path)
+    full_dump = payload_bytes(db.changes_since(None))
+    start = time.perf_counter()
+    delta = payload_bytes(db.changes_since(since))
+    delta_ms = (time.perf_counter() - start) * 1000.0
+    return full_file, full_dump, delta, delta_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de sincronización por deltas")
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 1825])
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("  BENCHMARK SINCRONIZACIÓN POR DELTAS (bytes por sincronización)")
+    print("=" * 78)
+    print(f"{'días':>6} {'escenario':>10} {'archivo .db':>12} {'volcado JSON':>13} "
+          f"{'delta JSON':>11} {'ahorro':>8} {'delta (ms)':>11}")
+    for days in args.days:
+        for scenario in ("toggle", "día", "semana"):
+            with tempfile.TemporaryDirectory() as tmp:
+                full_file, full_dump, delta, delta_ms = measure(
+                    os.path.join(tmp, "salud_hoy.db"), days, scenario)
+            saving = 1 - delta / full_file
+            print(f"{days:>6} {scenario:>10} {full_file:>12} {full_dump:>13} "
+                  f"{delta:>11} {saving:>8.2%} {delta_ms:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
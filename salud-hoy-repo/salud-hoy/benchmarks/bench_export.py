@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de exportación del historial
+Carga U usuarios con N días de historial (U x N x 4 filas) y exporta todo a
+CSV, JSON Lines y columnar: filas/s, tamaño del archivo y pico de memoria
+(tracemalloc, en una segunda pasada). El pico depende del tamaño del bloque,
+no del número de filas.
+
+Uso:
+    python benchmarks/bench_export.py [--users 200] [--days 1825] [--chunk-size 50000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+from app.exporter import export_history, FORMATS, EXTENSIONS, CHUNK_SIZE
+
+from bench_multiusuario import populate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de exportación del historial")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=1825)
+    parser.add_argument("--density", type=float, default=0.7)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--partition", action="store_true", help="Un archivo por usuario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        populate(db, 1, args.users + 1, args.days, args.density)
+
+        print("=" * 78)
+        print(f"  BENCHMARK EXPORTACIÓN ({args.users} usuarios x {args.days} días, "
+              f"bloques de {args.chunk_size})")
+        print("=" * 78)
+        print(f"{'formato':>9} {'filas':>11} {'MB':>9} {'s':>8} {'filas/s':>11} {'pico (MiB)':>11}")
+        for fmt in FORMATS:
+            out = os.path.join(tmp, "export_" + fmt)
+            if not args.partition:
+                out += EXTENSIONS[fmt]
+            result = export_history(db, out, fmt, all_users=True,
+                                    partition_by_user=args.partition, chunk_size=args.chunk_size)
+            # Segunda pasada solo para la memoria (tracemalloc hace más lenta la exportación)
+            tracemalloc.start()
+            try:
+                export_history(db, out, fmt, all_users=True,
+                               partition_by_user=args.partition, chunk_size=args.chunk_size)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            print(f"{fmt:>9} {result['rows']:>11} {result['bytes'] / 1e6:>9.2f} "
+                  f"{result['seconds']:>8.2f} {result['rows_per_sec']:>11.0f} {peak / 2**20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
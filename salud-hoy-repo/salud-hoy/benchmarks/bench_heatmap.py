@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del mapa de calor
+Para 1, 5 y 10 años de historial de un usuario mide:
+- la consulta agregada (get_daily_counts)
+- el render completo de la textura (FboHeatmapRenderer.render, con glFinish)
+- el repintado del cuadro de hoy después de un toggle (paint)
+- como referencia, crear un widget con su Color y Rectangle por día
+Necesita un contexto OpenGL (abre la ventana de Kivy).
+
+Uso:
+    python benchmarks/bench_heatmap.py [--years 1 5 10] [--repeat 5]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kivy.core.window import Window  # noqa: F401  (crea el contexto OpenGL)
+from kivy.graphics import Color, Rectangle
+from kivy.graphics.opengl import glFinish
+from kivy.uix.widget import Widget
+
+from app.database import Database
+from app.heatmap import FboHeatmapRenderer, HeatmapGrid, heatmap_level, CELL, LEVEL_COLORS
+from bench_multiusuario import populate
+
+
+def timed(fn, repeat):
+    """Mediana en ms de repeat ejecuciones de fn() (esperando a la GPU)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        glFinish()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def widgets_per_day(grid, levels):
+    parent = Widget()
+    for day in grid.days():
+        cell = Widget(size_hint=(None, None), size=(CELL, CELL), pos=grid.cell_pos(day))
+        with cell.canvas:
+            Color(*LEVEL_COLORS[levels.get(day.isoformat(), 0)])
+            Rectangle(pos=cell.pos, size=cell.size)
+        parent.add_widget(cell)
+    return parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del mapa de calor")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    today = date.today()
+    tmp = tempfile.mkdtemp(prefix="bench_heatmap_")
+    try:
+        db_path = os.path.join(tmp, "salud_hoy.db")
+        populate(Database(db_path), 1, 2, max(args.years) * 365 + 7, 0.6)
+        db = Database(db_path, persistent=True, ensure_schema=False)
+        total = len(db.get_habit_catalog())
+
+        # Compilar los shaders antes de medir
+        renderer = FboHeatmapRenderer()
+        renderer.render(HeatmapGrid(today), {})
+
+        print("=" * 78)
+        print(f"{'años':>4} {'días':>6} {'consulta':>10} {'render':>10} {'repintar hoy':>13} {'widgets (ref.)':>15}")
+        print("=" * 78)
+        for years in args.years:
+            grid = HeatmapGrid(today, years)
+            start, end = grid.start_day.isoformat(), today.isoformat()
+            query_ms = timed(lambda: db.get_daily_counts(start, end), args.repeat)
+            levels = {day: heatmap_level(count, total) for day, count in db.get_daily_counts(start, end).items()}
+            render_ms = timed(lambda: renderer.render(grid, levels), args.repeat)
+            paint_ms = timed(lambda: renderer.paint(end, 4), args.repeat * 20)
+            widgets_ms = timed(lambda: widgets_per_day(grid, levels), args.repeat)
+            days = (today - grid.start_day).days + 1
+            print(f"{years:4d} {days:6d} {query_ms:7.2f} ms {render_ms:7.2f} ms {paint_ms:10.3f} ms"
+                  f" {widgets_ms:12.2f} ms")
+        print(f"\nTextura de 1 año: {HeatmapGrid(today).size[0]}x{HeatmapGrid(today).size[1]} px,"
+              f" un solo Rectangle en pantalla")
+        db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del historial paginado (sin interfaz gráfica)
+Carga --users usuarios con --years años de historial y recorre el historial
+completo de uno de ellos de a páginas, como al desplazar la pestaña Historial
+hasta el primer día, midiendo el tiempo por página de:
+- get_history_page: paginación por clave (day_date < último día recibido)
+- LIMIT/OFFSET: la misma consulta salteando las filas ya vistas (referencia)
+- HistoryFeed.load_older: la página más el armado de las filas del RecycleView
+Para que el desplazamiento no pierda frames, cada página debería tardar mucho
+menos que un frame a 60 fps (16.7 ms). También reporta el máximo de filas y
+el pico de memoria de la ventana de HistoryFeed, que no dependen de los años.
+
+Uso:
+    python benchmarks/bench_history.py [--users 20] [--years 10] [--page 60]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+from app.history_ui import HistoryFeed
+from bench_multiusuario import populate
+
+
+OFFSET_SQL = """
+    SELECT day_date, SUM(done), GROUP_CONCAT(CASE WHEN done = 1 THEN habit_key END)
+    FROM habitos_dia
+    WHERE user_id = ?
+    GROUP BY day_date
+    ORDER BY day_date DESC
+    LIMIT ? OFFSET ?
+"""
+
+FRAME_MS = 1000 / 60
+
+
+def keyset_pages(db, page_size):
+    times, before = [], None
+    while True:
+        start = time.perf_counter()
+        page = db.get_history_page(before=before, limit=page_size)
+        times.append((time.perf_counter() - start) * 1000)
+        if len(page) < page_size:
+            return times
+        before = page[-1].day_date
+
+
+def offset_pages(db, page_size):
+    times, offset = [], 0
+    conn = db.get_connection()
+    try:
+        while True:
+            start = time.perf_counter()
+            rows = conn.execute(OFFSET_SQL, (db.user_id, page_size, offset)).fetchall()
+            times.append((time.perf_counter() - start) * 1000)
+            if len(rows) < page_size:
+                return times
+            offset += page_size
+    finally:
+        conn.close()
+
+
+def feed_pages(db, page_size):
+    """Recorre el historial con HistoryFeed: (ms por página, máx de filas en la ventana)"""
+    feed = HistoryFeed(db, page_size=page_size)
+    start = time.perf_counter()
+    feed.reset()
+    times, max_rows = [(time.perf_counter() - start) * 1000], len(feed.rows)
+    while feed.has_older:
+        start = time.perf_counter()
+        feed.load_older()
+        times.append((time.perf_counter() - start) * 1000)
+        max_rows = max(max_rows, len(feed.rows))
+    return times, max_rows
+
+
+def feed_peak(db, page_size):
+    """Pico de memoria del mismo recorrido (aparte: tracemalloc distorsiona los tiempos)"""
+    tracemalloc.start()
+    try:
+        feed_pages(db, page_size)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summary(label, times):
+    p95 = sorted(times)[int(len(times) * 0.95) - 1] if len(times) > 1 else times[0]
+    print(f"{label:<26} {len(times):7d} {statistics.mean(times):9.2f} {p95:9.2f} {max(times):9.2f}"
+          f" {times[-1]:10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del historial paginado")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--page", type=int, default=60)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_history_")
+    try:
+        db_path = os.path.join(tmp, "salud_hoy.db")
+        populate(Database(db_path), 1, args.users + 1, args.years * 365, 0.6)
+        db = Database(db_path, user_id=args.users // 2 + 1, persistent=True, ensure_schema=False)
+
+        print("=" * 78)
+        print(f"{args.users} usuarios x {args.years} años, páginas de {args.page} días"
+              f" (un frame a 60 fps: {FRAME_MS:.1f} ms)")
+        print("=" * 78)
+        print(f"{'página':<26} {'páginas':>7} {'media ms':>9} {'p95 ms':>9} {'máx ms':>9} {'última ms':>10}")
+        summary("get_history_page (clave)", keyset_pages(db, args.page))
+        summary("LIMIT/OFFSET", offset_pages(db, args.page))
+        times, max_rows = feed_pages(db, args.page)
+        summary("HistoryFeed.load_older", times)
+        print(f"\nVentana de HistoryFeed: máx {max_rows} filas,"
+              f" pico {feed_peak(db, args.page) / 1024:.0f} KB")
+        db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
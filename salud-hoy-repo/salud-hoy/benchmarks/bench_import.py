@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de importación del historial
+Genera un CSV de N filas (por defecto 1M; usar --rows 10000000 para 10M) con
+varios usuarios, un 1% de filas inválidas y un 1% de repetidas, y lo importa
+en una base de datos nueva: filas/s y pico de memoria (tracemalloc, en una
+segunda pasada). El pico depende del tamaño del lote, no del archivo.
+
+Uso:
+    python benchmarks/bench_import.py [--rows 1000000] [--batch-size 50000] [--format csv|jsonl]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+from app.importer import import_history, BATCH_SIZE
+
+
+HABITS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+def generate(path, rows, fmt, seed=7):
+    """Escribe `rows` filas: usuario, día (hacia atrás desde hoy), hábito y done"""
+    rng = random.Random(seed)
+    today = date.today()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer:
+            writer.writerow(("user_id", "day_date", "habit_key", "done"))
+        day_keys = [(today - timedelta(days=i)).isoformat() for i in range(3650)]
+        for i in range(rows):
+            slot, habit = divmod(i, len(HABITS))
+            user_id, day = divmod(slot, len(day_keys))
+            record = [user_id + 1, day_keys[day], HABITS[habit], int(rng.random() < 0.7)]
+            roll = rng.random()
+            if roll < 0.005:
+                record[2] = "no_existe"
+            elif roll < 0.01:
+                record[1] = "2025-13-40"
+            elif roll < 0.02 and i:
+                # Repetida: vuelve a escribir la fila anterior con otro valor
+                record = previous[:3] + [1 - previous[3]]
+            previous = record
+            if writer:
+                writer.writerow(record)
+            else:
+                f.write(json.dumps(dict(zip(("user_id", "day_date", "habit_key", "done"), record))) + "\n")
+
+
+def run(tmp, name, source, fmt, batch_size):
+    db = Database(os.path.join(tmp, name))
+    return import_history(db, source, fmt, os.path.join(tmp, name + ".rechazos.csv"),
+                          user_ids=True, batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de importación del historial")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "historial." + args.format)
+        generate(source, args.rows, args.format)
+        size_mb = os.path.getsize(source) / 1e6
+
+        stats = run(tmp, "bench.db", source, args.format, args.batch_size)
+        tracemalloc.start()
+        try:
+            run(tmp, "bench_mem.db", source, args.format, args.batch_size)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    print("=" * 78)
+    print(f"  BENCHMARK IMPORTACIÓN ({args.rows} filas {args.format}, {size_mb:.1f} MB, "
+          f"lotes de {args.batch_size})")
+    print("=" * 78)
+    print(f"  importadas: {stats['imported']}  repetidas: {stats['duplicates']}  "
+          f"rechazadas: {stats['rejected']}")
+    print(f"  tiempo: {stats['seconds']:.2f} s  ({stats['rows_per_sec']:.0f} filas/s)")
+    print(f"  pico de memoria: {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
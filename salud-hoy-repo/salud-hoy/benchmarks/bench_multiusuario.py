@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de escala de datos por usuario
+Carga U usuarios con un año de historial cada uno en salud_hoy.db y mide la
+latencia de las consultas de un usuario (conteo del día, semana, racha y
+días activos del mes) a medida que crece el número de usuarios. Con el índice
+(user_id, done, day_date) la latencia por usuario debería mantenerse plana.
+
+Uso:
+    python benchmarks/bench_multiusuario.py [--users 10000] [--days 365] [--steps 4]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+
+
+HABITS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+def populate(db, first_user, last_user, days, density, seed=7):
+    """Inserta `days` días de historial para los usuarios [first_user, last_user)"""
+    rng = random.Random(seed + first_user)
+    today = date.today()
+    day_keys = [(today - timedelta(days=i)).isoformat() for i in range(days)]
+    with db.get_connection() as conn:
+        for user_id in range(first_user, last_user):
+            conn.executemany(
+                "INSERT OR IGNORE INTO dia(user_id, day_date) VALUES (?, ?)",
+                ((user_id, day) for day in day_keys),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO habitos_dia(user_id, day_date, habit_key, done) VALUES (?, ?, ?, ?)",
+                ((user_id, day, key, 1 if rng.random() < density else 0)
+                 for day in day_keys for key in HABITS),
+            )
+        conn.commit()
+    conn.close()
+
+
+def user_queries(db, today):
+    """Consultas que la app hace para un usuario en cada refresco"""
+    db.get_completed_count_for_day(today.isoformat())
+    db.get_completed_count_for_range((today - timedelta(days=6)).isoformat(), today.isoformat())
+    db.get_streak(today=today)
+    db.get_monthly_active_days(today.year, today.month)
+
+
+def measure(db, users, samples, rng):
+    today = date.today()
+    latencies = []
+    for _ in range(samples):
+        view = db.for_user(rng.randint(1, users))
+        start = time.perf_counter()
+        user_queries(view, today)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escala de datos por usuario")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--density", type=float, default=0.7)
+    parser.add_argument("--steps", type=int, default=4, help="Mediciones intermedias al ir cargando usuarios")
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+
+        print("=" * 70)
+        print(f"  BENCHMARK DATOS POR USUARIO ({args.users} usuarios x {args.days} días)")
+        print("=" * 70)
+        print(f"{'usuarios':>10} {'filas':>12} {'carga (s)':>10} {'consultas/usuario (ms)':>24}")
+        loaded = 0
+        for step in range(1, args.steps + 1):
+            target = args.users * step // args.steps
+            start = time.perf_counter()
+            populate(db, loaded + 1, target + 1, args.days, args.density)
+            load_s = time.perf_counter() - start
+            loaded = target
+            rows = loaded * args.days * len(HABITS)
+            print(f"{loaded:>10} {rows:>12} {load_s:>10.1f} {measure(db, loaded, args.samples, rng):>24.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de memoria de los registros de Database
+Lee --rows filas de historial (por defecto 1M, iter_habit_history con
+all_users=True) armando cada fila de cuatro formas:
+- dict por fila (como retornaban antes los métodos de Database)
+- Record con __slots__ (como Habit, Profile, BadgeUnlock)
+- namedtuple (como DayHabit, de iter_habits_for_date_range)
+- tupla de sqlite3 (sin row_factory, lo que retorna iter_habit_history)
+y mide con tracemalloc la memoria de la lista completa (bytes por fila) y el
+pico al recorrerlas por streaming sin guardarlas, más el tiempo de lectura
+(sin tracemalloc, que lo distorsiona).
+
+Uso:
+    python benchmarks/bench_records.py [--rows 1000000]
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database, Record
+from bench_multiusuario import populate, HABITS
+
+
+class SlotsRow(Record):
+    """Fila del historial como Record (para comparar con HistoryRow)"""
+
+    __slots__ = ("user_id", "day_date", "habit_key", "title", "done")
+
+    def __init__(self, user_id, day_date, habit_key, title, done):
+        self.user_id = user_id
+        self.day_date = day_date
+        self.habit_key = habit_key
+        self.title = title
+        self.done = done
+
+
+HistoryRow = namedtuple("HistoryRow", ("user_id", "day_date", "habit_key", "title", "done"))
+
+
+FACTORIES = [
+    ("dict por fila", lambda _, r: {"user_id": r[0], "day_date": r[1], "habit_key": r[2],
+                                    "title": r[3], "done": r[4]}),
+    ("Record (__slots__)", lambda _, r: SlotsRow(*r)),
+    ("namedtuple", lambda _, r: tuple.__new__(HistoryRow, r)),
+    ("tupla", None),
+]
+
+
+def rows(db, factory):
+    return db._iter_rows("history.all_users", ("0000-01-01", "9999-12-31"), row_factory=factory)
+
+
+def measure(db, factory):
+    gc.collect()
+    tracemalloc.start()
+    kept = list(rows(db, factory))
+    kept_bytes = tracemalloc.get_traced_memory()[0]
+    del kept
+    gc.collect()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    for _ in rows(db, factory):
+        pass
+    stream_peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    count = sum(1 for _ in rows(db, factory))
+    return count, kept_bytes, stream_peak, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memoria de los registros")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_records_")
+    try:
+        db = Database(os.path.join(tmp, "salud_hoy.db"))
+        users = 100
+        populate(db, 1, users + 1, max(1, args.rows // (users * len(HABITS))), 0.6)
+
+        print("=" * 78)
+        print(f"{'fila':<20} {'filas':>9} {'lista':>10} {'bytes/fila':>11} {'pico streaming':>15} {'lectura':>9}")
+        print("=" * 78)
+        for label, factory in FACTORIES:
+            count, kept, peak, seconds = measure(db, factory)
+            print(f"{label:<20} {count:9d} {kept / 1048576:7.1f} MB {kept / count:11.0f} "
+                  f"{peak / 1024:12.0f} KB {seconds:7.2f} s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de reset_all_data
+Compara el borrado fila por fila (DELETE ... WHERE user_id = ?, el reset
+anterior) con el reset actual, que trunca las tablas cuando nadie más tiene
+datos en ellas, sobre --rows filas de habitos_dia (por defecto 1M):
+- un usuario con todo el historial (un archivo por usuario)
+- --users usuarios en el mismo archivo: reset de uno solo y de todos
+
+Cada caso parte de una copia de la misma base de datos.
+
+Uso:
+    python benchmarks/bench_reset.py [--rows 1000000] [--users 100]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database, USER_TABLES
+from bench_multiusuario import populate, HABITS
+
+
+def build(path, users, rows):
+    db = Database(path)
+    days = rows // (users * len(HABITS))
+    populate(db, 1, users + 1, days, 0.6)
+    return days * users * len(HABITS)
+
+
+def row_by_row(db, user_ids):
+    """Reset anterior: DELETE con WHERE user_id = ? en cada tabla, usuario por usuario"""
+    with db.get_connection() as conn:
+        for user_id in user_ids:
+            for table in USER_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        conn.commit()
+    conn.close()
+
+
+def timed(template, tmp, fn):
+    path = os.path.join(tmp, "run.db")
+    shutil.copyfile(template, path)
+    db = Database(path, ensure_schema=False)
+    start = time.perf_counter()
+    fn(db)
+    elapsed = time.perf_counter() - start
+    os.remove(path)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de reset_all_data")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_reset_")
+    try:
+        single = os.path.join(tmp, "single.db")
+        shared = os.path.join(tmp, "shared.db")
+        single_rows = build(single, 1, args.rows)
+        shared_rows = build(shared, args.users, args.rows)
+        all_ids = range(1, args.users + 1)
+
+        cases = [
+            (f"1 usuario, {single_rows} filas", single,
+             lambda db: row_by_row(db, [1]),
+             lambda db: db.reset_all_data()),
+            (f"1 de {args.users} usuarios, {shared_rows} filas", shared,
+             lambda db: row_by_row(db, [1]),
+             lambda db: db.reset_all_data()),
+            (f"{args.users} usuarios, {shared_rows} filas", shared,
+             lambda db: row_by_row(db, all_ids),
+             lambda db: db.reset_all_data(all_users=True)),
+        ]
+
+        print("=" * 78)
+        print(f"{'caso':<36} {'fila por fila':>14} {'reset actual':>13} {'mejora':>8}")
+        print("=" * 78)
+        for label, template, before, after in cases:
+            old = timed(template, tmp, before)
+            new = timed(template, tmp, after)
+            print(f"{label:<36} {old * 1000:11.1f} ms {new * 1000:10.1f} ms {old / new:7.1f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
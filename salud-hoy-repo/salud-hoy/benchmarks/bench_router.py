@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del router de bases de datos por usuario
+Simula peticiones de usuarios al azar (uniforme o 80/20) sobre 100, 10k y
+100k usuarios y compara abrir un Database por petición contra DatabaseRouter
+con caché LRU: ms por petición, tasa de aciertos y archivos creados.
+
+Cada petición es lo que hace la app en un toggle: marcar un hábito y leer el
+conteo del día. Solo se crean los archivos de los usuarios que reciben peticiones.
+
+Uso:
+    python benchmarks/bench_router.py [--users 100 10000 100000] [--requests 5000]
+                                      [--max-open 256] [--pattern uniform|hot]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+from app.db_router import DatabaseRouter
+
+
+def request_stream(users, requests, pattern, seed=7):
+    """Genera los IDs de usuario de cada petición"""
+    rng = random.Random(seed)
+    hot = max(1, users // 5)
+    for _ in range(requests):
+        if pattern == "hot" and rng.random() < 0.8:
+            # 80% de las peticiones van al 20% de los usuarios
+            yield rng.randint(1, hot)
+        else:
+            yield rng.randint(1, users)
+
+
+def handle(db, today):
+    db.set_habit_status(today, "camina_10", True)
+    return db.get_completed_count_for_day(today)
+
+
+def run_uncached(base_dir, stream, today):
+    """Abre (y prepara) un Database por petición"""
+    router = DatabaseRouter(base_dir)
+    start = time.perf_counter()
+    count = 0
+    for user_id in stream:
+        handle(Database(router.path_for(user_id), user_id=user_id), today)
+        count += 1
+    return (time.perf_counter() - start) * 1000.0 / count
+
+
+def run_router(base_dir, stream, today, max_open):
+    router = DatabaseRouter(base_dir, max_open=max_open)
+    start = time.perf_counter()
+    count = 0
+    for user_id in stream:
+        handle(router.get(user_id), today)
+        count += 1
+    elapsed = (time.perf_counter() - start) * 1000.0 / count
+    router.close_all()
+    return elapsed, router
+
+
+def count_files(base_dir):
+    return sum(len(files) for _, _, files in os.walk(base_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del router de bases de datos por usuario")
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--max-open", type=int, default=256)
+    parser.add_argument("--pattern", choices=["uniform", "hot"], default="hot")
+    args = parser.parse_args()
+
+    today = date.today().isoformat()
+    print("=" * 78)
+    print(f"  BENCHMARK ROUTER POR USUARIO ({args.requests} peticiones, patrón {args.pattern}, "
+          f"máx. abiertas {args.max_open})")
+    print("=" * 78)
+    print(f"{'usuarios':>9} {'archivos':>9} {'sin caché (ms)':>15} {'router frío (ms)':>17} "
+          f"{'router (ms)':>12} {'aciertos':>9}")
+    for users in args.users:
+        stream = list(request_stream(users, args.requests, args.pattern))
+        with tempfile.TemporaryDirectory() as tmp:
+            # Primera pasada: crea los archivos (incluye la creación perezosa)
+            cold_ms, _ = run_router(tmp, stream, today, args.max_open)
+            files = count_files(tmp)
+            # Con los archivos ya creados: abrir por petición vs. router
+            uncached_ms = run_uncached(tmp, stream, today)
+            warm_ms, router = run_router(tmp, stream, today, args.max_open)
+        print(f"{users:>9} {files:>9} {uncached_ms:>15.3f} {cold_ms:>17.3f} "
+              f"{warm_ms:>12.3f} {router.hit_rate():>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de llamadas repetidas a SessionManager.has_active_session
+Compara la implementación anterior (os.path.exists + abrir y parsear el JSON en
+cada llamada) contra la sesión en caché de SessionManager.
+
+Uso:
+    python benchmarks/bench_session.py [--calls 10000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.session_manager import SessionManager
+
+
+USER = {"id": 1, "name": "Usuario Benchmark", "email": "bench@example.com"}
+
+
+def legacy_has_active_session(path):
+    """has_active_session anterior: verifica el archivo y lo vuelve a parsear"""
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(path):
+        return False
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f) is not None
+
+
+def timed(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) * 1_000_000.0 / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de has_active_session")
+    parser.add_argument("--calls", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.json")
+        sm = SessionManager(path)
+        sm.save_session(USER)
+
+        print("=" * 70)
+        print(f"  BENCHMARK SESIÓN ({args.calls} llamadas)")
+        print("=" * 70)
+        print(f"{'has_active_session anterior':<35} {timed(lambda: legacy_has_active_session(path), args.calls):10.2f} µs")
+        print(f"{'has_active_session (primera)':<35} {timed(lambda: SessionManager(path).has_active_session(), 1):10.2f} µs")
+        print(f"{'has_active_session en caché':<35} {timed(sm.has_active_session, args.calls):10.2f} µs")
+        print(f"{'save_session atómico':<35} {timed(lambda: sm.save_session(USER), 50):10.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
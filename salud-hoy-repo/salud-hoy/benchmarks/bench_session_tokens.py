@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de validación de tokens de sesión con muchas sesiones guardadas
+Carga N sesiones en la tabla sessions de users.db y mide la latencia de
+AuthDatabase.validate_session (búsqueda por clave primaria) y de la poda
+de sesiones vencidas.
+
+Uso:
+    python benchmarks/bench_session_tokens.py [--sessions 1000000] [--lookups 2000]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth_database import AuthDatabase, SESSION_TTL
+
+
+def populate(auth_db, sessions, users, expired_ratio, seed=7):
+    """Inserta `sessions` sesiones sintéticas repartidas entre `users` usuarios"""
+    rng = random.Random(seed)
+    now = int(time.time())
+    with auth_db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO users (name, email, password) VALUES (?, ?, 'x')",
+            ((f"Usuario {i}", f"user{i}@example.com") for i in range(users)),
+        )
+        rows = []
+        for i in range(sessions):
+            expires = now - 1 if rng.random() < expired_ratio else now + SESSION_TTL
+            token_hash = hashlib.sha256(f"bench-{i}".encode()).hexdigest()
+            rows.append((token_hash, rng.randint(1, users), now, expires, now))
+            if len(rows) == 50000:
+                conn.executemany("INSERT INTO sessions VALUES (?, ?, ?, ?, ?)", rows)
+                rows = []
+        conn.executemany("INSERT INTO sessions VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de validación de tokens de sesión")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--expired", type=float, default=0.1, help="Proporción de sesiones vencidas")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        auth_db = AuthDatabase(os.path.join(tmp, "users.db"))
+        start = time.perf_counter()
+        populate(auth_db, args.sessions, args.users, args.expired)
+        load_s = time.perf_counter() - start
+
+        user_id = auth_db.get_user_by_email("user0@example.com")["id"]
+        token = auth_db.create_session(user_id)
+        rng = random.Random(1)
+
+        latencies = []
+        for _ in range(args.lookups):
+            # Mitad tokens válidos, mitad tokens desconocidos
+            candidate = token if rng.random() < 0.5 else f"desconocido-{rng.random()}"
+            t0 = time.perf_counter()
+            auth_db.validate_session(candidate)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        latencies.sort()
+
+        start = time.perf_counter()
+        pruned = auth_db.prune_expired_sessions()
+        prune_ms = (time.perf_counter() - start) * 1000.0
+
+        print("=" * 70)
+        print(f"  BENCHMARK TOKENS DE SESIÓN ({args.sessions} sesiones, {args.users} usuarios)")
+        print("=" * 70)
+        print(f"Carga de datos: {load_s:.1f} s")
+        print(f"{'validate_session mediana':<30} {statistics.median(latencies):10.3f} ms")
+        print(f"{'validate_session p99':<30} {latencies[int(len(latencies) * 0.99)]:10.3f} ms")
+        print(f"{'prune_expired_sessions':<30} {prune_ms:10.1f} ms ({pruned} sesiones)")
+
+
+if __name__ == "__main__":
+    main()
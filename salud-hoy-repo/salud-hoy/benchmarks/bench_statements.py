@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las sentencias preparadas
+Mide las consultas puntuales que la interfaz hace en cada refresco
+(get_completed_count_for_day, get_profile, validate_session) con una conexión
+por operación (cada llamada vuelve a preparar su consulta) y con la conexión
+persistente (la consulta sale de la caché de sentencias), más la tasa de
+aciertos de la caché que reporta statement_cache_stats.
+
+Uso:
+    python benchmarks/bench_statements.py [--calls 20000] [--users 50] [--days 365]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+from app.auth_database import AuthDatabase
+from bench_multiusuario import populate
+
+
+def timed(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las sentencias preparadas")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_statements_")
+    try:
+        db_path = os.path.join(tmp, "salud_hoy.db")
+        auth_path = os.path.join(tmp, "users.db")
+        populate(Database(db_path), 1, args.users + 1, args.days, 0.6)
+        auth = AuthDatabase(auth_path)
+        auth.add_user("Ana", "ana@example.com", "secreta123")
+        token = auth.create_session(auth.get_user_by_email("ana@example.com")["id"])
+        today = date.today().isoformat()
+
+        print("=" * 78)
+        print(f"{args.users} usuarios x {args.days} días, {args.calls} llamadas por consulta")
+        print("=" * 78)
+        print(f"{'consulta':<30} {'por operación':>14} {'persistente':>12} {'mejora':>8}")
+        results = {}
+        for persistent in (False, True):
+            db = Database(db_path, user_id=1, persistent=persistent, ensure_schema=False)
+            auth_db = AuthDatabase(auth_path, persistent=persistent)
+            results[persistent] = {
+                "get_completed_count_for_day": timed(lambda: db.get_completed_count_for_day(today), args.calls),
+                "get_profile": timed(db.get_profile, args.calls),
+                "validate_session": timed(lambda: auth_db.validate_session(token), args.calls),
+                "_stats": (db.statement_cache_stats(), auth_db.statement_cache_stats()),
+            }
+            db.close()
+            auth_db.close()
+
+        for name in ("get_completed_count_for_day", "get_profile", "validate_session"):
+            old, new = results[False][name], results[True][name]
+            print(f"{name:<30} {old:11.1f} µs {new:9.1f} µs {old / new:7.1f}x")
+
+        print("\nCaché de sentencias (hits / ejecuciones)")
+        for persistent, label in ((False, "por operación"), (True, "persistente")):
+            for db_name, stats in zip(("salud_hoy.db", "users.db"), results[persistent]["_stats"]):
+                print(f"  {label:<14} {db_name:<13} {stats['hits']:>7d} / {stats['executions']:<7d}"
+                      f" {stats['hit_rate'] * 100:6.1f}%")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de memoria de las consultas por rango de fechas
+Carga U usuarios con N años de historial y recorre el historial completo de
+cada usuario de dos formas, midiendo el pico de memoria con tracemalloc:
+- get_habits_for_date_range: arma el dict {día: {hábito: done}} completo
+- iter_habits_for_date_range: recorre las filas de a FETCH_SIZE (streaming)
+
+El pico del streaming debería mantenerse constante al crecer el rango.
+
+Uso:
+    python benchmarks/bench_streaming.py [--users 50] [--years 1 5 10]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+
+from bench_multiusuario import populate
+
+
+def measure(fn):
+    """Ejecuta fn() y retorna (resultado, ms, pico de memoria en KiB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memoria de las consultas por rango")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--density", type=float, default=0.7)
+    args = parser.parse_args()
+
+    today = date.today()
+    print("=" * 78)
+    print(f"  BENCHMARK STREAMING POR RANGO ({args.users} usuarios)")
+    print("=" * 78)
+    print(f"{'años':>5} {'filas':>10} {'dict (ms)':>10} {'dict (KiB)':>11} "
+          f"{'stream (ms)':>12} {'stream (KiB)':>13}")
+    for years in args.years:
+        days = years * 365
+        start = (today - timedelta(days=days)).isoformat()
+        end = today.isoformat()
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "bench.db"))
+            populate(db, 1, args.users + 1, days, args.density)
+            users = [db.for_user(u) for u in range(1, args.users + 1)]
+
+            def full():
+                rows = 0
+                for view in users:
+                    result = view.get_habits_for_date_range(start, end)
+                    rows += sum(len(habits) for habits in result.values())
+                return rows
+
+            def stream():
+                rows = 0
+                for view in users:
+                    for _ in view.iter_habits_for_date_range(start, end):
+                        rows += 1
+                return rows
+
+            rows, dict_ms, dict_kib = measure(full)
+            stream_rows, stream_ms, stream_kib = measure(stream)
+            assert rows == stream_rows
+        print(f"{years:>5} {rows:>10} {dict_ms:>10.1f} {dict_kib:>11.1f} "
+              f"{stream_ms:>12.1f} {stream_kib:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
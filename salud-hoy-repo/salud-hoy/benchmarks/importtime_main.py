@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Reporte de tiempo de import de app.main
+Ejecuta `python -X importtime -c "import app.main"` en procesos nuevos (import en frío)
+y muestra los módulos más costosos y el total.
+
+Uso:
+    python benchmarks/importtime_main.py [--runs 5] [--top 20] [--module app.main]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+# Directorio salud-hoy/ (contiene el paquete app)
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_importtime(module="app.main"):
+    """
+    Importa el módulo en un proceso nuevo con -X importtime
+    :return: Lista de (self_us, cumulative_us, nombre) en el orden del reporte
+    """
+    env = dict(os.environ)
+    # Evitar que Kivy procese argumentos o escriba logs a archivo
+    env.setdefault("KIVY_NO_ARGS", "1")
+    env.setdefault("KIVY_NO_FILELOG", "1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def cold_import_ms(module="app.main", runs=3):
+    """
+    Mide el tiempo acumulado de import en frío del módulo
+    :return: El mejor tiempo (ms) de las corridas, el menos afectado por ruido
+    """
+    best = None
+    for _ in range(runs):
+        rows = run_importtime(module)
+        total = next(cum for _, cum, name in reversed(rows) if name.strip() == module)
+        best = total if best is None else min(best, total)
+    return best / 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de import en frío de app.main")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = run_importtime(args.module)
+    print("=" * 70)
+    print(f"  IMPORT TIME - {args.module}")
+    print("=" * 70)
+    print(f"{'acumulado (ms)':>15} {'propio (ms)':>12}  módulo")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:15.1f} {self_us / 1000:12.1f}  {name}")
+
+    kivymd_modules = sorted({name.strip() for _, _, name in rows if name.strip().startswith("kivymd.")})
+    print(f"\nMódulos kivymd importados: {len(kivymd_modules)}")
+    print(f"Mejor import en frío ({args.runs} corridas): {cold_import_ms(args.module, args.runs):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
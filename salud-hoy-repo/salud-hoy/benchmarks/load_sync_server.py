@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga del servidor de sincronización
+Crea usuarios con sesión, abre C clientes concurrentes (conexiones keep-alive)
+y durante D segundos envía una mezcla de lecturas y toggles. Reporta
+peticiones por segundo, latencia p50/p99 y el tamaño medio de los lotes de
+escritura.
+
+Por defecto levanta una instancia local en un directorio temporal; con --port
+se usa una instancia ya en ejecución (los usuarios bench<N>@example.com deben
+existir con la contraseña --password).
+
+Uso:
+    python benchmarks/load_sync_server.py [--clients 32] [--users 200] [--duration 10]
+                                          [--write-ratio 0.3] [--port 8765]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.sync_server import SyncServer
+
+
+HABITS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+async def request(reader, writer, method, path, token=None, body=None):
+    """Envía una petición HTTP/1.1 keep-alive y retorna (status, json)"""
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + data)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def login_all(host, port, users, password):
+    reader, writer = await asyncio.open_connection(host, port)
+    tokens = []
+    for i in range(users):
+        status, payload = await request(reader, writer, "POST", "/login", body={
+            "email": f"bench{i}@example.com", "password": password})
+        if status != 200:
+            raise SystemExit(f"[ERROR] No se pudo iniciar sesión con bench{i}@example.com: {payload}")
+        tokens.append(payload["token"])
+    writer.close()
+    return tokens
+
+
+async def client(host, port, tokens, deadline, write_ratio, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    today = date.today()
+    while time.perf_counter() < deadline:
+        token = rng.choice(tokens)
+        day = (today - timedelta(days=rng.randint(0, 6))).isoformat()
+        start = time.perf_counter()
+        if rng.random() < write_ratio:
+            status, _ = await request(reader, writer, "PUT", f"/days/{day}/habits/{rng.choice(HABITS)}",
+                                      token, {"done": rng.random() < 0.5})
+        elif rng.random() < 0.5:
+            status, _ = await request(reader, writer, "GET", f"/days/{day}", token)
+        else:
+            status, _ = await request(reader, writer, "GET", f"/stats?date={day}", token)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        if status != 200:
+            errors.append(status)
+    writer.close()
+
+
+async def run_load(host, port, args):
+    tokens = await login_all(host, port, args.users, args.password)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        client(host, port, tokens, deadline, args.write_ratio, latencies, errors, seed)
+        for seed in range(args.clients)
+    ))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor de sincronización")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="Usar una instancia ya en ejecución")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--password", default="bench123")
+    args = parser.parse_args()
+
+    server = None
+    tmp = None
+    port = args.port
+    if port is None:
+        tmp = tempfile.TemporaryDirectory()
+        server = SyncServer(tmp.name, port=0)
+        for i in range(args.users):
+            server.auth_db.add_user(f"Bench {i}", f"bench{i}@example.com", args.password)
+        server.start_in_thread()
+        port = server.port
+
+    try:
+        latencies, errors, elapsed = asyncio.run(run_load(args.host, port, args))
+    finally:
+        if server is not None:
+            server.stop_thread()
+            tmp.cleanup()
+
+    latencies.sort()
+    print("=" * 70)
+    print(f"  PRUEBA DE CARGA SERVIDOR DE SINCRONIZACIÓN ({args.clients} clientes, "
+          f"{args.users} usuarios, {args.write_ratio:.0%} escrituras)")
+    print("=" * 70)
+    print(f"{'peticiones':<25} {len(latencies):>10}")
+    print(f"{'errores':<25} {len(errors):>10}")
+    print(f"{'peticiones/s':<25} {len(latencies) / elapsed:>10.0f}")
+    print(f"{'latencia p50 (ms)':<25} {latencies[len(latencies) // 2]:>10.2f}")
+    print(f"{'latencia p99 (ms)':<25} {latencies[int(len(latencies) * 0.99)]:>10.2f}")
+    if server is not None and server.batcher.batches:
+        print(f"{'cambios por lote':<25} {server.batcher.writes / server.batcher.batches:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,79 @@
 PRAGMA foreign_keys = ON;
 
--- Perfil único de la app
+-- Perfil de cada usuario (user_id = id de users.db)
 CREATE TABLE IF NOT EXISTS usuario_perfil(
-  id INTEGER PRIMARY KEY CHECK (id = 1),
+  user_id INTEGER PRIMARY KEY,
   name TEXT NOT NULL DEFAULT '',
   goal TEXT NOT NULL DEFAULT 'Moverme más',
-  created_at DATETIME NOT NULL DEFAULT (datetime('now'))
+  created_at DATETIME NOT NULL DEFAULT (datetime('now')),
+  updated_at INTEGER NOT NULL DEFAULT 0,  -- ms (epoch) de la última escritura, para last-writer-wins
+  seq INTEGER NOT NULL DEFAULT 0          -- número de cambio local (0 = anterior al registro de cambios)
 );
 
--- Catálogo de hábitos
+-- Catálogo de hábitos (compartido por todos los usuarios)
 CREATE TABLE IF NOT EXISTS habito(
   key TEXT PRIMARY KEY,                  -- ej: camina_10
   title TEXT NOT NULL,                   -- ej: Camina 10 minutos
   is_active INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0,1))
 );
 
--- Días (YYYY-MM-DD)
+-- Días (YYYY-MM-DD) de cada usuario
 CREATE TABLE IF NOT EXISTS dia(
-  day_date TEXT PRIMARY KEY              -- ISO: 2025-10-08
+  user_id INTEGER NOT NULL,
+  day_date TEXT NOT NULL,                -- ISO: 2025-10-08
+  PRIMARY KEY (user_id, day_date)
 );
 
--- Estado de hábitos por día (M:N)
+-- Estado de hábitos por usuario y día (M:N)
 CREATE TABLE IF NOT EXISTS habitos_dia(
+  user_id INTEGER NOT NULL,
   day_date TEXT NOT NULL,
   habit_key TEXT NOT NULL,
   done INTEGER NOT NULL DEFAULT 0 CHECK (done IN (0,1)),
-  PRIMARY KEY (day_date, habit_key),
-  FOREIGN KEY (day_date)  REFERENCES dia(day_date)   ON DELETE CASCADE,
+  updated_at INTEGER NOT NULL DEFAULT 0, -- ms (epoch) de la última escritura, para last-writer-wins
+  seq INTEGER NOT NULL DEFAULT 0,        -- número de cambio local (0 = anterior al registro de cambios)
+  PRIMARY KEY (user_id, day_date, habit_key),
+  FOREIGN KEY (user_id, day_date) REFERENCES dia(user_id, day_date) ON DELETE CASCADE,
   FOREIGN KEY (habit_key) REFERENCES habito(key)      ON DELETE CASCADE
 );
 
+-- Medallas desbloqueadas (se escribe la primera vez que cada usuario desbloquea cada medalla)
+CREATE TABLE IF NOT EXISTS badge_unlock(
+  user_id INTEGER NOT NULL,
+  badge_key TEXT NOT NULL,               -- ej: streak_7
+  day_date TEXT NOT NULL,                -- día cuyo registro la desbloqueó
+  unlocked_at DATETIME NOT NULL DEFAULT (datetime('now')),
+  PRIMARY KEY (user_id, badge_key)
+);
+
+-- Contador de cambios: cada transacción que escribe toma el siguiente número
+-- (changes_since(seq) retorna las filas con un número mayor)
+CREATE TABLE IF NOT EXISTS change_seq(
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  value INTEGER NOT NULL
+);
+
+-- Bandeja de salida de la sincronización: cambios de hábitos aún no enviados
+-- al servidor. Un cambio nuevo del mismo (día, hábito) reemplaza al pendiente.
+CREATE TABLE IF NOT EXISTS sync_outbox(
+  user_id INTEGER NOT NULL,
+  day_date TEXT NOT NULL,
+  habit_key TEXT NOT NULL,
+  done INTEGER NOT NULL,
+  updated_at INTEGER NOT NULL,
+  queued_at INTEGER NOT NULL,  -- ms (epoch) del primer cambio pendiente (antigüedad de la cola)
+  PRIMARY KEY (user_id, day_date, habit_key)
+);
+
 -- Índices útiles
-CREATE INDEX IF NOT EXISTS idx_habitos_dia_done   ON habitos_dia(done);
+-- (user_id, done, day_date) sirve a los conteos por día, rango y racha de un usuario
+-- sin leer los registros de los demás usuarios
+CREATE INDEX IF NOT EXISTS idx_habitos_dia_user_done_day ON habitos_dia(user_id, done, day_date);
 CREATE INDEX IF NOT EXISTS idx_habitos_dia_habit  ON habitos_dia(habit_key);
+CREATE INDEX IF NOT EXISTS idx_habitos_dia_user_seq ON habitos_dia(user_id, seq);
 
 -- Datos base
-INSERT OR IGNORE INTO usuario_perfil(id, name, goal) VALUES (1, '', 'Moverme más');
+INSERT OR IGNORE INTO change_seq(id, value) VALUES (1, 0);
 
 INSERT OR IGNORE INTO habito(key, title, is_active) VALUES
 ('camina_10','Camina 10 minutos',1),
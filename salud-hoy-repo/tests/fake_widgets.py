@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Widgets en memoria para las pruebas de Salud Hoy
+Reemplazan a los widgets KivyMD de la grilla de medallas (ver app.badges_ui) en
+test_medallas_ui.py y en benchmarks/bench_badges_ui.py: no abren ventana ni
+importan KivyMD.
+"""
+
+
+class FakeWidget:
+    """Widget mínimo en memoria"""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+        self.children = []
+
+    def add_widget(self, widget):
+        self.children.append(widget)
+
+    def clear_widgets(self):
+        self.children = []
+
+
+class FakeBadgeFactory:
+    """Fábrica de la grilla de medallas que cuenta los widgets creados y registra las modificaciones"""
+
+    def __init__(self):
+        self.created = 0
+        # Modificaciones en orden: ("chip", texto), ("icon", ícono, unlocked), ("title", texto)
+        self.calls = []
+
+    def make_chip(self, text):
+        self.created += 1
+        return FakeWidget(text=text)
+
+    def set_chip_text(self, chip, text):
+        self.calls.append(("chip", text))
+        chip.text = text
+
+    def make_tile(self, badge):
+        self.created += 3
+        icon = FakeWidget(icon=badge["icon"], unlocked=badge["unlocked"])
+        title = FakeWidget(text=badge["title"])
+        tile = FakeWidget()
+        tile.add_widget(icon)
+        tile.add_widget(title)
+        return tile, icon, title
+
+    def set_unlocked(self, icon, unlocked):
+        self.calls.append(("icon", icon.icon, unlocked))
+        icon.unlocked = unlocked
+
+    def set_title(self, title, text):
+        self.calls.append(("title", text))
+        title.text = text
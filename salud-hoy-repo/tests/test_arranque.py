@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de arranque para Salud Hoy
+Valida el arranque por etapas: primer frame desde la sesión en caché,
+apertura de bases de datos en segundo plano e hidratación de la UI
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+from unittest.mock import patch, Mock
+
+# Importar las clases principales
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.main import SaludHoyApp
+from app.database import Database
+from app.auth_database import AuthDatabase
+from app.startup_trace import StartupTrace
+
+
+class TestStartupTrace:
+    """Clase para probar la traza de arranque"""
+
+    def test_etapas_registradas(self):
+        """Prueba que cada etapa registre su inicio y duración en ms"""
+        ticks = iter([0.0, 0.010, 0.030, 0.030, 0.045])
+        trace = StartupTrace(enabled=False, clock=lambda: next(ticks))
+
+        with trace.stage("build_kv"):
+            pass
+        with trace.stage("first_frame"):
+            pass
+
+        nombres = [s[0] for s in trace.stages]
+        assert nombres == ["build_kv", "first_frame"], "Las etapas deberían registrarse en orden"
+        assert trace.stages[0][1] == pytest.approx(10.0), "build_kv debería empezar a los 10 ms"
+        assert trace.stages[0][2] == pytest.approx(20.0), "build_kv debería durar 20 ms"
+        assert trace.total_ms() == pytest.approx(45.0), "El total debería ser 45 ms"
+
+    def test_reporte_solo_en_modo_debug(self, capsys):
+        """Prueba que la traza solo se imprima con el flag de debug"""
+        trace = StartupTrace(enabled=False)
+        trace.mark("ready")
+        trace.report()
+        assert capsys.readouterr().out == "", "Sin debug no debería imprimirse nada"
+
+        trace.enabled = True
+        trace.report()
+        salida = capsys.readouterr().out
+        assert "[STARTUP]" in salida, "Con debug debería imprimirse la línea de tiempo"
+        assert "ready" in salida, "El reporte debería incluir las etapas"
+
+    def test_flag_desde_variable_de_entorno(self):
+        """Prueba que SALUD_HOY_DEBUG_STARTUP active la traza"""
+        with patch.dict(os.environ, {"SALUD_HOY_DEBUG_STARTUP": "1"}):
+            assert StartupTrace().enabled is True
+        with patch.dict(os.environ, {"SALUD_HOY_DEBUG_STARTUP": "0"}):
+            assert StartupTrace().enabled is False
+
+
+class TestArranquePorEtapas:
+    """Clase para probar el pipeline de arranque de la app"""
+
+    @pytest.fixture
+    def temp_app(self):
+        """Crea una aplicación temporal con rutas de bases de datos aisladas"""
+        temp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(temp_dir, "test_salud_hoy.db")
+        auth_db_path = os.path.join(temp_dir, "test_users.db")
+
+        with patch('kivymd.app.MDApp.__init__', return_value=None), \
+             patch('app.main.toast'), \
+             patch.object(SaludHoyApp, '_database_paths', return_value=(db_path, auth_db_path)):
+
+            app = SaludHoyApp()
+            app.startup_trace = StartupTrace(enabled=False)
+            app.session_manager = Mock()
+
+            # Mock del root y screen_manager
+            app.root = Mock()
+            app.root.ids = Mock()
+            app.root.ids.screen_manager = Mock()
+            app.root.ids.screen_manager.current = "login"
+
+            yield app, db_path, auth_db_path
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_primer_frame_sin_abrir_bases_de_datos(self, temp_app):
+        """Prueba que on_start muestre la pantalla principal desde el token en caché sin abrir bases de datos"""
+        app, db_path, auth_db_path = temp_app
+
+        with patch('app.main.SessionManager') as mock_sm, \
+             patch('app.main.threading.Thread') as mock_thread:
+            mock_sm.return_value.load_token.return_value = "token-en-cache"
+            app.on_start()
+
+        assert app.root.ids.screen_manager.current == "main", "Debería mostrar la pantalla principal de inmediato"
+        assert mock_thread.call_args.kwargs["args"] == ("token-en-cache",), "El token debería validarse en el hilo"
+        assert app.db is None, "La base de datos no debería abrirse en el hilo principal"
+        assert app.is_loading is True, "Los toggles deberían ignorarse hasta hidratar la UI"
+        assert not os.path.exists(db_path), "El archivo de base de datos no debería crearse antes del hilo"
+        mock_thread.return_value.start.assert_called_once()
+
+    def test_primer_frame_sin_sesion(self, temp_app):
+        """Prueba que sin sesión en caché se muestre el login"""
+        app, db_path, auth_db_path = temp_app
+
+        with patch('app.main.SessionManager') as mock_sm, \
+             patch('app.main.threading.Thread'):
+            mock_sm.return_value.load_token.return_value = None
+            app.on_start()
+
+        assert app.root.ids.screen_manager.current == "login", "Sin sesión debería mostrarse el login"
+
+    def test_apertura_valida_sesion(self, temp_app):
+        """Prueba que la apertura en segundo plano valide el token de la sesión"""
+        app, db_path, auth_db_path = temp_app
+        auth = AuthDatabase(auth_db_path)
+        auth.add_user("Usuario Test", "test@example.com", "password123")
+        token = auth.create_session(auth.get_user_by_email("test@example.com")["id"])
+
+        db, auth_db, user = app._open_databases(token)
+
+        assert isinstance(db, Database), "Debería abrirse la base de datos de hábitos"
+        assert isinstance(auth_db, AuthDatabase), "Debería abrirse la base de datos de usuarios"
+        assert user is not None and user["name"] == "Usuario Test", "El usuario de la sesión debería validarse"
+        nombres = [s[0] for s in app.startup_trace.stages]
+        assert "open_database" in nombres and "validate_session" in nombres, "Las etapas deberían trazarse"
+
+    def test_hidratacion_sesion_invalida(self, temp_app):
+        """Prueba que un token desconocido vuelva al login"""
+        app, db_path, auth_db_path = temp_app
+        token = "token-desconocido"
+        app.root.ids.screen_manager.current = "main"
+
+        db, auth_db, user = app._open_databases(token)
+        app._hydrate(db, auth_db, token, user)
+
+        assert user is None, "El token no debería ser válido"
+        assert app.root.ids.screen_manager.current == "login", "Debería volver al login"
+        assert app.current_user is None, "No debería quedar usuario actual"
+        app.session_manager.clear_session.assert_called_once()
+        assert app.is_loading is False, "La UI debería quedar habilitada tras hidratar"
+
+    def test_hidratacion_sesion_valida(self, temp_app):
+        """Prueba que la hidratación cargue el perfil y refresque la UI"""
+        app, db_path, auth_db_path = temp_app
+        auth = AuthDatabase(auth_db_path)
+        auth.add_user("Usuario Test", "test@example.com", "password123")
+        token = auth.create_session(auth.get_user_by_email("test@example.com")["id"])
+
+        db, auth_db, user = app._open_databases(token)
+        with patch.object(app, 'refresh_ui') as mock_refresh:
+            app._hydrate(db, auth_db, token, user)
+
+        assert app.db.db_path == db.db_path, "La base de datos abierta debería conectarse a la app"
+        assert app.db.user_id == user["id"], "Los datos deberían limitarse al usuario de la sesión"
+        assert app.current_user["email"] == "test@example.com", "El usuario validado debería ser el actual"
+        assert "profile" in app.user_data, "El perfil debería cargarse"
+        mock_refresh.assert_called_once()
+        assert "ready" in [s[0] for s in app.startup_trace.stages], "Debería marcarse el fin del arranque"
+
+    def test_error_al_abrir_permite_reintentar(self, temp_app):
+        """Prueba que un error al abrir las bases de datos habilite la UI y permita reintentar"""
+        app, db_path, auth_db_path = temp_app
+        app.is_loading = True
+        app.root.ids.screen_manager.current = "main"
+
+        with patch.object(app, '_open_databases', side_effect=OSError("disco lleno")), \
+             patch('app.main.Clock.schedule_once', side_effect=lambda fn, *_: fn(0)):
+            app._open_databases_async("token-en-cache")
+
+        assert app.is_loading is False, "La UI no debería quedar cargando para siempre"
+        assert app.root.ids.screen_manager.current == "login", "Debería volver al login"
+        assert app.db is None, "No debería quedar una base de datos a medio abrir"
+
+        app.session_manager.load_token.return_value = "token-en-cache"
+        with patch('app.main.threading.Thread') as mock_thread:
+            assert app._databases_ready() is False
+            assert app.is_loading is True, "El reintento debería volver a ignorar los toggles"
+            assert app._databases_ready() is False
+        mock_thread.assert_called_once()
+        assert mock_thread.call_args.kwargs["args"] == ("token-en-cache",), "Debería reintentar con la sesión guardada"
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de las copias de seguridad para Salud Hoy
+Valida la copia incremental con la API de backup de SQLite (también con
+escrituras concurrentes), la restauración, la rotación de instantáneas y su
+programación
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import shutil
+from unittest.mock import patch, Mock
+from datetime import date, timedelta
+
+# Importar las clases de base de datos y las copias
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.auth_database import AuthDatabase
+from app.backup import (backup_database, list_snapshots, snapshot, SnapshotScheduler, main)
+from app.badges import BadgeEngine
+from app.main import SaludHoyApp
+
+
+HABITOS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+def _llenar(db, dias=500):
+    inicio = date(2024, 1, 1)
+    db.import_habit_rows([
+        (db.user_id, (inicio + timedelta(days=i)).isoformat(), key, i % 2 == 0)
+        for i in range(dias) for key in HABITOS
+    ])
+
+
+def _filas(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT * FROM habitos_dia ORDER BY user_id, day_date, habit_key").fetchall()
+    finally:
+        conn.close()
+
+
+class TestCopias:
+    """Clase para probar las copias de seguridad"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal con 500 días de historial"""
+        temp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(temp_dir, "salud_hoy.db")
+        db = Database(db_path)
+        _llenar(db)
+
+        yield db, temp_dir
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_copia_incremental(self, temp_db):
+        """Prueba que la copia por pasos sea idéntica y no deje archivos temporales"""
+        db, temp_dir = temp_db
+        dest = os.path.join(temp_dir, "copia", "salud_hoy.db")
+        pasos = []
+        result = db.backup(dest, pages_per_step=8, progress=lambda hechas, total: pasos.append(hechas))
+
+        assert _filas(dest) == _filas(db.db_path), "La copia debería tener las mismas filas"
+        assert result["steps"] > 1 and result["steps"] == len(pasos), "Debería copiarse en varios pasos"
+        assert pasos[-1] == result["pages"], "El último paso debería completar todas las páginas"
+        assert result["restarts"] == 0 and not result["fallback"]
+        assert not os.path.exists(dest + ".part"), "No debería quedar el archivo temporal"
+
+    def test_escritura_durante_la_copia(self, temp_db):
+        """Prueba que una escritura de otra conexión a mitad de la copia quede incluida"""
+        db, temp_dir = temp_db
+        dest = os.path.join(temp_dir, "copia.db")
+        escrito = []
+
+        def escribir(hechas, total):
+            # Escribe una vez, cuando la copia ya avanzó
+            if hechas > total // 2 and not escrito:
+                db.set_habit_status("2030-01-01", "camina_10", True)
+                escrito.append(True)
+
+        result = db.backup(dest, pages_per_step=4, progress=escribir)
+        assert result["restarts"] >= 1, "La escritura debería reiniciar la copia"
+        assert _filas(dest) == _filas(db.db_path), "La copia debería incluir la escritura"
+
+        # Con max_restarts=0 se copia el resto en un solo paso
+        escrito.clear()
+        db.set_habit_status("2030-01-02", "camina_10", True)
+        result = backup_database(db.db_path, dest, pages_per_step=4, max_restarts=0, progress=escribir)
+        assert result["fallback"], "Debería copiar en un solo paso tras el reinicio"
+        assert _filas(dest) == _filas(db.db_path)
+
+    def test_restaurar(self, temp_db):
+        """Prueba que restore vuelva al estado de la copia, también con conexión persistente"""
+        db, temp_dir = temp_db
+        dest = os.path.join(temp_dir, "copia.db")
+        db.backup(dest)
+        original = _filas(db.db_path)
+
+        persistente = Database(db.db_path, persistent=True)
+        persistente.reset_all_data()
+        assert persistente.get_completed_count_for_range("2024-01-01", "2025-12-31") == 0
+
+        persistente.restore(dest)
+        assert _filas(db.db_path) == original, "Debería volver al contenido de la copia"
+        assert persistente.get_completed_count_for_range("2024-01-01", "2025-12-31") > 0, \
+            "La conexión persistente debería ver los datos restaurados"
+        persistente.close()
+
+    def test_restaurar_descarta_caches(self, temp_db):
+        """Prueba que restore descarte las métricas de medallas y que la app recargue la UI"""
+        db, temp_dir = temp_db
+        dest = os.path.join(temp_dir, "copia.db")
+        db.backup(dest)
+
+        vista = db.for_user(db.user_id)
+        engine = BadgeEngine(vista, today=lambda: date(2025, 5, 14))
+        total = engine.metric("total_active_days")
+        assert total > 0
+        vista.reset_all_data()
+        engine.metric("total_active_days")
+        calculos = engine.compute_counts["total_active_days"]
+
+        # restore desde otra instancia del mismo archivo también avisa a la vista
+        db.restore(dest)
+        assert engine.metric("total_active_days") == total, "La métrica debería leerse de la copia"
+        assert engine.compute_counts["total_active_days"] == calculos + 1, "La métrica debería recalcularse"
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.restore(dest)
+
+        with patch('kivymd.app.MDApp.__init__', return_value=None), \
+             patch('app.main.toast'):
+            app = SaludHoyApp()
+            app.root = Mock()
+            app.db, app.auth_db = vista, Mock()
+            with patch.object(app, 'refresh_ui') as refresh:
+                assert app.restore_snapshot(dest) is True
+            refresh.assert_called_once()
+            assert app.restore_snapshot(os.path.join(temp_dir, "no_existe.db")) is False
+
+    def test_restaurar_copia_danada(self, temp_db):
+        """Prueba que una copia dañada no reemplace a la base de datos"""
+        db, temp_dir = temp_db
+        danada = os.path.join(temp_dir, "danada.db")
+        with open(danada, "wb") as f:
+            f.write(b"esto no es una base de datos" * 200)
+        original = _filas(db.db_path)
+
+        with pytest.raises((ValueError, sqlite3.DatabaseError)):
+            db.restore(danada)
+        assert _filas(db.db_path) == original, "La base de datos no debería cambiar"
+
+    def test_usuarios(self, temp_db):
+        """Prueba la copia y restauración de users.db"""
+        _, temp_dir = temp_db
+        auth = AuthDatabase(os.path.join(temp_dir, "users.db"))
+        auth.add_user("Ana", "ana@example.com", "secreta123")
+        dest = os.path.join(temp_dir, "users-copia.db")
+        auth.backup(dest)
+
+        auth.add_user("Luis", "luis@example.com", "secreta123")
+        assert auth.get_user_count() == 2
+        auth.restore(dest)
+        assert auth.get_user_count() == 1, "Debería volver a la copia"
+        assert auth.check_user("ana@example.com", "secreta123")
+
+    def test_rotacion(self, temp_db):
+        """Prueba que las instantáneas se ordenen por fecha y se conserven las últimas"""
+        db, temp_dir = temp_db
+        backups = os.path.join(temp_dir, "backups")
+        base = 1750000000.0
+        for dia in range(3):
+            result = snapshot(db.db_path, backups, keep=2, now=base + dia * 86400)
+        assert len(result["removed"]) == 1, "Debería borrar la instantánea más vieja"
+
+        rutas = list_snapshots(backups, db.db_path)
+        assert len(rutas) == 2
+        assert rutas[-1] == result["path"], "La más nueva debería ir al final"
+        assert list_snapshots(backups, os.path.join(temp_dir, "users.db")) == []
+
+    def test_programacion(self, temp_db):
+        """Prueba que las instantáneas programadas respeten el intervalo"""
+        db, temp_dir = temp_db
+        backups = os.path.join(temp_dir, "backups")
+        ahora = [1750000000.0]
+        programa = SnapshotScheduler([db.db_path], backups, keep=3, interval=3600, clock=lambda: ahora[0])
+
+        assert programa.tick(), "Sin instantáneas previas debería guardar una"
+        programa.join()
+        assert len(programa.results) == 1 and os.path.exists(programa.results[0]["path"])
+        ahora[0] += 60
+        assert not programa.tick(), "No debería repetirse antes del intervalo"
+        ahora[0] += 3600
+        assert programa.tick()
+        programa.join()
+        assert len(list_snapshots(backups, db.db_path)) == 2
+
+        # Un arranque nuevo cuenta el intervalo desde la instantánea más nueva del disco
+        nuevo = SnapshotScheduler([db.db_path], backups, interval=3600)
+        assert not nuevo.is_due(), "No debería repetir la instantánea recién guardada"
+
+    def test_consola(self, temp_db, capsys):
+        """Prueba los comandos snapshot, list y restore"""
+        db, temp_dir = temp_db
+        backups = os.path.join(temp_dir, "backups")
+        assert main(["--dir", backups, "snapshot", "--db", db.db_path]) == 0
+        copia = list_snapshots(backups, db.db_path)[-1]
+        original = _filas(db.db_path)
+
+        db.reset_all_data()
+        assert main(["--dir", backups, "restore", copia, "--db", db.db_path]) == 0
+        assert _filas(db.db_path) == original
+        assert len(list_snapshots(backups, db.db_path)) == 2, "Debería guardar el estado previo a restaurar"
+
+        assert main(["--dir", backups, "list"]) == 0
+        assert os.path.basename(copia) in capsys.readouterr().out
+        assert main(["--dir", backups, "restore", os.path.join(temp_dir, "no_existe.db")]) == 1
@@ -269,3 +269,29 @@ class TestDatabase:
         profile_after = db.get_profile()
         assert profile_after["name"] == "", "El nombre debería estar vacío después del reset"
         assert profile_after["goal"] == "Moverme más", "El objetivo debería ser el por defecto después del reset"
+
+    def test_registros_livianos(self, temp_db):
+        """Prueba los registros con __slots__ y su compatibilidad con dicts"""
+        db, db_path = temp_db
+        
+        profile = db.get_profile()
+        assert isinstance(profile, Profile) and not hasattr(profile, "__dict__"), \
+            "El perfil debería ser un registro sin __dict__"
+        assert profile.name == profile["name"] == profile.get("name") == ""
+        assert profile == {"name": "", "goal": "Moverme más"}, "Debería compararse igual que el dict"
+        
+        # main.py edita el perfil como dict
+        profile["name"] = "Ana"
+        assert profile.name == "Ana"
+        with pytest.raises(KeyError):
+            profile["edad"]
+        assert profile.get("edad", 0) == 0
+        
+        habits = db.get_habits()
+        assert {h.key for h in habits} == {h["key"] for h in habits}
+        assert dict(habits[0]) == habits[0].to_dict(), "dict() debería aceptar el registro"
+        
+        db.set_habit_status("2025-01-15", "camina_10", True)
+        fila = next(db.iter_habits_for_date_range("2025-01-01", "2025-01-31"))
+        assert fila == ("2025-01-15", "camina_10", True), "Las filas siguen siendo tuplas"
+        assert fila.habit_key == "camina_10" and fila.done is True
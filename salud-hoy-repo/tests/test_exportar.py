@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de exportación del historial para Salud Hoy
+Valida los formatos CSV, JSON Lines y columnar, el filtro por fechas,
+la exportación de varios usuarios y la partición en un archivo por usuario
+"""
+
+import pytest
+import os
+import csv
+import json
+import tempfile
+import shutil
+from datetime import date, timedelta
+
+# Importar las clases de base de datos y exportación
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.exporter import export_history, read_columnar, COLUMNS
+
+
+INICIO = date(2024, 12, 20)
+HABITOS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+class TestExportar:
+    """Clase para probar la exportación del historial"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal con dos usuarios y 30 días de historial"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"))
+        for user_id in (1, 2):
+            view = db.for_user(user_id)
+            with view.transaction():
+                for i in range(30):
+                    day = (INICIO + timedelta(days=i)).isoformat()
+                    for j, key in enumerate(HABITOS):
+                        if (i + j + user_id) % 3:
+                            view.set_habit_status(day, key, (i + j) % 2 == 0)
+
+        yield db, temp_dir
+
+        try:
+            db.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def esperado(self, db, **kwargs):
+        return [tuple(r[:4]) + (bool(r[4]),) for r in db.iter_habit_history(**kwargs)]
+
+    def test_csv(self, temp_db):
+        """Prueba que el CSV tenga encabezado y todas las filas del usuario"""
+        db, temp_dir = temp_db
+        out = os.path.join(temp_dir, "historial.csv")
+        result = export_history(db, out, "csv", chunk_size=7)
+
+        with open(out, encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        assert tuple(rows[0]) == COLUMNS, "La primera fila debería ser el encabezado"
+        assert result["rows"] == len(rows) - 1 == len(self.esperado(db)), "Deberían exportarse todas las filas"
+        assert {r[0] for r in rows[1:]} == {"1"}, "Solo deberían exportarse las filas del usuario"
+        titulos = {h["key"]: h["title"] for h in db.get_habits(False)}
+        assert all(r[3] == titulos[r[2]] for r in rows[1:]), "Debería incluirse el título del hábito"
+        assert result["bytes"] == os.path.getsize(out) and result["rows_per_sec"] > 0
+
+    def test_jsonl_con_filtro_de_fechas(self, temp_db):
+        """Prueba JSON Lines y el filtro por rango de fechas"""
+        db, temp_dir = temp_db
+        out = os.path.join(temp_dir, "historial.jsonl")
+        export_history(db, out, "jsonl", start_date="2025-01-01", end_date="2025-01-05")
+
+        with open(out, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        assert rows, "Debería haber filas en el rango"
+        assert all("2025-01-01" <= r["day_date"] <= "2025-01-05" for r in rows), "Solo deberían exportarse fechas del rango"
+        assert isinstance(rows[0]["done"], bool), "done debería exportarse como booleano"
+        assert len(rows) == len(self.esperado(db, start_date="2025-01-01", end_date="2025-01-05"))
+
+    def test_columnar_ida_y_vuelta(self, temp_db):
+        """Prueba que el formato columnar se lea igual que la base de datos"""
+        db, temp_dir = temp_db
+        out = os.path.join(temp_dir, "historial.shc")
+        export_history(db, out, "columnar", all_users=True, chunk_size=13)
+
+        assert list(read_columnar(out)) == self.esperado(db, all_users=True), \
+            "Leer el archivo columnar debería devolver las mismas filas"
+
+    def test_columnar_mas_chico_que_csv(self, temp_db):
+        """Prueba que el formato columnar ocupe menos que el CSV"""
+        db, temp_dir = temp_db
+        csv_size = export_history(db, os.path.join(temp_dir, "h.csv"), "csv", all_users=True)["bytes"]
+        shc_size = export_history(db, os.path.join(temp_dir, "h.shc"), "columnar", all_users=True)["bytes"]
+        assert shc_size * 5 < csv_size, "El formato columnar debería comprimir mucho más que el CSV"
+
+    def test_un_archivo_por_usuario(self, temp_db):
+        """Prueba la partición en un archivo por usuario aunque un bloque mezcle usuarios"""
+        db, temp_dir = temp_db
+        out = os.path.join(temp_dir, "por_usuario")
+        result = export_history(db, out, "columnar", all_users=True, partition_by_user=True, chunk_size=11)
+
+        assert sorted(os.listdir(out)) == ["user_1.shc", "user_2.shc"], "Debería haber un archivo por usuario"
+        for user_id in (1, 2):
+            rows = list(read_columnar(os.path.join(out, f"user_{user_id}.shc")))
+            assert rows == self.esperado(db.for_user(user_id)), f"El archivo del usuario {user_id} debería tener solo sus filas"
+        assert result["rows"] == len(self.esperado(db, all_users=True))
+
+    def test_formato_desconocido(self, temp_db):
+        """Prueba que un formato desconocido se rechace"""
+        db, temp_dir = temp_db
+        with pytest.raises(ValueError):
+            export_history(db, os.path.join(temp_dir, "x"), "xml")
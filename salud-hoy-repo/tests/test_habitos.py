@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del catálogo de hábitos para Salud Hoy
+Valida el catálogo en memoria (una consulta, inmutable, compartido entre
+usuarios), las filas del RecycleView armadas desde el catálogo y las
+medallas con un número de hábitos distinto de 4
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import shutil
+from datetime import date
+
+# Importar las clases de base de datos, medallas y la lista de hábitos
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database, HabitCatalog
+from app.badges import BadgeEngine
+from app.habits_ui import HabitList
+
+
+HOY = date(2025, 3, 20)
+
+
+class FakeRecycleView:
+    """RecycleView mínimo en memoria"""
+
+    def __init__(self):
+        self.data = []
+        self.refreshes = 0
+
+    def refresh_from_data(self):
+        self.refreshes += 1
+
+
+def _agregar_habitos(db, cantidad):
+    """Agrega hábitos al catálogo (como lo haría una versión nueva del esquema)"""
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany("INSERT INTO habito(key, title, is_active) VALUES (?, ?, 1)",
+                     [(f"extra_{i}", f"Hábito extra {i}") for i in range(cantidad)])
+    conn.commit()
+    conn.close()
+
+
+class TestHabitos:
+    """Clase para probar el catálogo de hábitos y la lista del día"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal para las pruebas"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"), persistent=True)
+
+        yield db
+
+        try:
+            db.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_catalogo_en_memoria(self, temp_db):
+        """Prueba que el catálogo se consulte una vez y no se pueda modificar"""
+        catalogo = temp_db.get_habit_catalog()
+        ejecuciones = temp_db.statement_cache_stats()["executions"]
+
+        assert isinstance(catalogo, HabitCatalog)
+        assert temp_db.get_habit_catalog() is catalogo, "El catálogo debería quedar en memoria"
+        assert temp_db.for_user(2).get_habit_catalog() is catalogo, "Debería compartirse entre usuarios"
+        assert temp_db.statement_cache_stats()["executions"] == ejecuciones, "No debería consultar de nuevo"
+        assert list(catalogo) == [h.key for h in temp_db.get_habits()]
+        assert catalogo.titles["camina_10"] == "Camina 10 minutos"
+
+        with pytest.raises(AttributeError):
+            catalogo.keys = ()
+        with pytest.raises(TypeError):
+            catalogo.titles["camina_10"] = "Otro"
+
+        _agregar_habitos(temp_db, 2)
+        assert len(temp_db.get_habit_catalog()) == 4, "Sin refresh debería seguir el catálogo en memoria"
+        assert len(temp_db.get_habit_catalog(refresh=True)) == 6
+
+    def test_catalogo_compartido_por_las_vistas(self, temp_db):
+        """Prueba que refresh o restore desde una vista actualice el catálogo de las demás"""
+        copia = os.path.join(os.path.dirname(temp_db.db_path), "copia.db")
+        temp_db.backup(copia)
+        # Vistas creadas antes de que se cargue el catálogo
+        ana, beto = temp_db.for_user(1), temp_db.for_user(2)
+        assert beto.get_habit_catalog() is ana.get_habit_catalog(), \
+            "Las vistas deberían compartir el catálogo aunque se cargue después de crearlas"
+
+        _agregar_habitos(temp_db, 2)
+        assert len(ana.get_habit_catalog(refresh=True)) == 6
+        assert len(beto.get_habit_catalog()) == 6, "El refresh de una vista debería verse en las demás"
+
+        beto.restore(copia)
+        assert len(ana.get_habit_catalog()) == 4, "Después de restore las vistas deberían leer el catálogo de la copia"
+        assert temp_db.get_habit_catalog() is ana.get_habit_catalog()
+
+    def test_filas_desde_el_catalogo(self, temp_db):
+        """Prueba que las filas se armen del catálogo y un toggle solo cambie su fila"""
+        _agregar_habitos(temp_db, 20)
+        catalogo = temp_db.get_habit_catalog()
+        vista = FakeRecycleView()
+        lista = HabitList(vista)
+
+        assert lista.update(catalogo, {"camina_10": True}) == 24, "Debería haber una fila por hábito"
+        assert [fila["key"] for fila in vista.data] == list(catalogo)
+        assert vista.data[0] == {"key": "camina_10", "title": "Camina 10 minutos", "active": True}
+
+        # El mismo estado no modifica filas ni refresca la vista
+        assert lista.update(catalogo, {"camina_10": True}) == 0
+        assert vista.refreshes == 0
+
+        # Un toggle real cambia el estado; el reasignado al reciclar la fila no
+        assert lista.set_done("extra_3", True), "El toggle debería registrarse"
+        assert not lista.set_done("extra_3", True), "Reciclar la fila no es un toggle"
+        assert lista.done_count() == 2
+
+        # Otro día (o usuario): solo cambian las filas distintas
+        assert lista.update(catalogo, {"respira_1": True}) == 3
+        assert vista.refreshes == 1
+        assert lista.done_count() == 1
+
+    def test_medallas_con_mas_habitos(self, temp_db):
+        """Prueba que los umbrales y títulos sigan al número de hábitos activos"""
+        _agregar_habitos(temp_db, 2)
+        catalogo = temp_db.get_habit_catalog()
+        for key in list(catalogo)[:4]:
+            temp_db.set_habit_status(HOY.isoformat(), key, True)
+
+        engine = BadgeEngine(temp_db, today=lambda: HOY)
+        dia_completo = {b["key"]: b for b in engine.evaluate()}["today_full"]
+        assert engine.metric("habit_count") == 6
+        assert dia_completo["title"] == "Hoy\n6/6"
+        assert not dia_completo["unlocked"], "4 de 6 hábitos no completan el día"
+
+        for key in list(catalogo)[4:]:
+            temp_db.set_habit_status(HOY.isoformat(), key, True)
+        engine.invalidate("today")
+        assert {b["key"]: b for b in engine.evaluate()}["today_full"]["unlocked"]
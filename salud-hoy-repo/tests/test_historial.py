@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del historial por día para Salud Hoy
+Valida la paginación por clave (day_date) de get_history_page, la ventana de
+páginas que recibe el RecycleView y que cargar una página no mueva las filas
+que se ven en pantalla
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+from datetime import date, timedelta
+
+# Importar las clases de base de datos y del historial
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database, HistoryDay
+from app.history_ui import HistoryFeed, HistoryList
+
+
+HOY = date(2025, 3, 20)
+DIAS = 150
+
+
+class FakeRecycleView:
+    """RecycleView mínimo en memoria (data, scroll_y, alto y bind)"""
+
+    def __init__(self, height):
+        self.data = []
+        self.scroll_y = 1
+        self.height = height
+        self.callbacks = []
+
+    def bind(self, scroll_y):
+        self.callbacks.append(scroll_y)
+
+    def scroll_to(self, scroll_y):
+        self.scroll_y = scroll_y
+        for callback in self.callbacks:
+            callback(self, scroll_y)
+
+
+def _dia(n):
+    return (HOY - timedelta(days=n)).isoformat()
+
+
+def _fila_arriba(vista, alto_fila):
+    """day_date de la primera fila visible"""
+    desplazable = len(vista.data) * alto_fila - vista.height
+    return vista.data[int(round((1 - vista.scroll_y) * desplazable / alto_fila))]["day_date"]
+
+
+class TestHistorial:
+    """Clase para probar el historial paginado"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal con DIAS días de historial"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"), persistent=True)
+        for n in range(DIAS):
+            db.set_habit_status(_dia(n), "camina_10", True)
+            db.set_habit_status(_dia(n), "respira_1", n % 3 == 0)
+
+        yield db
+
+        try:
+            db.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_paginas_por_clave(self, temp_db):
+        """Prueba que las páginas recorran todos los días sin repetir ni saltear"""
+        dias, pagina = [], temp_db.get_history_page(limit=60)
+        while pagina:
+            dias.extend(pagina)
+            pagina = temp_db.get_history_page(before=pagina[-1].day_date, limit=60)
+
+        assert [d.day_date for d in dias] == [_dia(n) for n in range(DIAS)], \
+            "Debería haber un elemento por día, del más reciente al más antiguo"
+        assert dias[0] == HistoryDay(_dia(0), 2, ("camina_10", "respira_1"))
+        assert dias[1] == HistoryDay(_dia(1), 1, ("camina_10",)), "Solo los hábitos completados"
+
+        # Hacia días más recientes: también del más reciente al más antiguo
+        recientes = temp_db.get_history_page(after=_dia(100), limit=3)
+        assert [d.day_date for d in recientes] == [_dia(97), _dia(98), _dia(99)]
+
+        # Cada usuario ve solo su historial
+        assert temp_db.for_user(2).get_history_page() == []
+
+    def test_ventana_de_paginas(self, temp_db):
+        """Prueba que la ventana no supere max_pages páginas al recorrer el historial"""
+        feed = HistoryFeed(temp_db, page_size=10, max_pages=3)
+        assert feed.reset() == 10
+        assert feed.rows[0]["score"] == "2/4"
+        assert feed.rows[1]["summary"] == "Camina 10 minutos"
+
+        vistos = [fila["day_date"] for fila in feed.rows]
+        while feed.has_older:
+            agregadas, _ = feed.load_older()
+            vistos.extend(fila["day_date"] for fila in feed.rows[len(feed.rows) - agregadas:])
+            assert len(feed.rows) <= 30, "La ventana no debería crecer con el historial"
+        assert vistos == [_dia(n) for n in range(DIAS)]
+        assert feed.has_newer
+
+        # Volver arriba pide de nuevo las páginas descartadas
+        while feed.has_newer:
+            feed.load_newer()
+        assert feed.rows[0]["day_date"] == _dia(0)
+        assert [fila["day_date"] for fila in feed.rows] == [_dia(n) for n in range(30)]
+
+    def test_carga_sin_saltos(self, temp_db):
+        """Prueba que al cargar una página la misma fila siga arriba de la vista"""
+        vista = FakeRecycleView(height=500)
+        lista = HistoryList(vista, HistoryFeed(temp_db, page_size=20, max_pages=2), row_height=50)
+        lista.open()
+        assert len(vista.data) == 20 and vista.scroll_y == 1
+
+        # Hacia abajo: se agregan páginas al final y luego se descartan las de arriba
+        for _ in range(5):
+            vista.scroll_y = 0.05
+            arriba = _fila_arriba(vista, 50)
+            vista.scroll_to(0.05)
+            assert _fila_arriba(vista, 50) == arriba, "La vista no debería saltar al cargar"
+            assert len(vista.data) <= 40
+        assert lista.feed.has_newer, "Deberían haberse descartado días recientes"
+
+        # Hacia arriba: se vuelve a pedir la página anterior al principio
+        vista.scroll_y = 0.95
+        arriba = _fila_arriba(vista, 50)
+        vista.scroll_to(0.95)
+        assert _fila_arriba(vista, 50) == arriba
+        assert len(vista.data) <= 40
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de importación del historial para Salud Hoy
+Valida la lectura de CSV y JSON Lines, las validaciones con archivo de
+rechazos, las filas repetidas y la ida y vuelta con el exportador
+"""
+
+import pytest
+import os
+import csv
+import json
+import tempfile
+import shutil
+
+# Importar las clases de base de datos, importación y exportación
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.importer import import_history
+from app.exporter import export_history
+
+
+class TestImportar:
+    """Clase para probar la importación del historial"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Crea un directorio temporal para las bases de datos y los archivos"""
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    @pytest.fixture
+    def temp_db(self, temp_dir):
+        return Database(os.path.join(temp_dir, "test_salud_hoy.db"))
+
+    def escribir_csv(self, path, filas):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("date", "habit_key", "done"))
+            writer.writerows(filas)
+
+    def test_csv_con_rechazos(self, temp_dir, temp_db):
+        """Prueba que las filas inválidas vayan al archivo de rechazos con su motivo"""
+        entrada = os.path.join(temp_dir, "historial.csv")
+        rechazos = os.path.join(temp_dir, "rechazos.csv")
+        self.escribir_csv(entrada, [
+            ("2025-03-01", "camina_10", "1"),
+            ("2025-03-01", "respira_1", "true"),
+            ("2025-02-30", "camina_10", "1"),
+            ("20250302", "camina_10", "1"),
+            ("2025-03-02", "nadar_30", "1"),
+            ("2025-03-02", "postura_1", "quizás"),
+        ])
+
+        stats = import_history(temp_db, entrada, rejects_path=rechazos)
+
+        assert stats["read"] == 6 and stats["imported"] == 2 and stats["rejected"] == 4
+        assert temp_db.get_day_habits("2025-03-01") == {
+            "camina_10": True, "estirate_2": False, "respira_1": True, "postura_1": False
+        }, "Las filas válidas deberían importarse"
+        with open(rechazos, encoding="utf-8", newline="") as f:
+            filas = list(csv.DictReader(f))
+        assert [int(r["line"]) for r in filas] == [4, 5, 6, 7], "Debería guardarse la línea de cada rechazo"
+        assert "Hábito desconocido" in filas[2]["reason"], "Debería guardarse el motivo"
+        assert json.loads(filas[2]["record"])["habit_key"] == "nadar_30", "Debería guardarse la fila original"
+
+    def test_jsonl_y_repetidas(self, temp_dir, temp_db):
+        """Prueba JSON Lines, líneas inválidas y que una fila repetida reemplace a la anterior"""
+        entrada = os.path.join(temp_dir, "historial.jsonl")
+        with open(entrada, "w", encoding="utf-8") as f:
+            f.write('{"day_date": "2025-03-01", "habit_key": "camina_10", "done": true}\n')
+            f.write('no es json\n')
+            f.write('\n')
+            f.write('[1, 2]\n')
+            f.write('{"day_date": "2025-03-01", "habit_key": "camina_10", "done": false}\n')
+
+        stats = import_history(temp_db, entrada)
+
+        assert stats["rejected"] == 2 and stats["duplicates"] == 1
+        assert temp_db.get_day_habits("2025-03-01")["camina_10"] is False, "Debería ganar la última fila"
+
+    def test_jsonl_valores_no_escalares(self, temp_dir, temp_db):
+        """Prueba que listas u objetos en una fila JSON se rechacen sin cortar la importación"""
+        entrada = os.path.join(temp_dir, "historial.jsonl")
+        rechazos = os.path.join(temp_dir, "rechazos.csv")
+        with open(entrada, "w", encoding="utf-8") as f:
+            f.write('{"day_date": "2025-03-01", "habit_key": "camina_10", "done": true}\n')
+            f.write('{"day_date": ["2025-03-01"], "habit_key": "camina_10", "done": true}\n')
+            f.write('{"day_date": "2025-03-01", "habit_key": {"key": "respira_1"}, "done": true}\n')
+            f.write('{"day_date": "2025-03-01", "habit_key": "respira_1", "done": [1]}\n')
+            f.write('{"day_date": "2025-03-01", "habit_key": "postura_1", "done": 1}\n')
+
+        stats = import_history(temp_db, entrada, rejects_path=rechazos, batch_size=1)
+
+        assert stats["read"] == 5 and stats["rejected"] == 3 and stats["imported"] == 2
+        assert temp_db.get_day_habits("2025-03-01") == {
+            "camina_10": True, "estirate_2": False, "respira_1": False, "postura_1": True
+        }, "Las filas válidas deberían importarse"
+        with open(rechazos, encoding="utf-8", newline="") as f:
+            filas = list(csv.DictReader(f))
+        assert [int(r["line"]) for r in filas] == [2, 3, 4], "Cada fila inválida debería ir a rechazos"
+
+    def test_user_id_invalido(self, temp_dir, temp_db):
+        """Prueba que con user_ids solo se acepten enteros (JSON) o dígitos (CSV)"""
+        entrada = os.path.join(temp_dir, "historial.jsonl")
+        with open(entrada, "w", encoding="utf-8") as f:
+            for user_id in (2, 2.7, True, "3", "x1", None, [2]):
+                f.write(json.dumps({"user_id": user_id, "day_date": "2025-03-01",
+                                    "habit_key": "camina_10", "done": True}) + "\n")
+        rechazos = os.path.join(temp_dir, "rechazos.csv")
+
+        stats = import_history(temp_db, entrada, rejects_path=rechazos, user_ids=True)
+
+        assert stats["imported"] == 2 and stats["rejected"] == 5
+        assert [u for u in (1, 2, 3) if temp_db.for_user(u).get_completed_count_for_day("2025-03-01")] == [2, 3], \
+            "2.7 y true no deberían asignarse a los usuarios 2 y 1"
+        with open(rechazos, encoding="utf-8", newline="") as f:
+            assert all("user_id inválido" in r["reason"] for r in csv.DictReader(f))
+
+    def test_conservar_existentes(self, temp_dir, temp_db):
+        """Prueba replace=False: las filas que ya existen no se modifican"""
+        temp_db.set_habit_status("2025-03-01", "camina_10", True)
+        entrada = os.path.join(temp_dir, "historial.csv")
+        self.escribir_csv(entrada, [("2025-03-01", "camina_10", "0"), ("2025-03-01", "respira_1", "1")])
+
+        stats = import_history(temp_db, entrada, replace=False)
+
+        assert stats["imported"] == 1 and stats["unchanged"] == 1
+        assert temp_db.get_day_habits("2025-03-01")["camina_10"] is True, "La fila existente debería conservarse"
+
+    def test_ida_y_vuelta_con_exportador(self, temp_dir, temp_db):
+        """Prueba que importar una exportación (varios usuarios, lotes chicos) reproduzca los datos"""
+        for user_id in (1, 2):
+            view = temp_db.for_user(user_id)
+            for day in range(1, 20):
+                view.set_habit_status(f"2025-03-{day:02d}", "camina_10", day % user_id == 0)
+                view.set_habit_status(f"2025-03-{day:02d}", "respira_1", True)
+        salida = os.path.join(temp_dir, "export.csv")
+        export_history(temp_db, salida, "csv", all_users=True)
+
+        destino = Database(os.path.join(temp_dir, "destino.db"))
+        stats = import_history(destino, salida, user_ids=True, batch_size=7)
+
+        assert stats["rejected"] == 0 and stats["imported"] == stats["read"]
+        for user_id in (1, 2):
+            assert list(destino.for_user(user_id).iter_habit_history()) == \
+                list(temp_db.for_user(user_id).iter_habit_history()), "Los datos deberían reproducirse"
+
+    def test_importados_se_sincronizan(self, temp_dir, temp_db):
+        """Prueba que las filas importadas tomen un número de cambio"""
+        seq = temp_db.current_seq()
+        entrada = os.path.join(temp_dir, "historial.csv")
+        self.escribir_csv(entrada, [("2025-03-01", "camina_10", "1")])
+        import_history(temp_db, entrada)
+        assert [c[3] for c in temp_db.changes_since(seq)] == ["camina_10"], \
+            "La fila importada debería enviarse en la próxima sincronización"
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de tiempo de import para Salud Hoy
+Falla si app.main vuelve a importar módulos pesados de KivyMD que deberían
+cargarse bajo demanda. El presupuesto de tiempo del import en frío depende de
+la máquina: solo se comprueba si se define SALUD_HOY_IMPORT_BUDGET_MS.
+"""
+
+import pytest
+import os
+
+# Importar el reporte de import time y el registro diferido
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from benchmarks.importtime_main import cold_import_ms, run_importtime
+from app.lazy_imports import LazyImports
+
+
+# Presupuesto de import en frío (ms) de la máquina; sin la variable no se mide
+IMPORT_BUDGET_MS = os.environ.get("SALUD_HOY_IMPORT_BUDGET_MS")
+
+# Módulos que app.main NO debe importar al cargarse
+LAZY_MODULES = ["kivymd.toast", "kivymd.uix.dialog", "kivymd.uix.textfield", "kivymd.uix.chip"]
+
+
+class TestImportTime:
+    """Clase para probar el presupuesto de import de app.main"""
+
+    @pytest.mark.skipif(not IMPORT_BUDGET_MS, reason="Define SALUD_HOY_IMPORT_BUDGET_MS para medir el import en frío")
+    def test_import_en_frio_dentro_del_presupuesto(self):
+        """Prueba que el import en frío de app.main no supere el presupuesto"""
+        budget_ms = float(IMPORT_BUDGET_MS)
+        elapsed_ms = cold_import_ms("app.main", runs=3)
+        assert elapsed_ms < budget_ms, (
+            f"El import en frío de app.main tomó {elapsed_ms:.1f} ms "
+            f"(presupuesto: {budget_ms:.0f} ms)"
+        )
+
+    def test_modulos_pesados_no_se_importan(self):
+        """Prueba que los widgets pesados de KivyMD no se importen al cargar app.main"""
+        imported = {name.strip() for _, _, name in run_importtime("app.main")}
+        for module in LAZY_MODULES:
+            assert module not in imported, f"'{module}' debería importarse bajo demanda"
+
+
+class TestLazyImports:
+    """Clase para probar el registro de imports diferidos"""
+
+    def test_import_una_sola_vez(self):
+        """Prueba que cada nombre se importe en el primer uso y luego se cachee"""
+        lazy = LazyImports({"dumps": ("json", "dumps"), "sqrt": ("math", "sqrt")})
+
+        assert not lazy.is_loaded("dumps"), "No debería importarse antes del primer uso"
+        dumps = lazy.dumps
+        assert dumps is lazy.get("dumps"), "El segundo acceso debería usar la caché"
+        assert lazy.is_loaded("dumps"), "Debería quedar marcado como cargado"
+        assert "dumps" in lazy.load_times, "Debería registrarse el tiempo de carga"
+
+    def test_precalentamiento_incremental(self):
+        """Prueba que prewarm_next importe un nombre por llamada"""
+        lazy = LazyImports({"dumps": ("json", "dumps"), "sqrt": ("math", "sqrt")})
+
+        assert lazy.prewarm_next() == 1, "Debería quedar un nombre pendiente"
+        assert lazy.prewarm_next() == 0, "No deberían quedar nombres pendientes"
+        assert lazy.pending() == [], "Todos los nombres deberían estar cargados"
+
+    def test_nombre_no_registrado(self):
+        """Prueba que un nombre desconocido lance AttributeError"""
+        lazy = LazyImports({})
+        with pytest.raises(AttributeError):
+            lazy.MDNoExiste
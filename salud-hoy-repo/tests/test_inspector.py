@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del inspector de bases de datos para Salud Hoy
+Valida la paginación por clave, los filtros por usuario y fecha, las filas
+aproximadas de sqlite_stat1, los tamaños de dbstat y el modo solo lectura
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import shutil
+
+# Importar las clases de base de datos y el inspector
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.inspector import connect, TablePager, approx_row_counts, object_sizes, summary, main
+
+
+HABITOS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+class TestInspector:
+    """Clase para probar el inspector"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal con dos usuarios y 20 días de historial"""
+        temp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(temp_dir, "test_salud_hoy.db")
+        db = Database(db_path)
+        for user_id in (1, 2):
+            view = db.for_user(user_id)
+            with view.transaction():
+                for day in range(1, 21):
+                    for key in HABITOS:
+                        view.set_habit_status(f"2025-03-{day:02d}", key, day % 2 == 0)
+        conn = connect(db_path)
+
+        yield conn, db_path
+
+        conn.close()
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_paginas_recorren_la_tabla_una_vez(self, temp_db):
+        """Prueba que las páginas cubran todas las filas, en orden y sin repetir"""
+        conn, _ = temp_db
+        pager = TablePager(conn, "habitos_dia", limit=7)
+        assert pager.key == ["user_id", "day_date", "habit_key"], "Debería paginar por la clave primaria"
+
+        filas = [row for rows, _ in pager.pages() for row in rows]
+        todas = conn.execute("SELECT * FROM habitos_dia ORDER BY user_id, day_date, habit_key").fetchall()
+        assert filas == todas, "Las páginas deberían recorrer la tabla completa en orden"
+
+    def test_continuar_despues_de_una_clave(self, temp_db):
+        """Prueba que una página empiece justo después de la clave indicada"""
+        conn, _ = temp_db
+        pager = TablePager(conn, "habitos_dia", limit=3)
+        rows, after = pager.page()
+        siguiente, _ = pager.page(after)
+        assert tuple(after) == rows[-1][:3], "La clave debería ser la de la última fila"
+        assert siguiente[0] > rows[-1], "La página siguiente debería continuar después de la clave"
+
+    def test_filtros_por_usuario_y_fecha(self, temp_db):
+        """Prueba los filtros por user_id y rango de day_date"""
+        conn, _ = temp_db
+        pager = TablePager(conn, "habitos_dia", limit=5, user_id=2,
+                           start_date="2025-03-10", end_date="2025-03-12")
+        filas = [row for rows, _ in pager.pages() for row in rows]
+        assert len(filas) == 3 * len(HABITOS), "Deberían verse solo 3 días de un usuario"
+        assert {row[0] for row in filas} == {2}, "Solo deberían verse filas del usuario 2"
+        with pytest.raises(ValueError):
+            TablePager(conn, "habito", user_id=1)
+
+    def test_tabla_sin_clave_primaria_usa_rowid(self, temp_db):
+        """Prueba la paginación por rowid de una tabla sin clave primaria"""
+        _, db_path = temp_db
+        rw = sqlite3.connect(db_path)
+        rw.execute("CREATE TABLE notas(texto TEXT)")
+        rw.executemany("INSERT INTO notas VALUES (?)", [(f"nota {i}",) for i in range(5)])
+        rw.commit()
+        rw.close()
+
+        conn = connect(db_path)
+        pager = TablePager(conn, "notas", limit=2)
+        filas = [row for rows, _ in pager.pages() for row in rows]
+        conn.close()
+        assert pager.key == ["rowid"], "Sin clave primaria debería paginar por rowid"
+        assert filas == [(f"nota {i}",) for i in range(5)], "El rowid no debería mostrarse como columna"
+
+    def test_tabla_desconocida(self, temp_db):
+        """Prueba que no se pueda paginar una tabla que no existe (ni inyectar SQL)"""
+        conn, _ = temp_db
+        with pytest.raises(ValueError):
+            TablePager(conn, "habitos_dia; DROP TABLE habito")
+
+    def test_filas_aproximadas_y_tamanos(self, temp_db):
+        """Prueba las filas de sqlite_stat1 (después de ANALYZE) y los tamaños de dbstat"""
+        conn, db_path = temp_db
+        assert approx_row_counts(conn) is None, "Sin ANALYZE no debería haber estadísticas"
+
+        assert main(["--db", db_path, "summary", "--analyze"]) == 0
+        conn = connect(db_path)
+        counts = approx_row_counts(conn)
+        assert counts["habitos_dia"] == 2 * 20 * len(HABITOS), "Debería leerse la cantidad de filas"
+
+        sizes = object_sizes(conn)
+        if sizes is not None:
+            assert sizes["habitos_dia"][0] > 0, "Debería informarse el tamaño de la tabla"
+        nombres = {obj["name"] for obj in summary(conn)}
+        conn.close()
+        assert "idx_habitos_dia_user_done_day" in nombres, "El resumen debería incluir los índices"
+
+    def test_solo_lectura(self, temp_db):
+        """Prueba que el inspector no pueda escribir ni cree archivos"""
+        conn, db_path = temp_db
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM habitos_dia")
+        with pytest.raises(FileNotFoundError):
+            connect(db_path + ".no_existe")
+        assert not os.path.exists(db_path + ".no_existe"), "No debería crearse un archivo nuevo"
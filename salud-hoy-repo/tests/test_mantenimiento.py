@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del mantenimiento de bases de datos para Salud Hoy
+Valida auto_vacuum=INCREMENTAL en bases nuevas, que el vacuum incremental
+devuelva las páginas que deja reset_all_data, el presupuesto de tiempo, la
+conversión de bases de datos anteriores y la ejecución en reposo
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import shutil
+from datetime import date, timedelta
+
+# Importar las clases de base de datos y el mantenimiento
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.maintenance import run_maintenance, IdleMaintenance, main
+
+
+HABITOS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+def _llenar(db, dias=3000):
+    inicio = date(2015, 1, 1)
+    db.import_habit_rows([
+        (db.user_id, (inicio + timedelta(days=i)).isoformat(), key, i % 3 == 0)
+        for i in range(dias) for key in HABITOS
+    ])
+
+
+def _pragma(db_path, nombre):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"PRAGMA {nombre}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestMantenimiento:
+    """Clase para probar el mantenimiento"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Crea un directorio temporal para las bases de datos"""
+        temp_dir = tempfile.mkdtemp()
+
+        yield temp_dir
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_base_nueva_incremental(self, temp_dir):
+        """Prueba que las bases de datos nuevas se creen con auto_vacuum=INCREMENTAL"""
+        db_path = os.path.join(temp_dir, "salud_hoy.db")
+        Database(db_path).close()
+        assert _pragma(db_path, "auto_vacuum") == 2, "La base nueva debería usar auto_vacuum=INCREMENTAL"
+
+    def test_vacuum_libera_paginas_del_reset(self, temp_dir):
+        """Prueba que después de reset_all_data el mantenimiento devuelva las páginas libres"""
+        db_path = os.path.join(temp_dir, "salud_hoy.db")
+        db = Database(db_path)
+        _llenar(db)
+        db.reset_all_data()
+        db.close()
+        libres = _pragma(db_path, "freelist_count")
+        tamano = os.path.getsize(db_path)
+        assert libres > 0, "El reset debería dejar páginas libres"
+
+        report = run_maintenance(db_path, budget=10.0)
+        assert report["steps"]["quick_check"]["integrity"] == "ok", "La base debería estar íntegra"
+        assert report["steps"]["vacuum"]["freed_pages"] == libres, "Debería liberar todas las páginas libres"
+        assert report["freed_bytes"] == libres * _pragma(db_path, "page_size")
+        assert _pragma(db_path, "freelist_count") == 0, "No deberían quedar páginas libres"
+        assert os.path.getsize(db_path) < tamano, "El archivo debería achicarse"
+
+        # Los datos siguen accesibles después del mantenimiento
+        db = Database(db_path)
+        db.set_habit_status("2025-01-01", "camina_10", True)
+        assert db.get_completed_count_for_day("2025-01-01") == 1
+        db.close()
+
+    def test_presupuesto_agotado_no_falla(self, temp_dir):
+        """Prueba que un presupuesto agotado interrumpa las tareas sin lanzar excepciones"""
+        db_path = os.path.join(temp_dir, "salud_hoy.db")
+        db = Database(db_path)
+        _llenar(db)
+        db.reset_all_data()
+        db.close()
+
+        report = run_maintenance(db_path, budget=0.0)
+        vacuum = report["steps"]["vacuum"]
+        assert vacuum["interrupted"], "Sin presupuesto el vacuum debería quedar interrumpido"
+        assert vacuum["freelist"] > 0, "Las páginas libres deberían quedar para la próxima pasada"
+        assert _pragma(db_path, "freelist_count") == vacuum["freelist"]
+
+    def test_convertir_base_anterior(self, temp_dir):
+        """Prueba que --convert active auto_vacuum=INCREMENTAL en una base sin él"""
+        db_path = os.path.join(temp_dir, "antigua.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE t (x TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [("x" * 200,) for _ in range(2000)])
+        conn.commit()
+        conn.execute("DELETE FROM t")
+        conn.commit()
+        conn.close()
+        assert _pragma(db_path, "auto_vacuum") == 0
+
+        report = run_maintenance(db_path)
+        assert report["steps"]["vacuum"]["auto_vacuum"] == "none", "Sin --convert no debería cambiar el modo"
+        assert report["freed_pages"] == 0
+
+        report = run_maintenance(db_path, convert=True)
+        assert report["steps"]["convert"]["ok"]
+        assert report["freed_pages"] > 0, "El VACUUM completo debería achicar el archivo"
+        assert _pragma(db_path, "auto_vacuum") == 2, "Debería quedar en auto_vacuum=INCREMENTAL"
+
+    def test_reposo(self, temp_dir):
+        """Prueba que el mantenimiento en reposo respete la inactividad y el intervalo"""
+        db_path = os.path.join(temp_dir, "salud_hoy.db")
+        Database(db_path).close()
+        ahora = [1000.0]
+        idle = IdleMaintenance([db_path], idle_seconds=60, interval=3600, clock=lambda: ahora[0])
+
+        ahora[0] += 30
+        assert not idle.tick(), "No debería ejecutarse con la app en uso"
+        ahora[0] += 31
+        assert idle.tick(), "Debería ejecutarse tras 60 segundos sin interacción"
+        idle.join()
+        assert len(idle.reports) == 1 and idle.reports[0]["db"] == db_path
+
+        ahora[0] += 120
+        assert not idle.tick(), "No debería repetirse antes del intervalo"
+        idle.request()
+        idle.touch()
+        assert not idle.tick(), "Un pedido también espera a que la app quede inactiva"
+        ahora[0] += 60
+        assert idle.tick(), "Debería ejecutarse el pedido al quedar inactiva"
+        idle.join()
+        assert len(idle.reports) == 2
+
+    def test_consola(self, temp_dir, capsys):
+        """Prueba el comando de consola"""
+        db_path = os.path.join(temp_dir, "salud_hoy.db")
+        Database(db_path).close()
+        assert main(["--db", db_path]) == 0
+        salida = capsys.readouterr().out
+        assert "quick_check" in salida and "vacuum" in salida
+        assert main(["--db", os.path.join(temp_dir, "no_existe.db")]) == 1
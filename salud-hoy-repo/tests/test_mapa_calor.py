@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del mapa de calor para Salud Hoy
+Valida la consulta agregada por día, la posición de cada día en la grilla y
+que la textura se dibuje una vez y luego solo se repinte el cuadro de hoy
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+from datetime import date, timedelta
+
+# Importar las clases de base de datos y del mapa de calor
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.heatmap import HeatmapGrid, HeatmapView, heatmap_level, PITCH, GAP
+
+
+HOY = date(2025, 3, 20)    # jueves
+
+
+class FakeCanvas:
+    def __init__(self):
+        self.updates = 0
+
+    def ask_update(self):
+        self.updates += 1
+
+
+class FakeImage:
+    """Widget Image mínimo en memoria"""
+
+    def __init__(self):
+        self.texture = None
+        self.canvas = FakeCanvas()
+
+
+class FakeRenderer:
+    """Dibujante que registra los renders completos y los cuadros repintados"""
+
+    def __init__(self):
+        self.renders = []
+        self.painted = []
+
+    def render(self, grid, levels):
+        self.renders.append((grid.start_day, dict(levels)))
+        return f"textura {len(self.renders)}"
+
+    def paint(self, day_date, level):
+        self.painted.append((day_date, level))
+
+
+class TestMapaCalor:
+    """Clase para probar el mapa de calor"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal para las pruebas"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"), persistent=True)
+
+        yield db
+
+        try:
+            db.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_conteos_en_una_consulta(self, temp_db):
+        """Prueba que los conteos por día salgan de una sola consulta"""
+        for n in range(400):
+            dia = (HOY - timedelta(days=n)).isoformat()
+            temp_db.set_habit_status(dia, "camina_10", True)
+            temp_db.set_habit_status(dia, "respira_1", n % 2 == 0)
+
+        ejecuciones = temp_db.statement_cache_stats()["executions"]
+        conteos = temp_db.get_daily_counts((HOY - timedelta(days=364)).isoformat(), HOY.isoformat())
+        assert temp_db.statement_cache_stats()["executions"] == ejecuciones + 1
+        assert len(conteos) == 365
+        assert conteos[HOY.isoformat()] == 2
+        assert conteos[(HOY - timedelta(days=1)).isoformat()] == 1
+
+    def test_grilla_y_niveles(self):
+        """Prueba la posición de los días y los niveles de color"""
+        grilla = HeatmapGrid(HOY)
+        assert grilla.start_day.weekday() == 0, "La primera columna debería empezar en lunes"
+        assert (HOY - grilla.start_day).days >= 364
+        assert grilla.weeks == 53
+        assert grilla.size == (53 * PITCH - GAP, 7 * PITCH - GAP)
+        assert grilla.cell_pos(grilla.start_day) == (0, 6 * PITCH), "El lunes va arriba"
+        assert grilla.cell_pos(HOY) == (52 * PITCH, 3 * PITCH)
+        assert HeatmapGrid(HOY, years=10).weeks == 522
+
+        assert [heatmap_level(n, 4) for n in range(5)] == [0, 1, 2, 3, 4]
+        assert heatmap_level(1, 24) == 1 and heatmap_level(24, 24) == 4
+        assert heatmap_level(3, 0) == 0
+
+    def test_textura_en_cache(self, temp_db):
+        """Prueba que un toggle solo repinte el cuadro de hoy"""
+        temp_db.set_habit_status((HOY - timedelta(days=3)).isoformat(), "camina_10", True)
+        imagen, dibujante = FakeImage(), FakeRenderer()
+        mapa = HeatmapView(imagen, renderer=dibujante)
+
+        assert mapa.show(temp_db, today=HOY)
+        assert imagen.texture == "textura 1"
+        assert dibujante.renders[0][1] == {(HOY - timedelta(days=3)).isoformat(): 1}
+        assert not mapa.show(temp_db, today=HOY), "Sin cambios no debería dibujar de nuevo"
+
+        # Toggles de hoy: solo cambia un cuadro, y solo si cambia el nivel
+        assert mapa.update_today(2, today=HOY)
+        assert not mapa.update_today(2, today=HOY)
+        assert mapa.update_today(4, today=HOY)
+        assert dibujante.painted == [(HOY.isoformat(), 2), (HOY.isoformat(), 4)]
+        assert imagen.canvas.updates == 2
+        assert len(dibujante.renders) == 1
+
+        # Otro día u otro usuario: la grilla se arma de nuevo
+        assert mapa.update_today(0, today=HOY + timedelta(days=1))
+        assert mapa.show(temp_db.for_user(2), today=HOY + timedelta(days=1))
+        assert len(dibujante.renders) == 3
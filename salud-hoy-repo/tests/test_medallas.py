@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del motor de medallas para Salud Hoy
+Valida las reglas declarativas, el cálculo de métricas y la
+evaluación incremental (solo se recalcula lo invalidado)
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+from datetime import date, timedelta
+
+# Importar las clases de base de datos y medallas
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.badges import BadgeEngine, BADGE_RULES, METRICS
+
+
+HOY = date(2025, 3, 20)
+HABITOS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+class TestBadgeEngine:
+    """Clase para probar el motor de medallas"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal para las pruebas"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"))
+
+        yield db
+
+        try:
+            db.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def marcar_dias(self, db, dias, habitos=HABITOS, hasta=HOY):
+        """Marca los hábitos como completados en los últimos `dias` días hasta `hasta`"""
+        for i in range(dias):
+            day = (hasta - timedelta(days=i)).isoformat()
+            for key in habitos:
+                db.set_habit_status(day, key, True)
+
+    def unlocked(self, engine):
+        return {b["key"] for b in engine.evaluate() if b["unlocked"]}
+
+    def test_sin_datos_ninguna_medalla(self, temp_db):
+        """Prueba que sin historial no haya medallas desbloqueadas"""
+        engine = BadgeEngine(temp_db, today=lambda: HOY)
+        assert self.unlocked(engine) == set(), "No debería haber medallas sin datos"
+
+    def test_semana_perfecta_y_racha(self, temp_db):
+        """Prueba las medallas de racha, semana y día completo"""
+        self.marcar_dias(temp_db, 7)
+        engine = BadgeEngine(temp_db, today=lambda: HOY)
+
+        unlocked = self.unlocked(engine)
+        for key in ("first_active", "streak_3", "streak_7", "week_14", "week_perfect", "today_full"):
+            assert key in unlocked, f"La medalla '{key}' debería estar desbloqueada"
+        assert "streak_30" not in unlocked, "La racha de 30 días no debería estar desbloqueada"
+        assert engine.metric("streak") == 7, "La racha debería ser de 7 días"
+        assert engine.metric("weekly_score") == 28, "La semana debería sumar 28"
+
+    def test_titulo_con_plantilla(self, temp_db):
+        """Prueba que el título 'Hoy n/n' use el número de hábitos activos"""
+        engine = BadgeEngine(temp_db, today=lambda: HOY)
+        titles = {b["key"]: b["title"] for b in engine.evaluate()}
+        assert titles["today_full"] == "Hoy\n4/4", "El título debería usar habit_count"
+
+    def test_racha_se_corta_en_un_hueco(self, temp_db):
+        """Prueba que la racha se corte en el primer día sin hábitos"""
+        self.marcar_dias(temp_db, 3, habitos=["camina_10"])
+        self.marcar_dias(temp_db, 5, habitos=["camina_10"], hasta=HOY - timedelta(days=4))
+        assert temp_db.get_streak(threshold=1, today=HOY) == 3, "La racha debería cortarse en el hueco"
+        assert temp_db.get_streak(threshold=2, today=HOY) == 0, "Con umbral 2 no debería haber racha"
+
+    def test_metricas_en_cache(self, temp_db):
+        """Prueba que las métricas no se recalculen mientras no cambien sus entradas"""
+        engine = BadgeEngine(temp_db, today=lambda: HOY)
+        engine.evaluate()
+        engine.evaluate()
+        for name, count in engine.compute_counts.items():
+            assert count <= 1, f"La métrica '{name}' debería calcularse como máximo una vez"
+
+    def test_toggle_de_hoy_solo_recalcula_dependientes(self, temp_db):
+        """Prueba que un cambio de hoy no vuelva a consultar el historial"""
+        self.marcar_dias(temp_db, 10, hasta=HOY - timedelta(days=1))
+        engine = BadgeEngine(temp_db, today=lambda: HOY)
+        engine.evaluate()
+
+        temp_db.set_habit_status(HOY.isoformat(), "camina_10", True)
+        engine.on_habit_changed(HOY.isoformat())
+        unlocked = self.unlocked(engine)
+
+        assert "first_active" in unlocked, "El toggle de hoy debería desbloquear 'first_active'"
+        assert engine.compute_counts["today_count"] == 2, "today_count debería recalcularse"
+        assert engine.compute_counts["habit_count"] == 1, "habit_count no depende de hoy"
+        assert engine.compute_counts["streak_before_today"] == 1, "La racha previa no debería recalcularse"
+        assert engine.compute_counts["total_before_today"] == 1, "El total previo no debería recalcularse"
+        assert engine.metric("streak") == 11, "La racha debería sumar el día de hoy"
+
+    def test_cambio_de_fecha_invalida_calendario(self, temp_db):
+        """Prueba que al pasar la medianoche se recalculen las métricas del calendario"""
+        current = [HOY]
+        engine = BadgeEngine(temp_db, today=lambda: current[0])
+        engine.evaluate()
+
+        current[0] = HOY + timedelta(days=1)
+        engine.evaluate()
+        assert engine.compute_counts["weekly_before_today"] == 2, "La semana previa debería recalcularse al cambiar la fecha"
+        assert engine.compute_counts["habit_count"] == 1, "El catálogo no depende de la fecha"
+
+    def test_nueva_medalla_como_datos(self, temp_db):
+        """Prueba que una medalla nueva se pueda agregar solo con datos"""
+        self.marcar_dias(temp_db, 2, habitos=["camina_10"])
+        rules = BADGE_RULES + [{"key": "total_2", "icon": "star", "title": "2 días",
+                                "metric": "total_active_days", "min": 2}]
+        engine = BadgeEngine(temp_db, rules=rules, today=lambda: HOY)
+        assert "total_2" in self.unlocked(engine), "La medalla nueva debería evaluarse"
+
+    def test_metrica_desconocida(self, temp_db):
+        """Prueba que una regla con métrica desconocida se rechace"""
+        rules = [{"key": "x", "icon": "x", "title": "x", "metric": "no_existe", "min": 1}]
+        with pytest.raises(ValueError):
+            BadgeEngine(temp_db, rules=rules, metrics=METRICS)
+
+
+class TestBadgeUnlocks:
+    """Clase para probar el historial persistido de desbloqueos"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal para las pruebas"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"))
+
+        yield db
+
+        try:
+            db.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_desbloqueo_registrado_y_evento(self, temp_db):
+        """Prueba que el primer desbloqueo se registre y emita un evento"""
+        engine = BadgeEngine(temp_db, today=lambda: HOY, track_unlocks=True)
+        events = []
+        engine.bind_unlock(events.append)
+
+        temp_db.set_habit_status(HOY.isoformat(), "camina_10", True)
+
+        history = engine.unlock_history()
+        assert [u["badge_key"] for u in history] == ["first_active"], "Debería registrarse 'first_active'"
+        assert history[0]["day_date"] == HOY.isoformat(), "Debería guardarse el día que la desbloqueó"
+        assert history[0]["title"] == "Primer día\nactivo", "El historial debería incluir el título"
+        assert len(events) == 1 and events[0][0]["key"] == "first_active", "Debería emitirse un evento"
+
+    def test_sin_duplicados(self, temp_db):
+        """Prueba que una medalla ya desbloqueada no se registre ni se celebre de nuevo"""
+        engine = BadgeEngine(temp_db, today=lambda: HOY, track_unlocks=True)
+        events = []
+        engine.bind_unlock(events.append)
+
+        temp_db.set_habit_status(HOY.isoformat(), "camina_10", True)
+        temp_db.set_habit_status(HOY.isoformat(), "respira_1", True)
+
+        assert len(temp_db.get_badge_unlocks()) == 1, "Solo debería haber un registro"
+        assert len(events) == 1, "Solo debería emitirse un evento"
+
+    def test_misma_transaccion(self, temp_db):
+        """Prueba que el desbloqueo y el hábito se confirmen o reviertan juntos"""
+        engine = BadgeEngine(temp_db, today=lambda: HOY, track_unlocks=True)
+        events = []
+        engine.bind_unlock(events.append)
+
+        def hook_que_falla(day_date):
+            raise RuntimeError("fallo simulado")
+
+        temp_db.add_write_hook(hook_que_falla)
+        with pytest.raises(RuntimeError):
+            temp_db.set_habit_status(HOY.isoformat(), "camina_10", True)
+        temp_db.remove_write_hook(hook_que_falla)
+
+        assert temp_db.get_completed_count_for_day(HOY.isoformat()) == 0, "El hábito debería revertirse"
+        assert temp_db.get_badge_unlocks() == [], "El desbloqueo debería revertirse"
+        assert events == [], "No debería emitirse un evento de una transacción revertida"
+
+    def test_medalla_permanente_no_recalcula(self, temp_db):
+        """Prueba que una medalla 'sticky' ya ganada no vuelva a calcular su métrica"""
+        temp_db.record_badge_unlock("first_active", "2025-01-01")
+        engine = BadgeEngine(temp_db, today=lambda: HOY, track_unlocks=True)
+
+        badges = {b["key"]: b["unlocked"] for b in engine.evaluate()}
+        assert badges["first_active"] is True, "La medalla ganada debería seguir desbloqueada"
+        assert engine.compute_counts["ever_active"] == 0, "ever_active no debería calcularse"
+
+    def test_reset_borra_historial(self, temp_db):
+        """Prueba que reset_all_data borre el historial de desbloqueos"""
+        engine = BadgeEngine(temp_db, today=lambda: HOY, track_unlocks=True)
+        temp_db.set_habit_status(HOY.isoformat(), "camina_10", True)
+
+        temp_db.reset_all_data()
+        engine.invalidate_all()
+
+        assert temp_db.get_badge_unlocks() == [], "El historial debería borrarse"
+        assert engine.unlocked_keys == set(), "El motor debería recargar el historial"
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la grilla de medallas para Salud Hoy
+Valida que los widgets se creen una sola vez y que un toggle solo
+modifique los widgets cuyo estado cambió
+"""
+
+import pytest
+
+# Importar la grilla de medallas
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.badges_ui import BadgeGrid
+from .fake_widgets import FakeWidget, FakeBadgeFactory
+
+
+def make_badges(**unlocked):
+    return [
+        {"key": "first_active", "icon": "check-decagram", "title": "Primer día\nactivo",
+         "unlocked": unlocked.get("first_active", False)},
+        {"key": "streak_3", "icon": "run", "title": "3 días\nseguidos",
+         "unlocked": unlocked.get("streak_3", False)},
+        {"key": "today_full", "icon": "medal", "title": "Hoy\n4/4",
+         "unlocked": unlocked.get("today_full", False)},
+    ]
+
+
+class TestBadgeGrid:
+    """Clase para probar la actualización incremental de la grilla"""
+
+    @pytest.fixture
+    def grid(self):
+        factory = FakeBadgeFactory()
+        grid = BadgeGrid(FakeWidget(), FakeWidget(), factory=factory)
+        grid.update(make_badges(), ("Racha: 0 día(s)", "Semana: 0/28"))
+        return grid, factory
+
+    def test_primer_render_crea_widgets(self, grid):
+        """Prueba que el primer render cree todas las tarjetas y chips"""
+        grid, factory = grid
+        assert len(grid.grid.children) == 3, "Debería haber una tarjeta por medalla"
+        assert len(grid.chips_box.children) == 2, "Debería haber un chip por texto"
+        assert factory.created == 3 * 3 + 2, "Deberían crearse 3 widgets por tarjeta y los chips"
+
+    def test_toggle_solo_modifica_lo_que_cambio(self, grid):
+        """Prueba que un toggle solo toque el ícono y el chip que cambiaron"""
+        grid, factory = grid
+        created = factory.created
+
+        touched = grid.update(make_badges(first_active=True), ("Racha: 1 día(s)", "Semana: 0/28"))
+
+        assert factory.created == created, "No deberían crearse widgets nuevos"
+        assert touched == 2, "Solo deberían modificarse el ícono y un chip"
+        assert ("icon", "check-decagram", True) in factory.calls
+        assert ("chip", "Racha: 1 día(s)") in factory.calls
+
+    def test_sin_cambios_no_toca_widgets(self, grid):
+        """Prueba que repetir el mismo estado no modifique ningún widget"""
+        grid, factory = grid
+        touched = grid.update(make_badges(), ("Racha: 0 día(s)", "Semana: 0/28"))
+        assert touched == 0, "Sin cambios no debería modificarse nada"
+        assert factory.calls == [], "No debería llamarse a la fábrica"
+
+    def test_cambio_de_catalogo_reconstruye(self, grid):
+        """Prueba que un catálogo de medallas distinto vuelva a crear las tarjetas"""
+        grid, factory = grid
+        badges = make_badges() + [{"key": "streak_30", "icon": "trophy",
+                                   "title": "30 días\nseguidos", "unlocked": False}]
+        grid.update(badges, ("Racha: 0 día(s)", "Semana: 0/28"))
+        assert len(grid.grid.children) == 4, "Debería agregarse la tarjeta nueva"
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de datos por usuario para Salud Hoy
+Valida que el historial de hábitos, el perfil y las medallas de cada
+usuario estén separados, y la migración de bases de datos de un solo usuario
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import shutil
+from datetime import date
+
+# Importar la clase de base de datos
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database, SCHEMA_VERSION, DEFAULT_USER_ID
+
+
+# Esquema de un solo usuario (versión 1) para probar la migración
+ESQUEMA_V1 = """
+CREATE TABLE usuario_perfil(
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  name TEXT NOT NULL DEFAULT '',
+  goal TEXT NOT NULL DEFAULT 'Moverme más',
+  created_at DATETIME NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE habito(
+  key TEXT PRIMARY KEY,
+  title TEXT NOT NULL,
+  is_active INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0,1))
+);
+CREATE TABLE dia(day_date TEXT PRIMARY KEY);
+CREATE TABLE habitos_dia(
+  day_date TEXT NOT NULL,
+  habit_key TEXT NOT NULL,
+  done INTEGER NOT NULL DEFAULT 0 CHECK (done IN (0,1)),
+  PRIMARY KEY (day_date, habit_key),
+  FOREIGN KEY (day_date)  REFERENCES dia(day_date)   ON DELETE CASCADE,
+  FOREIGN KEY (habit_key) REFERENCES habito(key)      ON DELETE CASCADE
+);
+CREATE INDEX idx_habitos_dia_done ON habitos_dia(done);
+CREATE INDEX idx_habitos_dia_habit ON habitos_dia(habit_key);
+INSERT INTO usuario_perfil(id, name, goal) VALUES (1, 'Ana', 'Caminar');
+INSERT INTO habito(key, title) VALUES ('camina_10', 'Camina 10 minutos'), ('respira_1', 'Respira 1 minuto');
+INSERT INTO dia(day_date) VALUES ('2025-03-19'), ('2025-03-20');
+INSERT INTO habitos_dia VALUES ('2025-03-19', 'camina_10', 1), ('2025-03-20', 'camina_10', 1),
+                               ('2025-03-20', 'respira_1', 1);
+"""
+
+
+class TestMultiUsuario:
+    """Clase para probar la partición de datos por usuario"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Crea un directorio temporal para las bases de datos"""
+        temp_dir = tempfile.mkdtemp()
+
+        yield temp_dir
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_historiales_separados(self, temp_dir):
+        """Prueba que los hábitos de un usuario no aparezcan en otro"""
+        ana = Database(os.path.join(temp_dir, "test_salud_hoy.db"), user_id=1)
+        beto = ana.for_user(2)
+
+        ana.set_habit_status("2025-03-20", "camina_10", True)
+        ana.set_habit_status("2025-03-20", "respira_1", True)
+        beto.set_habit_status("2025-03-20", "camina_10", True)
+
+        assert ana.get_completed_count_for_day("2025-03-20") == 2, "Ana debería tener 2 hábitos"
+        assert beto.get_completed_count_for_day("2025-03-20") == 1, "Beto debería tener 1 hábito"
+        assert beto.get_day_habits("2025-03-20")["respira_1"] is False, "El hábito de Ana no debería verse en Beto"
+        assert beto.get_streak(threshold=2, today=date(2025, 3, 20)) == 0, "La racha de Beto no debería sumar a Ana"
+
+    def test_perfil_y_medallas_por_usuario(self, temp_dir):
+        """Prueba que el perfil y las medallas sean de cada usuario"""
+        ana = Database(os.path.join(temp_dir, "test_salud_hoy.db"), user_id=1)
+        beto = ana.for_user(2)
+
+        ana.update_profile("Ana", "Caminar")
+        ana.record_badge_unlock("first_active", "2025-03-20")
+
+        assert beto.get_profile() == {"name": "", "goal": "Moverme más"}, "Beto debería tener el perfil por defecto"
+        assert beto.get_badge_unlocks() == [], "Beto no debería tener medallas de Ana"
+        assert beto.record_badge_unlock("first_active", "2025-03-21") is True, "Cada usuario desbloquea sus medallas"
+
+    def test_reset_solo_del_usuario(self, temp_dir):
+        """Prueba que reset_all_data borre solo los datos del usuario actual"""
+        ana = Database(os.path.join(temp_dir, "test_salud_hoy.db"), user_id=1)
+        beto = ana.for_user(2)
+        ana.set_habit_status("2025-03-20", "camina_10", True)
+        beto.set_habit_status("2025-03-20", "camina_10", True)
+
+        beto.reset_all_data()
+
+        assert beto.get_all_days_with_habits() == [], "Los datos de Beto deberían borrarse"
+        assert ana.get_all_days_with_habits() == ["2025-03-20"], "Los datos de Ana no deberían tocarse"
+
+    def test_reset_trunca_tablas_sin_otros_usuarios(self, temp_dir):
+        """Prueba que el reset trunque solo las tablas en las que nadie más tiene datos"""
+        ana = Database(os.path.join(temp_dir, "test_salud_hoy.db"), user_id=1)
+        beto = ana.for_user(2)
+        ana.set_habit_status("2025-03-20", "camina_10", True)
+        ana.update_profile("Ana", "Caminar")
+        beto.set_habit_status("2025-03-20", "camina_10", True)
+        seq = ana.current_seq()
+
+        truncadas = beto.reset_all_data()
+        assert "sync_outbox" in truncadas, "Nadie tiene cambios pendientes: la tabla se puede truncar"
+        assert "habitos_dia" not in truncadas and "usuario_perfil" not in truncadas, \
+            "Ana tiene hábitos y perfil: se borran solo las filas de Beto"
+        assert ana.get_profile()["name"] == "Ana", "El perfil de Ana no debería tocarse"
+        assert ana.get_all_days_with_habits() == ["2025-03-20"]
+
+        truncadas = ana.reset_all_data()
+        assert set(truncadas) == {"habitos_dia", "dia", "badge_unlock", "usuario_perfil", "sync_outbox"}, \
+            "Sin otros usuarios deberían truncarse todas las tablas"
+        assert ana.get_all_days_with_habits() == []
+        assert len(ana.get_habits()) == 4, "El catálogo de hábitos no debería borrarse"
+        assert ana.current_seq() == seq, "El contador de cambios no debería volver a cero"
+
+    def test_reset_de_todos_los_usuarios(self, temp_dir):
+        """Prueba que reset_all_data(all_users=True) borre los datos de todos"""
+        ana = Database(os.path.join(temp_dir, "test_salud_hoy.db"), user_id=1)
+        beto = ana.for_user(2)
+        ana.set_habit_status("2025-03-20", "camina_10", True)
+        beto.set_habit_status("2025-03-21", "camina_10", True)
+
+        ana.reset_all_data(all_users=True)
+        assert ana.get_all_days_with_habits() == [] and beto.get_all_days_with_habits() == []
+
+    def test_vistas_comparten_la_conexion(self, temp_dir):
+        """Prueba que con persistent=True las vistas de otros usuarios usen una sola conexión"""
+        ana = Database(os.path.join(temp_dir, "test_salud_hoy.db"), user_id=1, persistent=True)
+        beto = ana.for_user(2)
+        carla = beto.for_user(3)
+
+        ana.get_completed_count_for_day("2025-03-20")
+        fallos = ana.statement_cache_stats()["misses"]
+        beto.get_completed_count_for_day("2025-03-20")
+        carla.get_completed_count_for_day("2025-03-20")
+        assert ana.statement_cache_stats()["misses"] == fallos, "La consulta debería prepararse una sola vez"
+
+        # Una operación de otra vista dentro de la transacción se suma a ella
+        with pytest.raises(RuntimeError):
+            with ana.transaction():
+                ana.set_habit_status("2025-03-20", "camina_10", True)
+                beto.set_habit_status("2025-03-20", "camina_10", True)
+                raise RuntimeError("cancelar")
+        assert beto.get_completed_count_for_day("2025-03-20") == 0, "La transacción debería deshacerse entera"
+
+        carla.close()
+        assert ana._conn is None, "Cerrar una vista debería liberar la conexión compartida"
+        assert beto.get_completed_count_for_day("2025-03-20") == 0, "La conexión debería reabrirse al usarse"
+        ana.close()
+
+    def test_migracion_desde_un_solo_usuario(self, temp_dir):
+        """Prueba que una base de datos de un solo usuario se migre al usuario por defecto"""
+        db_path = os.path.join(temp_dir, "test_salud_hoy.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript(ESQUEMA_V1)
+        conn.close()
+
+        db = Database(db_path)
+
+        assert db.user_id == DEFAULT_USER_ID
+        assert db.get_profile() == {"name": "Ana", "goal": "Caminar"}, "El perfil debería migrarse"
+        assert db.get_all_days_with_habits() == ["2025-03-19", "2025-03-20"], "Los días deberían migrarse"
+        assert db.get_completed_count_for_day("2025-03-20") == 2, "Los hábitos deberían migrarse"
+        assert db.for_user(2).get_all_days_with_habits() == [], "Otro usuario no debería heredar los datos"
+
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert not any(t.endswith("_v1") for t in tables), "No deberían quedar tablas de la versión anterior"
+        assert "idx_habitos_dia_habit" in indexes, "Los índices deberían recrearse sobre las tablas nuevas"
+
+    def test_reabrir_no_migra_de_nuevo(self, temp_dir):
+        """Prueba que abrir una base de datos ya migrada conserve los datos"""
+        db_path = os.path.join(temp_dir, "test_salud_hoy.db")
+        Database(db_path, user_id=5).set_habit_status("2025-03-20", "camina_10", True)
+
+        assert Database(db_path, user_id=5).get_completed_count_for_day("2025-03-20") == 1
+
+    def test_consultas_usan_indice_por_usuario(self, temp_dir):
+        """Prueba que los conteos de un usuario usen el índice (user_id, done, day_date)"""
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"))
+        with db.get_connection() as conn:
+            plan = " ".join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM habitos_dia "
+                "WHERE user_id = ? AND day_date BETWEEN ? AND ? AND done = 1",
+                (1, "2025-01-01", "2025-01-31")))
+        conn.close()
+        assert "idx_habitos_dia_user_done_day" in plan, f"Debería usarse el índice por usuario: {plan}"
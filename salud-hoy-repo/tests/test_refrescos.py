@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de los refrescos de la UI para Salud Hoy
+Valida que las invalidaciones se junten y cada parte de la pantalla se
+refresque a lo sumo una vez por frame, con los contadores de refrescos evitados
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+from unittest.mock import patch, Mock
+
+# Importar el planificador y la app
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.main import SaludHoyApp, today_key
+from app.database import Database
+from app.ui_refresh import RefreshScheduler
+
+
+class FakeTrigger:
+    """Disparador de Clock.create_trigger: el callback corre al avanzar el frame"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.pending = False
+
+    def __call__(self):
+        self.pending = True
+
+    def next_frame(self):
+        if self.pending:
+            self.pending = False
+            self.callback()
+
+
+class TestRefreshScheduler:
+    """Clase para probar el planificador de refrescos"""
+
+    def test_una_vez_por_frame(self):
+        """Prueba que varias invalidaciones en un frame cuesten un refresco por parte"""
+        llamadas = []
+        disparadores = []
+
+        def crear(callback):
+            disparadores.append(FakeTrigger(callback))
+            return disparadores[-1]
+
+        refrescos = RefreshScheduler([
+            ("counter", lambda: llamadas.append("counter")),
+            ("badges", lambda: llamadas.append("badges")),
+            ("tip", lambda: llamadas.append("tip")),
+        ], create_trigger=crear)
+        frame = disparadores[0]
+
+        for _ in range(3):
+            refrescos.invalidate("badges", "counter")
+        refrescos.invalidate("tip")
+        assert llamadas == [], "Nada debería refrescarse antes del próximo frame"
+
+        frame.next_frame()
+        assert llamadas == ["counter", "badges", "tip"], "Cada parte una vez, en el orden registrado"
+        frame.next_frame()
+        assert len(llamadas) == 3, "Sin invalidaciones nuevas no debería refrescarse nada"
+
+        stats = refrescos.stats()
+        assert stats["counter"] == {"requested": 3, "flushed": 1, "avoided": 2}
+        assert stats["tip"]["avoided"] == 0
+        assert "[REFRESH]" in refrescos.format_report()
+
+        with pytest.raises(KeyError):
+            refrescos.invalidate("desconocida")
+
+    def test_error_no_corta_el_frame(self, capsys):
+        """Prueba que si una parte falla las siguientes se refresquen igual"""
+        llamadas = []
+
+        def falla():
+            raise RuntimeError("widget sin construir")
+
+        refrescos = RefreshScheduler([
+            ("counter", falla),
+            ("badges", lambda: llamadas.append("badges")),
+        ], create_trigger=FakeTrigger)
+
+        refrescos.invalidate("counter", "badges")
+        refrescos.flush()
+        assert llamadas == ["badges"], "Las partes siguientes deberían refrescarse"
+        assert refrescos.errors["counter"] == 1 and refrescos.errors["badges"] == 0
+        assert "counter" in capsys.readouterr().out, "El error debería registrarse"
+
+        refrescos.flush()
+        assert refrescos.flushed["counter"] == 1, "Una parte que falló no debería reintentarse en cada frame"
+        refrescos.invalidate("counter")
+        refrescos.flush()
+        assert refrescos.flushed["counter"] == 2, "Una nueva invalidación debería volver a intentarlo"
+
+
+class TestRefrescosApp:
+    """Clase para probar los refrescos desde la app"""
+
+    @pytest.fixture
+    def temp_app(self):
+        """Crea una aplicación temporal con una base de datos aislada"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"))
+
+        with patch('kivymd.app.MDApp.__init__', return_value=None), \
+             patch('app.main.toast'):
+            app = SaludHoyApp()
+            app.root = Mock()
+            app.db = db
+            app.is_loading = False
+
+            yield app
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_toggles_seguidos(self, temp_app):
+        """Prueba que varios toggles en un frame refresquen contador y medallas una vez"""
+        with patch.object(temp_app, '_update_today_counter') as contador, \
+             patch.object(temp_app, '_build_badges_ui') as medallas:
+            for key in ("camina_10", "estirate_2", "respira_1", "postura_1"):
+                temp_app.on_toggle_habit(key, True)
+
+            assert contador.call_count == 0, "El refresco debería esperar al próximo frame"
+            assert temp_app.db.get_completed_count_for_day(today_key()) == 4, \
+                "Los toggles deberían guardarse de inmediato"
+
+            temp_app._ui_refresh.flush()
+            contador.assert_called_once()
+            medallas.assert_called_once()
+
+        stats = temp_app._ui_refresh.stats()
+        assert stats["counter"]["avoided"] == 3
+        assert stats["badges"]["avoided"] == 3
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del router de bases de datos por usuario para Salud Hoy
+Valida la ruta de cada archivo, la creación perezosa, la caché LRU de
+conexiones y el cierre limpio al desalojar
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Importar el router
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.db_router import DatabaseRouter
+from app.database import Database
+from .test_multiusuario import ESQUEMA_V1
+
+
+class TestDatabaseRouter:
+    """Clase para probar el router de bases de datos por usuario"""
+
+    @pytest.fixture
+    def temp_router(self):
+        """Crea un router temporal con como máximo 2 bases de datos abiertas"""
+        temp_dir = tempfile.mkdtemp()
+        router = DatabaseRouter(temp_dir, max_open=2, shards=16)
+
+        yield router
+
+        try:
+            router.close_all()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_ruta_por_usuario(self, temp_router):
+        """Prueba que cada usuario tenga su archivo repartido en subdirectorios"""
+        path = temp_router.path_for(42)
+        assert path == os.path.join(temp_router.base_dir, "0a", "user_42.db"), "La ruta debería usar el shard 42 % 16"
+        assert temp_router.path_for(58) != path, "Cada usuario debería tener su propio archivo"
+
+    def test_creacion_perezosa(self, temp_router):
+        """Prueba que el archivo se cree recién en el primer acceso"""
+        path = temp_router.path_for(1)
+        assert not os.path.exists(path), "El archivo no debería existir antes del primer acceso"
+
+        db = temp_router.get(1)
+        db.set_habit_status("2025-03-20", "camina_10", True)
+
+        assert os.path.exists(path), "El archivo debería crearse en el primer acceso"
+        assert db.user_id == 1, "La base de datos debería limitarse al usuario"
+
+    def test_lru_desaloja_el_menos_usado(self, temp_router):
+        """Prueba que al superar el límite se cierre la base de datos menos usada"""
+        uno = temp_router.get(1)
+        uno.get_profile()
+        temp_router.get(2)
+        temp_router.get(1)
+        temp_router.get(3)
+
+        assert temp_router.open_count() == 2, "No debería superarse el límite de abiertas"
+        assert temp_router.get(1) is uno, "El usuario 1 se usó hace poco y debería seguir abierto"
+        assert temp_router.evictions == 1, "Debería haberse desalojado una base de datos"
+        assert temp_router.hits == 2 and temp_router.misses == 3
+
+    def test_desalojo_cierra_y_conserva_datos(self, temp_router):
+        """Prueba que desalojar cierre la conexión sin perder datos"""
+        db = temp_router.get(7)
+        db.set_habit_status("2025-03-20", "camina_10", True)
+
+        assert temp_router.evict(7) is True
+        assert db._conn is None, "La conexión debería cerrarse al desalojar"
+        assert temp_router.get(7).get_completed_count_for_day("2025-03-20") == 1, "Los datos deberían conservarse"
+
+    def test_referencia_desalojada_sigue_funcionando(self, temp_router):
+        """Prueba que una instancia desalojada vuelva a abrir su conexión si se usa"""
+        db = temp_router.get(1)
+        temp_router.get(2)
+        temp_router.get(3)
+
+        db.set_habit_status("2025-03-20", "camina_10", True)
+        assert db.get_completed_count_for_day("2025-03-20") == 1
+        assert db._conn is None, "Fuera de la caché no debería quedar una conexión abierta"
+        assert temp_router.get(1).get_completed_count_for_day("2025-03-20") == 1
+
+    def test_apertura_fuera_del_lock(self, temp_router):
+        """Prueba que abrir un archivo no frene a otros usuarios y que dos aperturas del mismo usuario den una instancia"""
+        creadas = []
+        barrera = threading.Barrier(2)
+
+        class DatabaseLenta(Database):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                creadas.append(self)
+                if self.user_id == 1:
+                    # Las dos aperturas del usuario 1 esperan a estar en curso a la vez
+                    barrera.wait(5)
+
+        with patch('app.db_router.Database', DatabaseLenta):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                futuros = [pool.submit(temp_router.get, 1) for _ in range(2)]
+                assert temp_router.get(2).user_id == 2, "Otro usuario no debería esperar a la apertura"
+                primera, segunda = [f.result(timeout=10) for f in futuros]
+
+        assert primera is segunda, "Dos aperturas concurrentes deberían retornar la misma instancia"
+        assert len(creadas) == 3 and temp_router.open_count() == 2
+        perdedora = next(db for db in creadas if db.user_id == 1 and db is not primera)
+        assert perdedora._conn is None, "La instancia descartada no debería quedar abierta"
+
+    def test_migra_archivo_existente(self, temp_router):
+        """Prueba que un archivo del esquema anterior se migre en el primer acceso"""
+        path = temp_router.path_for(1)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.executescript(ESQUEMA_V1)
+        conn.close()
+
+        assert temp_router.get(1).get_completed_count_for_day("2025-03-20") == 2, "Los datos deberían migrarse"
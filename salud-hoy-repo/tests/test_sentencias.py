@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del registro de sentencias SQL para Salud Hoy
+Valida que las operaciones ejecuten solo sentencias del registro, que la
+conexión persistente reutilice las sentencias preparadas (tasa de aciertos
+de la caché) y que AuthDatabase funcione con conexión persistente
+"""
+
+import pytest
+import os
+import re
+import sqlite3
+import tempfile
+import shutil
+import threading
+from datetime import date
+
+# Importar las clases de base de datos
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database, StatementCache, STATEMENTS
+from app.auth_database import AuthDatabase, AUTH_STATEMENTS
+
+
+def _operaciones(db):
+    """Recorre las operaciones que usa la interfaz"""
+    db.update_profile("Ana", 3)
+    db.get_profile()
+    db.get_habits()
+    db.set_habit_status("2025-01-02", "camina_10", True)
+    db.get_day_habits("2025-01-02")
+    db.get_completed_count_for_day("2025-01-02")
+    db.get_streak(1, date(2025, 1, 2))
+    db.get_active_days_count("2025-01-01", "2025-01-31")
+    db.get_monthly_active_days(2025, 1)
+    db.get_history_page()
+    db.get_history_page(after="2025-01-01")
+    db.get_daily_counts("2025-01-01", "2025-01-31")
+    db.queue_habit_change("2025-01-02", "camina_10")
+    db.get_outbox()
+    list(db.iter_habit_history())
+
+
+class TestSentencias:
+    """Clase para probar el registro de sentencias y la caché"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Crea un directorio temporal para las bases de datos"""
+        temp_dir = tempfile.mkdtemp()
+
+        yield temp_dir
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_solo_sentencias_del_registro(self, temp_dir):
+        """Prueba que las operaciones no ejecuten SQL fuera del registro"""
+        db = Database(os.path.join(temp_dir, "salud_hoy.db"), persistent=True)
+        ejecutadas = []
+        db._open_connection()[0].set_trace_callback(ejecutadas.append)
+
+        _operaciones(db)
+        db.reset_all_data()
+        db.close()
+
+        # El trace muestra los valores de los parámetros: cada ? acepta un literal
+        literal = r"(?:'[^']*'|-?[0-9.]+|NULL)"
+        registradas = [re.compile(re.escape(" ".join(sql.split())).replace(r"\?", literal))
+                       for sql in STATEMENTS.values()]
+        fuera = [sql for sql in ejecutadas
+                 if sql not in ("BEGIN ", "COMMIT")
+                 and not any(r.fullmatch(" ".join(sql.split())) for r in registradas)]
+        assert fuera == [], f"SQL fuera del registro: {fuera}"
+
+    def test_tasa_de_aciertos(self, temp_dir):
+        """Prueba que la conexión persistente prepare cada sentencia una sola vez"""
+        db_path = os.path.join(temp_dir, "salud_hoy.db")
+        persistente = Database(db_path, persistent=True)
+        por_operacion = Database(db_path, ensure_schema=False)
+        for _ in range(20):
+            _operaciones(persistente)
+            _operaciones(por_operacion)
+
+        stats = persistente.statement_cache_stats()
+        # iter_* abre su propia conexión (prepara de nuevo en cada recorrido)
+        assert stats["misses"] - 20 <= len(STATEMENTS), "Cada sentencia debería prepararse una sola vez"
+        assert stats["hit_rate"] > 0.8, f"Tasa de aciertos muy baja: {stats['hit_rate']:.2f}"
+        assert por_operacion.statement_cache_stats()["hit_rate"] < 0.5, \
+            "Sin conexión persistente cada operación vuelve a preparar sus consultas"
+
+        # Al cerrar se pierde la caché de la conexión
+        persistente.close()
+        misses = persistente.statement_cache_stats()["misses"]
+        persistente.get_profile()
+        assert persistente.statement_cache_stats()["misses"] == misses + 1
+
+    def test_cache_lru(self):
+        """Prueba que StatementCache replique el desalojo LRU de sqlite3"""
+        cache = StatementCache(capacity=2)
+        conexion = cache.new_connection()
+        for sql in ("A", "B", "A", "C", "B"):
+            cache.record(conexion, sql)
+        # A es acierto; C desaloja a B (la menos usada), que vuelve a fallar
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 4
+
+    def test_usuarios_persistente(self, temp_dir):
+        """Prueba AuthDatabase con conexión persistente compartida entre hilos"""
+        auth = AuthDatabase(os.path.join(temp_dir, "users.db"), persistent=True)
+        assert auth.add_user("Ana", "ana@example.com", "secreta123")
+        assert not auth.add_user("Ana", "ana@example.com", "secreta123"), "El email debería ser único"
+        user = auth.check_user("ana@example.com", "secreta123")
+        tokens = []
+
+        def sesiones():
+            for _ in range(20):
+                tokens.append(auth.create_session(user["id"]))
+
+        hilos = [threading.Thread(target=sesiones) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        assert auth.get_session_count() == 80
+        assert all(auth.validate_session(token) for token in tokens[:5])
+        assert auth.revoke_session(tokens[0])
+        assert auth.statement_cache_stats()["misses"] <= len(AUTH_STATEMENTS)
+
+        # Los cambios quedan confirmados para otras conexiones
+        auth.close()
+        conn = sqlite3.connect(auth.db_path)
+        assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 79
+        conn.close()
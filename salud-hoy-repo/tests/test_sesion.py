@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del gestor de sesiones para Salud Hoy
+Valida la escritura atómica (temporal + os.replace), la tolerancia a
+archivos escritos a medias, la caché en memoria de la sesión y los
+tokens de sesión guardados en users.db
+"""
+
+import pytest
+import os
+import json
+import tempfile
+import shutil
+from unittest.mock import patch
+
+# Importar el gestor de sesiones
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.session_manager import SessionManager
+from app.auth_database import AuthDatabase, SESSION_TTL
+
+
+USUARIO = {"id": 1, "name": "Usuario Test", "email": "test@example.com"}
+
+
+class TestSessionManager:
+    """Clase para probar el gestor de sesiones"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Crea un directorio temporal para el archivo de sesión"""
+        temp_dir = tempfile.mkdtemp()
+
+        yield temp_dir
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_guardar_y_cargar(self, temp_dir):
+        """Prueba que la sesión guardada se pueda leer desde otra instancia"""
+        path = os.path.join(temp_dir, "session.json")
+        assert SessionManager(path).save_session(USUARIO) is True, "La sesión debería guardarse"
+
+        assert SessionManager(path).load_session() == USUARIO, "La sesión leída debería ser igual a la guardada"
+        with open(path, encoding='utf-8') as f:
+            assert "\n" not in f.read(), "El archivo debería estar en formato compacto"
+
+    def test_corte_antes_de_reemplazar(self, temp_dir):
+        """Prueba que un corte durante la escritura deje intacta la sesión anterior"""
+        path = os.path.join(temp_dir, "session.json")
+        sm = SessionManager(path)
+        sm.save_session(USUARIO)
+
+        with patch('app.session_manager.os.replace', side_effect=OSError("corte simulado")):
+            assert sm.save_session({"id": 2, "name": "Otro", "email": "otro@example.com"}) is False
+
+        assert SessionManager(path).load_session() == USUARIO, "La sesión anterior debería seguir intacta"
+        assert os.listdir(temp_dir) == ["session.json"], "No deberían quedar archivos temporales"
+
+    def test_error_a_mitad_de_json(self, temp_dir):
+        """Prueba que un error a mitad de la serialización no toque el archivo de sesión"""
+        path = os.path.join(temp_dir, "session.json")
+        sm = SessionManager(path)
+        sm.save_session(USUARIO)
+
+        with patch('app.session_manager.os.fsync', side_effect=OSError("disco lleno")):
+            assert sm.save_session({"id": 2}) is False
+
+        assert SessionManager(path).load_session() == USUARIO, "La sesión anterior debería seguir intacta"
+        assert sm.load_session() == USUARIO, "La caché no debería cambiar si falla la escritura"
+
+    def test_archivo_truncado(self, temp_dir):
+        """Prueba que un archivo escrito a medias (formato anterior) se trate como sin sesión"""
+        path = os.path.join(temp_dir, "session.json")
+        contenido = json.dumps(USUARIO, indent=2)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(contenido[:len(contenido) // 2])
+
+        sm = SessionManager(path)
+        assert sm.load_session() is None, "Un archivo truncado no debería cargarse"
+        assert sm.has_active_session() is False, "No debería haber sesión activa"
+
+    def test_cache_sin_lecturas_repetidas(self, temp_dir):
+        """Prueba que has_active_session y load_session lean el disco una sola vez"""
+        path = os.path.join(temp_dir, "session.json")
+        SessionManager(path).save_session(USUARIO)
+        sm = SessionManager(path)
+
+        with patch('builtins.open', wraps=open) as mock_open:
+            for _ in range(100):
+                assert sm.has_active_session() is True
+                sm.load_session()
+
+        assert mock_open.call_count == 1, "El archivo de sesión debería leerse una sola vez"
+
+    def test_copia_no_modifica_cache(self, temp_dir):
+        """Prueba que modificar el diccionario retornado no altere la sesión en memoria"""
+        sm = SessionManager(os.path.join(temp_dir, "session.json"))
+        sm.save_session(USUARIO)
+
+        sm.load_session()["name"] = "Cambiado"
+        assert sm.load_session()["name"] == "Usuario Test", "La caché no debería modificarse desde afuera"
+
+    def test_cerrar_sesion(self, temp_dir):
+        """Prueba que clear_session borre el archivo y la caché"""
+        path = os.path.join(temp_dir, "session.json")
+        sm = SessionManager(path)
+        sm.save_session(USUARIO)
+
+        assert sm.clear_session() is True
+        assert not os.path.exists(path), "El archivo de sesión debería borrarse"
+        assert sm.has_active_session() is False, "No debería haber sesión activa"
+        assert sm.clear_session() is True, "Cerrar sesión dos veces no debería fallar"
+
+
+class TestSessionTokens:
+    """Clase para probar los tokens de sesión de AuthDatabase"""
+
+    @pytest.fixture
+    def temp_auth(self):
+        """Crea una base de datos de usuarios temporal con un usuario"""
+        temp_dir = tempfile.mkdtemp()
+        auth_db = AuthDatabase(os.path.join(temp_dir, "test_users.db"))
+        auth_db.add_user("Usuario Test", "test@example.com", "password123")
+        user_id = auth_db.get_user_by_email("test@example.com")["id"]
+
+        yield auth_db, user_id, temp_dir
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_token_valido(self, temp_auth):
+        """Prueba que un token recién creado identifique al usuario"""
+        auth_db, user_id, _ = temp_auth
+        token = auth_db.create_session(user_id)
+
+        user = auth_db.validate_session(token)
+        assert user is not None and user["id"] == user_id, "El token debería identificar al usuario"
+        assert user["email"] == "test@example.com"
+
+    def test_token_no_se_guarda_en_claro(self, temp_auth):
+        """Prueba que users.db guarde solo el hash del token"""
+        auth_db, user_id, _ = temp_auth
+        token = auth_db.create_session(user_id)
+
+        with auth_db.get_connection() as conn:
+            stored = conn.execute("SELECT token_hash FROM sessions").fetchone()[0]
+        assert stored != token, "El token no debería guardarse en texto plano"
+
+    def test_token_vencido(self, temp_auth):
+        """Prueba que un token vencido no sea válido y se pode"""
+        auth_db, user_id, _ = temp_auth
+        token = auth_db.create_session(user_id, now=1000)
+
+        assert auth_db.validate_session(token, now=1000 + SESSION_TTL) is None, "El token debería vencer"
+        assert auth_db.prune_expired_sessions(now=1000 + SESSION_TTL) == 1, "Debería podarse la sesión vencida"
+        assert auth_db.get_session_count() == 0
+
+    def test_token_revocado_y_desconocido(self, temp_auth):
+        """Prueba que los tokens revocados o inventados no sean válidos"""
+        auth_db, user_id, _ = temp_auth
+        token = auth_db.create_session(user_id)
+
+        assert auth_db.revoke_session(token) is True
+        assert auth_db.validate_session(token) is None, "Un token revocado no debería ser válido"
+        assert auth_db.validate_session("inventado") is None, "Un token desconocido no debería ser válido"
+        assert auth_db.validate_session(None) is None
+
+    def test_last_seen(self, temp_auth):
+        """Prueba que last_seen se actualice como mucho una vez por minuto"""
+        auth_db, user_id, _ = temp_auth
+        token = auth_db.create_session(user_id, now=1000)
+
+        def last_seen():
+            with auth_db.get_connection() as conn:
+                return conn.execute("SELECT last_seen FROM sessions").fetchone()[0]
+
+        auth_db.validate_session(token, now=1030)
+        assert last_seen() == 1000, "No debería escribirse antes de un minuto"
+        auth_db.validate_session(token, now=1090)
+        assert last_seen() == 1090, "Debería actualizarse después de un minuto"
+
+    def test_archivo_solo_con_token(self, temp_auth):
+        """Prueba que el archivo de sesión guarde solo el token"""
+        auth_db, user_id, temp_dir = temp_auth
+        path = os.path.join(temp_dir, "session.json")
+        SessionManager(path).save_token(auth_db.create_session(user_id))
+
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        assert list(data) == ["token"], "El archivo solo debería tener el token"
+        assert auth_db.validate_session(SessionManager(path).load_token()) is not None
+
+    def test_archivo_formato_anterior(self, temp_auth):
+        """Prueba que una sesión del formato anterior (datos del usuario) no tenga token"""
+        _, _, temp_dir = temp_auth
+        path = os.path.join(temp_dir, "session.json")
+        SessionManager(path).save_session(USUARIO)
+
+        assert SessionManager(path).load_token() is None, "El formato anterior debería pedir login"
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de lectura por streaming para Salud Hoy
+Valida que los métodos iter_* retornen lo mismo que las versiones que
+arman el resultado completo, lean de a lotes y liberen su conexión
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+import tracemalloc
+from datetime import date, timedelta
+
+# Importar la clase de base de datos
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+
+
+INICIO = date(2024, 1, 1)
+HABITOS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+class TestStreaming:
+    """Clase para probar los generadores de rangos de fechas"""
+
+    @pytest.fixture
+    def temp_db(self):
+        """Crea una base de datos temporal con 60 días de historial"""
+        temp_dir = tempfile.mkdtemp()
+        db = Database(os.path.join(temp_dir, "test_salud_hoy.db"))
+        with db.transaction():
+            for i in range(60):
+                day = (INICIO + timedelta(days=i)).isoformat()
+                for j, key in enumerate(HABITOS):
+                    # Patrón variado: algunos hábitos desmarcados, algunos días vacíos
+                    if (i + j) % 3:
+                        db.set_habit_status(day, key, (i * j) % 5 != 0)
+
+        yield db
+
+        try:
+            db.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def test_iter_igual_a_get(self, temp_db):
+        """Prueba que los generadores retornen lo mismo que los métodos get_*"""
+        start, end = "2024-01-10", "2024-02-20"
+        esperado = temp_db.get_habits_for_date_range(start, end)
+        assert dict(temp_db.iter_days_for_date_range(start, end, fetch_size=3)) == esperado, \
+            "Agrupar por día debería dar el mismo resultado aunque los lotes corten un día"
+        assert list(temp_db.iter_all_days_with_habits(fetch_size=7)) == temp_db.get_all_days_with_habits()
+
+    def test_filas_ordenadas_y_filtro_done(self, temp_db):
+        """Prueba el orden de las filas y el parámetro only_done"""
+        filas = list(temp_db.iter_habits_for_date_range("2024-01-01", "2024-01-31", only_done=False))
+        assert filas == sorted(filas), "Las filas deberían estar ordenadas por día y hábito"
+        assert any(not done for _, _, done in filas), "only_done=False debería incluir hábitos desmarcados"
+        completados = list(temp_db.iter_habits_for_date_range("2024-01-01", "2024-01-31"))
+        assert completados == [f for f in filas if f[2]], "Por defecto solo deberían retornarse los completados"
+
+    def test_generador_descartado_libera_la_conexion(self, temp_db):
+        """Prueba que un generador a medio recorrer no bloquee las escrituras al cerrarse"""
+        rows = temp_db.iter_habits_for_date_range("2024-01-01", "2024-12-31", fetch_size=2)
+        next(rows)
+        rows.close()
+        temp_db.set_habit_status("2024-03-15", "camina_10", True)
+        assert temp_db.get_day_habits("2024-03-15")["camina_10"] is True, \
+            "La escritura debería confirmarse después de cerrar el generador"
+
+    def test_memoria_constante(self, temp_db):
+        """Prueba que recorrer el rango no acumule las filas en memoria"""
+        with temp_db.transaction():
+            for i in range(60, 1500):
+                day = (INICIO + timedelta(days=i)).isoformat()
+                for key in HABITOS:
+                    temp_db.set_habit_status(day, key, True)
+
+        tracemalloc.start()
+        try:
+            total = sum(1 for _ in temp_db.iter_habits_for_date_range("2024-01-01", "2030-12-31", fetch_size=100))
+            _, pico_stream = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            temp_db.get_habits_for_date_range("2024-01-01", "2030-12-31")
+            _, pico_dict = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert total > 5000, "El rango debería tener miles de filas"
+        assert pico_stream * 4 < pico_dict, "El streaming debería usar mucha menos memoria que el dict completo"
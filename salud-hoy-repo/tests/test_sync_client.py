@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del cliente de sincronización para Salud Hoy
+Valida la bandeja de salida (sync_outbox): toggles sin conexión, cambios
+reemplazados, métricas, reintentos y el envío contra un servidor de prueba
+que corta conexiones al azar
+"""
+
+import pytest
+import os
+import json
+import random
+import tempfile
+import shutil
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Importar las clases de base de datos y sincronización
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database
+from app.sync_client import SyncClient
+
+
+DIA = "2025-03-20"
+HABITOS = ["camina_10", "estirate_2", "respira_1", "postura_1"]
+
+
+class ServidorInestable:
+    """
+    Servidor de prueba para POST /changes que aplica los cambios en su propia
+    copia de la base de datos y corta conexiones al azar: antes de aplicar
+    (el lote se pierde) o después de aplicar (se pierde solo la respuesta)
+    """
+
+    def __init__(self, db, drop_rate=0.0, seed=7):
+        self.db = db
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.batch_sizes = []
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                servidor.requests += 1
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                corte = servidor.rng.random() < servidor.drop_rate
+                if corte and servidor.rng.random() < 0.5:
+                    self.close_connection = True
+                    return
+                changes = body["changes"]
+                if any(c["habit_key"] not in HABITOS for c in changes):
+                    self._json(400, {"error": "Hábito desconocido"})
+                    return
+                servidor.batch_sizes.append(len(changes))
+                servidor.db.apply_changes(
+                    ["h", 0, c["date"], c["habit_key"], int(c["done"]), c["updated_at"]]
+                    for c in changes
+                )
+                if corte:
+                    self.close_connection = True
+                    return
+                self._json(200, {"applied": len(changes)})
+
+            def _json(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class Reloj:
+    """Reloj manual para la espera entre reintentos"""
+
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def puerto_cerrado():
+    """URL a la que nadie escucha"""
+    import socket
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return f"http://127.0.0.1:{port}"
+
+
+class TestSyncClient:
+    """Clase para probar la bandeja de salida y su envío"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Crea un directorio temporal para las bases de datos"""
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    @pytest.fixture
+    def local(self, temp_dir):
+        """Base de datos del dispositivo"""
+        return Database(os.path.join(temp_dir, "local.db"))
+
+    @pytest.fixture
+    def remoto(self, temp_dir):
+        """Base de datos del servidor de prueba"""
+        return Database(os.path.join(temp_dir, "remoto.db"))
+
+    def test_toggle_sin_conexion(self, local):
+        """Prueba que un toggle sin servidor se guarde y quede pendiente"""
+        client = SyncClient(local, puerto_cerrado(), "token", clock=Reloj())
+        client.record_toggle(DIA, "camina_10", True)
+
+        assert local.get_day_habits(DIA)["camina_10"] is True, "El toggle debería verse al instante"
+        assert client.flush() is False, "Sin servidor el envío debería fallar"
+        stats = client.stats()
+        assert stats["depth"] == 1 and stats["failures"] == 1, "El cambio debería seguir en la bandeja"
+        assert stats["last_error"], "Debería registrarse el error"
+
+    def test_cambios_reemplazados(self, local):
+        """Prueba que varios toggles del mismo hábito y día dejen un solo pendiente"""
+        client = SyncClient(local, puerto_cerrado(), "token")
+        for done in (True, False, True):
+            client.record_toggle(DIA, "camina_10", done)
+        client.record_toggle(DIA, "respira_1", True)
+
+        outbox = local.get_outbox()
+        assert [c["habit_key"] for c in outbox] == ["camina_10", "respira_1"], "Debería quedar un pendiente por hábito"
+        assert outbox[0]["done"] is True, "Debería quedar el último estado"
+        assert client.stats()["collapsed"] == 2, "Deberían contarse los cambios reemplazados"
+
+    def test_cambio_durante_el_envio_se_conserva(self, local):
+        """Prueba que un cambio hecho mientras se enviaba su versión anterior no se pierda"""
+        local.clock = Reloj()
+        local.set_habit_status(DIA, "camina_10", True)
+        local.queue_habit_change(DIA, "camina_10")
+        lote = local.get_outbox()
+
+        local.clock.t = 1.0
+        local.set_habit_status(DIA, "camina_10", False)
+        local.queue_habit_change(DIA, "camina_10")
+        local.remove_from_outbox(lote)
+
+        outbox = local.get_outbox()
+        assert len(outbox) == 1 and outbox[0]["done"] is False, "El cambio nuevo debería seguir pendiente"
+
+    def test_antiguedad_de_la_cola(self, local):
+        """Prueba que oldest_age mida desde el primer cambio pendiente"""
+        reloj = Reloj()
+        local.clock = reloj
+        reloj.t = 100.0
+        local.set_habit_status(DIA, "camina_10", True)
+        local.queue_habit_change(DIA, "camina_10")
+        reloj.t = 130.0
+        local.set_habit_status(DIA, "camina_10", False)
+        local.queue_habit_change(DIA, "camina_10")
+
+        assert local.get_outbox_stats() == {"depth": 1, "oldest_age": 30.0}, \
+            "Reemplazar un cambio no debería reiniciar la antigüedad"
+
+    def test_espera_exponencial(self, local):
+        """Prueba que después de cada fallo se espere el doble antes de reintentar"""
+        reloj = Reloj()
+        client = SyncClient(local, puerto_cerrado(), "token", clock=reloj)
+        client.record_toggle(DIA, "camina_10", True)
+
+        client.flush()
+        assert not client.is_due(), "No debería reintentar inmediatamente"
+        reloj.t = 1.0
+        assert client.is_due(), "Debería reintentar después de 1 s"
+        client.flush()
+        reloj.t = 2.5
+        assert not client.is_due(), "La segunda espera debería ser de 2 s"
+
+    def test_reenvio_con_servidor_inestable(self, local, remoto):
+        """Prueba que todos los cambios lleguen aunque el servidor corte conexiones"""
+        servidor = ServidorInestable(remoto, drop_rate=0.4)
+        try:
+            client = SyncClient(local, servidor.url, "token", batch_size=8, timeout=2, clock=Reloj())
+            inicio = date(2025, 3, 1)
+            rng = random.Random(3)
+            esperado = {}
+            for _ in range(120):
+                day = (inicio + timedelta(days=rng.randint(0, 13))).isoformat()
+                habit_key, done = rng.choice(HABITOS), rng.random() < 0.7
+                client.record_toggle(day, habit_key, done)
+                esperado[(day, habit_key)] = done
+
+            for _ in range(200):
+                if client.flush():
+                    break
+            assert client.stats()["depth"] == 0, "La bandeja debería vaciarse"
+            assert client.failures > 0, "El servidor de prueba debería haber cortado conexiones"
+            assert max(servidor.batch_sizes) <= 8, "Los lotes no deberían superar batch_size"
+            assert remoto.get_all_days_with_habits() == local.get_all_days_with_habits(), \
+                "El servidor debería tener el mismo estado que el dispositivo"
+            for (day, habit_key), done in esperado.items():
+                assert remoto.get_day_habits(day)[habit_key] is done, \
+                    f"El servidor debería tener el último estado de {habit_key} el {day}"
+        finally:
+            servidor.close()
+
+    def test_cambios_rechazados(self, local, remoto):
+        """Prueba que de un lote rechazado (400) se descarte solo el cambio inválido"""
+        servidor = ServidorInestable(remoto)
+        try:
+            with local.transaction():
+                for habit_key in HABITOS:
+                    local.set_habit_status(DIA, habit_key, True)
+                    local.queue_habit_change(DIA, habit_key)
+            conn = local.get_connection()
+            conn.execute("UPDATE sync_outbox SET habit_key = 'no_existe' WHERE habit_key = 'estirate_2'")
+            conn.commit()
+            conn.close()
+
+            client = SyncClient(local, servidor.url, "token")
+            assert client.flush() is True, "La bandeja debería quedar vacía"
+            assert client.rejected == 1, "Debería contarse solo el cambio rechazado"
+            assert client.sent == 3, "Los cambios válidos del lote deberían enviarse"
+            dia = remoto.get_day_habits(DIA)
+            assert dia["camina_10"] and dia["respira_1"] and dia["postura_1"], \
+                "Los cambios válidos deberían llegar al servidor"
+            assert dia["estirate_2"] is False, "El cambio rechazado no debería aplicarse"
+        finally:
+            servidor.close()
+
+    def test_reset_vacia_la_bandeja(self, local):
+        """Prueba que reset_all_data no deje cambios pendientes de datos borrados"""
+        client = SyncClient(local, puerto_cerrado(), "token")
+        client.record_toggle(DIA, "camina_10", True)
+        local.reset_all_data()
+        assert local.get_outbox() == [], "La bandeja debería vaciarse"
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de sincronización por deltas para Salud Hoy
+Valida el registro de cambios (seq), changes_since, la mezcla con
+last-writer-wins y que dos copias de la base de datos converjan
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import shutil
+import threading
+
+# Importar la clase de base de datos
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.database import Database, SCHEMA_VERSION
+
+
+DIA = "2025-03-20"
+
+# Esquema por usuario sin registro de cambios (versión 2) para probar la migración
+ESQUEMA_V2 = """
+CREATE TABLE usuario_perfil(
+  user_id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL DEFAULT '',
+  goal TEXT NOT NULL DEFAULT 'Moverme más',
+  created_at DATETIME NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE habito(
+  key TEXT PRIMARY KEY,
+  title TEXT NOT NULL,
+  is_active INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0,1))
+);
+CREATE TABLE dia(user_id INTEGER NOT NULL, day_date TEXT NOT NULL, PRIMARY KEY (user_id, day_date));
+CREATE TABLE habitos_dia(
+  user_id INTEGER NOT NULL,
+  day_date TEXT NOT NULL,
+  habit_key TEXT NOT NULL,
+  done INTEGER NOT NULL DEFAULT 0 CHECK (done IN (0,1)),
+  PRIMARY KEY (user_id, day_date, habit_key)
+);
+CREATE TABLE badge_unlock(
+  user_id INTEGER NOT NULL,
+  badge_key TEXT NOT NULL,
+  day_date TEXT NOT NULL,
+  unlocked_at DATETIME NOT NULL DEFAULT (datetime('now')),
+  PRIMARY KEY (user_id, badge_key)
+);
+INSERT INTO habito(key, title) VALUES ('camina_10', 'Camina 10 minutos');
+INSERT INTO dia VALUES (1, '2025-03-20');
+INSERT INTO habitos_dia VALUES (1, '2025-03-20', 'camina_10', 1);
+PRAGMA user_version = 2;
+"""
+
+
+class Reloj:
+    """Reloj manual para controlar updated_at"""
+
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def sincronizar(origen, destino, desde):
+    """Envía los deltas de origen posteriores a `desde` y retorna el nuevo punto de partida"""
+    seq = origen.current_seq()
+    destino.apply_changes(origen.changes_since(desde))
+    return seq
+
+
+class TestSyncDelta:
+    """Clase para probar la sincronización por deltas entre dos copias"""
+
+    @pytest.fixture
+    def copias(self):
+        """Crea dos bases de datos temporales (dos dispositivos del mismo usuario)"""
+        temp_dir = tempfile.mkdtemp()
+        a = Database(os.path.join(temp_dir, "a.db"))
+        b = Database(os.path.join(temp_dir, "b.db"))
+        a.clock = Reloj(1000.0)
+        b.clock = Reloj(1000.0)
+
+        yield a, b
+
+        try:
+            a.close()
+            b.close()
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def estado(self, db):
+        return db.get_all_days_with_habits(), db.get_profile()
+
+    def test_seq_crece_por_escritura(self, copias):
+        """Prueba que cada escritura tome un número de cambio mayor"""
+        a, _ = copias
+        assert a.current_seq() == 0, "Una base nueva debería empezar en 0"
+
+        a.set_habit_status(DIA, "camina_10", True)
+        primero = a.current_seq()
+        a.update_profile("Ana", "Caminar")
+        assert a.current_seq() > primero > 0, "Cada escritura debería avanzar el número de cambio"
+
+        cambios = list(a.changes_since(primero))
+        assert cambios == [["p", a.current_seq(), "Ana", "Caminar", 1000000]], \
+            "Solo debería enviarse lo posterior a seq"
+
+    def test_solo_ultimo_estado(self, copias):
+        """Prueba que las escrituras reemplazadas no se envíen"""
+        a, _ = copias
+        for done in (True, False, True):
+            a.set_habit_status(DIA, "camina_10", done)
+        cambios = list(a.changes_since(None))
+        assert len(cambios) == 1 and cambios[0][4] == 1, "Solo debería enviarse el último estado"
+
+    def test_copias_convergen(self, copias):
+        """Prueba que dos copias con cambios distintos terminen iguales"""
+        a, b = copias
+        a.set_habit_status(DIA, "camina_10", True)
+        a.update_profile("Ana", "Caminar")
+        b.set_habit_status(DIA, "respira_1", True)
+        b.set_habit_status("2025-03-19", "postura_1", True)
+
+        desde_a = sincronizar(a, b, None)
+        desde_b = sincronizar(b, a, None)
+
+        assert self.estado(a) == self.estado(b), "Las copias deberían converger"
+        assert a.get_completed_count_for_day(DIA) == 2, "Deberían mezclarse los hábitos de ambas"
+
+        # Una segunda ronda no debería traer nada nuevo (sin eco)
+        seq_a = a.current_seq()
+        sincronizar(a, b, desde_a)
+        sincronizar(b, a, desde_b)
+        assert a.apply_changes(b.changes_since(None)) == 0, "Los deltas ya aplicados no deberían reaplicarse"
+        assert a.current_seq() == seq_a, "Reaplicar deltas no debería generar cambios nuevos"
+
+    def test_conflicto_gana_el_ultimo(self, copias):
+        """Prueba last-writer-wins por (día, hábito)"""
+        a, b = copias
+        a.set_habit_status(DIA, "camina_10", True)
+        b.clock.t = 2000.0
+        b.set_habit_status(DIA, "camina_10", False)
+
+        sincronizar(a, b, None)
+        sincronizar(b, a, None)
+
+        assert a.get_day_habits(DIA)["camina_10"] is False, "Debería ganar la escritura más reciente"
+        assert self.estado(a) == self.estado(b), "Las copias deberían converger"
+
+    def test_empate_se_resuelve_igual_en_ambas(self, copias):
+        """Prueba que un empate en updated_at se resuelva igual en las dos copias"""
+        a, b = copias
+        a.set_habit_status(DIA, "camina_10", True)
+        b.set_habit_status(DIA, "camina_10", False)
+        a.update_profile("Ana", "Caminar")
+        b.update_profile("Beto", "Caminar")
+
+        sincronizar(a, b, None)
+        sincronizar(b, a, None)
+
+        assert self.estado(a) == self.estado(b), "Las copias deberían converger también en un empate"
+
+    def test_hooks_ven_deltas(self, copias):
+        """Prueba que los hooks de escritura reciban los días modificados por otra copia"""
+        a, b = copias
+        dias = []
+        b.add_write_hook(dias.append)
+        a.set_habit_status(DIA, "camina_10", True)
+        a.set_habit_status(DIA, "respira_1", True)
+
+        sincronizar(a, b, None)
+        assert dias == [DIA], "El hook debería llamarse una vez por día modificado"
+
+    def test_rollback_no_consume_seq(self, copias):
+        """Prueba que una transacción revertida no deje un número de cambio usado"""
+        a, _ = copias
+
+        def falla(day_date):
+            raise RuntimeError("fallo simulado")
+
+        a.add_write_hook(falla)
+        with pytest.raises(RuntimeError):
+            a.set_habit_status(DIA, "camina_10", True)
+        a.remove_write_hook(falla)
+
+        assert a.current_seq() == 0, "El número de cambio debería revertirse"
+        a.set_habit_status(DIA, "camina_10", True)
+        assert a.current_seq() == 1, "La siguiente escritura debería tomar el número 1"
+
+    def test_aplicaciones_concurrentes_no_repiten_seq(self, copias):
+        """Prueba que dos conexiones que aplican deltas a la vez tomen números de cambio distintos"""
+        a, b = copias
+        otra = Database(a.db_path, user_id=2, ensure_schema=False)
+        otra.clock = a.clock
+        a.set_habit_status(DIA, "camina_10", True)
+        b.set_habit_status(DIA, "respira_1", True)
+
+        with a.transaction():
+            assert a.apply_changes(b.changes_since(None)) == 1
+            # La otra conexión aplica mientras esta transacción sigue abierta
+            hilo = threading.Thread(target=otra.apply_changes, args=(b.changes_since(None),))
+            hilo.start()
+            hilo.join(0.3)
+            assert hilo.is_alive(), "La otra conexión debería esperar a que se confirme la transacción"
+        hilo.join()
+
+        numeros = [c[1] for c in a.changes_since(None)] + [c[1] for c in otra.changes_since(None)]
+        assert len(numeros) == 3 and len(set(numeros)) == 3, "Cada transacción debería tomar su propio número"
+        assert a.current_seq() == max(numeros)
+
+
+class TestMigracionV3:
+    """Clase para probar la migración al registro de cambios"""
+
+    def test_migra_desde_v2(self):
+        """Prueba que una base por usuario sin seq se migre sin perder datos"""
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, "v2.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(ESQUEMA_V2)
+        conn.close()
+
+        db = Database(path)
+        conn = db.get_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+
+        assert version == SCHEMA_VERSION, "La base debería quedar en la versión actual"
+        assert db.get_day_habits(DIA)["camina_10"] is True, "Los datos deberían conservarse"
+        assert [c[0] for c in db.changes_since(None)] == ["h"], \
+            "Las filas anteriores deberían enviarse en la primera sincronización"
+        db.set_habit_status(DIA, "camina_10", False)
+        assert db.current_seq() == 1, "El registro de cambios debería funcionar después de migrar"
+
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
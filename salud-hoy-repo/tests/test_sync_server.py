@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del servidor de sincronización para Salud Hoy
+Levanta una instancia local en un puerto libre y la prueba con http.client:
+login con token, lecturas y escrituras por usuario, validaciones y lotes
+"""
+
+import pytest
+import os
+import json
+import asyncio
+import tempfile
+import shutil
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Importar el servidor
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'salud-hoy')))
+
+from app.sync_server import SyncServer, WriteBatcher
+
+
+class TestSyncServer:
+    """Clase para probar el servidor HTTP de sincronización"""
+
+    @pytest.fixture
+    def server(self):
+        """Levanta un servidor temporal con dos usuarios registrados"""
+        temp_dir = tempfile.mkdtemp()
+        server = SyncServer(temp_dir, port=0)
+        server.auth_db.add_user("Ana", "ana@example.com", "password123")
+        server.auth_db.add_user("Beto", "beto@example.com", "password123")
+        server.start_in_thread()
+
+        yield server
+
+        server.stop_thread()
+        try:
+            shutil.rmtree(temp_dir)
+        except PermissionError:
+            # En Windows, a veces los archivos están en uso
+            pass
+
+    def call(self, server, method, path, token=None, body=None):
+        """Hace una petición y retorna (status, json)"""
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = conn.getresponse()
+        result = response.status, json.loads(response.read())
+        conn.close()
+        return result
+
+    def login(self, server, email):
+        status, payload = self.call(server, "POST", "/login", body={"email": email, "password": "password123"})
+        assert status == 200, f"El login debería funcionar: {payload}"
+        return payload["token"]
+
+    def test_login_y_token_requerido(self, server):
+        """Prueba que sin token válido no se pueda acceder a los datos"""
+        status, _ = self.call(server, "POST", "/login", body={"email": "ana@example.com", "password": "mala"})
+        assert status == 401, "Credenciales incorrectas deberían rechazarse"
+
+        assert self.call(server, "GET", "/profile")[0] == 401, "Sin token debería rechazarse"
+        assert self.call(server, "GET", "/profile", token="inventado")[0] == 401, "Un token inventado debería rechazarse"
+
+    def test_toggle_y_lectura(self, server):
+        """Prueba que un toggle se confirme y se vea en las lecturas"""
+        token = self.login(server, "ana@example.com")
+
+        status, _ = self.call(server, "PUT", "/days/2025-03-20/habits/camina_10", token, {"done": True})
+        assert status == 200, "El toggle debería aceptarse"
+
+        status, day = self.call(server, "GET", "/days/2025-03-20", token)
+        assert day["habits"]["camina_10"] is True and day["completed"] == 1, "El toggle debería leerse"
+        status, stats = self.call(server, "GET", "/stats?date=2025-03-20", token)
+        assert stats["streak"] == 1 and stats["weekly"] == 1, "Las estadísticas deberían incluir el toggle"
+        status, rango = self.call(server, "GET", "/range?start=2025-03-01&end=2025-03-31", token)
+        assert rango["days"] == {"2025-03-20": {"camina_10": True}}
+
+    def test_datos_separados_por_usuario(self, server):
+        """Prueba que cada usuario vea solo sus datos"""
+        ana = self.login(server, "ana@example.com")
+        beto = self.login(server, "beto@example.com")
+
+        self.call(server, "PUT", "/days/2025-03-20/habits/camina_10", ana, {"done": True})
+        self.call(server, "PUT", "/profile", beto, {"name": "Beto", "goal": "Respirar"})
+
+        assert self.call(server, "GET", "/days/2025-03-20", beto)[1]["completed"] == 0, "Beto no debería ver los hábitos de Ana"
+        assert self.call(server, "GET", "/profile", ana)[1]["name"] == "", "Ana no debería ver el perfil de Beto"
+        assert self.call(server, "GET", "/profile", beto)[1] == {"name": "Beto", "goal": "Respirar"}
+
+    def test_cambios_en_lote(self, server):
+        """Prueba que POST /changes aplique varios cambios de una vez"""
+        token = self.login(server, "ana@example.com")
+        changes = [{"date": "2025-03-20", "habit_key": key, "done": True}
+                   for key in ("camina_10", "respira_1", "postura_1")]
+
+        status, payload = self.call(server, "POST", "/changes", token, {"changes": changes})
+
+        assert status == 200 and payload["applied"] == 3
+        assert self.call(server, "GET", "/days/2025-03-20", token)[1]["completed"] == 3
+
+    def test_deltas(self, server):
+        """Prueba que GET /changes retorne solo los cambios posteriores a seq"""
+        token = self.login(server, "ana@example.com")
+        self.call(server, "PUT", "/days/2025-03-20/habits/camina_10", token, {"done": True})
+        status, primero = self.call(server, "GET", "/changes", token)
+        assert status == 200 and len(primero["changes"]) == 1, "Debería retornar el toggle"
+
+        self.call(server, "POST", "/changes", token, {"changes": [
+            {"date": "2025-03-20", "habit_key": "respira_1", "done": True},
+            {"date": "2025-03-20", "habit_key": "camina_10", "done": False, "updated_at": 1},
+        ]})
+        status, delta = self.call(server, "GET", f"/changes?since={primero['seq']}", token)
+        assert [c[3] for c in delta["changes"]] == ["respira_1"], \
+            "Solo debería retornar lo nuevo (un cambio más antiguo no gana)"
+
+    def test_updated_at_cero(self, server):
+        """Prueba que updated_at = 0 se respete en vez de reemplazarse por la hora de llegada"""
+        token = self.login(server, "ana@example.com")
+        self.call(server, "POST", "/changes", token, {"changes": [
+            {"date": "2025-03-20", "habit_key": "camina_10", "done": True, "updated_at": 5},
+        ]})
+
+        status, _ = self.call(server, "POST", "/changes", token, {"changes": [
+            {"date": "2025-03-20", "habit_key": "camina_10", "done": False, "updated_at": 0},
+        ]})
+        assert status == 200
+        status, delta = self.call(server, "GET", "/changes", token)
+        assert [(c[4], c[5]) for c in delta["changes"]] == [(1, 5)], \
+            "Un cambio con updated_at 0 es más antiguo y no debería ganar"
+
+    def test_validaciones(self, server):
+        """Prueba que fechas y hábitos inválidos se rechacen sin escribir"""
+        token = self.login(server, "ana@example.com")
+
+        assert self.call(server, "PUT", "/days/20-03-2025/habits/camina_10", token, {"done": True})[0] == 400
+        assert self.call(server, "PUT", "/days/2025-03-20/habits/no_existe", token, {"done": True})[0] == 400
+        assert self.call(server, "GET", "/no/existe", token)[0] == 404
+        for body in ({"changes": {"date": "2025-03-20"}},
+                     {"changes": [["2025-03-20", "camina_10", True]]},
+                     {"changes": [{"date": "2025-03-20", "habit_key": ["camina_10"], "done": True}]},
+                     {"changes": [{"date": "2025-03-20", "habit_key": "camina_10", "done": True,
+                                   "updated_at": "ayer"}]},
+                     [{"date": "2025-03-20", "habit_key": "camina_10", "done": True}]):
+            status, payload = self.call(server, "POST", "/changes", token, body)
+            assert status == 400, f"Un cuerpo mal formado debería rechazarse con 400: {body} -> {payload}"
+        assert self.call(server, "GET", "/days/2025-03-20", token)[1]["completed"] == 0
+
+    def test_cerrar_sesion(self, server):
+        """Prueba que DELETE /session invalide el token"""
+        token = self.login(server, "ana@example.com")
+
+        assert self.call(server, "DELETE", "/session", token)[0] == 200
+        assert self.call(server, "GET", "/profile", token)[0] == 401, "El token debería quedar revocado"
+
+    def test_cache_de_tokens_acotada(self, server):
+        """Prueba que la caché de tokens descarte los vencidos y no supere su máximo"""
+        tokens = [self.login(server, email) for email in ("ana@example.com", "beto@example.com")] * 2
+        tokens += [self.login(server, "ana@example.com") for _ in range(3)]
+
+        with patch('app.sync_server.TOKEN_CACHE_MAX', 3):
+            for token in tokens:
+                assert self.call(server, "GET", "/profile", token)[0] == 200
+            assert len(server._tokens) == 3, "La caché no debería superar TOKEN_CACHE_MAX"
+            assert list(server._tokens) == tokens[-3:], "Deberían quedar los tokens más recientes"
+
+        # Simular que pasó TOKEN_CACHE_TTL: el próximo token nuevo descarta los vencidos
+        server._tokens = {token: (user, 0) for token, (user, _) in server._tokens.items()}
+        assert self.call(server, "GET", "/profile", tokens[0])[0] == 200
+        assert list(server._tokens) == [tokens[0]], "Los tokens vencidos deberían descartarse"
+
+
+class TestWriteBatcher:
+    """Clase para probar el agrupamiento de escrituras"""
+
+    def test_cambios_concurrentes_en_un_lote(self):
+        """Prueba que los cambios que llegan juntos se escriban en una transacción por usuario"""
+        calls = []
+
+        async def run():
+            batcher = WriteBatcher(lambda user_id, changes: calls.append((user_id, list(changes))), window=0.05)
+            executor = ThreadPoolExecutor(max_workers=1)
+            batcher.start(executor)
+            await asyncio.gather(
+                batcher.submit(1, [("2025-03-20", "camina_10", True)]),
+                batcher.submit(1, [("2025-03-20", "respira_1", True)]),
+                batcher.submit(2, [("2025-03-20", "camina_10", True)]),
+            )
+            await batcher.stop()
+            executor.shutdown()
+            return batcher
+
+        batcher = asyncio.run(run())
+
+        assert batcher.batches == 1, "Los tres cambios deberían ir en un solo lote"
+        assert sorted(calls) == [(1, [("2025-03-20", "camina_10", True), ("2025-03-20", "respira_1", True)]),
+                                 (2, [("2025-03-20", "camina_10", True)])], "Debería escribirse una vez por usuario"
+
+    def test_error_solo_afecta_a_su_usuario(self):
+        """Prueba que un error al escribir un usuario no afecte a los demás"""
+        def apply(user_id, changes):
+            if user_id == 2:
+                raise RuntimeError("fallo simulado")
+
+        async def run():
+            batcher = WriteBatcher(apply, window=0.05)
+            executor = ThreadPoolExecutor(max_workers=1)
+            batcher.start(executor)
+            results = await asyncio.gather(
+                batcher.submit(1, [("2025-03-20", "camina_10", True)]),
+                batcher.submit(2, [("2025-03-20", "camina_10", True)]),
+                return_exceptions=True,
+            )
+            await batcher.stop()
+            executor.shutdown()
+            return results
+
+        ok, error = asyncio.run(run())
+        assert ok is True, "El usuario 1 debería confirmarse"
+        assert isinstance(error, RuntimeError), "El usuario 2 debería recibir el error"